@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Storage benchmark for saved Draw.io files
+Compares disk usage, save latency and read latency of plain and compressed (COMPRESS_DRAWIO_FILES) storage
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.file_service import FileService, map_file  # noqa: E402
+
+
+def build_diagram(cell_count: int, seed: int) -> str:
+    """Build a grid diagram with cell_count vertices chained by edges"""
+    cells = ['<mxCell id="0"/>', '<mxCell id="1" parent="0"/>']
+    columns = max(1, int(cell_count ** 0.5))
+    for index in range(cell_count):
+        x = 40 + (index % columns) * 160
+        y = 40 + (index // columns) * 100
+        cells.append(
+            f'<mxCell id="v{index}" value="Node {seed}-{index}" style="rounded=1;whiteSpace=wrap;html=1;" '
+            f'vertex="1" parent="1"><mxGeometry x="{x}" y="{y}" width="120" height="60" as="geometry"/></mxCell>'
+        )
+        if index:
+            cells.append(
+                f'<mxCell id="e{index}" style="edgeStyle=orthogonalEdgeStyle;" edge="1" parent="1" '
+                f'source="v{index - 1}" target="v{index}"><mxGeometry relative="1" as="geometry"/></mxCell>'
+            )
+    return (
+        '<mxfile><diagram name="Benchmark"><mxGraphModel><root>'
+        + "".join(cells)
+        + "</root></mxGraphModel></diagram></mxfile>"
+    )
+
+
+def summarize(times_ms: List[float]) -> Dict[str, float]:
+    """Summarize a list of timings in milliseconds"""
+    ordered = sorted(times_ms)
+    return {
+        "mean_ms": round(statistics.mean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+
+def read_plain(path: str) -> str:
+    """Read a file the way the renderer did before memory-mapped reads"""
+    return Path(path).read_text(encoding="utf-8")
+
+
+def read_mapped(path: str) -> str:
+    """Read a file through a memory map"""
+    with map_file(path) as view:
+        return str(view, "utf-8")
+
+
+async def measure_mode(temp_dir: Path, diagrams: List[str], compress: bool) -> Dict[str, Any]:
+    """Save and read back every diagram with one storage mode"""
+    FileService._instance = None
+    FileService._initialized = False
+    service = FileService(temp_dir=str(temp_dir), persist_metadata=False, compress_drawio=compress)
+    try:
+        save_times, file_ids = [], []
+        for xml_content in diagrams:
+            start = time.perf_counter()
+            file_ids.append(await service.save_drawio_file(xml_content))
+            save_times.append((time.perf_counter() - start) * 1000)
+
+        paths = [service.temp_files[file_id].path for file_id in file_ids]
+        disk_bytes = sum(service.temp_files[file_id].size_bytes for file_id in file_ids)
+
+        reads = {}
+        for name, reader in (("read_text", read_plain), ("mmap", read_mapped)):
+            times = []
+            for path in paths:
+                start = time.perf_counter()
+                reader(path)
+                times.append((time.perf_counter() - start) * 1000)
+            reads[name] = summarize(times)
+
+        times = []
+        for file_id in file_ids:
+            start = time.perf_counter()
+            await service.read_drawio_xml(file_id)
+            times.append((time.perf_counter() - start) * 1000)
+        reads["read_drawio_xml"] = summarize(times)
+
+        return {
+            "compressed_files": sum(service.temp_files[file_id].compressed for file_id in file_ids),
+            "disk_bytes": disk_bytes,
+            "save": summarize(save_times),
+            "reads": reads,
+        }
+    finally:
+        service.close()
+        FileService._instance = None
+        FileService._initialized = False
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark plain vs compressed Draw.io storage")
+    parser.add_argument("--files", type=int, default=200, help="Number of diagrams to save")
+    parser.add_argument("--cells", type=int, default=200, help="Number of vertices per diagram")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    diagrams = [build_diagram(args.cells, seed) for seed in range(args.files)]
+    logical_bytes = sum(len(xml_content.encode("utf-8")) for xml_content in diagrams)
+
+    results = {"files": args.files, "cells": args.cells, "logical_bytes": logical_bytes}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, compress in (("plain", False), ("compressed", True)):
+            results[name] = await measure_mode(Path(temp_dir) / name, diagrams, compress)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"files: {args.files} | cells: {args.cells} | logical size: {logical_bytes / 1e6:.2f} MB")
+    for name in ("plain", "compressed"):
+        entry = results[name]
+        reads = entry["reads"]
+        print(
+            f"{name:<11} disk {entry['disk_bytes'] / 1e6:7.2f} MB "
+            f"({entry['disk_bytes'] / logical_bytes:5.1%})  save p50 {entry['save']['p50_ms']:7.3f} ms  "
+            f"read_text p50 {reads['read_text']['p50_ms']:6.3f} ms  mmap p50 {reads['mmap']['p50_ms']:6.3f} ms  "
+            f"read_drawio_xml p50 {reads['read_drawio_xml']['p50_ms']:6.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Per-format export benchmark for ImageService
+Measures cold render time, cached render time and output size for each export format
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.image_service import EXPORT_FORMATS, ExportOptions, ImageService  # noqa: E402
+
+
+def build_diagram(cell_count: int) -> str:
+    """Build a grid diagram with cell_count vertices chained by edges"""
+    cells = ['<mxCell id="0"/>', '<mxCell id="1" parent="0"/>']
+    columns = max(1, int(cell_count ** 0.5))
+    for index in range(cell_count):
+        x = 40 + (index % columns) * 160
+        y = 40 + (index // columns) * 100
+        cells.append(
+            f'<mxCell id="v{index}" value="Node {index}" style="rounded=1;whiteSpace=wrap;html=1;" '
+            f'vertex="1" parent="1"><mxGeometry x="{x}" y="{y}" width="120" height="60" as="geometry"/></mxCell>'
+        )
+        if index:
+            cells.append(
+                f'<mxCell id="e{index}" style="edgeStyle=orthogonalEdgeStyle;" edge="1" parent="1" '
+                f'source="v{index - 1}" target="v{index}"><mxGeometry relative="1" as="geometry"/></mxCell>'
+            )
+    return (
+        '<mxfile><diagram name="Benchmark"><mxGraphModel><root>'
+        + "".join(cells)
+        + "</root></mxGraphModel></diagram></mxfile>"
+    )
+
+
+def summarize(times_ms: List[float]) -> Dict[str, float]:
+    """Summarize a list of timings in milliseconds"""
+    ordered = sorted(times_ms)
+    return {
+        "mean_ms": round(statistics.mean(ordered), 2),
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+    }
+
+
+async def benchmark_format(service: ImageService, drawio_path: Path, export_format: str,
+                           iterations: int) -> Dict[str, Any]:
+    """Benchmark cold and cached exports of a single format"""
+    options = ExportOptions(format=export_format)
+    cold_times = []
+    result = None
+
+    for _ in range(iterations):
+        service.clear_render_cache()
+        start = time.perf_counter()
+        result = await service.export_diagram(str(drawio_path), options)
+        cold_times.append((time.perf_counter() - start) * 1000)
+        if not result.success:
+            return {"format": export_format, "skipped": True, "reason": result.error}
+
+    warm_times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        cached = await service.export_diagram(str(drawio_path), options)
+        warm_times.append((time.perf_counter() - start) * 1000)
+        assert cached.from_cache
+
+    return {
+        "format": export_format,
+        "renderer": result.renderer,
+        "size_bytes": Path(result.png_file_path).stat().st_size,
+        "cold": summarize(cold_times),
+        "cached": summarize(warm_times),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark diagram export per output format")
+    parser.add_argument("--formats", nargs="+", default=list(EXPORT_FORMATS), choices=list(EXPORT_FORMATS))
+    parser.add_argument("--cells", type=int, default=50, help="Number of vertices in the diagram")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--drawio-cli", default="drawio", help="Draw.io CLI executable")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    service = ImageService(drawio_cli_path=args.drawio_cli)
+    cli_check = await service.is_drawio_cli_available()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        drawio_path = Path(temp_dir) / "benchmark.drawio"
+        drawio_path.write_text(build_diagram(args.cells), encoding="utf-8")
+
+        results = []
+        for export_format in args.formats:
+            results.append(await benchmark_format(service, drawio_path, export_format, args.iterations))
+
+    if args.json:
+        print(json.dumps({"cli_available": cli_check.available, "cells": args.cells, "results": results}, indent=2))
+        return
+
+    print(f"Draw.io CLI available: {cli_check.available} | cells: {args.cells} | iterations: {args.iterations}")
+    print(f"{'format':<8}{'renderer':<12}{'size':>10}{'cold p50':>12}{'cold p95':>12}{'cached p50':>12}")
+    for result in results:
+        if result.get("skipped"):
+            print(f"{result['format']:<8}skipped: {result['reason']}")
+            continue
+        print(
+            f"{result['format']:<8}{result['renderer']:<12}{result['size_bytes']:>10}"
+            f"{result['cold']['p50_ms']:>10.2f}ms{result['cold']['p95_ms']:>10.2f}ms"
+            f"{result['cached']['p50_ms']:>10.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
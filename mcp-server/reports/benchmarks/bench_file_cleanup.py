@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Cleanup benchmark for FileService metadata indexes
+Measures expired/orphan detection with the path and expiry indexes against the previous linear scan
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.file_service import FileService, TempFile  # noqa: E402
+
+
+def populate(service: FileService, file_count: int, expired_count: int, orphan_count: int) -> None:
+    """Create file_count managed files (expired_count of them expired) plus orphan_count orphans"""
+    now = datetime.now()
+    for index in range(file_count):
+        path = service.temp_dir / f"file_{index}.drawio"
+        path.touch()
+        expires_at = now - timedelta(minutes=1) if index < expired_count else now + timedelta(hours=24)
+        service.temp_files[f"id_{index}"] = TempFile(
+            id=f"id_{index}",
+            original_name=path.name,
+            path=str(path),
+            file_type="drawio",
+            created_at=now,
+            expires_at=expires_at
+        )
+    for index in range(orphan_count):
+        (service.temp_dir / f"orphan_{index}.drawio").touch()
+
+
+def legacy_scan(service: FileService) -> Dict[str, int]:
+    """Replay the previous detection: full metadata pass plus any() per file on disk"""
+    now = datetime.now()
+    expired = [file_id for file_id, temp_file in service.temp_files.items() if now > temp_file.expires_at]
+    orphaned = 0
+    for file_path in service.temp_dir.iterdir():
+        if file_path.is_file() and not any(
+            temp_file.path == str(file_path) for temp_file in service.temp_files.values()
+        ):
+            orphaned += 1
+    return {"expired": len(expired), "orphaned": orphaned}
+
+
+def timed(func, *args) -> Dict[str, Any]:
+    """Run func once and record wall time in milliseconds"""
+    start = time.perf_counter()
+    result = func(*args)
+    if asyncio.iscoroutine(result):
+        result = asyncio.run(result)
+    return {"result": result, "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+def run(file_count: int, expired_count: int, orphan_count: int, legacy: bool) -> Dict[str, Any]:
+    """Benchmark one population size"""
+    FileService._instance = None
+    FileService._initialized = False
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        service = FileService(temp_dir=temp_dir, persist_metadata=False)
+        service.stop_cleanup_scheduler()
+        try:
+            populate(service, file_count, expired_count, orphan_count)
+            results: Dict[str, Any] = {"files": file_count, "expired": expired_count, "orphans": orphan_count}
+            if legacy:
+                results["legacy_detection"] = timed(legacy_scan, service)
+            results["indexed_cleanup"] = timed(service.cleanup_expired_files)
+            results["indexed_noop_cleanup"] = timed(service.cleanup_expired_files)
+            return results
+        finally:
+            FileService._instance = None
+            FileService._initialized = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FileService cleanup at large file counts")
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--expired", type=int, default=1_000)
+    parser.add_argument("--orphans", type=int, default=100)
+    parser.add_argument("--legacy-files", type=int, default=5_000,
+                        help="File count for the quadratic legacy scan (too slow at --files)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = [run(args.files, args.expired, args.orphans, legacy=False)]
+    if args.legacy_files:
+        legacy_expired = max(1, args.expired * args.legacy_files // args.files)
+        results.append(run(args.legacy_files, legacy_expired, args.orphans, legacy=True))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for entry in results:
+        print(f"files: {entry['files']} | expired: {entry['expired']} | orphans: {entry['orphans']}")
+        for name in ("legacy_detection", "indexed_cleanup", "indexed_noop_cleanup"):
+            if name in entry:
+                print(f"  {name:<22}{entry[name]['elapsed_ms']:>12.2f} ms  -> {entry[name]['result']}")
+
+
+if __name__ == "__main__":
+    main()
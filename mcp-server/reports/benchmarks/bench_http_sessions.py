@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+HTTP transport load test
+Opens many concurrent Streamable HTTP sessions against one server process and measures
+initialize, list_tools, generate-drawio-xml, save-drawio-file and resource read latency
+In process the Claude API is replaced by a stub that blocks like the real client for --llm-latency seconds
+With --url it targets a running server instead, e.g. one started with --workers N (generate-drawio-xml is skipped)
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from mcp import ClientSession  # noqa: E402
+from mcp.client.streamable_http import streamablehttp_client  # noqa: E402
+
+from src import server  # noqa: E402
+from src.file_service import FileService  # noqa: E402
+from src.http_transport import STREAMABLE_HTTP_PATH, create_http_app, create_http_server  # noqa: E402
+from src.llm_service import LLMService  # noqa: E402
+
+SAMPLE_XML = """<mxfile host="app.diagrams.net"><diagram name="load"><mxGraphModel><root>
+<mxCell id="0"/><mxCell id="1" parent="0"/>
+<mxCell id="2" value="Session" style="rounded=1;" vertex="1" parent="1"><mxGeometry x="40" y="40" width="120" height="60" as="geometry"/></mxCell>
+</root></mxGraphModel></diagram></mxfile>"""
+
+
+class StubMessages:
+    """Stand-in for client.messages that blocks like the synchronous Anthropic client"""
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def create(self, **kwargs):
+        time.sleep(self.latency_s)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=SAMPLE_XML)],
+                               usage=SimpleNamespace(input_tokens=500, output_tokens=300))
+
+
+def summarize(times_ms: List[float]) -> Dict[str, float]:
+    """Summarize a list of timings in milliseconds"""
+    if not times_ms:
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(times_ms)
+    return {
+        "mean_ms": round(statistics.mean(ordered), 2),
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+async def run_session(url: str, index: int, timings: Dict[str, List[float]], generate: bool) -> None:
+    """Run one client session through the full request sequence"""
+    session_start = time.perf_counter()
+    async with streamablehttp_client(url) as (read_stream, write_stream, _):
+        async with ClientSession(read_stream, write_stream) as session:
+            steps = [
+                ("initialize", lambda: session.initialize()),
+                ("list_tools", lambda: session.list_tools()),
+                # A distinct prompt per session so every call reaches the client
+                ("generate", lambda: session.call_tool("generate-drawio-xml",
+                                                       {"prompt": f"Flowchart for load session {index}"})),
+                ("save", lambda: session.call_tool("save-drawio-file",
+                                                   {"xml_content": SAMPLE_XML, "filename": f"load_{index}"})),
+            ]
+            for step, call in steps:
+                if step == "generate" and not generate:
+                    continue
+                start = time.perf_counter()
+                result = await call()
+                timings[step].append((time.perf_counter() - start) * 1000)
+                if getattr(result, "isError", False):
+                    raise RuntimeError(f"{step}: {result.content[0].text}")
+                # Tool failures are reported in the text rather than as isError
+                if step == "generate" and "<mxfile" not in result.content[0].text:
+                    raise RuntimeError(f"{step}: {result.content[0].text}")
+            resources = await session.list_resources()
+            start = time.perf_counter()
+            await session.read_resource(resources.resources[0].uri)
+            timings["read_resource"].append((time.perf_counter() - start) * 1000)
+    timings["session"].append((time.perf_counter() - session_start) * 1000)
+
+
+async def run_load(url: str, sessions: int,
+                   generate: bool = False) -> Tuple[Dict[str, List[float]], List[str], float]:
+    """Run the sessions concurrently and collect timings and failures"""
+    timings: Dict[str, List[float]] = {"initialize": [], "list_tools": []}
+    if generate:
+        timings["generate"] = []
+    timings.update({"save": [], "read_resource": [], "session": []})
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(run_session(url, index, timings, generate) for index in range(sessions)),
+                                    return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failures = [repr(outcome) for outcome in outcomes if isinstance(outcome, BaseException)]
+    return timings, failures, elapsed
+
+
+async def run_in_process(port: int, sessions: int, llm_latency_s: float):
+    """Serve the MCP server in this process and load it"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        server.logger = logging.getLogger("bench_http_sessions")
+        server.file_service = FileService(temp_dir=temp_dir, persist_metadata=False, cleanup_interval_minutes=24 * 60)
+        server.llm_service = LLMService(api_key="sk-ant-bench-stub", skip_client_init=True)
+        server.llm_service.client = SimpleNamespace(messages=StubMessages(llm_latency_s))
+
+        app = create_http_app(server.server, server.create_initialization_options())
+        http_server = create_http_server(app, port=port, log_level="warning")
+        serve_task = asyncio.create_task(http_server.serve())
+        while not http_server.started:
+            await asyncio.sleep(0.01)
+        port = http_server.servers[0].sockets[0].getsockname()[1]
+
+        timings, failures, elapsed = await run_load(f"http://127.0.0.1:{port}{STREAMABLE_HTTP_PATH}", sessions,
+                                                    generate=True)
+
+        stored = len(await server.file_service.list_files())
+        http_server.should_exit = True
+        await serve_task
+        server.file_service.close()
+    return timings, failures, elapsed, stored
+
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the Streamable HTTP transport")
+    parser.add_argument("--sessions", type=int, default=100, help="Concurrent client sessions")
+    parser.add_argument("--port", type=int, default=0, help="Port to serve on (0 picks a free port)")
+    parser.add_argument("--url", help="Streamable HTTP endpoint of a running server (e.g. http://127.0.0.1:8000/mcp)")
+    parser.add_argument("--llm-latency", type=float, default=1.0,
+                        help="Seconds the stubbed Claude API call blocks (in-process only)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if args.url:
+        timings, failures, elapsed = await run_load(args.url, args.sessions)
+        stored = None
+    else:
+        timings, failures, elapsed, stored = await run_in_process(args.port, args.sessions, args.llm_latency)
+
+    results: Dict[str, Any] = {
+        "sessions": args.sessions,
+        "failures": len(failures),
+        "elapsed_s": round(elapsed, 2),
+        "sessions_per_s": round(args.sessions / elapsed, 1),
+        "files_stored": stored,
+        **{step: summarize(values) for step, values in timings.items()},
+    }
+    if args.json:
+        results["errors"] = failures[:5]
+        print(json.dumps(results, indent=2))
+        return
+
+    stored_text = f", {stored} files stored" if stored is not None else ""
+    print(f"{args.sessions} concurrent sessions in {results['elapsed_s']} s "
+          f"({results['sessions_per_s']} sessions/s), {len(failures)} failed{stored_text}")
+    for step in timings:
+        s = results[step]
+        print(f"  {step:<14} p50 {s['p50_ms']:8.2f} ms  p95 {s['p95_ms']:8.2f} ms  max {s['max_ms']:8.2f} ms")
+    for error in failures[:5]:
+        print(f"  error: {error}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Warm startup benchmark for persisted FileService metadata
+Measures how long a restarted FileService takes to load and reconcile N persisted file records
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.file_service import FileService, TempFile  # noqa: E402
+from src.metadata_store import COLUMNS, METADATA_DB_NAME, MetadataStore  # noqa: E402
+
+
+def populate(temp_dir: Path, file_count: int, missing_count: int) -> None:
+    """Write file_count records in one transaction; the last missing_count have no file on disk"""
+    MetadataStore(str(temp_dir / METADATA_DB_NAME)).close()
+    now = datetime.now()
+    records = []
+    for index in range(file_count):
+        path = temp_dir / f"file_{index}.drawio"
+        if index < file_count - missing_count:
+            path.touch()
+        temp_file = TempFile(
+            id=f"id_{index}",
+            original_name=path.name,
+            path=str(path),
+            file_type="drawio",
+            created_at=now,
+            expires_at=now + timedelta(hours=24)
+        )
+        record = temp_file.to_record()
+        records.append(tuple(record[column] for column in COLUMNS))
+
+    connection = sqlite3.connect(str(temp_dir / METADATA_DB_NAME))
+    with connection:
+        connection.executemany(
+            f"INSERT INTO files ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})", records
+        )
+    connection.close()
+
+
+def measure_startup(temp_dir: Path) -> Dict[str, Any]:
+    """Start a FileService on temp_dir and time the restore"""
+    FileService._instance = None
+    FileService._initialized = False
+    start = time.perf_counter()
+    service = FileService(temp_dir=str(temp_dir))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    restored = len(service.temp_files)
+    service.close()
+    FileService._instance = None
+    FileService._initialized = False
+    return {"restored": restored, "elapsed_ms": round(elapsed_ms, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FileService warm startup from persisted metadata")
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--missing", type=int, default=1_000, help="Records whose file was deleted while down")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        populate(Path(temp_dir), args.files, args.missing)
+        first = measure_startup(Path(temp_dir))
+        second = measure_startup(Path(temp_dir))
+
+    results = {"files": args.files, "missing": args.missing, "first_start": first, "second_start": second}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"records: {args.files} | missing on disk: {args.missing}")
+    print(f"  first start (reconciles)  {first['elapsed_ms']:>10.2f} ms  -> {first['restored']} restored")
+    print(f"  second start              {second['elapsed_ms']:>10.2f} ms  -> {second['restored']} restored")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the PNG conversion pipeline
+Measures peak Python heap usage of render -> hash -> Base64 -> registration for large PNGs
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.file_service import FileService  # noqa: E402
+from src.image_service import CLIAvailabilityResult, ImageService  # noqa: E402
+
+
+class SimulatedCLIImageService(ImageService):
+    """ImageService whose Draw.io CLI writes a pre-generated PNG of a fixed size"""
+
+    def __init__(self, rendered_png: Path):
+        super().__init__(render_cache_size=0)
+        self.rendered_png = rendered_png
+
+    async def is_drawio_cli_available(self) -> CLIAvailabilityResult:
+        return CLIAvailabilityResult(available=True, version="simulated")
+
+    async def _execute_drawio_cli(self, input_path: str, output_path: str, options=None) -> bool:
+        os.link(self.rendered_png, output_path)
+        return True
+
+
+async def measure_pipeline(image_service: ImageService, file_service: FileService,
+                           drawio_path: Path) -> Dict[str, Any]:
+    """Run one conversion the way convert_to_png does and record peak heap usage"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = await image_service.generate_png_with_fallback(
+        drawio_file_path=str(drawio_path),
+        output_dir=str(file_service.temp_dir),
+        include_base64=True,
+        file_service=file_service
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert result["success"], result
+    assert result["save_result"]["success"], result["save_result"]
+    return {"peak_bytes": peak, "elapsed_ms": round(elapsed_ms, 2)}
+
+
+async def measure_legacy_reads(image_service: ImageService, png_path: Path) -> Dict[str, Any]:
+    """Replay the previous pipeline: Base64 from one full read, then a second full read to save a copy"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    encoded = await image_service.convert_to_base64(str(png_path))
+    with open(png_path, "rb") as f:
+        copy = f.read()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert encoded is not None and copy
+    return {"peak_bytes": peak, "elapsed_ms": round(elapsed_ms, 2)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark PNG pipeline memory for large diagrams")
+    parser.add_argument("--size-mb", type=float, default=10.0, help="Rendered PNG size in MB")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    size_bytes = int(args.size_mb * 1000 * 1000)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rendered_png = Path(temp_dir) / "rendered.png"
+        rendered_png.write_bytes(b"\x89PNG\r\n\x1a\n" + os.urandom(size_bytes - 8))
+
+        file_service = FileService(temp_dir=str(Path(temp_dir) / "managed"))
+        try:
+            drawio_path = file_service.temp_dir / "large.drawio"
+            drawio_path.write_text("<mxfile><diagram name=\"Large\"/></mxfile>", encoding="utf-8")
+
+            image_service = SimulatedCLIImageService(rendered_png)
+            pipeline = await measure_pipeline(image_service, file_service, drawio_path)
+            legacy = await measure_legacy_reads(image_service, rendered_png)
+        finally:
+            file_service.stop_cleanup_scheduler()
+
+    results = {
+        "png_size_bytes": size_bytes,
+        "pipeline": {**pipeline, "peak_ratio": round(pipeline["peak_bytes"] / size_bytes, 2)},
+        "legacy_reads": {**legacy, "peak_ratio": round(legacy["peak_bytes"] / size_bytes, 2)},
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"PNG size: {size_bytes / 1e6:.1f} MB")
+    for name in ("pipeline", "legacy_reads"):
+        entry = results[name]
+        print(
+            f"{name:<14} peak heap {entry['peak_bytes'] / 1e6:8.1f} MB "
+            f"({entry['peak_ratio']:.2f}x PNG)  {entry['elapsed_ms']:8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
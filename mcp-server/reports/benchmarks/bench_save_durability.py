@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Save throughput benchmark for FileService write durability policies
+Measures save latency per WRITE_DURABILITY policy and the cost of repeated filenames
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.file_service import DURABILITY_POLICIES, FileService  # noqa: E402
+
+
+def summarize(times_ms: List[float]) -> Dict[str, float]:
+    """Summarize a list of timings in milliseconds"""
+    ordered = sorted(times_ms)
+    return {
+        "mean_ms": round(statistics.mean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+
+def open_service(temp_dir: Path, durability: str) -> FileService:
+    """Create a fresh FileService for one measurement"""
+    FileService._instance = None
+    FileService._initialized = False
+    return FileService(temp_dir=str(temp_dir), durability=durability)
+
+
+async def measure_policy(temp_dir: Path, durability: str, saves: int, filename: str = None) -> Dict[str, Any]:
+    """Save distinct diagrams under one durability policy"""
+    service = open_service(temp_dir, durability)
+    try:
+        times = []
+        start_all = time.perf_counter()
+        for index in range(saves):
+            start = time.perf_counter()
+            await service.save_drawio_file(f"<mxfile><diagram name=\"{index}\"/></mxfile>", filename)
+            times.append((time.perf_counter() - start) * 1000)
+        elapsed = time.perf_counter() - start_all
+        return {**summarize(times), "saves_per_second": round(saves / elapsed, 1)}
+    finally:
+        service.close()
+
+
+def measure_legacy_probe(temp_dir: Path, saves: int) -> Dict[str, Any]:
+    """Replay the previous exists() probe loop for a repeated filename"""
+    temp_dir.mkdir(parents=True)
+    times = []
+    for _ in range(saves):
+        start = time.perf_counter()
+        file_path = temp_dir / "diagram.drawio"
+        counter = 1
+        while file_path.exists():
+            file_path = temp_dir / f"diagram_{counter}.drawio"
+            counter += 1
+        file_path.write_bytes(b"<mxfile/>")
+        times.append((time.perf_counter() - start) * 1000)
+    return summarize(times)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark FileService save durability policies")
+    parser.add_argument("--saves", type=int, default=500, help="Number of saves per policy")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {"saves": args.saves, "policies": {}}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for durability in DURABILITY_POLICIES:
+            results["policies"][durability] = await measure_policy(
+                Path(temp_dir) / durability, durability, args.saves
+            )
+        results["repeated_name"] = await measure_policy(
+            Path(temp_dir) / "repeated", "none", args.saves, filename="diagram"
+        )
+        results["legacy_probe"] = measure_legacy_probe(Path(temp_dir) / "legacy", args.saves)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"saves: {args.saves} | temp dir: {tempfile.gettempdir()}")
+    for durability, entry in results["policies"].items():
+        print(
+            f"{durability:<6} p50 {entry['p50_ms']:7.3f} ms  p95 {entry['p95_ms']:7.3f} ms  "
+            f"{entry['saves_per_second']:9.1f} saves/s"
+        )
+    print(
+        f"repeated filename: counter p95 {results['repeated_name']['p95_ms']:.3f} ms, "
+        f"legacy exists() probe p95 {results['legacy_probe']['p95_ms']:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Cold startup benchmark for stdio sessions
+Spawns `python -m src.server` the way MCP clients do for every session and measures the time
+until the initialize response and the first list_tools response
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from mcp import ClientSession, StdioServerParameters  # noqa: E402
+from mcp.client.stdio import stdio_client  # noqa: E402
+
+TARGET_MS = 300.0
+
+
+async def measure_once(env: Dict[str, str]) -> Dict[str, float]:
+    """Spawn one server process and time initialize and the first list_tools"""
+    params = StdioServerParameters(command=sys.executable, args=["-m", "src.server"], env=env, cwd=str(ROOT))
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        async with stdio_client(params, errlog=devnull) as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                initialized = time.perf_counter()
+                tools = await session.list_tools()
+                listed = time.perf_counter()
+    if not tools.tools:
+        raise RuntimeError("list_tools returned no tools")
+    return {
+        "initialize_ms": (initialized - start) * 1000,
+        "list_tools_ms": (listed - start) * 1000,
+    }
+
+
+def summarize(times_ms: List[float]) -> Dict[str, float]:
+    """Summarize a list of timings in milliseconds"""
+    ordered = sorted(times_ms)
+    return {
+        "min_ms": round(ordered[0], 2),
+        "p50_ms": round(statistics.median(ordered), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold stdio startup until the first list_tools response")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS, help="Budget for the p50 time to list_tools")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    runs: List[Dict[str, float]] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = {
+            **os.environ,
+            # A test key keeps the live key check out of the measurement
+            "ANTHROPIC_API_KEY": "sk-ant-REDACTED",
+            "DEVELOPMENT_MODE": "true",
+            "TEMP_DIR": temp_dir,
+            "LOG_LEVEL": "WARNING",
+        }
+        # The first spawn also fills the OS page cache and the dependency probe cache
+        await measure_once(env)
+        for _ in range(args.runs):
+            runs.append(await measure_once(env))
+
+    results: Dict[str, Any] = {
+        "runs": args.runs,
+        "target_ms": args.target_ms,
+        "initialize": summarize([run["initialize_ms"] for run in runs]),
+        "list_tools": summarize([run["list_tools_ms"] for run in runs]),
+    }
+    results["within_target"] = results["list_tools"]["p50_ms"] <= args.target_ms
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.runs} cold stdio starts (after one warm-up spawn)")
+        for step in ("initialize", "list_tools"):
+            s = results[step]
+            print(f"  spawn -> {step:<11} min {s['min_ms']:8.2f} ms  p50 {s['p50_ms']:8.2f} ms  max {s['max_ms']:8.2f} ms")
+        status = "within" if results["within_target"] else "OVER"
+        print(f"  p50 to list_tools is {status} the {args.target_ms:.0f} ms target")
+    if not results["within_target"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Storage layout benchmark for FileService
+Measures save, lookup and directory scan latency of the flat and sharded layouts
+with 10k, 100k and 1M files already in managed storage
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.file_service import STORAGE_LAYOUTS, FileService  # noqa: E402
+
+
+def summarize(times_ms: List[float]) -> Dict[str, float]:
+    """Summarize a list of timings in milliseconds"""
+    ordered = sorted(times_ms)
+    return {
+        "mean_ms": round(statistics.mean(ordered), 4),
+        "p50_ms": round(ordered[len(ordered) // 2], 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+    }
+
+
+def open_service(temp_dir: Path, layout: str) -> FileService:
+    """Create a fresh FileService without metadata persistence or background sweeps"""
+    FileService._instance = None
+    FileService._initialized = False
+    service = FileService(temp_dir=str(temp_dir), persist_metadata=False, durability="none",
+                          storage_layout=layout, cleanup_interval_minutes=24 * 60)
+    return service
+
+
+def prefill(service: FileService, file_count: int) -> List[Path]:
+    """Create file_count empty files where the layout would place them"""
+    paths = []
+    for index in range(file_count):
+        stem = f"prefill_{index}"
+        path = service._ensure_storage_dir(stem) / f"{stem}.drawio"
+        os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o644))
+        paths.append(path)
+    return paths
+
+
+async def measure_layout(temp_dir: Path, layout: str, file_count: int, samples: int) -> Dict[str, Any]:
+    """Measure one layout with file_count files already on disk"""
+    service = open_service(temp_dir, layout)
+    try:
+        start = time.perf_counter()
+        paths = prefill(service, file_count)
+        prefill_s = time.perf_counter() - start
+        # Flush the prefill so its writeback does not land in the measured saves
+        if hasattr(os, "sync"):
+            os.sync()
+
+        save_times = []
+        file_ids = []
+        for index in range(samples):
+            start = time.perf_counter()
+            file_ids.append(await service.save_drawio_file(f"<mxfile><diagram name=\"{index}\"/></mxfile>", f"sample_{index}"))
+            save_times.append((time.perf_counter() - start) * 1000)
+
+        lookup_times = []
+        for file_id in random.sample(file_ids, len(file_ids)):
+            start = time.perf_counter()
+            await service.get_file_path(file_id)
+            lookup_times.append((time.perf_counter() - start) * 1000)
+
+        stat_times = []
+        for path in random.sample(paths, min(samples, len(paths))):
+            start = time.perf_counter()
+            path.exists()
+            stat_times.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        scanned = len(service._scan_storage())
+        scan_ms = (time.perf_counter() - start) * 1000
+
+        return {
+            "prefill_s": round(prefill_s, 2),
+            "save": summarize(save_times),
+            "get_file_path": summarize(lookup_times),
+            "exists": summarize(stat_times),
+            "scan_ms": round(scan_ms, 1),
+            "scanned_files": scanned,
+        }
+    finally:
+        service.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark FileService flat vs sharded storage layouts")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Numbers of files already in storage")
+    parser.add_argument("--samples", type=int, default=500, help="Saves and lookups measured per run")
+    parser.add_argument("--layouts", nargs="+", choices=STORAGE_LAYOUTS, default=list(STORAGE_LAYOUTS))
+    parser.add_argument("--dir", help="Parent directory for the test storage (defaults to the system temp dir)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {"samples": args.samples, "runs": []}
+    for file_count in args.counts:
+        for layout in args.layouts:
+            with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+                entry = await measure_layout(Path(temp_dir), layout, file_count, args.samples)
+            results["runs"].append({"files": file_count, "layout": layout, **entry})
+            if not args.json:
+                print(
+                    f"{file_count:>9} files  {layout:<7}  save p50 {entry['save']['p50_ms']:7.3f} ms "
+                    f"p95 {entry['save']['p95_ms']:7.3f} ms  |  get_file_path p95 "
+                    f"{entry['get_file_path']['p95_ms']:7.3f} ms  |  exists p95 {entry['exists']['p95_ms']:7.4f} ms  "
+                    f"|  scan {entry['scan_ms']:9.1f} ms  (prefill {entry['prefill_s']} s)"
+                )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
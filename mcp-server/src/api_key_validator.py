@@ -5,19 +5,29 @@ This module provides comprehensive API key validation functionality including:
 - Real API key validation through actual API calls
 - Test/fake key detection and appropriate handling
 - Pre-connection testing and validation
+- Caching of live validation results across restarts
 """
 import asyncio
+import hashlib
+import json
 import logging
+import os
 import re
+import threading
+import time
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Optional, Dict, Any, Tuple
 from enum import Enum
 
-import anthropic
-from anthropic import APIError, APIConnectionError, APITimeoutError, RateLimitError
-
 from .exceptions import LLMError, LLMErrorCode
 
+API_KEY_CACHE_FILE_NAME = "api_key_validation.json"
+
+# Only results that say something about the key itself are cached; network
+# errors and timeouts are retried on the next start
+CACHEABLE_ERROR_CODES = (None, "UNAUTHORIZED", "RATE_LIMITED", "QUOTA_EXCEEDED")
+
 
 class APIKeyType(Enum):
     """Types of API keys."""
@@ -36,6 +46,103 @@ class APIKeyValidationResult:
     error_code: Optional[str] = None
     account_info: Optional[Dict[str, Any]] = None
     rate_limit_info: Optional[Dict[str, Any]] = None
+    cached: bool = False
+    live_check_pending: bool = False
+
+
+class APIKeyValidationCache:
+    """
+    Live validation results of production keys, persisted to a JSON file.
+    
+    Entries are keyed by the SHA-256 of the key, so the key itself is never
+    written to disk. Several processes may share the file; each write
+    replaces it atomically.
+    """
+    
+    def __init__(self, path: str, ttl_seconds: int):
+        """
+        Initialize the cache.
+        
+        Args:
+            path: JSON file holding the cached results
+            ttl_seconds: How long a result is reused; 0 disables the cache
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key_hash(api_key: str) -> str:
+        """Cache key for an API key."""
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                entries = json.loads(self.path.read_text(encoding="utf-8")).get("entries", {})
+                self._entries = entries if isinstance(entries, dict) else {}
+            except (OSError, ValueError, AttributeError):
+                # Missing or corrupt file: start empty, the next put rewrites it
+                self._entries = {}
+        return self._entries
+    
+    def _is_fresh(self, entry: Dict[str, Any], now: float) -> bool:
+        return now - entry.get("validated_at", 0) < self.ttl_seconds
+    
+    def get(self, api_key: str) -> Optional[APIKeyValidationResult]:
+        """
+        Cached result for a key.
+        
+        Args:
+            api_key: The API key
+            
+        Returns:
+            The cached result, or None if there is no fresh entry
+        """
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._load().get(self.key_hash(api_key))
+        if entry is None or not self._is_fresh(entry, time.time()):
+            return None
+        return APIKeyValidationResult(
+            is_valid=entry["is_valid"],
+            key_type=APIKeyType.PRODUCTION,
+            error_message=entry.get("error_message"),
+            error_code=entry.get("error_code"),
+            account_info={"validated_at": entry["validated_at"]},
+            cached=True,
+        )
+    
+    def put(self, api_key: str, result: APIKeyValidationResult) -> bool:
+        """
+        Store a live validation result if it is conclusive.
+        
+        Args:
+            api_key: The validated API key
+            result: Result of the live check
+            
+        Returns:
+            True if the result was stored
+        """
+        if self.ttl_seconds <= 0 or result.error_code not in CACHEABLE_ERROR_CODES:
+            return False
+        now = time.time()
+        with self._lock:
+            entries = {key: entry for key, entry in self._load().items() if self._is_fresh(entry, now)}
+            entries[self.key_hash(api_key)] = {
+                "is_valid": result.is_valid,
+                "error_code": result.error_code,
+                "error_message": result.error_message,
+                "validated_at": now,
+            }
+            self._entries = entries
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            temp_path.write_text(json.dumps({"entries": entries}), encoding="utf-8")
+            os.replace(temp_path, self.path)
+        return True
 
 
 class APIKeyValidator:
@@ -52,14 +159,16 @@ class APIKeyValidator:
         r"fake-key-.*",
     ]
     
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(self, logger: Optional[logging.Logger] = None, cache: Optional[APIKeyValidationCache] = None):
         """
         Initialize the API key validator.
         
         Args:
             logger: Optional logger instance
+            cache: Optional cache of live validation results
         """
         self.logger = logger or logging.getLogger(__name__)
+        self.cache = cache
     
     def classify_api_key(self, api_key: str) -> APIKeyType:
         """
@@ -91,14 +200,21 @@ class APIKeyValidator:
     async def validate_api_key(
         self, 
         api_key: str, 
-        skip_real_validation: bool = False
+        skip_real_validation: bool = False,
+        defer_live_check: bool = False
     ) -> APIKeyValidationResult:
         """
         Comprehensive API key validation.
         
+        Production keys are checked against the API unless a cached result
+        is available.
+        
         Args:
             api_key: The API key to validate
             skip_real_validation: If True, only perform format validation
+            defer_live_check: If True and no cached result exists, return a
+                format-only result with live_check_pending set instead of
+                calling the API
             
         Returns:
             APIKeyValidationResult: Detailed validation result
@@ -136,7 +252,26 @@ class APIKeyValidator:
         
         # Step 3: Real API validation for production keys
         if not skip_real_validation and key_type == APIKeyType.PRODUCTION:
-            return await self._validate_production_key(api_key)
+            cached = self.cache.get(api_key) if self.cache else None
+            if cached is not None:
+                self.logger.info(f"✅ キャッシュ済みのAPIキー検証結果を使用")
+                return cached
+            
+            if defer_live_check:
+                return APIKeyValidationResult(
+                    is_valid=True,
+                    key_type=key_type,
+                    error_message="Production API key format valid - live validation pending",
+                    live_check_pending=True
+                )
+            
+            result = await self._validate_production_key(api_key)
+            if self.cache:
+                try:
+                    await asyncio.to_thread(self.cache.put, api_key, result)
+                except OSError as error:
+                    self.logger.warning(f"⚠️ APIキー検証結果を保存できません: {str(error)}")
+            return result
         
         # If skipping real validation, assume production key is valid
         return APIKeyValidationResult(
@@ -158,6 +293,9 @@ class APIKeyValidator:
         self.logger.info(f"🔍 本番APIキーの実際の検証を実行中...")
         
         try:
+            # Imported here so format-only validation never loads anthropic
+            import anthropic
+            
             # Create client with the key
             client = anthropic.Anthropic(
                 api_key=api_key,
@@ -166,7 +304,9 @@ class APIKeyValidator:
             
             # Make a minimal API call to validate the key
             # Use a very simple prompt to minimize token usage
-            response = client.messages.create(
+            # The client is synchronous, so keep the call off the event loop
+            response = await asyncio.to_thread(
+                client.messages.create,
                 model="claude-3-haiku-20240307",  # Use cheapest model
                 max_tokens=10,  # Minimal tokens
                 temperature=0,
@@ -185,7 +325,7 @@ class APIKeyValidator:
             account_info = {
                 "model_used": "claude-3-haiku-20240307",
                 "response_received": True,
-                "validation_timestamp": asyncio.get_event_loop().time()
+                "validated_at": time.time()
             }
             
             return APIKeyValidationResult(
@@ -208,6 +348,8 @@ class APIKeyValidator:
         Returns:
             APIKeyValidationResult: Classified error result
         """
+        from anthropic import APIConnectionError, APIError, APITimeoutError, RateLimitError
+        
         error_message = str(error).lower()
         
         # Authentication/API key errors
@@ -299,7 +441,8 @@ class APIKeyValidator:
         self, 
         api_key: str, 
         development_mode: bool = False,
-        force_validation: bool = False
+        force_validation: bool = False,
+        defer_live_check: bool = False
     ) -> APIKeyValidationResult:
         """
         Validate API key with policy-based decisions.
@@ -308,6 +451,8 @@ class APIKeyValidator:
             api_key: The API key to validate
             development_mode: Whether server is in development mode
             force_validation: Force real validation even for test keys
+            defer_live_check: Return instead of calling the API when no cached
+                result exists (see validate_api_key)
             
         Returns:
             APIKeyValidationResult: Validation result following policy
@@ -328,5 +473,6 @@ class APIKeyValidator:
         # For production keys or when forced, do real validation
         return await self.validate_api_key(
             api_key, 
-            skip_real_validation=False
+            skip_real_validation=False,
+            defer_live_check=defer_live_check
         )
\ No newline at end of file
@@ -5,9 +5,11 @@ import os
 import logging
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from enum import Enum
 
+from .tracing import EXPORTER_NAMES, current_request_id
+
 
 class LogLevel(Enum):
     """Supported log levels."""
@@ -24,6 +26,31 @@ class LogFormat(Enum):
     JSON = "json"
 
 
+class WriteDurability(Enum):
+    """Supported file write durability policies."""
+    NONE = "none"
+    FILE = "file"
+    FULL = "full"
+
+
+class EvictionPolicy(Enum):
+    """Supported storage quota eviction policies."""
+    LRU = "lru"
+    LARGEST_OLDEST = "largest_oldest"
+
+
+class Transport(Enum):
+    """Supported MCP transports."""
+    STDIO = "stdio"
+    HTTP = "http"  # Streamable HTTP at /mcp and HTTP+SSE at /sse
+
+
+class StorageLayout(Enum):
+    """Supported temp directory layouts."""
+    FLAT = "flat"
+    SHARDED = "sharded"
+
+
 @dataclass
 class MCPServerConfig:
     """Configuration for the MCP Draw.io Server."""
@@ -35,15 +62,35 @@ class MCPServerConfig:
     temp_dir: str = "./temp"
     file_expiry_hours: int = 24
     cleanup_interval_minutes: int = 60
+    persist_file_metadata: bool = True
+    compress_drawio_files: bool = False
+    write_durability: WriteDurability = WriteDurability.FILE
+    io_max_workers: int = 8
+    max_storage_bytes: int = 0  # 0 = unlimited
+    max_files: int = 0  # 0 = unlimited
+    eviction_policy: EvictionPolicy = EvictionPolicy.LRU
+    storage_layout: StorageLayout = StorageLayout.FLAT
+    shared_storage: bool = False  # Several server processes share temp_dir
     
     # LLM service settings
     cache_ttl: int = 3600  # 1 hour
     max_cache_size: int = 100
+    persist_llm_cache: bool = False  # Keep generations in temp_dir, shared by workers
+    api_key_validation_ttl: int = 86400  # Reuse live API key checks for 24 hours; 0 disables
     
     # Image service settings
     drawio_cli_path: str = "drawio"
+    native_renderer_enabled: bool = True
+    max_concurrent_renders: int = 4
+    render_cache_size: int = 128
+    inline_image_max_bytes: int = 1024 * 1024  # 1MB
+    resource_chunk_size: int = 1024 * 1024  # 1MB
     
     # Server settings
+    transport: Transport = Transport.STDIO
+    http_host: str = "127.0.0.1"
+    http_port: int = 8000
+    workers: int = 1  # > 1 pre-forks HTTP worker processes under a supervisor
     max_concurrent_requests: int = 10
     request_timeout: int = 30
     
@@ -58,6 +105,19 @@ class MCPServerConfig:
     # Health check settings
     health_check_interval: int = 300  # 5 minutes
     
+    # Metrics settings
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 0  # 0 disables the Prometheus /metrics endpoint
+    
+    # Tracing settings
+    trace_exporters: str = ""  # Comma-separated: json, log, otel; empty disables tracing
+    trace_file: str = ""  # json exporter output; defaults to temp_dir/.traces/traces-<pid>.jsonl
+    trace_sample_rate: float = 1.0
+    
+    # Profiling settings
+    profiling_enabled: bool = False  # Exposes the profile-server admin tool
+    profile_interval_ms: float = 10.0
+    
     # Additional metadata
     server_name: str = "mcp-drawio-server"
     server_version: str = "1.0.0"
@@ -82,6 +142,9 @@ class MCPServerConfig:
         if self.max_cache_size <= 0:
             raise ValueError("max_cache_size must be positive")
         
+        if self.api_key_validation_ttl < 0:
+            raise ValueError("api_key_validation_ttl must be non-negative")
+        
         if self.file_expiry_hours <= 0:
             raise ValueError("file_expiry_hours must be positive")
         
@@ -93,6 +156,52 @@ class MCPServerConfig:
         
         if self.request_timeout <= 0:
             raise ValueError("request_timeout must be positive")
+        
+        if self.max_concurrent_renders <= 0:
+            raise ValueError("max_concurrent_renders must be positive")
+        
+        if self.render_cache_size < 0:
+            raise ValueError("render_cache_size must not be negative")
+        
+        if self.inline_image_max_bytes <= 0:
+            raise ValueError("inline_image_max_bytes must be positive")
+        
+        if self.resource_chunk_size <= 0:
+            raise ValueError("resource_chunk_size must be positive")
+        
+        if self.io_max_workers <= 0:
+            raise ValueError("io_max_workers must be positive")
+        
+        if self.max_storage_bytes < 0:
+            raise ValueError("max_storage_bytes must not be negative")
+        
+        if self.max_files < 0:
+            raise ValueError("max_files must not be negative")
+        
+        if not 0 <= self.http_port <= 65535:
+            raise ValueError("http_port must be between 0 and 65535")
+        
+        if self.workers < 1:
+            raise ValueError("workers must be at least 1")
+        
+        if not 0 <= self.metrics_port <= 65535:
+            raise ValueError("metrics_port must be between 0 and 65535")
+        
+        unknown_exporters = set(self.trace_exporter_names) - set(EXPORTER_NAMES)
+        if unknown_exporters:
+            raise ValueError(f"Unknown trace exporters: {', '.join(sorted(unknown_exporters))}")
+        
+        if not 0.0 <= self.trace_sample_rate <= 1.0:
+            raise ValueError("trace_sample_rate must be between 0.0 and 1.0")
+        
+        if self.profile_interval_ms <= 0:
+            raise ValueError("profile_interval_ms must be positive")
+        
+        if self.workers > 1 and not self.shared_storage:
+            raise ValueError("workers > 1 requires shared_storage")
+        
+        if self.shared_storage and not self.persist_file_metadata:
+            raise ValueError("shared_storage requires persist_file_metadata")
     
     def _ensure_directories(self):
         """Ensure required directories exist."""
@@ -124,15 +233,68 @@ class MCPServerConfig:
         # Parse boolean values
         debug = os.getenv("DEBUG", "false").lower() in ("true", "1", "yes", "on")
         development_mode = os.getenv("DEVELOPMENT_MODE", "false").lower() in ("true", "1", "yes", "on")
+        native_renderer_enabled = os.getenv("NATIVE_RENDERER", "true").lower() in ("true", "1", "yes", "on")
+        persist_file_metadata = os.getenv("PERSIST_FILE_METADATA", "true").lower() in ("true", "1", "yes", "on")
+        compress_drawio_files = os.getenv("COMPRESS_DRAWIO_FILES", "false").lower() in ("true", "1", "yes", "on")
+        shared_storage = os.getenv("SHARED_STORAGE", "false").lower() in ("true", "1", "yes", "on")
+        persist_llm_cache = os.getenv("PERSIST_LLM_CACHE", "false").lower() in ("true", "1", "yes", "on")
+        
+        # Parse write durability
+        write_durability_str = os.getenv("WRITE_DURABILITY", "file").lower()
+        try:
+            write_durability = WriteDurability(write_durability_str)
+        except ValueError:
+            write_durability = WriteDurability.FILE
+        
+        # Parse eviction policy
+        eviction_policy_str = os.getenv("EVICTION_POLICY", "lru").lower()
+        try:
+            eviction_policy = EvictionPolicy(eviction_policy_str)
+        except ValueError:
+            eviction_policy = EvictionPolicy.LRU
+        
+        # Parse transport
+        transport_str = os.getenv("MCP_TRANSPORT", "stdio").lower()
+        try:
+            transport = Transport(transport_str)
+        except ValueError:
+            transport = Transport.STDIO
+        
+        # Parse storage layout
+        storage_layout_str = os.getenv("STORAGE_LAYOUT", "flat").lower()
+        try:
+            storage_layout = StorageLayout(storage_layout_str)
+        except ValueError:
+            storage_layout = StorageLayout.FLAT
         
         return cls(
             anthropic_api_key=anthropic_api_key,
             temp_dir=os.getenv("TEMP_DIR", "./temp"),
             file_expiry_hours=int(os.getenv("FILE_EXPIRY_HOURS", "24")),
             cleanup_interval_minutes=int(os.getenv("CLEANUP_INTERVAL_MINUTES", "60")),
+            persist_file_metadata=persist_file_metadata,
+            compress_drawio_files=compress_drawio_files,
+            write_durability=write_durability,
+            io_max_workers=int(os.getenv("IO_MAX_WORKERS", "8")),
+            max_storage_bytes=int(os.getenv("MAX_STORAGE_BYTES", "0")),
+            max_files=int(os.getenv("MAX_FILES", "0")),
+            eviction_policy=eviction_policy,
+            storage_layout=storage_layout,
+            shared_storage=shared_storage,
             cache_ttl=int(os.getenv("CACHE_TTL", "3600")),
             max_cache_size=int(os.getenv("MAX_CACHE_SIZE", "100")),
+            persist_llm_cache=persist_llm_cache,
+            api_key_validation_ttl=int(os.getenv("API_KEY_VALIDATION_TTL", "86400")),
             drawio_cli_path=os.getenv("DRAWIO_CLI_PATH", "drawio"),
+            native_renderer_enabled=native_renderer_enabled,
+            max_concurrent_renders=int(os.getenv("MAX_CONCURRENT_RENDERS", "4")),
+            render_cache_size=int(os.getenv("RENDER_CACHE_SIZE", "128")),
+            inline_image_max_bytes=int(os.getenv("INLINE_IMAGE_MAX_BYTES", str(1024 * 1024))),
+            resource_chunk_size=int(os.getenv("RESOURCE_CHUNK_SIZE", str(1024 * 1024))),
+            transport=transport,
+            http_host=os.getenv("MCP_HTTP_HOST", "127.0.0.1"),
+            http_port=int(os.getenv("MCP_HTTP_PORT", "8000")),
+            workers=int(os.getenv("MCP_WORKERS", "1")),
             max_concurrent_requests=int(os.getenv("MAX_CONCURRENT_REQUESTS", "10")),
             request_timeout=int(os.getenv("REQUEST_TIMEOUT", "30")),
             log_level=log_level,
@@ -140,6 +302,13 @@ class MCPServerConfig:
             debug=debug,
             development_mode=development_mode,
             health_check_interval=int(os.getenv("HEALTH_CHECK_INTERVAL", "300")),
+            metrics_host=os.getenv("METRICS_HOST", "127.0.0.1"),
+            metrics_port=int(os.getenv("METRICS_PORT", "0")),
+            trace_exporters=os.getenv("TRACE_EXPORTERS", ""),
+            trace_file=os.getenv("TRACE_FILE", ""),
+            trace_sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")),
+            profiling_enabled=os.getenv("PROFILING_ENABLED", "false").lower() in ("true", "1", "yes", "on"),
+            profile_interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "10")),
         )
     
     def to_dict(self) -> Dict[str, Any]:
@@ -151,9 +320,29 @@ class MCPServerConfig:
             "temp_dir": self.temp_dir,
             "file_expiry_hours": self.file_expiry_hours,
             "cleanup_interval_minutes": self.cleanup_interval_minutes,
+            "persist_file_metadata": self.persist_file_metadata,
+            "compress_drawio_files": self.compress_drawio_files,
+            "write_durability": self.write_durability.value,
+            "io_max_workers": self.io_max_workers,
+            "max_storage_bytes": self.max_storage_bytes,
+            "max_files": self.max_files,
+            "eviction_policy": self.eviction_policy.value,
+            "storage_layout": self.storage_layout.value,
+            "shared_storage": self.shared_storage,
             "cache_ttl": self.cache_ttl,
             "max_cache_size": self.max_cache_size,
+            "persist_llm_cache": self.persist_llm_cache,
+            "api_key_validation_ttl": self.api_key_validation_ttl,
             "drawio_cli_path": self.drawio_cli_path,
+            "native_renderer_enabled": self.native_renderer_enabled,
+            "max_concurrent_renders": self.max_concurrent_renders,
+            "render_cache_size": self.render_cache_size,
+            "inline_image_max_bytes": self.inline_image_max_bytes,
+            "resource_chunk_size": self.resource_chunk_size,
+            "transport": self.transport.value,
+            "http_host": self.http_host,
+            "http_port": self.http_port,
+            "workers": self.workers,
             "max_concurrent_requests": self.max_concurrent_requests,
             "request_timeout": self.request_timeout,
             "log_level": self.log_level.value,
@@ -161,7 +350,19 @@ class MCPServerConfig:
             "debug": self.debug,
             "development_mode": self.development_mode,
             "health_check_interval": self.health_check_interval,
+            "metrics_host": self.metrics_host,
+            "metrics_port": self.metrics_port,
+            "trace_exporters": self.trace_exporters,
+            "trace_file": self.trace_file,
+            "trace_sample_rate": self.trace_sample_rate,
+            "profiling_enabled": self.profiling_enabled,
+            "profile_interval_ms": self.profile_interval_ms,
         }
+    
+    @property
+    def trace_exporter_names(self) -> List[str]:
+        """Trace exporter names from the comma-separated setting."""
+        return [name.strip().lower() for name in self.trace_exporters.split(",") if name.strip()]
 
 
 def setup_logging(config: MCPServerConfig) -> logging.Logger:
@@ -225,6 +426,11 @@ class JsonFormatter(logging.Formatter):
             "line": record.lineno,
         }
         
+        # Correlate entries logged during a tool call
+        request_id = current_request_id()
+        if request_id:
+            log_entry["request_id"] = request_id
+        
         # Add exception information if present
         if record.exc_info:
             log_entry["exception"] = self.formatException(record.exc_info)
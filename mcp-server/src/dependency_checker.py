@@ -6,19 +6,29 @@ This module provides comprehensive dependency checking functionality including:
 - Clear error messages for missing dependencies
 - Automatic setup guidance
 - Troubleshooting information
+- Persisted version probes of system commands, reused while the binary is unchanged
 """
 import asyncio
+import json
 import logging
+import os
+import shlex
 import shutil
 import subprocess
 import sys
+import threading
 import time
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
+import importlib.metadata
 import importlib.util
 
+DEPENDENCY_CACHE_FILE_NAME = "dependency_probes.json"
+
+VERSION_PROBE_TIMEOUT_SECONDS = 10
+
 
 class DependencyType(Enum):
     """Types of dependencies to check."""
@@ -63,20 +73,104 @@ class DependencyCheckResult:
     troubleshooting: Optional[Dict[str, str]] = None
 
 
+class ProbeCache:
+    """
+    Version probe results of system commands, persisted to a JSON file.
+    
+    Entries are keyed by command name and hold the resolved binary path,
+    its mtime and size; an entry is only reused while all three match, so
+    upgrading or replacing a binary triggers a fresh probe. Several
+    processes may share the file; each write replaces it atomically.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Initialize the probe cache.
+        
+        Args:
+            path: JSON file holding the probe results
+        """
+        self.path = Path(path)
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def fingerprint(binary_path: str) -> Dict[str, Any]:
+        """Identity of a binary: its resolved path, mtime and size."""
+        real_path = os.path.realpath(binary_path)
+        stat = os.stat(real_path)
+        return {"path": real_path, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                entries = json.loads(self.path.read_text(encoding="utf-8")).get("entries", {})
+                self._entries = entries if isinstance(entries, dict) else {}
+            except (OSError, ValueError, AttributeError):
+                # Missing or corrupt file: start empty, the next put rewrites it
+                self._entries = {}
+        return self._entries
+    
+    def get(self, name: str, fingerprint: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Cached probe of a command.
+        
+        Args:
+            name: Command name
+            fingerprint: Current fingerprint of the binary
+            
+        Returns:
+            The probe (status, version, error_message), or None if the
+            binary changed or was never probed
+        """
+        with self._lock:
+            entry = self._load().get(name)
+        if entry is None or entry.get("binary") != fingerprint:
+            return None
+        return entry
+    
+    def put(self, name: str, fingerprint: Dict[str, Any], result: DependencyCheckResult) -> None:
+        """
+        Store the probe of a command.
+        
+        Args:
+            name: Command name
+            fingerprint: Fingerprint of the probed binary
+            result: Outcome of the probe
+        """
+        with self._lock:
+            entries = dict(self._load())
+            entries[name] = {
+                "binary": fingerprint,
+                "status": result.status.value,
+                "version": result.version,
+                "error_message": result.error_message,
+                "probed_at": time.time(),
+            }
+            self._entries = entries
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            temp_path.write_text(json.dumps({"entries": entries}), encoding="utf-8")
+            os.replace(temp_path, self.path)
+
+
 class DependencyChecker:
     """Comprehensive dependency checker for the MCP server."""
     
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(self, logger: Optional[logging.Logger] = None, probe_cache_path: Optional[str] = None):
         """
         Initialize the dependency checker.
         
         Args:
             logger: Optional logger instance
+            probe_cache_path: Optional JSON file persisting system command
+                probes across restarts; every check probes when None
         """
         self.logger = logger or logging.getLogger(__name__)
         self._check_cache: Dict[str, DependencyCheckResult] = {}
         self._cache_ttl = 300  # 5 minutes
         self._last_check_time: Optional[float] = None
+        self._probe_cache = ProbeCache(probe_cache_path) if probe_cache_path else None
         
         # Define all dependency requirements
         self.requirements = self._define_requirements()
@@ -168,27 +262,16 @@ class DependencyChecker:
         
         self.logger.info("🔍 Starting comprehensive dependency check...")
         
-        # Run all dependency checks
-        results = []
-        for requirement in self.requirements:
-            try:
-                result = await self._check_single_dependency(requirement)
-                results.append(result)
-                self._check_cache[requirement.name] = result
-                
-                # Log individual results
-                status_emoji = "✅" if result.status == DependencyStatus.AVAILABLE else "❌"
-                self.logger.debug(f"{status_emoji} {requirement.name}: {result.status.value}")
-                
-            except Exception as e:
-                self.logger.error(f"Error checking dependency {requirement.name}: {str(e)}")
-                error_result = DependencyCheckResult(
-                    requirement=requirement,
-                    status=DependencyStatus.ERROR,
-                    error_message=str(e)
-                )
-                results.append(error_result)
-                self._check_cache[requirement.name] = error_result
+        # Run all dependency checks concurrently; results keep the requirement order
+        results = list(await asyncio.gather(
+            *(self._check_single_dependency(requirement) for requirement in self.requirements)
+        ))
+        for result in results:
+            self._check_cache[result.requirement.name] = result
+            
+            # Log individual results
+            status_emoji = "✅" if result.status == DependencyStatus.AVAILABLE else "❌"
+            self.logger.debug(f"{status_emoji} {result.requirement.name}: {result.status.value}")
         
         self._last_check_time = time.time()
         
@@ -209,25 +292,19 @@ class DependencyChecker:
         """
         self.logger.info("🚀 Checking startup dependencies...")
         
-        critical_errors = []
-        all_critical_available = True
-        
-        # Check only critical dependencies
+        # Check only critical dependencies, without looking up versions
         critical_requirements = [req for req in self.requirements if req.required]
-        
-        for requirement in critical_requirements:
-            try:
-                result = await self._check_single_dependency(requirement)
-                
-                if result.status != DependencyStatus.AVAILABLE:
-                    all_critical_available = False
-                    error_msg = self._format_startup_error(result)
-                    critical_errors.append(error_msg)
-                    
-            except Exception as e:
-                all_critical_available = False
-                error_msg = f"❌ {requirement.name}: Failed to check - {str(e)}"
-                critical_errors.append(error_msg)
+        results = await asyncio.gather(
+            *(self._check_single_dependency(requirement, detect_version=False)
+              for requirement in critical_requirements)
+        )
+        
+        critical_errors = [
+            self._format_startup_error(result)
+            for result in results
+            if result.status != DependencyStatus.AVAILABLE
+        ]
+        all_critical_available = not critical_errors
         
         if all_critical_available:
             self.logger.info("✅ All critical dependencies are available")
@@ -326,11 +403,12 @@ class DependencyChecker:
         
         return "\n".join(guidance_parts)
     
-    async def _check_single_dependency(self, requirement: DependencyRequirement) -> DependencyCheckResult:
+    async def _check_single_dependency(self, requirement: DependencyRequirement,
+                                       detect_version: bool = True) -> DependencyCheckResult:
         """Check a single dependency requirement."""
         try:
             if requirement.type == DependencyType.PYTHON_LIBRARY:
-                return await self._check_python_library(requirement)
+                return await self._check_python_library(requirement, detect_version)
             elif requirement.type == DependencyType.SYSTEM_COMMAND:
                 return await self._check_system_command(requirement)
             elif requirement.type == DependencyType.ENVIRONMENT_VAR:
@@ -353,10 +431,11 @@ class DependencyChecker:
                 error_message=str(e)
             )
     
-    async def _check_python_library(self, requirement: DependencyRequirement) -> DependencyCheckResult:
-        """Check if a Python library is available."""
+    async def _check_python_library(self, requirement: DependencyRequirement,
+                                    detect_version: bool = True) -> DependencyCheckResult:
+        """Check if a Python library is available, reading its version from package metadata if asked."""
         try:
-            # Try to import the library
+            # Locate the library without importing it
             spec = importlib.util.find_spec(requirement.name)
             if spec is None:
                 return DependencyCheckResult(
@@ -366,18 +445,13 @@ class DependencyChecker:
                     install_guidance=f"Install with: {requirement.install_command}" if requirement.install_command else None
                 )
             
-            # Try to get version if possible
+            # Read the installed distribution's version without importing the module
             version = None
-            try:
-                module = importlib.import_module(requirement.name)
-                if hasattr(module, '__version__'):
-                    version = module.__version__
-                elif hasattr(module, 'version'):
-                    version = module.version
-                elif hasattr(module, 'VERSION'):
-                    version = module.VERSION
-            except Exception:
-                pass  # Version detection failed, but library exists
+            if detect_version:
+                try:
+                    version = importlib.metadata.version(requirement.name)
+                except importlib.metadata.PackageNotFoundError:
+                    pass  # Importable but not installed as a distribution (e.g. vendored)
             
             return DependencyCheckResult(
                 requirement=requirement,
@@ -405,43 +479,33 @@ class DependencyChecker:
                     install_guidance=self._get_install_guidance(requirement)
                 )
             
-            # Try to get version if version command is specified
-            version = None
-            if requirement.version_command or requirement.check_command:
-                version_cmd = requirement.version_command or requirement.check_command
+            version_cmd = requirement.version_command or requirement.check_command
+            if not version_cmd:
+                return DependencyCheckResult(
+                    requirement=requirement,
+                    status=DependencyStatus.AVAILABLE
+                )
+            
+            # Reuse the last probe while the binary is unchanged
+            fingerprint = None
+            if self._probe_cache:
+                fingerprint = ProbeCache.fingerprint(command_path)
+                cached = self._probe_cache.get(requirement.name, fingerprint)
+                if cached is not None:
+                    self.logger.debug(f"Using cached probe of {requirement.name}")
+                    return self._probe_result(requirement, DependencyStatus(cached["status"]),
+                                              cached.get("version"), cached.get("error_message"))
+            
+            result, conclusive = await self._probe_version(requirement, command_path, version_cmd)
+            
+            # Timeouts may be transient and are probed again next time
+            if fingerprint and conclusive:
                 try:
-                    process = await asyncio.create_subprocess_shell(
-                        version_cmd,
-                        stdout=asyncio.subprocess.PIPE,
-                        stderr=asyncio.subprocess.PIPE
-                    )
-                    stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=10)
-                    
-                    if process.returncode == 0:
-                        version = stdout.decode().strip()
-                    else:
-                        # Command exists but version check failed
-                        error_output = stderr.decode().strip()
-                        return DependencyCheckResult(
-                            requirement=requirement,
-                            status=DependencyStatus.INVALID,
-                            error_message=f"Command '{requirement.name}' exists but version check failed: {error_output}",
-                            troubleshooting={"reinstall": f"Try reinstalling: {requirement.install_command}"}
-                        )
-                        
-                except asyncio.TimeoutError:
-                    return DependencyCheckResult(
-                        requirement=requirement,
-                        status=DependencyStatus.INVALID,
-                        error_message=f"Command '{requirement.name}' exists but is not responding",
-                        troubleshooting={"check_installation": f"Command may be corrupted, try reinstalling"}
-                    )
+                    await asyncio.to_thread(self._probe_cache.put, requirement.name, fingerprint, result)
+                except OSError as e:
+                    self.logger.warning(f"Could not save probe of {requirement.name}: {str(e)}")
             
-            return DependencyCheckResult(
-                requirement=requirement,
-                status=DependencyStatus.AVAILABLE,
-                version=version
-            )
+            return result
             
         except Exception as e:
             return DependencyCheckResult(
@@ -450,6 +514,58 @@ class DependencyChecker:
                 error_message=str(e)
             )
     
+    async def _probe_version(self, requirement: DependencyRequirement, command_path: str,
+                             version_cmd: str) -> Tuple[DependencyCheckResult, bool]:
+        """
+        Run the version command of a system command found at command_path.
+        
+        Returns:
+            Tuple of (result, conclusive); a probe that timed out is not conclusive
+        """
+        # Run the resolved binary directly instead of going through a shell
+        args = shlex.split(version_cmd)[1:]
+        process = await asyncio.create_subprocess_exec(
+            command_path, *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=VERSION_PROBE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return DependencyCheckResult(
+                requirement=requirement,
+                status=DependencyStatus.INVALID,
+                error_message=f"Command '{requirement.name}' exists but is not responding",
+                troubleshooting={"check_installation": f"Command may be corrupted, try reinstalling"}
+            ), False
+        
+        if process.returncode != 0:
+            # Command exists but version check failed
+            error_output = stderr.decode().strip()
+            return self._probe_result(
+                requirement, DependencyStatus.INVALID,
+                error_message=f"Command '{requirement.name}' exists but version check failed: {error_output}"
+            ), True
+        
+        return self._probe_result(requirement, DependencyStatus.AVAILABLE, version=stdout.decode().strip()), True
+    
+    def _probe_result(self, requirement: DependencyRequirement, status: DependencyStatus,
+                      version: Optional[str] = None, error_message: Optional[str] = None) -> DependencyCheckResult:
+        """Build the result of a completed version probe."""
+        troubleshooting = None
+        if status == DependencyStatus.INVALID:
+            troubleshooting = {"reinstall": f"Try reinstalling: {requirement.install_command}"}
+        return DependencyCheckResult(
+            requirement=requirement,
+            status=status,
+            version=version,
+            error_message=error_message,
+            troubleshooting=troubleshooting
+        )
+    
     async def _check_environment_variable(self, requirement: DependencyRequirement) -> DependencyCheckResult:
         """Check if an environment variable is set."""
         import os
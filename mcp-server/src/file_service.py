@@ -2,16 +2,34 @@
 File Service for managing temporary Draw.io files.
 """
 import asyncio
+import hashlib
+import heapq
+import itertools
+import mmap
 import os
 import uuid
 import logging
+from collections import Counter, OrderedDict
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional, Literal
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Literal, Set, Tuple, Union
+import sqlite3
 import threading
 import time
 
+try:
+    import fcntl
+except ImportError:  # Windows: every worker runs the (store-checked) sweeps
+    fcntl = None
+
+from . import svg_renderer
+from .io_executor import IOExecutor, get_io_executor
+from .tracing import PHASE_DISK_WRITE, traced
+from .metadata_store import CORRUPT_SUFFIX, METADATA_DB_NAME, SIDECAR_SUFFIXES, MetadataStore, MetadataStoreError
+
 
 @dataclass
 class TempFile:
@@ -19,9 +37,478 @@ class TempFile:
     id: str
     original_name: str
     path: str
-    file_type: Literal["drawio", "png"]
+    file_type: Literal["drawio", "png", "svg", "pdf", "jpg", "webp"]
     created_at: datetime
     expires_at: datetime
+    size_bytes: Optional[int] = None
+    content_sha256: Optional[str] = None
+    blob_sha256: Optional[str] = None  # Set when the content lives in a shared content-addressed blob
+    compressed: bool = False  # Pages stored with draw.io deflate+base64 encoding
+    last_accessed: Optional[datetime] = None  # Set by get_file_path; drives LRU eviction
+    
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Keep the owning FileIndex (expiry order and persisted row) in sync
+        index = self.__dict__.get("_index")
+        if index is not None:
+            index._changed(self, name)
+    
+    def to_record(self) -> Dict:
+        """Serialize to a metadata store row."""
+        return {
+            "id": self.id,
+            "original_name": self.original_name,
+            "path": self.path,
+            "file_type": self.file_type,
+            "created_at": self.created_at.isoformat(),
+            "expires_at": self.expires_at.isoformat(),
+            "size_bytes": self.size_bytes,
+            "content_sha256": self.content_sha256,
+            "blob_sha256": self.blob_sha256,
+            "compressed": int(self.compressed),
+            "last_accessed": self.last_accessed.isoformat() if self.last_accessed else None,
+        }
+    
+    @classmethod
+    def from_record(cls, record: Dict) -> "TempFile":
+        """Deserialize from a metadata store row."""
+        # Fill __dict__ directly: restoring skips per-field change tracking
+        temp_file = cls.__new__(cls)
+        temp_file.__dict__.update(
+            id=record["id"],
+            original_name=record["original_name"],
+            path=record["path"],
+            file_type=record["file_type"],
+            created_at=datetime.fromisoformat(record["created_at"]),
+            expires_at=datetime.fromisoformat(record["expires_at"]),
+            size_bytes=record.get("size_bytes"),
+            content_sha256=record.get("content_sha256"),
+            blob_sha256=record.get("blob_sha256"),
+            compressed=bool(record.get("compressed")),
+            last_accessed=(
+                datetime.fromisoformat(record["last_accessed"]) if record.get("last_accessed") else None
+            ),
+        )
+        return temp_file
+    
+    @property
+    def accessed_at(self) -> datetime:
+        """Last access time, or the creation time if never accessed."""
+        return self.last_accessed or self.created_at
+
+
+@contextmanager
+def map_file(path: Union[str, Path]) -> Iterator[memoryview]:
+    """
+    Map a file read-only and yield a memoryview of its content.
+    
+    The content is paged in by the OS on access instead of being copied into
+    the Python heap. Callers must copy (bytes()/tobytes()) anything they keep
+    beyond the with block.
+    
+    Args:
+        path: File to map.
+        
+    Yields:
+        Read-only memoryview of the file (empty for empty files).
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield memoryview(b"")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                yield view
+
+
+def read_file_range(path: Union[str, Path], offset: int, length: int) -> bytes:
+    """Read length bytes at offset through a memory map."""
+    with map_file(path) as view:
+        with view[offset:offset + length] as part:
+            return part.tobytes()
+
+
+def sha256_file(path: Union[str, Path]) -> str:
+    """Hash a file through a memory map without reading it into memory."""
+    with map_file(path) as view:
+        return hashlib.sha256(view).hexdigest()
+
+
+# Wake up slightly after expires_at so the file is strictly expired
+EXPIRY_WAKEUP_SLACK_SECONDS = 0.01
+
+# Content-addressed blobs live under temp_dir/blobs/ab/cd/<sha256>
+BLOB_DIR_NAME = "blobs"
+
+# Write durability: "none" relies on rename for atomicity only, "file" fsyncs
+# file data before the rename, "full" also fsyncs the directory entries
+DurabilityPolicy = Literal["none", "file", "full"]
+DURABILITY_POLICIES = ("none", "file", "full")
+
+# Temporary files of in-flight writes are left alone by the orphan sweep
+TEMP_WRITE_GRACE_SECONDS = 300
+
+# Storage quota eviction: "lru" evicts the least recently accessed file first,
+# "largest_oldest" the file with the largest size x age since last access
+EvictionPolicy = Literal["lru", "largest_oldest"]
+EVICTION_POLICIES = ("lru", "largest_oldest")
+
+# Eviction frees space down to this fraction of the quota so that sustained
+# load at the limit does not evict on every save
+QUOTA_LOW_WATERMARK = 0.9
+
+# Storage layout: "flat" keeps every file directly in temp_dir, "sharded" spreads
+# them over temp_dir/files/<xx>/ by a hash prefix of the filename stem so that no
+# directory grows past a few thousand entries
+StorageLayout = Literal["flat", "sharded"]
+STORAGE_LAYOUTS = ("flat", "sharded")
+SHARD_DIR_NAME = "files"
+SHARD_PREFIX_LENGTH = 2  # 256 shard directories
+
+
+# Held (flock) by the one worker that runs the orphan and shared-expiry sweeps
+CLEANUP_LOCK_NAME = ".cleanup.lock"
+
+# Listings with shared storage only read rows created since the previous
+# listing, less this overlap for saves still waiting on the write lock then
+SHARED_LISTING_OVERLAP_SECONDS = 60
+
+
+def shard_prefix(stem: str) -> str:
+    """Get the shard directory name of a filename stem."""
+    return hashlib.sha256(stem.encode('utf-8')).hexdigest()[:SHARD_PREFIX_LENGTH]
+
+
+class FileIndex(MutableMapping):
+    """
+    File metadata keyed by file ID with path and expiry indexes.
+    
+    Behaves like the Dict[str, TempFile] it replaces, and additionally keeps
+    a path -> file IDs index and an expiry-ordered heap up to date on every
+    insert and delete. Heap entries of removed or rescheduled files are
+    discarded lazily when they reach the top. When a MetadataStore is
+    attached, every change is also written through to it.
+    
+    Files adopted from other workers sharing the store are indexed for lookup
+    and expiry but left out of usage, blob byte counts and eviction order:
+    the worker that saved a file accounts for it.
+    
+    Mutations are serialized with a lock so the expiry scheduler thread, the
+    I/O pool and the event loop can all use the index. Iterate it through the
+    snapshot methods: a live view fails when another thread changes it.
+    """
+    
+    def __init__(self, store: Optional[MetadataStore] = None):
+        self.store = store
+        # Called when a file becomes the next one to expire
+        self.on_earliest_changed: Optional[Callable[[], None]] = None
+        self._lock = threading.RLock()
+        self._logger = logging.getLogger(__name__)
+        self._files: Dict[str, TempFile] = {}
+        self._paths: Dict[str, Set[str]] = {}
+        self._expiry_heap: List[tuple] = []
+        self._scheduled: Dict[str, int] = {}
+        self._sequence = itertools.count()
+        # Content-addressed blob reference counts and dedup accounting
+        self._blob_refs: Dict[str, int] = {}
+        self.blob_logical_bytes = 0
+        self.blob_stored_bytes = 0
+        # Per-type usage, bytes of files outside blobs and least recently accessed order
+        self._sizes: Dict[str, int] = {}
+        self._type_usage: Dict[str, Dict[str, int]] = {}
+        self.loose_bytes = 0
+        self._access_order: "OrderedDict[str, None]" = OrderedDict()
+        # Files saved by other workers, see load(adopted=True)
+        self._adopted: Set[str] = set()
+    
+    def __getitem__(self, file_id: str) -> TempFile:
+        return self._files[file_id]
+    
+    def __setitem__(self, file_id: str, temp_file: TempFile) -> None:
+        with self._lock:
+            if file_id in self._files:
+                self._unindex(file_id)
+            self._index(file_id, temp_file)
+            self._persist(temp_file)
+    
+    def __delitem__(self, file_id: str) -> None:
+        with self._lock:
+            self._unindex(file_id)
+            del self._files[file_id]
+        if self.store is not None:
+            try:
+                self.store.delete([file_id])
+            except sqlite3.Error as error:
+                self._logger.warning(f"Failed to delete persisted metadata for {file_id}: {str(error)}")
+    
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._files))
+    
+    def __len__(self) -> int:
+        return len(self._files)
+    
+    @property
+    def owned_count(self) -> int:
+        """Number of files not adopted from other workers."""
+        with self._lock:
+            return len(self._files) - len(self._adopted)
+    
+    def __repr__(self) -> str:
+        return f"FileIndex({self._files!r})"
+    
+    def pop(self, file_id: str, *default):
+        with self._lock:
+            return super().pop(file_id, *default)
+    
+    def load(self, temp_files: Iterable[TempFile], adopted: bool = False) -> None:
+        """
+        Bulk-index already persisted files without writing them back to the store.
+        
+        The expiry heap is rebuilt with one heapify instead of a push per file.
+        
+        Args:
+            temp_files: Files to index.
+            adopted: The files were saved by other workers; they are not
+                counted in usage and never offered for eviction.
+        """
+        with self._lock:
+            for temp_file in sorted(temp_files, key=lambda f: f.accessed_at):
+                if temp_file.id in self._files:
+                    self._unindex(temp_file.id)
+                sequence = next(self._sequence)
+                self._files[temp_file.id] = temp_file
+                self._paths.setdefault(temp_file.path, set()).add(temp_file.id)
+                self._scheduled[temp_file.id] = sequence
+                self._expiry_heap.append((temp_file.expires_at, sequence, temp_file.id))
+                if adopted:
+                    self._adopted.add(temp_file.id)
+                else:
+                    self._count_blob(temp_file, 1)
+                    self._count_usage(temp_file.id, temp_file, 1)
+                temp_file.__dict__["_index"] = self
+            heapq.heapify(self._expiry_heap)
+        if self.on_earliest_changed is not None:
+            self.on_earliest_changed()
+    
+    def snapshot_values(self) -> List[TempFile]:
+        """Get the indexed files as a list taken under the lock."""
+        with self._lock:
+            return list(self._files.values())
+    
+    def snapshot_items(self) -> List[Tuple[str, TempFile]]:
+        """Get (file ID, file) pairs as a list taken under the lock."""
+        with self._lock:
+            return list(self._files.items())
+    
+    def blob_refcount(self, blob_sha256: str) -> int:
+        """Get the number of files referencing a blob."""
+        return self._blob_refs.get(blob_sha256, 0)
+    
+    @property
+    def blob_count(self) -> int:
+        """Number of distinct blobs referenced."""
+        return len(self._blob_refs)
+    
+    @property
+    def disk_bytes(self) -> int:
+        """Bytes on disk: each blob once plus files stored outside blobs."""
+        return self.blob_stored_bytes + self.loose_bytes
+    
+    def usage_by_type(self) -> Dict[str, Dict[str, int]]:
+        """Get file count and (logical) bytes per file type."""
+        with self._lock:
+            return {file_type: dict(usage) for file_type, usage in self._type_usage.items() if usage["files"]}
+    
+    def eviction_order(self, policy: str, now: datetime) -> List[str]:
+        """
+        Get file IDs in the order a storage quota should evict them.
+        
+        Args:
+            policy: "lru" (least recently accessed first) or "largest_oldest"
+                (largest size x time since last access first).
+            now: Reference time for file age.
+            
+        Returns:
+            File IDs, first to evict first.
+        """
+        with self._lock:
+            if policy == "lru":
+                return list(self._access_order)
+            return sorted(
+                self._access_order,
+                key=lambda file_id: -self._sizes.get(file_id, 0) * max(
+                    (now - self._files[file_id].accessed_at).total_seconds(), 1.0
+                )
+            )
+    
+    def get_ids_by_path(self, path: str) -> Set[str]:
+        """Get the IDs of files stored at path."""
+        with self._lock:
+            return set(self._paths.get(str(path), ()))
+    
+    def indexed_paths(self) -> Set[str]:
+        """Get the paths that have metadata."""
+        with self._lock:
+            return set(self._paths)
+    
+    def expired_ids(self, now: datetime) -> List[str]:
+        """
+        Get IDs of files that expired before now, earliest first.
+        
+        Only heap entries up to now are visited, so the cost scales with the
+        number of expired (and stale) entries rather than the total file count.
+        
+        Args:
+            now: Reference time.
+            
+        Returns:
+            Expired file IDs. They stay in the index until deleted.
+        """
+        expired = []
+        with self._lock:
+            heap = self._expiry_heap
+            while heap and heap[0][0] < now:
+                expires_at, sequence, file_id = heapq.heappop(heap)
+                if self._scheduled.get(file_id) == sequence:
+                    del self._scheduled[file_id]
+                    expired.append(file_id)
+        return expired
+    
+    def next_expiry(self) -> Optional[datetime]:
+        """Get the earliest scheduled expiry, or None if nothing is scheduled."""
+        with self._lock:
+            heap = self._expiry_heap
+            while heap and self._scheduled.get(heap[0][2]) != heap[0][1]:
+                heapq.heappop(heap)
+            return heap[0][0] if heap else None
+    
+    def _index(self, file_id: str, temp_file: TempFile) -> None:
+        """Add a file to the path and expiry indexes."""
+        self._files[file_id] = temp_file
+        self._paths.setdefault(temp_file.path, set()).add(file_id)
+        self._count_blob(temp_file, 1)
+        self._count_usage(file_id, temp_file, 1)
+        temp_file.__dict__["_index"] = self
+        self._schedule(temp_file, file_id)
+    
+    def _count_blob(self, temp_file: TempFile, delta: int) -> None:
+        """Add or drop a blob reference and update dedup byte counters."""
+        blob_sha256 = temp_file.blob_sha256
+        if not blob_sha256:
+            return
+        size = temp_file.size_bytes or 0
+        refs = self._blob_refs.get(blob_sha256, 0) + delta
+        self.blob_logical_bytes += delta * size
+        if refs <= 0:
+            self._blob_refs.pop(blob_sha256, None)
+            self.blob_stored_bytes -= size
+        else:
+            if refs == 1 and delta > 0:
+                self.blob_stored_bytes += size
+            self._blob_refs[blob_sha256] = refs
+    
+    def _count_usage(self, file_id: str, temp_file: TempFile, delta: int) -> None:
+        """Add or drop a file from the per-type usage and access order."""
+        if delta > 0:
+            size = self._sizes[file_id] = temp_file.size_bytes or 0
+            self._access_order[file_id] = None
+        else:
+            size = self._sizes.pop(file_id, 0)
+            self._access_order.pop(file_id, None)
+        usage = self._type_usage.setdefault(temp_file.file_type, {"files": 0, "bytes": 0})
+        usage["files"] += delta
+        usage["bytes"] += delta * size
+        if not temp_file.blob_sha256:
+            self.loose_bytes += delta * size
+    
+    def relocate(self, moves: Iterable[Tuple[str, str]]) -> None:
+        """
+        Point files at new paths, persisting all changes in one transaction.
+        
+        Args:
+            moves: (file ID, new path) pairs.
+        """
+        moves = list(moves)
+        with self._lock:
+            for file_id, path in moves:
+                temp_file = self._files[file_id]
+                ids = self._paths.get(temp_file.path)
+                if ids is not None:
+                    ids.discard(file_id)
+                    if not ids:
+                        del self._paths[temp_file.path]
+                # Bypass _changed: the store is updated once below
+                temp_file.__dict__["path"] = path
+                self._paths.setdefault(path, set()).add(file_id)
+        if self.store is not None:
+            try:
+                self.store.update_paths(moves)
+            except sqlite3.Error as error:
+                self._logger.warning(f"Failed to persist relocated file paths: {str(error)}")
+    
+    def _changed(self, temp_file: TempFile, name: str) -> None:
+        """Handle an attribute change of an indexed file."""
+        with self._lock:
+            if self._files.get(temp_file.id) is not temp_file:
+                return
+            if name == "expires_at":
+                self._schedule(temp_file)
+            elif temp_file.id in self._adopted:
+                pass
+            elif name == "last_accessed":
+                self._access_order.move_to_end(temp_file.id)
+            elif name == "size_bytes" and not temp_file.blob_sha256:
+                size = temp_file.size_bytes or 0
+                delta = size - self._sizes.get(temp_file.id, 0)
+                self._sizes[temp_file.id] = size
+                self._type_usage[temp_file.file_type]["bytes"] += delta
+                self.loose_bytes += delta
+            self._persist(temp_file)
+    
+    def _persist(self, temp_file: TempFile) -> None:
+        """Write a file's metadata through to the store."""
+        if self.store is None:
+            return
+        try:
+            self.store.upsert(temp_file.to_record())
+        except sqlite3.Error as error:
+            # The file stays usable in memory; it just won't survive a restart
+            self._logger.warning(f"Failed to persist metadata for {temp_file.id}: {str(error)}")
+    
+    def _schedule(self, temp_file: TempFile, file_id: Optional[str] = None) -> None:
+        """Push a (re)scheduled expiry; older entries for the file become stale."""
+        file_id = file_id or temp_file.id
+        if self._files.get(file_id) is not temp_file:
+            return
+        sequence = next(self._sequence)
+        self._scheduled[file_id] = sequence
+        heapq.heappush(self._expiry_heap, (temp_file.expires_at, sequence, file_id))
+        if self._expiry_heap[0][1] == sequence and self.on_earliest_changed is not None:
+            self.on_earliest_changed()
+        
+        # Compact when stale entries dominate the heap
+        if len(self._expiry_heap) > 2 * len(self._scheduled) + 64:
+            self._expiry_heap = [
+                entry for entry in self._expiry_heap if self._scheduled.get(entry[2]) == entry[1]
+            ]
+            heapq.heapify(self._expiry_heap)
+    
+    def _unindex(self, file_id: str) -> None:
+        """Drop the path and expiry entries of a file."""
+        temp_file = self._files[file_id]
+        ids = self._paths.get(temp_file.path)
+        if ids is not None:
+            ids.discard(file_id)
+            if not ids:
+                del self._paths[temp_file.path]
+        self._scheduled.pop(file_id, None)
+        if file_id in self._adopted:
+            self._adopted.discard(file_id)
+        else:
+            self._count_blob(temp_file, -1)
+            self._count_usage(file_id, temp_file, -1)
+        temp_file.__dict__.pop("_index", None)
 
 
 class FileServiceError(Exception):
@@ -39,13 +526,21 @@ class FileService:
     _instance = None
     _initialized = False
     
-    def __new__(cls, temp_dir: str = "./temp", file_expiry_hours: int = 24, cleanup_interval_minutes: int = 60):
+    def __new__(cls, temp_dir: str = "./temp", file_expiry_hours: int = 24, cleanup_interval_minutes: int = 60,
+                persist_metadata: bool = True, compress_drawio: bool = False,
+                durability: DurabilityPolicy = "file", max_storage_bytes: int = 0, max_files: int = 0,
+                eviction_policy: EvictionPolicy = "lru", storage_layout: StorageLayout = "flat",
+                shared_storage: bool = False, io_executor: Optional[IOExecutor] = None):
         """Singleton pattern to ensure only one FileService instance."""
         if cls._instance is None:
             cls._instance = super(FileService, cls).__new__(cls)
         return cls._instance
     
-    def __init__(self, temp_dir: str = "./temp", file_expiry_hours: int = 24, cleanup_interval_minutes: int = 60):
+    def __init__(self, temp_dir: str = "./temp", file_expiry_hours: int = 24, cleanup_interval_minutes: int = 60,
+                 persist_metadata: bool = True, compress_drawio: bool = False,
+                 durability: DurabilityPolicy = "file", max_storage_bytes: int = 0, max_files: int = 0,
+                 eviction_policy: EvictionPolicy = "lru", storage_layout: StorageLayout = "flat",
+                 shared_storage: bool = False, io_executor: Optional[IOExecutor] = None):
         """
         Initialize the file service.
         
@@ -53,18 +548,82 @@ class FileService:
             temp_dir: Directory for temporary files.
             file_expiry_hours: Hours after which files expire.
             cleanup_interval_minutes: Minutes between automatic cleanup runs.
+            persist_metadata: Keep file metadata in a SQLite database inside temp_dir
+                so file IDs survive restarts.
+            compress_drawio: Store .drawio pages with draw.io deflate+base64 encoding;
+                files stay openable by draw.io and both renderers.
+            durability: Write durability policy ("none", "file" or "full"). Writes are
+                always atomic (temp file + rename); "file" fsyncs the data before the
+                rename and "full" also fsyncs directories and the metadata database.
+            max_storage_bytes: Storage quota in bytes on disk (0 = unlimited).
+            max_files: Maximum number of managed files (0 = unlimited).
+            eviction_policy: Which files make room when a save would exceed the
+                quota: "lru" or "largest_oldest".
+            storage_layout: "flat" (all files in temp_dir) or "sharded" (hash-prefix
+                subdirectories of temp_dir/files). Switching to "sharded" moves the
+                files of the flat layout into their shards on startup.
+            shared_storage: Several server processes use this temp_dir. File IDs
+                unknown to this process are looked up in the shared metadata
+                database, sweeps check it before deleting anything, and only the
+                worker holding the cleanup lock runs them. Requires persist_metadata.
+                The storage quota is enforced per worker against the files it saved
+                (and those restored at startup); files adopted from other workers
+                are neither counted nor evicted.
+            io_executor: Thread pool for blocking disk operations; defaults to the
+                process-wide I/O executor.
+                
+        Raises:
+            ValueError: If durability, eviction_policy or storage_layout is unknown,
+                a limit is negative or shared_storage is set without persist_metadata.
         """
         # Only initialize once
         if FileService._initialized:
             return
+        
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(f"Unknown durability policy: {durability}")
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction_policy}")
+        if storage_layout not in STORAGE_LAYOUTS:
+            raise ValueError(f"Unknown storage layout: {storage_layout}")
+        if max_storage_bytes < 0 or max_files < 0:
+            raise ValueError("Storage limits must not be negative")
+        if shared_storage and not persist_metadata:
+            raise ValueError("shared_storage requires persist_metadata")
             
         self.temp_dir = Path(temp_dir)
         self.file_expiry_hours = file_expiry_hours
         self.cleanup_interval_minutes = cleanup_interval_minutes
-        self.temp_files: Dict[str, TempFile] = {}
+        self.compress_drawio = compress_drawio
+        self.durability = durability
+        self.max_storage_bytes = max_storage_bytes
+        self.max_files = max_files
+        self.eviction_policy = eviction_policy
+        self.storage_layout = storage_layout
+        self.shared_storage = shared_storage
+        self._io_executor = io_executor
+        self.temp_files: FileIndex = FileIndex()
         self._cleanup_running = False
         self._cleanup_thread = None
         self._stop_cleanup = threading.Event()
+        self._cleanup_lock = threading.Lock()
+        # Serializes blob reference changes with blob creation and deletion
+        self._blob_lock = threading.Lock()
+        # Next free suffix per filename stem that has collided before
+        self._name_counters: Dict[str, int] = {}
+        # Shard directories known to exist
+        self._shard_dirs: Set[Path] = set()
+        # Open cleanup lock file while this worker is the cleanup leader
+        self._leader_lock = None
+        # When list_files last read the shared store; None reads it all
+        self._shared_listed_at: Optional[datetime] = None
+        self._expiry_wakeup = threading.Event()
+        self._expiry_stats = {"removed": 0, "lag_total": 0.0, "lag_last": 0.0, "lag_max": 0.0}
+        # Space claimed by saves in flight and files evicted to stay within the quota
+        self._quota_lock = threading.Lock()
+        self._quota_reserved = {"bytes": 0, "files": 0}
+        self._quota_stats = {"evicted_files": 0, "evicted_bytes": 0}
+        self.temp_files.on_earliest_changed = self._expiry_wakeup.set
         
         # Setup logging
         self.logger = logging.getLogger(__name__)
@@ -72,11 +631,19 @@ class FileService:
         # Ensure temp directory exists
         self._ensure_temp_directory()
         
+        # Restore persisted metadata
+        self._metadata_store: Optional[MetadataStore] = None
+        if persist_metadata:
+            self._open_metadata_store()
+        if storage_layout == "sharded":
+            self._migrate_flat_files()
+        
         # Start cleanup task
         self._start_cleanup_scheduler()
         
         FileService._initialized = True
     
+    @traced("file.save_png")
     async def save_png_file(self, file_id: str, png_file_path: str) -> str:
         """
         Register a PNG file in the file service for cleanup management.
@@ -88,41 +655,74 @@ class FileService:
         Returns:
             PNG file ID for future reference.
             
+        Raises:
+            FileServiceError: If file registration fails.
+        """
+        return await self.register_file(file_id, png_file_path, file_type="png")
+    
+    @traced("file.register")
+    async def register_file(self, file_id: str, file_path: str, file_type: str,
+                            size_bytes: Optional[int] = None,
+                            content_sha256: Optional[str] = None) -> str:
+        """
+        Register an existing rendered file in the file service for cleanup management.
+        
+        The file is registered in place; its content is not read or copied.
+        
+        Args:
+            file_id: Original file ID (for reference).
+            file_path: Path to the rendered file.
+            file_type: Export format of the file (png, svg, pdf, jpg or webp).
+            size_bytes: File size if already known by the caller.
+            content_sha256: SHA-256 of the content if already known by the caller.
+            
+        Returns:
+            Registered file ID for future reference.
+            
         Raises:
             FileServiceError: If file registration fails.
         """
         try:
-            # Generate unique PNG file ID
-            png_file_id = f"{file_id}_png"
+            # Generate unique file ID
+            registered_id = f"{file_id}_{file_type}"
             
-            # Ensure PNG file exists
-            png_path = Path(png_file_path)
-            if not png_path.exists():
-                raise FileServiceError(f"PNG file does not exist: {png_file_path}")
+            # Ensure file exists
+            path = Path(file_path)
+            if not await self.io_executor.run(path.exists):
+                raise FileServiceError(f"{file_type.upper()} file does not exist: {file_path}")
+            if size_bytes is None:
+                size_bytes = (await self.io_executor.run(path.stat)).st_size
             
             # Create metadata
             now = datetime.now()
             temp_file = TempFile(
-                id=png_file_id,
-                original_name=f"{file_id}.png",
-                path=str(png_path),
-                file_type="png",
+                id=registered_id,
+                original_name=f"{file_id}.{file_type}",
+                path=str(path),
+                file_type=file_type,
                 created_at=now,
-                expires_at=now + timedelta(hours=self.file_expiry_hours)
+                expires_at=now + timedelta(hours=self.file_expiry_hours),
+                size_bytes=size_bytes,
+                content_sha256=content_sha256
             )
             
-            # Store metadata
-            self.temp_files[png_file_id] = temp_file
+            # Make room under the storage quota, then store metadata
+            await self.io_executor.run(self._reserve_quota, size_bytes)
+            try:
+                await self.io_executor.run(self.temp_files.__setitem__, registered_id, temp_file)
+            finally:
+                self._release_quota(size_bytes)
             
-            self.logger.debug(f"Registered PNG file: {png_file_id} -> {png_file_path}")
-            return png_file_id
+            self.logger.debug(f"Registered {file_type.upper()} file: {registered_id} -> {file_path}")
+            return registered_id
             
         except Exception as error:
             raise FileServiceError(
-                f"Failed to register PNG file: {str(error)}",
+                f"Failed to register {file_type.upper()} file: {str(error)}",
                 error
             )
 
+    @traced("file.save_drawio")
     async def save_drawio_file(self, xml_content: str, filename: Optional[str] = None) -> str:
         """
         Save Draw.io XML content to a temporary file.
@@ -141,49 +741,34 @@ class FileService:
             # Generate unique file ID
             file_id = str(uuid.uuid4())
             
-            # Determine filename
+            # Determine filename stem; the unique name is claimed when linking
             if filename:
                 # Sanitize filename
-                safe_filename = self._sanitize_filename(filename)
-                if not safe_filename.endswith('.drawio'):
-                    safe_filename += '.drawio'
-            else:
-                safe_filename = f"{file_id}.drawio"
-            
-            # Create file path
-            file_path = self.temp_dir / safe_filename
-            
-            # Ensure unique filename
-            counter = 1
-            original_path = file_path
-            while file_path.exists():
-                stem = original_path.stem
+                stem = self._sanitize_filename(filename)
                 if stem.endswith('.drawio'):
                     stem = stem[:-7]  # Remove .drawio
-                file_path = self.temp_dir / f"{stem}_{counter}.drawio"
-                counter += 1
-            
-            # Write XML content to file
-            await self._write_file_async(file_path, xml_content)
-            
-            # Set appropriate file permissions (readable by owner and group)
-            os.chmod(file_path, 0o644)
-            
-            # Create metadata
-            now = datetime.now()
-            temp_file = TempFile(
-                id=file_id,
-                original_name=filename or file_id,
-                path=str(file_path),
-                file_type="drawio",
-                created_at=now,
-                expires_at=now + timedelta(hours=self.file_expiry_hours)
-            )
+            else:
+                stem = file_id
             
-            # Store metadata
-            self.temp_files[file_id] = temp_file
+            # Store the content once per unique payload
+            content = xml_content.encode('utf-8')
+            compressed = False
+            if self.compress_drawio:
+                packed = await self._compress_drawio_async(xml_content)
+                # Small diagrams can grow from base64 overhead; keep them plain
+                if packed is not None and len(packed) < len(content):
+                    content, compressed = packed, True
+            content_sha256 = hashlib.sha256(content).hexdigest()
+            blob_path = self._blob_path(content_sha256)
             
-            return file_id
+            # Identical content already on disk takes no extra space
+            incoming_bytes = 0 if self.temp_files.blob_refcount(content_sha256) else len(content)
+            await self.io_executor.run(self._reserve_quota, incoming_bytes)
+            try:
+                return await self._store_drawio(file_id, filename, stem, content, content_sha256, blob_path,
+                                                compressed)
+            finally:
+                self._release_quota(incoming_bytes)
             
         except Exception as error:
             raise FileServiceError(
@@ -191,6 +776,61 @@ class FileService:
                 error
             )
     
+    async def _store_drawio(self, file_id: str, filename: Optional[str], stem: str, content: bytes,
+                            content_sha256: str, blob_path: Path, compressed: bool) -> str:
+        """Write the blob of a .drawio save, link it under a unique name and store its metadata."""
+        if not await self.io_executor.run(blob_path.exists):
+            await self._write_blob_async(blob_path, content)
+        
+        # Create metadata
+        now = datetime.now()
+        temp_file = TempFile(
+            id=file_id,
+            original_name=filename or file_id,
+            path=str(blob_path),
+            file_type="drawio",
+            created_at=now,
+            expires_at=now + timedelta(hours=self.file_expiry_hours),
+            size_bytes=len(content),
+            content_sha256=content_sha256,
+            blob_sha256=content_sha256,
+            compressed=compressed
+        )
+        
+        def publish():
+            with self._blob_lock:
+                copied = False
+                for attempt in range(2):
+                    # The last reference may have been removed since the write above
+                    if not blob_path.exists():
+                        self._write_blob(blob_path, content)
+                    
+                    # Expose the blob under the requested filename without copying it
+                    try:
+                        temp_file.path = str(self._link_unique(blob_path, stem))
+                    except FileNotFoundError:
+                        # Another worker released the blob between the check and the link
+                        if attempt == 0:
+                            continue
+                        raise
+                    except OSError as link_error:
+                        # The blob name has no .drawio suffix, which the exporter
+                        # requires, so store a private copy under the filename
+                        self.logger.debug(f"Hard link unavailable, copying the blob: {link_error}")
+                        temp_file.path = str(self._copy_unique(content, stem))
+                        temp_file.blob_sha256 = None
+                        copied = True
+                    break
+                
+                # Store metadata
+                self.temp_files[file_id] = temp_file
+                if copied:
+                    self._release_blob(content_sha256)
+        
+        await self.io_executor.run(publish)
+        return file_id
+    
+    @traced("file.get_path")
     async def get_file_path(self, file_id: str) -> str:
         """
         Get file path by file ID.
@@ -205,7 +845,7 @@ class FileService:
             FileServiceError: If file not found or expired.
         """
         try:
-            temp_file = self.temp_files.get(file_id)
+            temp_file = await self._lookup(file_id)
             if not temp_file:
                 raise FileServiceError(f"File with ID '{file_id}' not found")
             
@@ -215,11 +855,9 @@ class FileService:
                 await self._remove_file(file_id)
                 raise FileServiceError(f"File with ID '{file_id}' has expired")
             
-            # Check if file still exists on disk
+            # Check if file still exists on disk and record the access
             file_path = Path(temp_file.path)
-            if not file_path.exists():
-                # Clean up missing file from metadata
-                del self.temp_files[file_id]
+            if not await self._check_on_disk(file_id, file_path, touch=True):
                 raise FileServiceError(f"File with ID '{file_id}' no longer exists on disk")
             
             return str(file_path.absolute())
@@ -232,6 +870,7 @@ class FileService:
                 error
             )
     
+    @traced("file.get_info")
     async def get_file_info(self, file_id: str) -> TempFile:
         """
         Get file information by file ID.
@@ -246,7 +885,7 @@ class FileService:
             FileServiceError: If file not found or expired.
         """
         try:
-            temp_file = self.temp_files.get(file_id)
+            temp_file = await self._lookup(file_id)
             if not temp_file:
                 raise FileServiceError(f"File with ID '{file_id}' not found")
             
@@ -266,6 +905,94 @@ class FileService:
                 error
             )
     
+    @traced("file.read_xml")
+    async def read_drawio_xml(self, file_id: str) -> str:
+        """
+        Read a saved Draw.io file as plain XML.
+        
+        Files stored compressed are inflated on read, so callers always get
+        mxGraphModel pages regardless of the storage mode.
+        
+        Args:
+            file_id: File ID returned from save_drawio_file.
+            
+        Returns:
+            Draw.io XML content.
+            
+        Raises:
+            FileServiceError: If file not found, expired or unreadable.
+        """
+        file_path = await self.get_file_path(file_id)
+        temp_file = await self.get_file_info(file_id)
+        
+        def read_xml():
+            with map_file(file_path) as view:
+                return str(view, 'utf-8')
+        
+        try:
+            xml_content = await self.io_executor.run(read_xml)
+            if temp_file.compressed:
+                # CPU-bound; keep it off the I/O threads
+                loop = asyncio.get_running_loop()
+                xml_content = await loop.run_in_executor(None, svg_renderer.inflate_document, xml_content)
+            return xml_content
+        except (OSError, UnicodeDecodeError, svg_renderer.DiagramRenderError) as error:
+            raise FileServiceError(f"Failed to read Draw.io file with ID '{file_id}': {str(error)}", error)
+    
+    @property
+    def io_executor(self) -> IOExecutor:
+        """Thread pool used for blocking disk operations."""
+        return self._io_executor or get_io_executor()
+    
+    async def list_files(self) -> List[TempFile]:
+        """
+        List files that have not expired.
+        
+        With shared storage this includes files saved by other workers.
+        
+        Returns:
+            TempFile metadata of active files, oldest first.
+        """
+        if self._shared_store is not None:
+            await self.io_executor.run(self._adopt_shared)
+        now = datetime.now()
+        active = [f for f in self.temp_files.snapshot_values() if now <= f.expires_at]
+        return sorted(active, key=lambda f: f.created_at)
+    
+    @traced("file.digest")
+    async def get_file_digest(self, file_id: str) -> TempFile:
+        """
+        Get file information with size and SHA-256 content hash filled in.
+        
+        Files registered without a hash are hashed once in chunks and the
+        result is kept on the TempFile, so later calls are free.
+        
+        Args:
+            file_id: File ID to look up.
+            
+        Returns:
+            TempFile metadata with size_bytes and content_sha256 set.
+            
+        Raises:
+            FileServiceError: If file not found, expired or unreadable.
+        """
+        temp_file = await self.get_file_info(file_id)
+        if temp_file.size_bytes is not None and temp_file.content_sha256:
+            return temp_file
+        
+        def hash_file():
+            size, content_sha256 = os.path.getsize(temp_file.path), sha256_file(temp_file.path)
+            # Attribute changes are persisted to the metadata store
+            temp_file.size_bytes = size
+            temp_file.content_sha256 = content_sha256
+        
+        try:
+            await self.io_executor.run(hash_file)
+        except OSError as error:
+            raise FileServiceError(f"Failed to hash file with ID '{file_id}': {str(error)}", error)
+        
+        return temp_file
+    
     async def file_exists(self, file_id: str) -> bool:
         """
         Check if file exists and is not expired.
@@ -277,7 +1004,7 @@ class FileService:
             True if file exists and is not expired, False otherwise.
         """
         try:
-            temp_file = self.temp_files.get(file_id)
+            temp_file = await self._lookup(file_id)
             if not temp_file:
                 return False
             
@@ -288,76 +1015,34 @@ class FileService:
                 return False
             
             # Check if file still exists on disk
-            file_path = Path(temp_file.path)
-            if not file_path.exists():
-                # Clean up missing file from metadata
-                del self.temp_files[file_id]
-                return False
-            
-            return True
+            return await self._check_on_disk(file_id, Path(temp_file.path))
             
         except Exception:
             return False
     
     async def cleanup_expired_files(self) -> int:
         """
-        Clean up expired temporary files with detailed logging.
+        Clean up expired and orphaned temporary files with detailed logging.
+        
+        The expiry scheduler normally removes files as they expire; this runs
+        the same passes on demand (e.g. at shutdown) and also sweeps orphans.
         
         Returns:
             Number of files cleaned up.
         """
         try:
             cleanup_start = datetime.now()
-            self.logger.info("Starting automatic cleanup of expired files")
+            self.logger.info("Starting cleanup of expired files")
             
-            now = datetime.now()
-            expired_ids = []
-            orphaned_files = []
-            
-            # Find expired files in metadata
-            for file_id, temp_file in self.temp_files.items():
-                if now > temp_file.expires_at:
-                    expired_ids.append(file_id)
-                    self.logger.debug(f"Found expired file: {file_id} (expired at {temp_file.expires_at})")
-            
-            # Find orphaned files on disk (files without metadata)
-            if self.temp_dir.exists():
-                for file_path in self.temp_dir.iterdir():
-                    if file_path.is_file():
-                        # Check if file has corresponding metadata
-                        file_has_metadata = any(
-                            temp_file.path == str(file_path) 
-                            for temp_file in self.temp_files.values()
-                        )
-                        if not file_has_metadata:
-                            orphaned_files.append(file_path)
-                            self.logger.debug(f"Found orphaned file: {file_path}")
-            
-            # Remove expired files
-            cleanup_count = 0
-            failed_removals = 0
+            def run_passes():
+                with self._cleanup_lock:
+                    return self._expire_due(datetime.now()), self._sweep_orphans()
             
-            for file_id in expired_ids:
-                try:
-                    temp_file = self.temp_files.get(file_id)
-                    if temp_file:
-                        self.logger.debug(f"Removing expired file: {temp_file.path}")
-                        await self._remove_file(file_id)
-                        cleanup_count += 1
-                except Exception as e:
-                    failed_removals += 1
-                    self.logger.warning(f"Failed to remove expired file {file_id}: {str(e)}")
-            
-            # Remove orphaned files
-            for file_path in orphaned_files:
-                try:
-                    self.logger.debug(f"Removing orphaned file: {file_path}")
-                    file_path.unlink()
-                    cleanup_count += 1
-                except Exception as e:
-                    failed_removals += 1
-                    self.logger.warning(f"Failed to remove orphaned file {file_path}: {str(e)}")
+            (expired_count, expired_failures), (orphan_count, orphan_failures) = \
+                await self.io_executor.run(run_passes)
             
+            cleanup_count = expired_count + orphan_count
+            failed_removals = expired_failures + orphan_failures
             cleanup_duration = (datetime.now() - cleanup_start).total_seconds()
             
             # Log cleanup results (requirement 7.3)
@@ -389,7 +1074,7 @@ class FileService:
             True if file has expired, False otherwise.
         """
         try:
-            temp_file = self.temp_files.get(file_id)
+            temp_file = await self._lookup(file_id)
             if not temp_file:
                 return True  # Non-existent files are considered expired
             
@@ -410,21 +1095,19 @@ class FileService:
             True if file exists and is accessible, False otherwise.
         """
         try:
-            temp_file = self.temp_files.get(file_id)
+            temp_file = await self._lookup(file_id)
             if not temp_file:
                 return False
             
             # Check if file exists on disk
             file_path = Path(temp_file.path)
-            if not file_path.exists():
+            if not await self._check_on_disk(file_id, file_path):
                 self.logger.warning(f"File {file_id} missing from disk: {temp_file.path}")
-                # Clean up missing file from metadata
-                del self.temp_files[file_id]
                 return False
             
             # Check if file is readable
             try:
-                file_path.stat()
+                await self.io_executor.run(file_path.stat)
                 return True
             except OSError as e:
                 self.logger.warning(f"File {file_id} not accessible: {str(e)}")
@@ -450,7 +1133,7 @@ class FileService:
             
             # Sort files by creation time (oldest first)
             sorted_files = sorted(
-                self.temp_files.items(),
+                self.temp_files.snapshot_items(),
                 key=lambda x: x[1].created_at
             )
             
@@ -491,7 +1174,7 @@ class FileService:
             self.logger.info(f"Starting age-based cleanup (max age: {max_age} hours)")
             
             old_file_ids = []
-            for file_id, temp_file in self.temp_files.items():
+            for file_id, temp_file in self.temp_files.snapshot_items():
                 if temp_file.created_at < cutoff_time:
                     old_file_ids.append(file_id)
             
@@ -513,37 +1196,310 @@ class FileService:
                 error
             )
     
-    def get_stats(self) -> Dict[str, int]:
+    def get_stats(self) -> Dict[str, Any]:
         """
         Get file service statistics.
         
         Returns:
-            Dictionary with statistics.
+            Dictionary with statistics, including expiry lag (seconds between a
+            file's expires_at and its removal) and file counts per type
+            (files_by_type; drawio_files and png_files are kept for existing
+            readers).
         """
         now = datetime.now()
-        active_files = sum(1 for f in self.temp_files.values() if now <= f.expires_at)
-        expired_files = len(self.temp_files) - active_files
+        files = self.temp_files.snapshot_values()
+        active_files = sum(1 for f in files if now <= f.expires_at)
+        expired_files = len(files) - active_files
         
         # Count files by type
-        drawio_files = sum(1 for f in self.temp_files.values() if f.file_type == "drawio")
-        png_files = sum(1 for f in self.temp_files.values() if f.file_type == "png")
+        files_by_type = Counter(f.file_type for f in files)
+        
+        removed = self._expiry_stats["removed"]
+        next_expiry = self.temp_files.next_expiry()
+        logical_bytes = self.temp_files.blob_logical_bytes
+        stored_bytes = self.temp_files.blob_stored_bytes
         
         return {
-            "total_files": len(self.temp_files),
+            "total_files": len(files),
             "active_files": active_files,
             "expired_files": expired_files,
-            "drawio_files": drawio_files,
-            "png_files": png_files,
-            "cleanup_running": self._cleanup_running
+            "drawio_files": files_by_type["drawio"],
+            "png_files": files_by_type["png"],
+            "files_by_type": dict(files_by_type),
+            "cleanup_running": self._cleanup_running,
+            "expired_files_removed": removed,
+            "expiry_lag_seconds_last": round(self._expiry_stats["lag_last"], 3),
+            "expiry_lag_seconds_max": round(self._expiry_stats["lag_max"], 3),
+            "expiry_lag_seconds_avg": round(self._expiry_stats["lag_total"] / removed, 3) if removed else 0.0,
+            "next_expiry_in_seconds": (
+                round(max(0.0, (next_expiry - now).total_seconds()), 3) if next_expiry else None
+            ),
+            "blob_count": self.temp_files.blob_count,
+            "dedup_logical_bytes": logical_bytes,
+            "dedup_stored_bytes": stored_bytes,
+            "dedup_bytes_saved": logical_bytes - stored_bytes,
+            "dedup_ratio": round(logical_bytes / stored_bytes, 3) if stored_bytes else 1.0,
+            "storage_bytes": self.temp_files.disk_bytes,
+            "max_storage_bytes": self.max_storage_bytes,
+            "max_files": self.max_files,
+            "eviction_policy": self.eviction_policy,
+            "storage_layout": self.storage_layout,
+            "shared_storage": self.shared_storage,
+            "cleanup_leader": self._leader_lock is not None or not self.shared_storage,
+            "quota_evicted_files": self._quota_stats["evicted_files"],
+            "quota_evicted_bytes": self._quota_stats["evicted_bytes"],
+            "usage_by_type": self.temp_files.usage_by_type(),
+            "io_executor": self.io_executor.get_stats(),
         }
     
     def stop_cleanup_scheduler(self) -> None:
-        """Stop the automatic cleanup scheduler."""
+        """Stop the expiry scheduler."""
         self.logger.info("Stopping cleanup scheduler")
         self._stop_cleanup.set()
+        self._expiry_wakeup.set()
         if self._cleanup_thread and self._cleanup_thread.is_alive():
             self._cleanup_thread.join(timeout=5.0)
     
+    def close(self) -> None:
+        """Stop the cleanup scheduler and close the metadata store."""
+        self.stop_cleanup_scheduler()
+        self._resign_leadership()
+        if self._metadata_store is not None:
+            self._metadata_store.close()
+            self._metadata_store = None
+            self.temp_files.store = None
+    
+    def _open_metadata_store(self) -> None:
+        """
+        Open the metadata store and reconcile it with the disk.
+        
+        Rows are loaded in one query and checked against one directory scan;
+        rows whose file is gone are dropped in a single transaction. Expired
+        rows are kept so the next cleanup removes their files. If the store
+        cannot be opened the service keeps working with in-memory metadata.
+        """
+        try:
+            store = MetadataStore(str(self.temp_dir / METADATA_DB_NAME),
+                                  synchronous="FULL" if self.durability == "full" else "NORMAL")
+            records = store.load()
+        except (MetadataStoreError, sqlite3.Error) as error:
+            self.logger.warning(f"File metadata persistence disabled: {str(error)}")
+            return
+        
+        scanned_dirs = self._storage_dirs()
+        disk_paths = self._scan_storage(scanned_dirs)
+        scanned = {str(directory) for directory in scanned_dirs}
+        
+        restored = []
+        stale_ids = []
+        for record in records:
+            try:
+                temp_file = TempFile.from_record(record)
+            except (KeyError, TypeError, ValueError):
+                stale_ids.append(record.get("id"))
+                continue
+            # Files registered from outside managed storage are not covered by the scan
+            if temp_file.path in disk_paths or (
+                str(Path(temp_file.path).parent) not in scanned and Path(temp_file.path).exists()
+            ):
+                restored.append(temp_file)
+            else:
+                stale_ids.append(temp_file.id)
+        
+        if stale_ids:
+            store.delete(stale_ids)
+        self.temp_files.load(restored)
+        self.temp_files.store = store
+        self._metadata_store = store
+        
+        self.logger.info(
+            f"Restored {len(restored)} file records from {store.db_path} "
+            f"({len(stale_ids)} without files on disk dropped)"
+        )
+    
+    @property
+    def _shared_store(self) -> Optional[MetadataStore]:
+        """The metadata store when other workers share it, else None."""
+        return self._metadata_store if self.shared_storage else None
+    
+    async def _lookup(self, file_id: str) -> Optional[TempFile]:
+        """Get a file's metadata, loading files saved by other workers from the shared store."""
+        temp_file = self.temp_files.get(file_id)
+        if temp_file is not None or self._shared_store is None:
+            return temp_file
+        
+        def load():
+            record = self._shared_store.get(file_id)
+            return self._adopt([record])[0] if record else None
+        
+        return await self.io_executor.run(load)
+    
+    def _adopt_shared(self) -> None:
+        """
+        Index files other workers saved since the previous listing.
+        
+        The first call reads the whole shared store. Runs on the I/O pool.
+        """
+        listed_at = datetime.now()
+        if self._shared_listed_at is None:
+            records = self._shared_store.load()
+        else:
+            since = self._shared_listed_at - timedelta(seconds=SHARED_LISTING_OVERLAP_SECONDS)
+            records = self._shared_store.created_since(since.isoformat())
+        self._adopt(record for record in records if record["id"] not in self.temp_files)
+        self._shared_listed_at = listed_at
+    
+    def _adopt(self, records: Iterable[Dict]) -> List[TempFile]:
+        """Index metadata rows written by other workers without writing them back."""
+        adopted = []
+        for record in records:
+            try:
+                adopted.append(TempFile.from_record(record))
+            except (KeyError, TypeError, ValueError):
+                self.logger.debug(f"Skipping unreadable shared metadata row {record.get('id')}")
+        if adopted:
+            self.temp_files.load(adopted, adopted=True)
+        return adopted
+    
+    def _is_cleanup_leader(self) -> bool:
+        """
+        Whether this worker runs the orphan and shared-expiry sweeps.
+        
+        Without shared storage every instance leads. With it, the worker that
+        holds an exclusive flock on the cleanup lock file leads until it
+        closes; the others try to take over at each sweep, so a crashed
+        leader is replaced within one sweep interval.
+        """
+        if not self.shared_storage or fcntl is None or self._leader_lock is not None:
+            return True
+        lock_file = open(self.temp_dir / CLEANUP_LOCK_NAME, "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._leader_lock = lock_file
+        self.logger.info(f"This worker (pid {os.getpid()}) is now the cleanup leader for {self.temp_dir}")
+        return True
+    
+    def _resign_leadership(self) -> None:
+        """Release the cleanup lock if this worker holds it."""
+        if self._leader_lock is not None:
+            # Closing the file releases the flock
+            self._leader_lock.close()
+            self._leader_lock = None
+    
+    async def _check_on_disk(self, file_id: str, file_path: Path, touch: bool = False) -> bool:
+        """Check that a file exists, dropping its metadata if it does not."""
+        def check():
+            if file_path.exists():
+                temp_file = self.temp_files.get(file_id)
+                if touch and temp_file is not None:
+                    # Persisted with the metadata; orders LRU eviction
+                    temp_file.last_accessed = datetime.now()
+                return True
+            # Clean up missing file from metadata
+            self.temp_files.pop(file_id, None)
+            return False
+        
+        return await self.io_executor.run(check)
+    
+    def storage_dir(self, stem: str) -> Path:
+        """
+        Get the directory that files named after stem are stored in.
+        
+        Args:
+            stem: Filename without extension.
+            
+        Returns:
+            temp_dir in the flat layout, otherwise the stem's shard directory.
+            The directory is not created.
+        """
+        if self.storage_layout == "flat":
+            return self.temp_dir
+        return self.temp_dir / SHARD_DIR_NAME / shard_prefix(stem)
+    
+    def _ensure_storage_dir(self, stem: str) -> Path:
+        """Get the storage directory of stem, creating its shard on first use."""
+        directory = self.storage_dir(stem)
+        if directory != self.temp_dir and directory not in self._shard_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._shard_dirs.add(directory)
+        return directory
+    
+    def _storage_dirs(self) -> List[Path]:
+        """Get temp_dir and the shard directories present on disk."""
+        directories = [self.temp_dir]
+        shard_root = self.temp_dir / SHARD_DIR_NAME
+        if shard_root.is_dir():
+            with os.scandir(shard_root) as entries:
+                directories.extend(Path(entry.path) for entry in entries if entry.is_dir())
+        return directories
+    
+    def _scan_storage(self, directories: Optional[List[Path]] = None) -> Set[str]:
+        """Get the paths of all files in temp_dir and its shard directories."""
+        paths = set()
+        for directory in directories or self._storage_dirs():
+            with os.scandir(directory) as entries:
+                paths.update(entry.path for entry in entries if entry.is_file())
+        return paths
+    
+    def _migrate_flat_files(self) -> None:
+        """
+        Move managed files of the flat layout into their shard directories.
+        
+        Each file is hard-linked into its shard, the new paths are written to
+        the metadata in one transaction and only then are the flat names
+        removed, so a crash at any point leaves every file reachable under
+        the path its metadata names. Files without metadata are left for the
+        orphan sweep.
+        """
+        with os.scandir(self.temp_dir) as entries:
+            flat_paths = [entry.path for entry in entries if entry.is_file()]
+        
+        moves = []
+        linked = []
+        for path in flat_paths:
+            file_ids = self.temp_files.get_ids_by_path(path)
+            if not file_ids:
+                continue
+            name = os.path.basename(path)
+            target = self._ensure_storage_dir(Path(name).stem) / name
+            try:
+                os.link(path, target)
+            except FileExistsError:
+                # Left behind by an interrupted migration, or a different file
+                if not os.path.samefile(path, target):
+                    self.logger.warning(f"Not migrating {path}: {target} already exists")
+                    continue
+            except OSError as error:
+                self.logger.warning(f"Failed to migrate {path}: {str(error)}")
+                continue
+            moves.extend((file_id, str(target)) for file_id in file_ids)
+            linked.append(path)
+        
+        if not moves:
+            return
+        self.temp_files.relocate(moves)
+        for path in linked:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # Another worker sharing temp_dir migrated it at the same time
+                continue
+            except OSError as error:
+                self.logger.warning(f"Failed to remove migrated file {path}: {str(error)}")
+        self._sync_directory(self.temp_dir)
+        self.logger.info(f"Migrated {len(linked)} files to the sharded storage layout")
+    
+    def _reserved_paths(self) -> Set[str]:
+        """Paths in temp_dir owned by the service itself, never orphans."""
+        reserved = {str(self.temp_dir / METADATA_DB_NAME) + suffix for suffix in SIDECAR_SUFFIXES}
+        # Databases moved aside as unreadable are kept for recovery
+        reserved.update(path + CORRUPT_SUFFIX for path in list(reserved))
+        reserved.add(str(self.temp_dir / CLEANUP_LOCK_NAME))
+        return reserved
+    
     def _ensure_temp_directory(self) -> None:
         """Ensure temporary directory exists."""
         try:
@@ -556,18 +1512,170 @@ class FileService:
                 error
             )
     
-    async def _write_file_async(self, file_path: Path, content: str) -> None:
+    @traced("file.write", phase=PHASE_DISK_WRITE)
+    async def _write_file_async(self, file_path: Path, content: Union[str, bytes]) -> None:
         """Write content to file asynchronously."""
-        def write_file():
-            with open(file_path, 'w', encoding='utf-8') as f:
+        # Run file writing in the I/O pool to avoid blocking
+        await self.io_executor.run(self._write_file, file_path, content)
+    
+    def _write_file(self, file_path: Path, content: Union[str, bytes]) -> None:
+        """Write content to file, syncing it to disk unless durability is "none"."""
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        with open(file_path, 'wb') as f:
+            f.write(data)
+            if self.durability != "none":
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def _sync_directory(self, directory: Path) -> None:
+        """Persist directory entries (renames, links) under the "full" policy."""
+        if self.durability != "full" or os.name == "nt":
+            return
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    @traced("file.compress")
+    async def _compress_drawio_async(self, xml_content: str) -> Optional[bytes]:
+        """Compress a .drawio document, or return None if it cannot be parsed."""
+        def compress():
+            return svg_renderer.compress_document(xml_content).encode('utf-8')
+        
+        try:
+            # CPU-bound; keep it off the I/O threads
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, compress)
+        except svg_renderer.DiagramRenderError as error:
+            self.logger.debug(f"Storing Draw.io file uncompressed: {str(error)}")
+            return None
+    
+    def _blob_path(self, content_sha256: str) -> Path:
+        """Get the sharded path of a content-addressed blob."""
+        return self.temp_dir / BLOB_DIR_NAME / content_sha256[:2] / content_sha256[2:4] / content_sha256
+    
+    @traced("file.write_blob")
+    async def _write_blob_async(self, blob_path: Path, content: bytes) -> None:
+        """Write a blob asynchronously via a temporary file."""
+        temp_path = blob_path.with_name(f"{blob_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            await self.io_executor.run(blob_path.parent.mkdir, parents=True, exist_ok=True)
+            await self._write_file_async(temp_path, content)
+            await self.io_executor.run(self._publish, temp_path, blob_path)
+        except BaseException:
+            # Not awaited, so the cleanup also runs when the save is cancelled
+            self.io_executor.submit(temp_path.unlink, missing_ok=True)
+            raise
+    
+    def _write_blob(self, blob_path: Path, content: bytes) -> None:
+        """Write a blob via a temporary file so a partial write never carries the content name."""
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = blob_path.with_name(f"{blob_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            self._write_file(temp_path, content)
+            self._publish(temp_path, blob_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+    
+    def _publish(self, temp_path: Path, final_path: Path) -> None:
+        """Atomically move a fully written temporary file to its final name."""
+        # Set appropriate file permissions (readable by owner and group)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, final_path)
+        self._sync_directory(final_path.parent)
+    
+    def _link_unique(self, blob_path: Path, stem: str) -> Path:
+        """
+        Hard-link a blob under the first free <stem>[_<n>].drawio name.
+        
+        os.link fails if the name exists, so a name is claimed atomically
+        (like O_EXCL) even against other processes. Stems that collided
+        before resume from their last suffix instead of probing from 1.
+        Caller holds _blob_lock.
+        
+        Args:
+            blob_path: Blob to link.
+            stem: Sanitized filename without extension.
+            
+        Returns:
+            Path of the new link.
+            
+        Raises:
+            OSError: If hard links are not supported.
+        """
+        return self._claim_unique(stem, lambda file_path: os.link(blob_path, file_path))
+    
+    def _copy_unique(self, content: bytes, stem: str) -> Path:
+        """
+        Write a blob's content under the first free <stem>[_<n>].drawio name.
+        
+        Fallback of _link_unique where hard links are not supported; the
+        name is claimed with O_EXCL. Caller holds _blob_lock.
+        
+        Args:
+            content: Blob content.
+            stem: Sanitized filename without extension.
+            
+        Returns:
+            Path of the copy.
+        """
+        def claim(file_path: Path) -> None:
+            with open(file_path, 'xb') as f:
                 f.write(content)
+                if self.durability != "none":
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.chmod(file_path, 0o644)
         
-        # Run file writing in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, write_file)
+        return self._claim_unique(stem, claim)
+    
+    def _claim_unique(self, stem: str, create: Callable[[Path], None]) -> Path:
+        """
+        Create the first free <stem>[_<n>].drawio name with create.
+        
+        Args:
+            stem: Sanitized filename without extension.
+            create: Creates the file, raising FileExistsError if the name is taken.
+            
+        Returns:
+            Path of the created file.
+        """
+        directory = self._ensure_storage_dir(stem)
+        counter = self._name_counters.get(stem, 0)
+        while True:
+            name = f"{stem}_{counter}.drawio" if counter else f"{stem}.drawio"
+            file_path = directory / name
+            try:
+                create(file_path)
+            except FileExistsError:
+                counter += 1
+                continue
+            if counter:
+                self._name_counters[stem] = counter + 1
+            self._sync_directory(directory)
+            return file_path
+    
+    def _release_blob(self, blob_sha256: str) -> None:
+        """Delete a blob once no file references it. Caller holds _blob_lock."""
+        if self.temp_files.blob_refcount(blob_sha256) > 0:
+            return
+        if self._shared_store is not None and self._shared_store.blob_referenced(blob_sha256):
+            return
+        blob_path = self._blob_path(blob_sha256)
+        try:
+            blob_path.unlink(missing_ok=True)
+            self.logger.debug(f"Removed unreferenced blob: {blob_path}")
+        except OSError as e:
+            self.logger.warning(f"Failed to remove blob {blob_path}: {str(e)}")
     
     async def _remove_file(self, file_id: str) -> None:
         """Remove file and its metadata with detailed logging."""
+        await self.io_executor.run(self._delete_file, file_id)
+    
+    def _delete_file(self, file_id: str) -> None:
+        """Remove file and its metadata (synchronous, safe from the scheduler thread)."""
         temp_file = self.temp_files.get(file_id)
         if not temp_file:
             self.logger.debug(f"File {file_id} not found in metadata, skipping removal")
@@ -575,6 +1683,19 @@ class FileService:
         
         file_path = Path(temp_file.path)
         
+        if temp_file.blob_sha256:
+            with self._blob_lock:
+                # Drop the file's own link, then the blob with its last reference
+                if file_path != self._blob_path(temp_file.blob_sha256):
+                    try:
+                        file_path.unlink(missing_ok=True)
+                    except Exception as e:
+                        self.logger.warning(f"Failed to remove file from disk {file_path}: {str(e)}")
+                if self.temp_files.pop(file_id, None) is not None:
+                    self.logger.debug(f"Removed file metadata: {file_id}")
+                self._release_blob(temp_file.blob_sha256)
+            return
+        
         try:
             # Remove file from disk
             if file_path.exists():
@@ -588,10 +1709,201 @@ class FileService:
             # Continue even if file removal fails
         
         # Remove from metadata
-        if file_id in self.temp_files:
-            del self.temp_files[file_id]
+        if self.temp_files.pop(file_id, None) is not None:
             self.logger.debug(f"Removed file metadata: {file_id}")
     
+    def _expire_due(self, now: datetime) -> Tuple[int, int]:
+        """
+        Remove files whose expires_at is before now and record their expiry lag.
+        
+        Args:
+            now: Reference time.
+            
+        Returns:
+            Tuple of (files removed, failed removals).
+        """
+        removed = 0
+        failures = 0
+        for file_id in self.temp_files.expired_ids(now):
+            temp_file = self.temp_files.get(file_id)
+            if not temp_file:
+                continue
+            try:
+                self.logger.debug(f"Removing expired file: {temp_file.path} (expired at {temp_file.expires_at})")
+                self._delete_file(file_id)
+            except Exception as e:
+                failures += 1
+                self.logger.warning(f"Failed to remove expired file {file_id}: {str(e)}")
+                continue
+            
+            removed += 1
+            lag = max(0.0, (datetime.now() - temp_file.expires_at).total_seconds())
+            self._expiry_stats["removed"] += 1
+            self._expiry_stats["lag_total"] += lag
+            self._expiry_stats["lag_last"] = lag
+            self._expiry_stats["lag_max"] = max(self._expiry_stats["lag_max"], lag)
+        return removed, failures
+    
+    def _reserve_quota(self, incoming_bytes: int) -> None:
+        """
+        Make room for a new file under the storage quota and reserve its space.
+        
+        Expired files are removed first, then files in eviction policy order
+        until the byte usage drops to QUOTA_LOW_WATERMARK of the quota and the
+        file count is within max_files. Runs on the I/O pool; every call must
+        be paired with _release_quota once the file is stored or has failed.
+        
+        Args:
+            incoming_bytes: Bytes the new file adds on disk.
+            
+        Raises:
+            FileServiceError: If the file alone is larger than the quota.
+        """
+        if self.max_storage_bytes and incoming_bytes > self.max_storage_bytes:
+            raise FileServiceError(
+                f"File of {incoming_bytes} bytes exceeds the storage quota of {self.max_storage_bytes} bytes"
+            )
+        
+        if self._over_quota(incoming_bytes):
+            with self._cleanup_lock:
+                if self._over_quota(incoming_bytes):
+                    self._evict(incoming_bytes)
+        
+        with self._quota_lock:
+            self._quota_reserved["bytes"] += incoming_bytes
+            self._quota_reserved["files"] += 1
+    
+    def _release_quota(self, incoming_bytes: int) -> None:
+        """Drop the reservation of a save once its file is indexed (or failed)."""
+        with self._quota_lock:
+            self._quota_reserved["bytes"] -= incoming_bytes
+            self._quota_reserved["files"] -= 1
+    
+    def _over_quota(self, incoming_bytes: int, byte_fraction: float = 1.0) -> bool:
+        """Whether adding a file would exceed max_files or byte_fraction of max_storage_bytes."""
+        with self._quota_lock:
+            reserved_bytes = self._quota_reserved["bytes"]
+            reserved_files = self._quota_reserved["files"]
+        if self.max_files and self.temp_files.owned_count + reserved_files + 1 > self.max_files:
+            return True
+        if self.max_storage_bytes:
+            used = self.temp_files.disk_bytes + reserved_bytes + incoming_bytes
+            return used > self.max_storage_bytes * byte_fraction
+        return False
+    
+    def _evict(self, incoming_bytes: int) -> None:
+        """Remove expired, then policy-ordered files until a new file fits. Caller holds _cleanup_lock."""
+        now = datetime.now()
+        self._expire_due(now)
+        
+        evicted = 0
+        evicted_bytes = 0
+        if self._over_quota(incoming_bytes, QUOTA_LOW_WATERMARK):
+            for file_id in self.temp_files.eviction_order(self.eviction_policy, now):
+                if not self._over_quota(incoming_bytes, QUOTA_LOW_WATERMARK):
+                    break
+                temp_file = self.temp_files.get(file_id)
+                if temp_file is None:
+                    continue
+                try:
+                    self._delete_file(file_id)
+                except Exception as e:
+                    self.logger.warning(f"Failed to evict file {file_id}: {str(e)}")
+                    continue
+                evicted += 1
+                evicted_bytes += temp_file.size_bytes or 0
+        
+        with self._quota_lock:
+            self._quota_stats["evicted_files"] += evicted
+            self._quota_stats["evicted_bytes"] += evicted_bytes
+        if evicted:
+            self.logger.info(
+                f"Storage quota: evicted {evicted} files ({evicted_bytes} bytes, {self.eviction_policy})"
+            )
+        if self._over_quota(incoming_bytes):
+            self.logger.warning("Storage quota still exceeded after eviction; saves in flight hold the space")
+    
+    def _sweep_orphans(self) -> Tuple[int, int]:
+        """
+        Remove files in temp_dir and its shard directories that have no metadata.
+        
+        With shared storage only the cleanup leader sweeps. It first removes
+        expired files of every worker (including workers that exited), then
+        treats a file as orphaned only if no worker's metadata references it
+        and it was not linked within the last TEMP_WRITE_GRACE_SECONDS, since
+        another worker may be between linking a file and storing its row.
+        
+        Returns:
+            Tuple of (files removed, failed removals).
+        """
+        if not self.temp_dir.exists() or not self._is_cleanup_leader():
+            return 0, 0
+        
+        removed = 0
+        failures = 0
+        shared_store = self._shared_store
+        if shared_store is not None:
+            now = datetime.now()
+            self._adopt(
+                record for record in shared_store.expired(now.isoformat())
+                if record["id"] not in self.temp_files
+            )
+            removed, failures = self._expire_due(now)
+        
+        disk_paths = self._scan_storage()
+        orphaned_paths = disk_paths - self.temp_files.indexed_paths() - self._reserved_paths()
+        if shared_store is not None and orphaned_paths:
+            now_ts = time.time()
+            orphaned_paths = {
+                path for path in orphaned_paths - shared_store.paths()
+                if not self._is_recent(Path(path), now_ts, changed=True)
+            }
+        
+        for path in orphaned_paths:
+            try:
+                self.logger.debug(f"Removing orphaned file: {path}")
+                Path(path).unlink()
+                removed += 1
+            except Exception as e:
+                failures += 1
+                self.logger.warning(f"Failed to remove orphaned file {path}: {str(e)}")
+        
+        # Blobs left without references (e.g. after a crash) and interrupted blob writes
+        blob_root = self.temp_dir / BLOB_DIR_NAME
+        if blob_root.exists():
+            with self._blob_lock:
+                now = time.time()
+                for blob_path in blob_root.glob("*/*/*"):
+                    if self.temp_files.blob_refcount(blob_path.name) > 0:
+                        continue
+                    if blob_path.suffix == ".tmp" and self._is_recent(blob_path, now):
+                        continue
+                    if shared_store is not None and (
+                        self._is_recent(blob_path, now, changed=True) or shared_store.blob_referenced(blob_path.name)
+                    ):
+                        continue
+                    try:
+                        blob_path.unlink()
+                        removed += 1
+                    except OSError as e:
+                        failures += 1
+                        self.logger.warning(f"Failed to remove orphaned blob {blob_path}: {str(e)}")
+        return removed, failures
+    
+    @staticmethod
+    def _is_recent(path: Path, now: float, changed: bool = False) -> bool:
+        """
+        Whether a file may still belong to an in-flight write.
+        
+        changed uses the inode change time instead of the modification time,
+        which also covers hard links just created to an old blob.
+        """
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        return now - (stat.st_ctime if changed else stat.st_mtime) < TEMP_WRITE_GRACE_SECONDS
+    
     def _sanitize_filename(self, filename: str) -> str:
         """Sanitize filename to prevent path traversal and invalid characters."""
         # Remove path separators and invalid characters
@@ -612,35 +1924,45 @@ class FileService:
         return sanitized
     
     def _start_cleanup_scheduler(self) -> None:
-        """Start the automatic cleanup scheduler with improved resource management."""
-        def cleanup_scheduler():
-            self.logger.info(f"Starting cleanup scheduler (interval: {self.cleanup_interval_minutes} minutes)")
+        """
+        Start the expiry scheduler thread.
+        
+        The thread sleeps until the earliest expires_at in the expiry index
+        (or until woken because an earlier expiry was scheduled), removes the
+        files that are due, and sweeps orphans every cleanup_interval_minutes.
+        """
+        def expiry_scheduler():
+            self.logger.info(
+                f"Starting expiry scheduler (orphan sweep interval: {self.cleanup_interval_minutes} minutes)"
+            )
+            sweep_interval = self.cleanup_interval_minutes * 60
+            next_sweep = time.monotonic() + sweep_interval
             
             while not self._stop_cleanup.is_set():
+                timeout = next_sweep - time.monotonic()
+                next_expiry = self.temp_files.next_expiry()
+                if next_expiry is not None:
+                    timeout = min(timeout, (next_expiry - datetime.now()).total_seconds() + EXPIRY_WAKEUP_SLACK_SECONDS)
+                
+                self._expiry_wakeup.wait(timeout=max(0.0, timeout))
+                self._expiry_wakeup.clear()
+                if self._stop_cleanup.is_set():
+                    break
+                
                 try:
-                    # Wait for the specified interval or until stop is requested
-                    if self._stop_cleanup.wait(timeout=self.cleanup_interval_minutes * 60):
-                        # Stop was requested
-                        break
-                    
-                    # Set cleanup running flag
-                    self._cleanup_running = True
-                    
-                    # Run cleanup in a new event loop
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        loop.run_until_complete(self.cleanup_expired_files())
-                    finally:
-                        loop.close()
-                        self._cleanup_running = False
-                        
+                    with self._cleanup_lock:
+                        self._cleanup_running = True
+                        self._expire_due(datetime.now())
+                        if time.monotonic() >= next_sweep:
+                            self._sweep_orphans()
+                            next_sweep = time.monotonic() + sweep_interval
                 except Exception as e:
-                    self.logger.error(f"Error in cleanup scheduler: {str(e)}")
-                    self._cleanup_running = False
+                    self.logger.error(f"Error in expiry scheduler: {str(e)}")
                     # Continue running even if cleanup fails
-                    
+                finally:
+                    self._cleanup_running = False
+            
             self.logger.info("Cleanup scheduler stopped")
         
-        self._cleanup_thread = threading.Thread(target=cleanup_scheduler, daemon=True, name="FileService-Cleanup")
-        self._cleanup_thread.start()
\ No newline at end of file
+        self._cleanup_thread = threading.Thread(target=expiry_scheduler, daemon=True, name="FileService-Expiry")
+        self._cleanup_thread.start()
@@ -1,10 +1,18 @@
 """
 Health check system for the MCP Draw.io Server.
+
+A background refresher runs the checks on an interval and keeps the last
+report, so liveness, readiness and /health probes only read cached state.
+The report is also written to a state file that the container healthcheck
+script reads instead of probing everything itself.
 """
 import asyncio
+import json
 import logging
+import os
 import time
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
 from enum import Enum
@@ -14,6 +22,11 @@ from .llm_service import LLMService
 from .file_service import FileService
 from .image_service import ImageService
 
+HEALTH_STATE_FILE_NAME = "health.json"
+
+# A cached report older than this many refresh intervals is reported as stale
+STALE_AFTER_INTERVALS = 2
+
 
 class HealthStatus(Enum):
     """Health check status values."""
@@ -37,18 +50,33 @@ class HealthCheckResult:
 class HealthChecker:
     """Health check manager for the MCP server."""
     
-    def __init__(self, config: MCPServerConfig):
+    def __init__(self, config: MCPServerConfig, state_path: Optional[str] = None):
+        """
+        Initialize the health checker.
+        
+        Args:
+            config: Server configuration
+            state_path: Optional file the latest report is published to
+        """
         self.config = config
         self.logger = logging.getLogger(__name__)
+        self._started_at = time.time()
         self._last_check_time: Optional[datetime] = None
         self._cached_results: Dict[str, HealthCheckResult] = {}
         self._services_initialized = False
         
+        # Latest report and when it was computed (epoch seconds)
+        self._report: Optional[Dict[str, Any]] = None
+        self._report_time: Optional[float] = None
+        self._state_path = Path(state_path) if state_path else None
+        self._refresher: Optional[asyncio.Task] = None
+        
         # Service instances (initialized lazily)
         self._llm_service: Optional[LLMService] = None
         self._file_service: Optional[FileService] = None
         self._image_service: Optional[ImageService] = None
         self._dependency_checker = None
+        self._api_key_validation = None
     
     def set_services(
         self, 
@@ -68,6 +96,18 @@ class HealthChecker:
         self._dependency_checker = dependency_checker
         self.logger.info("Health checker initialized with dependency checker")
     
+    def set_api_key_validation(self, result):
+        """Set the latest API key validation result, reported by the LLM service check."""
+        self._api_key_validation = result
+    
+    def _api_key_validation_state(self) -> str:
+        result = self._api_key_validation
+        if result is None:
+            return "unknown"
+        if result.live_check_pending:
+            return "pending"
+        return "valid" if result.is_valid else "invalid"
+    
     async def check_all(self, force_refresh: bool = False) -> Dict[str, Any]:
         """
         Perform all health checks and return comprehensive status.
@@ -133,7 +173,83 @@ class HealthChecker:
         total_duration = (time.time() - start_time) * 1000
         self.logger.info(f"Health checks completed in {total_duration:.2f}ms")
         
-        return self._build_health_response(health_results)
+        response = self._build_health_response(health_results)
+        self._report = response
+        self._report_time = time.time()
+        if self._state_path:
+            try:
+                await asyncio.to_thread(self._write_state, response, self._report_time)
+            except OSError as e:
+                self.logger.warning(f"Could not publish health state: {str(e)}")
+        
+        return response
+    
+    @property
+    def refresh_interval(self) -> float:
+        """Seconds between background refreshes."""
+        return self.config.health_check_interval
+    
+    def start_refresher(self) -> None:
+        """Start refreshing the cached report every refresh_interval seconds."""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_loop())
+    
+    async def stop_refresher(self) -> None:
+        """Stop the background refresher."""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+    
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.check_all(force_refresh=True)
+            except Exception as e:
+                # Keep the last report; its age shows that it is stale
+                self.logger.warning(f"Background health refresh failed: {str(e)}")
+    
+    def _freshness(self) -> Dict[str, Any]:
+        """Age of the cached report, for every probe response."""
+        if self._report_time is None:
+            return {"checked_at": None, "age_seconds": None, "stale": True}
+        age = time.time() - self._report_time
+        return {
+            "checked_at": datetime.utcfromtimestamp(self._report_time).isoformat() + "Z",
+            "age_seconds": round(age, 3),
+            "stale": age > self.refresh_interval * STALE_AFTER_INTERVALS,
+        }
+    
+    def _write_state(self, report: Dict[str, Any], checked_at: float) -> None:
+        """Publish a report to the state file, replacing the previous one atomically."""
+        state = {
+            "status": report["status"],
+            "checked_at": checked_at,
+            "stale_after": checked_at + self.refresh_interval * STALE_AFTER_INTERVALS,
+            "pid": os.getpid(),
+            "checks": {name: check["status"] for name, check in report["checks"].items()},
+        }
+        self._state_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self._state_path.with_name(f"{self._state_path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(temp_path, self._state_path)
+    
+    async def get_cached_health(self) -> Dict[str, Any]:
+        """
+        Latest health report with its age, without running any check.
+        
+        Checks only run here when no report exists yet.
+        
+        Returns:
+            Dictionary containing the health report and its freshness
+        """
+        if self._report is None:
+            await self.check_all(force_refresh=True)
+        return {**self._report, **self._freshness()}
     
     async def _check_server_basic(self) -> HealthCheckResult:
         """Check basic server functionality."""
@@ -242,6 +358,16 @@ class HealthChecker:
             except Exception:
                 pass
             
+            # Storage quota usage of the managed files
+            if self._file_service:
+                stats = self._file_service.get_stats()
+                checks["storage_bytes"] = stats["storage_bytes"]
+                checks["managed_files"] = stats["active_files"]
+                if stats["max_storage_bytes"]:
+                    checks["storage_quota_percent"] = round(
+                        stats["storage_bytes"] / stats["max_storage_bytes"] * 100, 1
+                    )
+            
             # Determine status
             critical_checks = ["temp_dir_exists", "temp_dir_writable", "temp_dir_readable"]
             critical_passed = all(checks.get(check, False) for check in critical_checks)
@@ -299,14 +425,23 @@ class HealthChecker:
             
             all_passed = all(checks.values())
             status = HealthStatus.HEALTHY if all_passed else HealthStatus.DEGRADED
+            message = "LLM service health check"
+            
+            # Live API key check runs in the background after startup
+            api_key_validation = self._api_key_validation_state()
+            if api_key_validation == "invalid":
+                # Rejected keys cannot recover; network errors and timeouts may
+                unauthorized = self._api_key_validation.error_code == "UNAUTHORIZED"
+                status = HealthStatus.UNHEALTHY if unauthorized else HealthStatus.DEGRADED
+                message = f"API key validation failed: {self._api_key_validation.error_message}"
             
             return HealthCheckResult(
                 name="llm_service",
                 status=status,
-                message="LLM service health check",
+                message=message,
                 timestamp=datetime.utcnow(),
                 duration_ms=(time.time() - start_time) * 1000,
-                details=checks
+                details={**checks, "api_key_validation": api_key_validation}
             )
             
         except Exception as e:
@@ -558,18 +693,25 @@ class HealthChecker:
         """
         Check if server is ready to handle requests.
         
+        Reads the cached report only; a server whose last report is
+        unhealthy is not ready.
+        
         Returns:
             Dictionary indicating readiness status
         """
+        health_status = self._report["status"] if self._report else None
         ready = (
             self._services_initialized and
             self.config is not None and
-            bool(self.config.anthropic_api_key)
+            bool(self.config.anthropic_api_key) and
+            health_status != HealthStatus.UNHEALTHY.value
         )
         
         return {
             "ready": ready,
             "timestamp": datetime.utcnow().isoformat() + "Z",
+            "health_status": health_status,
+            **self._freshness(),
             "details": {
                 "services_initialized": self._services_initialized,
                 "config_loaded": self.config is not None,
@@ -587,5 +729,6 @@ class HealthChecker:
         return {
             "alive": True,
             "timestamp": datetime.utcnow().isoformat() + "Z",
-            "uptime_seconds": time.time() - (self._last_check_time.timestamp() if self._last_check_time else time.time()),
+            "uptime_seconds": time.time() - self._started_at,
+            **self._freshness(),
         }
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+HTTP transports that let one server process serve many MCP clients.
+
+Streamable HTTP is served at /mcp and the older HTTP+SSE transport at /sse,
+with SSE clients POSTing their messages to /messages/. Every session runs on
+the same low-level Server instance, so all clients share the process-wide
+LLM cache, FileService, ImageService and render cache instead of each client
+spawning a server process with its own copies. An optional /health route
+reports the process's health checks as JSON.
+"""
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+import uvicorn
+from mcp.server import Server
+from mcp.server.models import InitializationOptions
+from mcp.server.sse import SseServerTransport
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from starlette.types import Receive, Scope, Send
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STREAMABLE_HTTP_PATH = "/mcp"
+SSE_PATH = "/sse"
+SSE_MESSAGES_PATH = "/messages/"
+HEALTH_PATH = "/health"
+
+DEFAULT_HTTP_HOST = "127.0.0.1"
+DEFAULT_HTTP_PORT = 8000
+
+
+class StreamableHTTPEndpoint:
+    """ASGI endpoint handing Streamable HTTP requests to the session manager."""
+
+    def __init__(self, session_manager: StreamableHTTPSessionManager):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.session_manager.handle_request(scope, receive, send)
+
+
+def create_http_app(mcp_server: Server, initialization_options: InitializationOptions,
+                    stateless: bool = False,
+                    health_provider: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None) -> Starlette:
+    """
+    Build the ASGI application serving both HTTP transports.
+
+    Args:
+        mcp_server: Low-level MCP server whose handlers every session uses.
+        initialization_options: Options sent to SSE clients on initialize.
+        stateless: Serve Streamable HTTP without session state, so any
+            request may go to any process behind a load balancer. The SSE
+            transport keeps its session in one process and is not served.
+        health_provider: Returns the health report served at /health; the
+            response is 503 when its "status" is "unhealthy".
+
+    Returns:
+        Starlette application; its lifespan runs the Streamable HTTP session manager.
+    """
+    session_manager = StreamableHTTPSessionManager(app=mcp_server, stateless=stateless)
+    sse = SseServerTransport(SSE_MESSAGES_PATH)
+
+    async def handle_sse(request: Request) -> Response:
+        async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+            logger.debug("SSE session opened")
+            await mcp_server.run(read_stream, write_stream, initialization_options)
+        logger.debug("SSE session closed")
+        return Response()
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        async with session_manager.run():
+            yield
+
+    async def handle_health(request: Request) -> Response:
+        report = await health_provider()
+        # Check details may hold dataclasses and enums
+        return Response(json.dumps(report, default=str), media_type="application/json",
+                        status_code=503 if report.get("status") == "unhealthy" else 200)
+
+    routes = [Route(STREAMABLE_HTTP_PATH, endpoint=StreamableHTTPEndpoint(session_manager))]
+    if not stateless:
+        routes.append(Route(SSE_PATH, endpoint=handle_sse, methods=["GET"]))
+        routes.append(Mount(SSE_MESSAGES_PATH, app=sse.handle_post_message))
+    if health_provider is not None:
+        routes.append(Route(HEALTH_PATH, endpoint=handle_health, methods=["GET"]))
+
+    app = Starlette(routes=routes, lifespan=lifespan)
+    app.state.session_manager = session_manager
+    return app
+
+
+def create_http_server(app: Starlette, host: str = DEFAULT_HTTP_HOST, port: int = DEFAULT_HTTP_PORT,
+                       log_level: str = "info") -> uvicorn.Server:
+    """
+    Create the uvicorn server for an HTTP application.
+
+    Args:
+        app: Application from create_http_app.
+        host: Interface to bind.
+        port: TCP port to bind (0 picks a free port).
+        log_level: uvicorn log level.
+
+    Returns:
+        uvicorn.Server; await serve() to run it and set should_exit to stop it.
+    """
+    config = uvicorn.Config(app, host=host, port=port, log_level=log_level.lower(), lifespan="on")
+    return uvicorn.Server(config)
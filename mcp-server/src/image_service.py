@@ -1,17 +1,47 @@
 """
-Image Service for converting Draw.io files to PNG using Draw.io CLI.
+Image Service for converting Draw.io files to PNG, SVG, PDF, JPEG and WebP using Draw.io CLI.
 """
 import asyncio
+import base64
+import hashlib
+import io
 import logging
 import os
 import shutil
 import subprocess
 import time
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 
 from .exceptions import LLMError, LLMErrorCode
+from .file_service import map_file, sha256_file
+from .io_executor import IOExecutor, get_io_executor
+from .metrics import CACHE_REQUESTS, RENDER_DURATION
+from .tracing import (
+    PHASE_CACHE_LOOKUP,
+    PHASE_ENCODE,
+    PHASE_QUEUE_WAIT,
+    PHASE_RENDER,
+    current_span,
+    traced,
+    tracer,
+)
+from . import svg_renderer
+
+
+# Supported export formats and their MIME types
+EXPORT_FORMATS: Dict[str, str] = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+    "jpg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+# Formats the Draw.io CLI cannot write; rendered as PNG and transcoded with Pillow
+TRANSCODED_FORMATS = frozenset({"webp"})
 
 
 @dataclass
@@ -19,11 +49,17 @@ class ImageGenerationResult:
     """Result of image generation operation."""
     success: bool
     image_file_id: Optional[str] = None
-    png_file_path: Optional[str] = None
+    png_file_path: Optional[str] = None  # Path of the exported file, whatever its format
     base64_content: Optional[str] = None
     error: Optional[str] = None
     fallback_message: Optional[str] = None
     cli_available: bool = True
+    renderer: Optional[str] = None
+    export_format: str = "png"
+    mime_type: Optional[str] = None
+    from_cache: bool = False
+    size_bytes: Optional[int] = None
+    content_sha256: Optional[str] = None
 
 
 @dataclass
@@ -44,25 +80,156 @@ class ImageServiceError(Exception):
         self.name = "ImageServiceError"
 
 
+@dataclass(frozen=True)
+class ExportOptions:
+    """Output format and rendering options for a diagram export."""
+    format: str = "png"
+    scale: float = 1.0
+    border: int = 0
+    transparent: bool = False
+    page_index: int = 0  # zero-based
+    crop: bool = False  # PDF only
+    quality: int = 90  # JPEG and WebP only
+
+    def validated(self) -> "ExportOptions":
+        """
+        Normalize and validate the options.
+
+        Returns:
+            A normalized copy of the options.
+
+        Raises:
+            ImageServiceError: If any option is out of range.
+        """
+        export_format = str(self.format or "").lower().lstrip(".")
+        if export_format == "jpeg":
+            export_format = "jpg"
+        if export_format not in EXPORT_FORMATS:
+            raise ImageServiceError(
+                f"Unsupported export format: {self.format}. "
+                f"Supported formats: {', '.join(EXPORT_FORMATS)}"
+            )
+        if not 0 < self.scale <= 10:
+            raise ImageServiceError(f"Scale must be between 0 and 10, got: {self.scale}")
+        if not 0 <= self.border <= 1000:
+            raise ImageServiceError(f"Border must be between 0 and 1000, got: {self.border}")
+        if self.page_index < 0:
+            raise ImageServiceError(f"Page index must be zero or greater, got: {self.page_index}")
+        if not 1 <= self.quality <= 100:
+            raise ImageServiceError(f"Quality must be between 1 and 100, got: {self.quality}")
+
+        return replace(
+            self,
+            format=export_format,
+            scale=float(self.scale),
+            border=int(self.border),
+            transparent=bool(self.transparent),
+            page_index=int(self.page_index),
+            crop=bool(self.crop),
+            quality=int(self.quality)
+        )
+
+    @property
+    def mime_type(self) -> str:
+        """MIME type of the exported file."""
+        return EXPORT_FORMATS[self.format]
+
+
+def pillow_available() -> bool:
+    """Check if Pillow is installed for JPEG/WebP transcoding."""
+    try:
+        import PIL.Image  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _transcode_png(png_bytes: bytes, export_format: str, quality: int) -> bytes:
+    """
+    Transcode PNG bytes to JPEG or WebP with Pillow.
+
+    Args:
+        png_bytes: Rendered PNG image.
+        export_format: Target format ("jpg" or "webp").
+        quality: Encoder quality (1-100).
+
+    Returns:
+        Encoded image bytes.
+
+    Raises:
+        ImageServiceError: If Pillow is not installed or encoding fails.
+    """
+    try:
+        from PIL import Image
+    except ImportError as error:
+        raise ImageServiceError(
+            f"{export_format.upper()} export requires Pillow. Install it with: pip install Pillow",
+            error
+        )
+
+    try:
+        with Image.open(io.BytesIO(png_bytes)) as image:
+            if export_format == "jpg":
+                # JPEG has no alpha channel; flatten onto white like the Draw.io CLI does
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            output = io.BytesIO()
+            image.save(output, format="JPEG" if export_format == "jpg" else "WEBP", quality=quality)
+            return output.getvalue()
+    except Exception as error:
+        raise ImageServiceError(f"Failed to encode {export_format.upper()}: {str(error)}", error)
+
+
 class ImageService:
     """Service for converting Draw.io files to PNG images using Draw.io CLI."""
     
-    def __init__(self, drawio_cli_path: str = "drawio", timeout_seconds: int = 30):
+    MAX_BASE64_SIZE = 10 * 1024 * 1024  # 10MB limit for inline Base64 content
+    
+    def __init__(self, drawio_cli_path: str = "drawio", timeout_seconds: int = 30,
+                 native_renderer_enabled: bool = True, max_concurrent_renders: int = 4,
+                 render_cache_size: int = 128, io_executor: Optional[IOExecutor] = None):
         """
         Initialize the image service.
         
         Args:
             drawio_cli_path: Path to Draw.io CLI executable.
             timeout_seconds: Timeout for CLI operations.
+            native_renderer_enabled: Render in-process when the CLI is unavailable
+                and an SVG rasterizer is installed.
+            max_concurrent_renders: Maximum number of exports rendered at once.
+            render_cache_size: Maximum number of cached export results.
+            io_executor: Thread pool for blocking disk operations; defaults to the
+                process-wide I/O executor.
         """
         self.drawio_cli_path = drawio_cli_path
+        self._io_executor = io_executor
         self.timeout_seconds = timeout_seconds
+        self.native_renderer_enabled = native_renderer_enabled
         self.cli_availability_cache: Optional[Dict] = None
         self.cli_cache_ttl = 5 * 60  # 5 minutes cache
         
+        # Render concurrency limit and cache shared by all export formats
+        self.max_concurrent_renders = max(1, max_concurrent_renders)
+        self.render_cache_size = render_cache_size
+        self._render_semaphore = asyncio.Semaphore(self.max_concurrent_renders)
+        self._render_cache: "OrderedDict[Tuple, Dict[str, any]]" = OrderedDict()
+        self._render_stats = {
+            "renders_active": 0,
+            "renders_waiting": 0,
+            "cache_hits": 0,
+            "cache_misses": 0
+        }
+        
         # Setup logging
         self.logger = logging.getLogger(__name__)
     
+    @property
+    def io_executor(self) -> IOExecutor:
+        """Thread pool used for blocking disk operations."""
+        return self._io_executor or get_io_executor()
+    
     async def generate_png(self, drawio_file_path: str, output_dir: Optional[str] = None, 
                           include_base64: bool = False) -> ImageGenerationResult:
         """
@@ -76,97 +243,464 @@ class ImageService:
         Returns:
             ImageGenerationResult with success status, file information, and fallback handling.
         """
+        return await self.export_diagram(
+            drawio_file_path=drawio_file_path,
+            options=ExportOptions(format="png"),
+            output_dir=output_dir,
+            include_base64=include_base64
+        )
+    
+    @traced("image.export")
+    async def export_diagram(self, drawio_file_path: str, options: Optional[ExportOptions] = None,
+                             output_dir: Optional[str] = None,
+                             include_base64: bool = False) -> ImageGenerationResult:
+        """
+        Export a Draw.io file to PNG, SVG, PDF, JPEG or WebP.
+        
+        Exports of every format share the render concurrency limit and the render cache.
+        
+        Args:
+            drawio_file_path: Path to the .drawio file.
+            options: Output format and rendering options. Defaults to PNG.
+            output_dir: Optional output directory. If None, uses same directory as input.
+            include_base64: Whether to include Base64 encoded content in result.
+            
+        Returns:
+            ImageGenerationResult with success status, file information, and fallback handling.
+        """
+        options = options or ExportOptions()
+        label = str(options.format).upper()
+        
         try:
+            try:
+                options = options.validated()
+            except ImageServiceError as error:
+                return ImageGenerationResult(
+                    success=False,
+                    error=str(error),
+                    cli_available=False,
+                    export_format=str(options.format)
+                )
+            label = options.format.upper()
+            current_span().set_attribute("format", options.format)
+            
             # Validate input file
             input_path = Path(drawio_file_path)
-            if not input_path.exists():
+            if not await self.io_executor.run(input_path.exists):
                 return ImageGenerationResult(
                     success=False,
                     error=f"Draw.io file not found: {drawio_file_path}",
-                    cli_available=False
+                    cli_available=False,
+                    export_format=options.format
                 )
             
             if not input_path.suffix.lower() == '.drawio':
                 return ImageGenerationResult(
                     success=False,
                     error=f"Invalid file type. Expected .drawio file, got: {input_path.suffix}",
-                    cli_available=False
-                )
-            
-            # Check CLI availability
-            cli_check = await self.is_drawio_cli_available()
-            if not cli_check.available:
-                # Generate comprehensive fallback message
-                fallback_message = await self.get_fallback_message()
-                
-                # Log the CLI unavailability for troubleshooting
-                self.logger.warning(f"Draw.io CLI not available for PNG conversion: {cli_check.error}")
-                
-                return ImageGenerationResult(
-                    success=False,
-                    error=f"Draw.io CLI not available: {cli_check.error or 'Unknown error'}",
-                    fallback_message=fallback_message,
-                    cli_available=False
+                    cli_available=False,
+                    export_format=options.format
                 )
             
             # Determine output path
+            output_name = f"{input_path.stem}.{options.format}"
+            if options.page_index:
+                output_name = f"{input_path.stem}-page{options.page_index + 1}.{options.format}"
             if output_dir:
                 output_directory = Path(output_dir)
-                output_directory.mkdir(parents=True, exist_ok=True)
-                output_path = output_directory / f"{input_path.stem}.png"
+                await self.io_executor.run(output_directory.mkdir, parents=True, exist_ok=True)
+                output_path = output_directory / output_name
             else:
-                output_path = input_path.parent / f"{input_path.stem}.png"
-            
-            # Remove existing output file if it exists
-            if output_path.exists():
-                output_path.unlink()
-            
-            # Execute Draw.io CLI conversion
-            success = await self._execute_drawio_cli(str(input_path), str(output_path))
+                output_path = input_path.parent / output_name
             
-            if not success:
-                return ImageGenerationResult(
-                    success=False,
-                    error="Draw.io CLI conversion failed",
-                    cli_available=True
-                )
+            self._render_stats["renders_waiting"] += 1
+            try:
+                with tracer.span("image.queue_wait", phase=PHASE_QUEUE_WAIT):
+                    await self._render_semaphore.acquire()
+            finally:
+                self._render_stats["renders_waiting"] -= 1
             
-            # Verify output file was created
-            if not output_path.exists():
-                return ImageGenerationResult(
-                    success=False,
-                    error="PNG file was not created by Draw.io CLI",
-                    cli_available=True
-                )
+            self._render_stats["renders_active"] += 1
+            try:
+                return await self._export_with_cache(input_path, output_path, options, include_base64)
+            finally:
+                self._render_stats["renders_active"] -= 1
+                self._render_semaphore.release()
             
-            # Generate file ID for the PNG
-            png_file_id = f"png_{int(time.time())}_{output_path.stem}"
+        except Exception as error:
+            self.logger.error(f"Error generating {label} from {drawio_file_path}: {str(error)}")
+            return ImageGenerationResult(
+                success=False,
+                error=f"Unexpected error during {label} generation: {str(error)}",
+                cli_available=False,
+                export_format=options.format
+            )
+    
+    async def _export_with_cache(self, input_path: Path, output_path: Path,
+                                 options: ExportOptions, include_base64: bool) -> ImageGenerationResult:
+        """
+        Export a diagram, reusing a cached render of identical content and options.
+        
+        Args:
+            input_path: Path to the .drawio file.
+            output_path: Path for the exported file.
+            options: Validated export options.
+            include_base64: Whether to include Base64 encoded content in result.
             
-            # Optionally include Base64 content
-            base64_content = None
+        Returns:
+            ImageGenerationResult for the export.
+        """
+        cache_key = await self._get_render_cache_key(input_path, options)
+        cached = await self._restore_cached_render(cache_key, output_path)
+        if cached:
+            self._render_stats["cache_hits"] += 1
+            CACHE_REQUESTS.labels("render", "hit").inc()
+            current_span().set_attribute("cache_hit", True)
+            self.logger.debug(f"Render cache hit for {input_path} ({options.format})")
+            result = ImageGenerationResult(
+                success=True,
+                image_file_id=f"{options.format}_{int(time.time())}_{output_path.stem}",
+                png_file_path=str(output_path.absolute()),
+                cli_available=cached["cli_available"],
+                renderer=cached["renderer"],
+                export_format=options.format,
+                mime_type=options.mime_type,
+                from_cache=True,
+                size_bytes=cached["size"],
+                content_sha256=cached["content_sha256"]
+            )
             if include_base64:
-                base64_content = await self.convert_to_base64(str(output_path))
-                if base64_content is None:
-                    self.logger.warning(f"Failed to convert PNG to Base64: {output_path}")
+                await self._attach_content(result, None, include_base64)
+            return result
+        self._render_stats["cache_misses"] += 1
+        CACHE_REQUESTS.labels("render", "miss").inc()
+        current_span().set_attribute("cache_hit", False)
+        
+        # Check CLI availability
+        content = None
+        cli_check = await self.is_drawio_cli_available()
+        render_start = time.perf_counter()
+        if not cli_check.available and self.is_native_export_available(options.format):
+            # Render in-process from the parsed diagram model
+            result, content = await self._export_natively(input_path, output_path, options)
+        elif not cli_check.available:
+            # Generate comprehensive fallback message
+            fallback_message = await self.get_fallback_message()
             
-            self.logger.info(f"Successfully converted {drawio_file_path} to {output_path}")
+            # Log the CLI unavailability for troubleshooting
+            self.logger.warning(
+                f"Draw.io CLI not available for {options.format.upper()} conversion: {cli_check.error}"
+            )
             
             return ImageGenerationResult(
-                success=True,
-                image_file_id=png_file_id,
-                png_file_path=str(output_path.absolute()),
-                base64_content=base64_content,
-                cli_available=True
+                success=False,
+                error=f"Draw.io CLI not available: {cli_check.error or 'Unknown error'}",
+                fallback_message=fallback_message,
+                cli_available=False,
+                export_format=options.format
             )
+        else:
+            result, content = await self._export_with_cli(input_path, output_path, options)
+        
+        if result.success:
+            RENDER_DURATION.labels(result.renderer or "cli", options.format).observe(time.perf_counter() - render_start)
+            await self._attach_content(result, content, include_base64)
+            if self.render_cache_size > 0:
+                try:
+                    stat = await self.io_executor.run(output_path.stat)
+                except OSError:
+                    return result
+                self._store_cached_render(cache_key, output_path, result, stat)
+        return result
+    
+    @traced("image.encode", phase=PHASE_ENCODE)
+    async def _attach_content(self, result: ImageGenerationResult, content: Optional[bytes],
+                              include_base64: bool) -> None:
+        """
+        Hash and optionally Base64-encode the rendered file.
+        
+        The file is read at most once (not at all when the renderer already holds
+        the bytes) and shared through a memoryview between hashing and encoding.
+        
+        Args:
+            result: Successful export result to update in place.
+            content: Rendered bytes if already in memory.
+            include_base64: Whether to include Base64 encoded content in result.
+        """
+        max_size = self.MAX_BASE64_SIZE
+        
+        def digest():
+            data = content if content is not None else Path(result.png_file_path).read_bytes()
+            encoded = None
+            with memoryview(data) as view:
+                content_sha256 = hashlib.sha256(view).hexdigest()
+                size_bytes = view.nbytes
+                if include_base64 and size_bytes <= max_size:
+                    encoded = base64.b64encode(view)
+            # Drop the raw bytes before building the Base64 string to keep peak memory down
+            del data
+            return content_sha256, size_bytes, encoded.decode('ascii') if encoded is not None else None
+        
+        result.content_sha256, result.size_bytes, result.base64_content = await self.io_executor.run(digest)
+        
+        if include_base64 and result.base64_content is None:
+            self.logger.warning(
+                f"{result.export_format.upper()} file too large for Base64 conversion: "
+                f"{result.size_bytes} bytes (max: {max_size})"
+            )
+    
+    @traced("image.export_cli", phase=PHASE_RENDER)
+    async def _export_with_cli(self, input_path: Path, output_path: Path,
+                               options: ExportOptions) -> Tuple[ImageGenerationResult, Optional[bytes]]:
+        """
+        Export a diagram with the Draw.io CLI.
+        
+        Formats the CLI cannot write are rendered to PNG first and transcoded.
+        
+        Args:
+            input_path: Path to the .drawio file.
+            output_path: Path for the exported file.
+            options: Validated export options.
             
-        except Exception as error:
-            self.logger.error(f"Error generating PNG from {drawio_file_path}: {str(error)}")
+        Returns:
+            Tuple of the ImageGenerationResult and the rendered bytes if they are
+            already in memory.
+        """
+        label = options.format.upper()
+        transcode = options.format in TRANSCODED_FORMATS
+        if transcode and not pillow_available():
             return ImageGenerationResult(
                 success=False,
-                error=f"Unexpected error during PNG generation: {str(error)}",
-                cli_available=False
-            )
+                error=f"{label} export requires Pillow. Install it with: pip install Pillow",
+                cli_available=True,
+                export_format=options.format
+            ), None
+        
+        cli_output_path = output_path.with_suffix(".render.png") if transcode else output_path
+        cli_options = replace(options, format="png") if transcode else options
+        
+        # Remove existing output file if it exists
+        await self.io_executor.run(cli_output_path.unlink, missing_ok=True)
+        
+        # Execute Draw.io CLI conversion
+        success = await self._execute_drawio_cli(str(input_path), str(cli_output_path), cli_options)
+        
+        if not success:
+            return ImageGenerationResult(
+                success=False,
+                error="Draw.io CLI conversion failed",
+                cli_available=True,
+                export_format=options.format
+            ), None
+        
+        # Verify output file was created
+        if not await self.io_executor.run(cli_output_path.exists):
+            return ImageGenerationResult(
+                success=False,
+                error=f"{label} file was not created by Draw.io CLI",
+                cli_available=True,
+                export_format=options.format
+            ), None
+        
+        content = None
+        if transcode:
+            try:
+                png_data = await self.io_executor.run(cli_output_path.read_bytes)
+                # CPU-bound; keep it off the I/O threads
+                loop = asyncio.get_running_loop()
+                content = await loop.run_in_executor(
+                    None, _transcode_png, png_data, options.format, options.quality
+                )
+                await self.io_executor.run(output_path.write_bytes, content)
+            except ImageServiceError as error:
+                return ImageGenerationResult(
+                    success=False,
+                    error=str(error),
+                    cli_available=True,
+                    export_format=options.format
+                ), None
+            finally:
+                await self.io_executor.run(cli_output_path.unlink, missing_ok=True)
+        
+        self.logger.info(f"Successfully converted {input_path} to {output_path}")
+        
+        return ImageGenerationResult(
+            success=True,
+            image_file_id=f"{options.format}_{int(time.time())}_{output_path.stem}",
+            png_file_path=str(output_path.absolute()),
+            cli_available=True,
+            renderer="drawio-cli",
+            export_format=options.format,
+            mime_type=options.mime_type
+        ), content
+    
+    def is_native_renderer_available(self) -> bool:
+        """
+        Check if PNGs can be rendered in-process without the Draw.io CLI.
+        
+        The rasterizer import is attempted once and cached by the renderer module.
+        
+        Returns:
+            True if native rendering is enabled and a rasterizer is installed.
+        """
+        return self.native_renderer_enabled and svg_renderer.rasterizer_available()
+    
+    def is_native_export_available(self, export_format: str) -> bool:
+        """
+        Check if a format can be rendered in-process without the Draw.io CLI.
+        
+        SVG needs no optional dependencies; PNG needs a rasterizer and JPEG/WebP
+        additionally need Pillow. PDF always requires the CLI.
+        
+        Args:
+            export_format: Normalized export format.
+            
+        Returns:
+            True if the format can be rendered natively.
+        """
+        if not self.native_renderer_enabled:
+            return False
+        if export_format == "svg":
+            return True
+        if export_format == "png":
+            return svg_renderer.rasterizer_available()
+        if export_format in ("jpg", "webp"):
+            return svg_renderer.rasterizer_available() and pillow_available()
+        return False
+    
+    @traced("image.export_native", phase=PHASE_RENDER)
+    async def _export_natively(self, input_path: Path, output_path: Path,
+                               options: ExportOptions) -> Tuple[ImageGenerationResult, Optional[bytes]]:
+        """
+        Render a diagram from the parsed diagram model using the native SVG renderer.
+        
+        Args:
+            input_path: Path to the .drawio file.
+            output_path: Path for the exported file.
+            options: Validated export options.
+            
+        Returns:
+            Tuple of the ImageGenerationResult and the rendered bytes.
+        """
+        def read_xml():
+            with map_file(input_path) as view:
+                return str(view, 'utf-8')
+        
+        def render(xml_content):
+            if options.format == "svg":
+                data = svg_renderer.render_drawio_to_svg(
+                    xml_content,
+                    page_index=options.page_index,
+                    scale=options.scale,
+                    border=options.border,
+                    transparent=options.transparent
+                ).encode('utf-8')
+            else:
+                data = svg_renderer.render_drawio_to_png(
+                    xml_content,
+                    page_index=options.page_index,
+                    scale=options.scale,
+                    border=options.border,
+                    transparent=options.transparent
+                )
+                if options.format in ("jpg", "webp"):
+                    data = _transcode_png(data, options.format, options.quality)
+            return data
+        
+        try:
+            xml_content = await self.io_executor.run(read_xml)
+            # CPU-bound; keep it off the I/O threads
+            loop = asyncio.get_running_loop()
+            content = await loop.run_in_executor(None, render, xml_content)
+            await self.io_executor.run(output_path.write_bytes, content)
+        except (svg_renderer.DiagramRenderError, ImageServiceError) as error:
+            self.logger.error(f"Native rendering failed for {input_path}: {str(error)}")
+            return ImageGenerationResult(
+                success=False,
+                error=f"Native rendering failed: {str(error)}",
+                cli_available=False,
+                renderer="native",
+                export_format=options.format
+            ), None
+        
+        self.logger.info(
+            f"Rendered {input_path} to {output_path} natively "
+            f"({options.format}, {svg_renderer.get_rasterizer_name() or 'svg'}, {len(content)} bytes)"
+        )
+        
+        return ImageGenerationResult(
+            success=True,
+            image_file_id=f"{options.format}_{int(time.time())}_{output_path.stem}",
+            png_file_path=str(output_path.absolute()),
+            cli_available=False,
+            renderer="native",
+            export_format=options.format,
+            mime_type=options.mime_type
+        ), content
+    
+    async def _get_render_cache_key(self, input_path: Path, options: ExportOptions) -> Tuple:
+        """Build the render cache key from the diagram content hash and export options."""
+        content_hash = await self.io_executor.run(sha256_file, input_path)
+        return (content_hash, options)
     
+    @traced("image.cache_lookup", phase=PHASE_CACHE_LOOKUP)
+    async def _restore_cached_render(self, cache_key: Tuple, output_path: Path) -> Optional[Dict[str, any]]:
+        """
+        Restore a cached render to the output path.
+        
+        Args:
+            cache_key: Render cache key.
+            output_path: Path the caller expects the export at.
+            
+        Returns:
+            The cache entry, or None on a miss or if the cached file changed.
+        """
+        entry = self._render_cache.get(cache_key)
+        if entry is None:
+            return None
+        
+        def restore():
+            cached_path = Path(entry["path"])
+            stat = cached_path.stat()
+            if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]:
+                return False
+            if cached_path != output_path:
+                shutil.copyfile(cached_path, output_path)
+            return True
+        
+        try:
+            restored = await self.io_executor.run(restore)
+        except OSError:
+            restored = False
+        
+        if not restored:
+            self._render_cache.pop(cache_key, None)
+            return None
+        
+        self._render_cache.move_to_end(cache_key)
+        return entry
+    
+    def _store_cached_render(self, cache_key: Tuple, output_path: Path,
+                             result: ImageGenerationResult, stat: os.stat_result) -> None:
+        """Remember a successful render, evicting the least recently used entry."""
+        self._render_cache[cache_key] = {
+            "path": str(output_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "renderer": result.renderer,
+            "cli_available": result.cli_available,
+            "content_sha256": result.content_sha256
+        }
+        self._render_cache.move_to_end(cache_key)
+        while len(self._render_cache) > self.render_cache_size:
+            self._render_cache.popitem(last=False)
+    
+    def clear_render_cache(self) -> None:
+        """Clear the render cache to force re-rendering."""
+        self._render_cache.clear()
+        self.logger.debug("Cleared render cache")
+    
+    @traced("image.cli_probe")
     async def is_drawio_cli_available(self) -> CLIAvailabilityResult:
         """
         Check if Draw.io CLI is available and get version information.
@@ -187,7 +721,7 @@ class ImageService:
                 )
             
             # Check if CLI executable exists in PATH
-            cli_path = shutil.which(self.drawio_cli_path)
+            cli_path = await self.io_executor.run(shutil.which, self.drawio_cli_path)
             if not cli_path:
                 result = CLIAvailabilityResult(
                     available=False,
@@ -333,27 +867,29 @@ class ImageService:
         """
         try:
             png_path = Path(png_file_path)
-            if not png_path.exists():
-                self.logger.error(f"PNG file not found for Base64 conversion: {png_file_path}")
-                return None
-            
-            # Check file size to avoid memory issues
-            file_size = png_path.stat().st_size
-            max_size = 10 * 1024 * 1024  # 10MB limit
-            if file_size > max_size:
-                self.logger.warning(f"PNG file too large for Base64 conversion: {file_size} bytes (max: {max_size})")
-                return None
-            
-            # Read file and encode to Base64
-            import base64
+            max_size = self.MAX_BASE64_SIZE
             
             def read_and_encode():
+                if not png_path.exists():
+                    self.logger.error(f"PNG file not found for Base64 conversion: {png_file_path}")
+                    return None
+                
+                # Check file size to avoid memory issues
+                file_size = png_path.stat().st_size
+                if file_size > max_size:
+                    self.logger.warning(
+                        f"PNG file too large for Base64 conversion: {file_size} bytes (max: {max_size})"
+                    )
+                    return None
+                
+                # Read file and encode to Base64
                 with open(png_path, 'rb') as f:
                     return base64.b64encode(f.read()).decode('utf-8')
             
-            # Run in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            base64_content = await loop.run_in_executor(None, read_and_encode)
+            # Run in the I/O pool to avoid blocking
+            base64_content = await self.io_executor.run(read_and_encode)
+            if base64_content is None:
+                return None
             
             self.logger.debug(f"Successfully converted {png_file_path} to Base64 ({len(base64_content)} chars)")
             return base64_content
@@ -363,87 +899,108 @@ class ImageService:
             return None
     
     async def save_png_with_metadata(self, png_file_path: str, file_service, 
-                                   original_drawio_id: Optional[str] = None) -> Dict[str, any]:
+                                   original_drawio_id: Optional[str] = None,
+                                   size_bytes: Optional[int] = None,
+                                   content_sha256: Optional[str] = None,
+                                   file_type: str = "png") -> Dict[str, any]:
         """
-        Save PNG file with metadata management.
+        Register a rendered file with the FileService for metadata and cleanup management.
+        
+        The file is registered in place; it is neither copied nor re-read.
         
         Args:
-            png_file_path: Path to the PNG file to save.
+            png_file_path: Path to the rendered file, normally inside the FileService temp directory.
             file_service: FileService instance for file management.
             original_drawio_id: Optional ID of the original .drawio file.
+            size_bytes: Size of the rendered file if already known.
+            content_sha256: SHA-256 of the rendered file if already known.
+            file_type: Export format of the rendered file.
             
         Returns:
             Dictionary with save result and metadata.
         """
         try:
             png_path = Path(png_file_path)
-            if not png_path.exists():
+            if not await self.io_executor.run(png_path.exists):
                 return {
                     "success": False,
-                    "error": f"PNG file not found: {png_file_path}"
+                    "error": f"{file_type.upper()} file not found: {png_file_path}"
                 }
             
-            # Read PNG content
-            with open(png_path, 'rb') as f:
-                png_content = f.read()
-            
-            # Generate filename
-            timestamp = int(time.time())
-            filename = f"diagram_{timestamp}.png"
-            if original_drawio_id:
-                filename = f"diagram_{original_drawio_id}_{timestamp}.png"
-            
-            # Save using FileService
-            file_id = await file_service.save_file(
-                content=png_content,
-                filename=filename,
-                file_type="png"
+            if size_bytes is None:
+                size_bytes = (await self.io_executor.run(png_path.stat)).st_size
+            
+            # Register using FileService
+            file_id = await file_service.register_file(
+                file_id=original_drawio_id or f"diagram_{int(time.time())}",
+                file_path=str(png_path),
+                file_type=file_type,
+                size_bytes=size_bytes,
+                content_sha256=content_sha256
             )
             
             # Get file metadata
             file_info = await file_service.get_file_info(file_id)
             
-            self.logger.info(f"Successfully saved PNG with ID: {file_id}")
+            self.logger.info(f"Successfully registered {file_type.upper()} with ID: {file_id}")
             
             return {
                 "success": True,
                 "file_id": file_id,
-                "filename": filename,
-                "file_path": file_info.get("path") if file_info else None,
-                "size_bytes": len(png_content),
+                "filename": png_path.name,
+                "file_path": file_info.path,
+                "size_bytes": size_bytes,
+                "content_sha256": content_sha256,
                 "original_drawio_id": original_drawio_id,
-                "created_at": file_info.get("created_at") if file_info else None,
-                "expires_at": file_info.get("expires_at") if file_info else None
+                "created_at": file_info.created_at.isoformat(),
+                "expires_at": file_info.expires_at.isoformat()
             }
             
         except Exception as error:
-            self.logger.error(f"Error saving PNG with metadata: {str(error)}")
+            self.logger.error(f"Error saving {file_type.upper()} with metadata: {str(error)}")
             return {
                 "success": False,
-                "error": f"Failed to save PNG: {str(error)}"
+                "error": f"Failed to save {file_type.upper()}: {str(error)}"
             }
     
-    async def _execute_drawio_cli(self, input_path: str, output_path: str) -> bool:
+    @traced("image.cli_exec")
+    async def _execute_drawio_cli(self, input_path: str, output_path: str,
+                                  options: Optional[ExportOptions] = None) -> bool:
         """
-        Execute Draw.io CLI to convert .drawio to PNG.
+        Execute Draw.io CLI to export a .drawio file.
         
         Args:
             input_path: Path to input .drawio file.
-            output_path: Path for output PNG file.
+            output_path: Path for output file.
+            options: Validated export options. Defaults to PNG.
             
         Returns:
             True if conversion succeeded, False otherwise.
         """
         try:
+            options = options or ExportOptions()
+            
             # Build CLI command
-            # Format: drawio -x -f png -o output_path input_path
+            # Format: drawio -x -f <format> -o output_path [options] input_path
             cmd = [
                 self.drawio_cli_path,
                 "-x",  # Export mode
-                "-f", "png",  # Format: PNG
-                "-o", output_path,  # Output file
-                input_path  # Input file
+                "-f", options.format,  # Output format
+                "-o", output_path  # Output file
             ]
+            if options.scale != 1.0:
+                cmd.extend(["-s", f"{options.scale:g}"])
+            if options.border:
+                cmd.extend(["-b", str(options.border)])
+            if options.transparent and options.format == "png":
+                cmd.append("-t")
+            if options.page_index:
+                cmd.extend(["-p", str(options.page_index + 1)])  # CLI pages are 1-based
+            if options.crop and options.format == "pdf":
+                cmd.append("--crop")
+            if options.format == "jpg":
+                cmd.extend(["-q", str(options.quality)])
+            cmd.append(input_path)  # Input file
             
             self.logger.debug(f"Executing Draw.io CLI: {' '.join(cmd)}")
             
@@ -520,7 +1077,17 @@ class ImageService:
             "cli_cached_available": self.cli_availability_cache.get("available") if self.cli_availability_cache else None,
             "cli_cached_version": self.cli_availability_cache.get("version") if self.cli_availability_cache else None,
             "fallback_enabled": True,
-            "base64_support": True
+            "base64_support": True,
+            "native_renderer_enabled": self.native_renderer_enabled,
+            "native_rasterizer": svg_renderer.get_rasterizer_name() if self.native_renderer_enabled else None,
+            "supported_formats": list(EXPORT_FORMATS),
+            "max_concurrent_renders": self.max_concurrent_renders,
+            "renders_active": self._render_stats["renders_active"],
+            "renders_waiting": self._render_stats["renders_waiting"],
+            "render_cache_entries": len(self._render_cache),
+            "render_cache_hits": self._render_stats["cache_hits"],
+            "render_cache_misses": self._render_stats["cache_misses"],
+            "io_executor": self.io_executor.get_stats()
         }
     
     async def get_service_status(self) -> Dict[str, any]:
@@ -542,7 +1109,12 @@ class ImageService:
                 "fallback_available": True,
                 "base64_support": True,
                 "features": {
-                    "png_conversion": cli_check.available,
+                    "png_conversion": cli_check.available or self.is_native_renderer_available(),
+                    "native_rendering": self.is_native_renderer_available(),
+                    "export_formats": [
+                        export_format for export_format in EXPORT_FORMATS
+                        if cli_check.available or self.is_native_export_available(export_format)
+                    ],
                     "fallback_messages": True,
                     "base64_encoding": True,
                     "file_metadata": True,
@@ -579,7 +1151,8 @@ class ImageService:
     async def generate_png_with_fallback(self, drawio_file_path: str, 
                                        output_dir: Optional[str] = None,
                                        include_base64: bool = False,
-                                       file_service=None) -> Dict[str, any]:
+                                       file_service=None,
+                                       options: Optional[ExportOptions] = None) -> Dict[str, any]:
         """
         Complete PNG generation workflow with comprehensive fallback handling.
         
@@ -588,24 +1161,36 @@ class ImageService:
             output_dir: Optional output directory.
             include_base64: Whether to include Base64 encoded content.
             file_service: Optional FileService for managed file saving.
+            options: Optional export options for formats other than PNG.
             
         Returns:
             Comprehensive result dictionary with success/failure status and fallback options.
         """
         try:
-            # Generate PNG using CLI
-            result = await self.generate_png(
-                drawio_file_path=drawio_file_path,
-                output_dir=output_dir,
-                include_base64=include_base64
-            )
+            # Generate the image using CLI or the native renderer
+            if options is None:
+                result = await self.generate_png(
+                    drawio_file_path=drawio_file_path,
+                    output_dir=output_dir,
+                    include_base64=include_base64
+                )
+            else:
+                result = await self.export_diagram(
+                    drawio_file_path=drawio_file_path,
+                    options=options,
+                    output_dir=output_dir,
+                    include_base64=include_base64
+                )
             
-            # If successful, optionally save with metadata
+            # If successful, optionally register with metadata
             if result.success and file_service and result.png_file_path:
                 save_result = await self.save_png_with_metadata(
                     png_file_path=result.png_file_path,
                     file_service=file_service,
-                    original_drawio_id=Path(drawio_file_path).stem
+                    original_drawio_id=Path(drawio_file_path).stem,
+                    size_bytes=result.size_bytes,
+                    content_sha256=result.content_sha256,
+                    file_type=result.export_format
                 )
                 
                 return {
@@ -614,7 +1199,13 @@ class ImageService:
                         "image_file_id": result.image_file_id,
                         "png_file_path": result.png_file_path,
                         "base64_content": result.base64_content,
-                        "cli_available": result.cli_available
+                        "cli_available": result.cli_available,
+                        "renderer": result.renderer,
+                        "format": result.export_format,
+                        "mime_type": result.mime_type,
+                        "from_cache": result.from_cache,
+                        "size_bytes": result.size_bytes,
+                        "content_sha256": result.content_sha256
                     },
                     "save_result": save_result,
                     "message": "PNG conversion completed successfully"
@@ -626,9 +1217,15 @@ class ImageService:
                         "image_file_id": result.image_file_id,
                         "png_file_path": result.png_file_path,
                         "base64_content": result.base64_content,
-                        "cli_available": result.cli_available
+                        "cli_available": result.cli_available,
+                        "renderer": result.renderer,
+                        "format": result.export_format,
+                        "mime_type": result.mime_type,
+                        "from_cache": result.from_cache,
+                        "size_bytes": result.size_bytes,
+                        "content_sha256": result.content_sha256
                     },
-                    "message": "PNG conversion completed successfully"
+                    "message": f"{result.export_format.upper()} conversion completed successfully"
                 }
             else:
                 # Handle failure with fallback information
@@ -0,0 +1,210 @@
+"""
+Dedicated thread pool for blocking disk I/O.
+
+FileService, ImageService and the resource handlers run file reads, writes,
+stats and deletes here instead of on the event loop or in the loop's default
+executor. The pool is sized independently of the default executor, so disk
+latency neither stalls request handling nor competes with unrelated
+run_in_executor work, and its queue depth is visible in the service stats.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from .tracing import PHASE_QUEUE_WAIT, add_phase_time, phase_timings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_IO_WORKERS = 8
+
+T = TypeVar("T")
+
+
+class IOExecutor:
+    """Bounded thread pool for blocking file operations, with queue metrics."""
+
+    def __init__(self, max_workers: int = DEFAULT_IO_WORKERS, thread_name_prefix: str = "drawio-io"):
+        """
+        Create the pool.
+
+        Args:
+            max_workers: Number of I/O threads.
+            thread_name_prefix: Prefix of the worker thread names.
+
+        Raises:
+            ValueError: If max_workers is not positive.
+        """
+        if max_workers <= 0:
+            raise ValueError("max_workers must be positive")
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "queued": 0,
+            "active": 0,
+            "max_queued": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "run_total": 0.0,
+        }
+
+    @property
+    def closed(self) -> bool:
+        """Whether the pool has been shut down."""
+        return self._closed
+
+    def submit(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """
+        Queue a blocking call without waiting for it.
+
+        Args:
+            func: Callable to run on an I/O thread.
+            *args: Positional arguments for func.
+            **kwargs: Keyword arguments for func.
+
+        Returns:
+            concurrent.futures.Future of the call.
+
+        Raises:
+            RuntimeError: If the pool has been shut down.
+        """
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["queued"] += 1
+            self._stats["max_queued"] = max(self._stats["max_queued"], self._stats["queued"])
+        try:
+            # Captured here: the pool thread does not see the submitting tool call's context
+            return self._executor.submit(self._call, time.perf_counter(), phase_timings(), func, args, kwargs)
+        except RuntimeError:
+            with self._lock:
+                self._stats["submitted"] -= 1
+                self._stats["queued"] -= 1
+            raise
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking call on the pool and await its result.
+
+        Args:
+            func: Callable to run on an I/O thread.
+            *args: Positional arguments for func.
+            **kwargs: Keyword arguments for func.
+
+        Returns:
+            The return value of func; exceptions raised by func propagate.
+        """
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool utilization statistics.
+
+        Returns:
+            Dictionary with worker count, queue depth and timing figures.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        finished = stats["completed"] + stats["failed"]
+        started = finished + stats["active"]
+        return {
+            "max_workers": self.max_workers,
+            "active": stats["active"],
+            "queue_depth": stats["queued"],
+            "max_queue_depth": stats["max_queued"],
+            "submitted": stats["submitted"],
+            "completed": stats["completed"],
+            "failed": stats["failed"],
+            "wait_ms_avg": round(stats["wait_total"] / started * 1000, 3) if started else 0.0,
+            "wait_ms_max": round(stats["wait_max"] * 1000, 3),
+            "run_ms_avg": round(stats["run_total"] / finished * 1000, 3) if finished else 0.0,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop accepting work and release the threads.
+
+        Args:
+            wait: Wait for queued calls to finish.
+        """
+        self._closed = True
+        self._executor.shutdown(wait=wait)
+
+    def _call(self, submitted_at: float, timings: Optional[Dict[str, float]],
+              func: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        """Run one queued call and record its wait and run times."""
+        started_at = time.perf_counter()
+        wait = started_at - submitted_at
+        add_phase_time(timings, PHASE_QUEUE_WAIT, wait)
+        with self._lock:
+            self._stats["queued"] -= 1
+            self._stats["active"] += 1
+            self._stats["wait_total"] += wait
+            self._stats["wait_max"] = max(self._stats["wait_max"], wait)
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._stats["active"] -= 1
+                self._stats["failed" if failed else "completed"] += 1
+                self._stats["run_total"] += time.perf_counter() - started_at
+
+
+_default_executor: Optional[IOExecutor] = None
+_default_lock = threading.Lock()
+
+
+def get_io_executor() -> IOExecutor:
+    """
+    Get the process-wide I/O executor, creating it on first use.
+
+    Returns:
+        The shared IOExecutor.
+    """
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None or _default_executor.closed:
+            _default_executor = IOExecutor()
+        return _default_executor
+
+
+def configure_io_executor(max_workers: int) -> IOExecutor:
+    """
+    Replace the process-wide I/O executor with one of the given size.
+
+    Calls already queued on the previous pool still complete.
+
+    Args:
+        max_workers: Number of I/O threads.
+
+    Returns:
+        The new shared IOExecutor.
+    """
+    global _default_executor
+    executor = IOExecutor(max_workers=max_workers)
+    with _default_lock:
+        previous, _default_executor = _default_executor, executor
+    if previous is not None and not previous.closed:
+        previous.shutdown(wait=False)
+    logger.debug(f"I/O executor configured with {max_workers} workers")
+    return executor
+
+
+def shutdown_io_executor() -> None:
+    """Shut down the process-wide I/O executor, waiting for queued calls."""
+    global _default_executor
+    with _default_lock:
+        executor, _default_executor = _default_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
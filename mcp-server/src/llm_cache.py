@@ -0,0 +1,158 @@
+"""
+Persistent cache of generated diagrams shared by server processes.
+
+LLMService keeps recent generations in memory; with this store they are also
+written to a SQLite database in WAL mode, so a restarted process, or another
+worker behind the same HTTP port, answers a repeated prompt without calling
+the API again. Entries carry their own expiry and the table is trimmed to a
+maximum size, oldest entries first.
+"""
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_DIR_NAME = ".llm_cache"
+LLM_CACHE_DB_NAME = "llm_cache.db"
+
+# How long a write waits for another process holding the write lock
+BUSY_TIMEOUT_SECONDS = 10.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    xml TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS llm_cache_expires_at ON llm_cache (expires_at)",
+    "CREATE INDEX IF NOT EXISTS llm_cache_created_at ON llm_cache (created_at)",
+)
+
+
+class LLMCacheStore:
+    """SQLite (WAL) backed store of cached LLM responses."""
+
+    def __init__(self, db_path: str, max_entries: int = 1000):
+        """
+        Open (or create) the cache database.
+
+        An unreadable database is replaced by an empty one; losing cached
+        responses only costs API calls.
+
+        Args:
+            db_path: Path to the SQLite database file; its directory is created.
+            max_entries: Maximum number of entries kept.
+
+        Raises:
+            ValueError: If max_entries is not positive.
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._connection = self._connect()
+        except sqlite3.DatabaseError as error:
+            logger.warning(f"LLM cache database {self.db_path} is unreadable, starting a new one: {str(error)}")
+            for suffix in ("", "-wal", "-shm"):
+                Path(str(self.db_path) + suffix).unlink(missing_ok=True)
+            self._connection = self._connect()
+
+    def get(self, key: str, now: float) -> Optional[Tuple[str, float, float]]:
+        """
+        Look up an entry that has not expired.
+
+        Args:
+            key: Cache key.
+            now: Current time as a UNIX timestamp.
+
+        Returns:
+            (xml, created_at, expires_at), or None if there is no live entry.
+        """
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT xml, created_at, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+        except sqlite3.Error as error:
+            logger.warning(f"LLM cache read failed: {str(error)}")
+            return None
+        return tuple(row) if row else None
+
+    def put(self, key: str, xml: str, created_at: float, expires_at: float) -> None:
+        """
+        Insert or replace an entry, trimming the table to max_entries.
+
+        Args:
+            key: Cache key.
+            xml: Generated XML.
+            created_at: Creation time as a UNIX timestamp.
+            expires_at: Expiry time as a UNIX timestamp.
+        """
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, xml, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, xml, created_at, expires_at)
+                )
+                self._connection.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as error:
+            logger.warning(f"LLM cache write failed: {str(error)}")
+
+    def purge_expired(self, now: float) -> int:
+        """
+        Delete expired entries.
+
+        Args:
+            now: Current time as a UNIX timestamp.
+
+        Returns:
+            Number of entries deleted.
+        """
+        try:
+            with self._lock, self._connection:
+                return self._connection.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,)).rowcount
+        except sqlite3.Error as error:
+            logger.warning(f"LLM cache purge failed: {str(error)}")
+            return 0
+
+    def count(self) -> int:
+        """Get the number of stored entries, expired or not."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database in WAL mode and ensure the schema exists."""
+        connection = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None,
+                                     timeout=BUSY_TIMEOUT_SECONDS)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            # A lost cache entry only costs an API call
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(_SCHEMA)
+            for statement in _INDEXES:
+                connection.execute(statement)
+        except sqlite3.Error:
+            connection.close()
+            raise
+        connection.isolation_level = "DEFERRED"
+        return connection
@@ -9,10 +9,24 @@ import time
 from dataclasses import dataclass
 from typing import Dict, Optional
 
-import anthropic
-from anthropic import APIError, APIConnectionError, APITimeoutError, RateLimitError
-
 from .exceptions import LLMError, LLMErrorCode
+from .llm_cache import LLMCacheStore
+from .metrics import CACHE_REQUESTS, LLM_REQUEST_DURATION, LLM_TOKENS
+from .tracing import (
+    PHASE_CACHE_LOOKUP,
+    PHASE_LLM_FIRST_TOKEN,
+    PHASE_LLM_TOTAL,
+    PHASE_VALIDATION,
+    add_phase_time,
+    current_span,
+    phase_timings,
+    traced,
+    tracer,
+)
+
+
+# Placeholder until LLMService.client is first accessed
+_CLIENT_NOT_CREATED = object()
 
 
 @dataclass
@@ -26,13 +40,16 @@ class CacheEntry:
 class LLMService:
     """Service for generating Draw.io XML diagrams using Claude API."""
     
-    def __init__(self, api_key: Optional[str] = None, skip_client_init: bool = False):
+    def __init__(self, api_key: Optional[str] = None, skip_client_init: bool = False,
+                 cache_store: Optional[LLMCacheStore] = None):
         """
         Initialize the LLM service.
         
         Args:
             api_key: Anthropic API key. If None, will use ANTHROPIC_API_KEY env var.
             skip_client_init: If True, skip Anthropic client initialization (for testing)
+            cache_store: Persistent cache behind the in-memory one, shared by
+                every process that opens the same database.
             
         Raises:
             LLMError: If API key is missing.
@@ -48,18 +65,15 @@ class LLMService:
         # Check if this is a test/fake key
         self.is_test_key = self._is_test_key(self.api_key)
         
-        if not skip_client_init:
-            self.client = anthropic.Anthropic(
-                api_key=self.api_key,
-                timeout=25.0  # 25 second timeout for API calls
-            )
-        else:
-            self.client = None
+        # The client is created on first use: importing anthropic takes longer
+        # than the rest of server startup, and stdio servers start per session
+        self._client = None if skip_client_init else _CLIENT_NOT_CREATED
         
         # Cache configuration
         self.cache: Dict[str, CacheEntry] = {}
         self.CACHE_TTL = 60 * 60  # 1 hour in seconds
         self.MAX_CACHE_SIZE = 100
+        self.cache_store = cache_store
         
         # Start cache cleanup task
         self._start_cache_cleanup()
@@ -84,6 +98,7 @@ class LLMService:
         
         return any(pattern in api_key_lower for pattern in test_patterns)
     
+    @traced("llm.generate")
     async def generate_drawio_xml(self, prompt: str) -> str:
         """
         Generate Draw.io XML from natural language prompt.
@@ -114,25 +129,40 @@ class LLMService:
             
             # Check cache first
             cache_key = self._generate_cache_key(prompt)
-            cached_result = self._get_from_cache(cache_key)
+            with tracer.span("llm.cache_lookup", phase=PHASE_CACHE_LOOKUP):
+                cached_result = await self._get_from_cache(cache_key)
             if cached_result:
+                CACHE_REQUESTS.labels("llm", "hit").inc()
+                current_span().set_attribute("cache_hit", True)
                 return cached_result
+            CACHE_REQUESTS.labels("llm", "miss").inc()
+            current_span().set_attribute("cache_hit", False)
             
             system_prompt = self._build_system_prompt()
             user_prompt = self._build_user_prompt(prompt)
             
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",  # Claude 3.5 Sonnet
-                max_tokens=8192,
-                temperature=0.2,  # Lower temperature for more consistent results
-                system=system_prompt,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": user_prompt,
-                    }
-                ],
-            )
+            request_start = time.perf_counter()
+            with tracer.span("llm.api_call", phase=PHASE_LLM_TOTAL):
+                # The client is synchronous; waiting for the response on the
+                # event loop would stall every other session until it arrives
+                response = await asyncio.to_thread(
+                    self.client.messages.create,
+                    model="claude-3-5-sonnet-20241022",  # Claude 3.5 Sonnet
+                    max_tokens=8192,
+                    temperature=0.2,  # Lower temperature for more consistent results
+                    system=system_prompt,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": user_prompt,
+                        }
+                    ],
+                )
+                request_duration = time.perf_counter() - request_start
+                LLM_REQUEST_DURATION.observe(request_duration)
+                # Without streaming the first token arrives with the whole response
+                add_phase_time(phase_timings(), PHASE_LLM_FIRST_TOKEN, request_duration)
+                self._record_token_usage(response)
             
             # Extract XML from response
             content = response.content[0]
@@ -142,11 +172,12 @@ class LLMService:
                     LLMErrorCode.INVALID_RESPONSE
                 )
             
-            xml = self._extract_xml_from_response(content.text)
-            self._validate_drawio_xml(xml)
+            with tracer.span("llm.validate_xml", phase=PHASE_VALIDATION):
+                xml = self._extract_xml_from_response(content.text)
+                self._validate_drawio_xml(xml)
             
             # Cache the result
-            self._save_to_cache(cache_key, xml)
+            await self._save_to_cache(cache_key, xml)
             
             return xml
             
@@ -157,6 +188,15 @@ class LLMService:
             # Handle all errors through the error handler
             raise self._handle_anthropic_error(error)
     
+    def _record_token_usage(self, response) -> None:
+        """Add the response's input and output token counts to the token metric and current span."""
+        usage = getattr(response, "usage", None)
+        for token_type in ("input", "output"):
+            tokens = getattr(usage, f"{token_type}_tokens", None)
+            if isinstance(tokens, int) and tokens > 0:
+                LLM_TOKENS.labels(token_type).inc(tokens)
+                current_span().set_attribute(f"{token_type}_tokens", tokens)
+    
     def _build_system_prompt(self) -> str:
         """Build system prompt for Draw.io XML generation."""
         return """You are an expert at generating Draw.io XML format. Convert the user's natural language diagram description into valid XML format that can be opened in Draw.io (diagrams.net).
@@ -221,8 +261,26 @@ Requirements:
 
 Output XML only:"""
     
+    @property
+    def client(self):
+        """Anthropic client, created on first access; None if client init was skipped."""
+        if self._client is _CLIENT_NOT_CREATED:
+            import anthropic
+            
+            self._client = anthropic.Anthropic(
+                api_key=self.api_key,
+                timeout=25.0  # 25 second timeout for API calls
+            )
+        return self._client
+    
+    @client.setter
+    def client(self, client) -> None:
+        self._client = client
+    
     def _handle_anthropic_error(self, error: Exception) -> LLMError:
         """Handle Anthropic API specific errors."""
+        from anthropic import APIConnectionError, APITimeoutError, RateLimitError
+        
         error_message = str(error).lower()
         
         # Rate limit errors
@@ -349,34 +407,47 @@ Output XML only:"""
         hash_obj = hashlib.sha256(prompt.encode('utf-8'))
         return f"llm_{hash_obj.hexdigest()[:16]}"
     
-    def _get_from_cache(self, key: str) -> Optional[str]:
-        """Get result from cache if valid."""
+    async def _get_from_cache(self, key: str) -> Optional[str]:
+        """Get result from cache if valid, reading the persistent cache in a worker thread."""
         entry = self.cache.get(key)
-        if not entry:
-            return None
-        
-        if time.time() > entry.expires_at:
+        now = time.time()
+        if entry and now > entry.expires_at:
             del self.cache[key]
-            return None
+            entry = None
         
-        return entry.xml
-    
-    def _save_to_cache(self, key: str, xml: str) -> None:
-        """Save result to cache."""
-        # Remove oldest entries if cache is full
-        if len(self.cache) >= self.MAX_CACHE_SIZE:
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k].timestamp)
-            del self.cache[oldest_key]
+        if not entry and self.cache_store:
+            # Generated by an earlier run or another worker
+            stored = await asyncio.to_thread(self.cache_store.get, key, now)
+            if stored:
+                xml, created_at, expires_at = stored
+                self._remember(key, CacheEntry(xml=xml, timestamp=created_at, expires_at=expires_at))
+                return xml
         
+        return entry.xml if entry else None
+    
+    async def _save_to_cache(self, key: str, xml: str) -> None:
+        """Save result to cache, writing the persistent cache in a worker thread."""
         now = time.time()
-        self.cache[key] = CacheEntry(
+        entry = CacheEntry(
             xml=xml,
             timestamp=now,
             expires_at=now + self.CACHE_TTL
         )
+        self._remember(key, entry)
+        if self.cache_store:
+            await asyncio.to_thread(self.cache_store.put, key, xml, entry.timestamp, entry.expires_at)
+    
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        """Put an entry in the in-memory cache, evicting the oldest when full."""
+        # Remove oldest entries if cache is full
+        if key not in self.cache and len(self.cache) >= self.MAX_CACHE_SIZE:
+            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k].timestamp)
+            del self.cache[oldest_key]
+        
+        self.cache[key] = entry
     
     def _clean_cache(self) -> None:
-        """Clean expired cache entries."""
+        """Clean expired cache entries. Blocks on the persistent cache; runs on the cleanup thread."""
         now = time.time()
         expired_keys = [
             key for key, entry in self.cache.items()
@@ -385,6 +456,9 @@ Output XML only:"""
         
         for key in expired_keys:
             del self.cache[key]
+        
+        if self.cache_store:
+            self.cache_store.purge_expired(now)
     
     def _start_cache_cleanup(self) -> None:
         """Start periodic cache cleanup task."""
@@ -399,7 +473,16 @@ Output XML only:"""
     
     def get_cache_stats(self) -> Dict[str, int]:
         """Get cache statistics."""
-        return {
+        stats = {
             "size": len(self.cache),
             "max_size": self.MAX_CACHE_SIZE
-        }
\ No newline at end of file
+        }
+        if self.cache_store:
+            stats["persistent_size"] = self.cache_store.count()
+        return stats
+    
+    def close(self) -> None:
+        """Close the persistent cache."""
+        if self.cache_store:
+            self.cache_store.close()
+            self.cache_store = None
\ No newline at end of file
@@ -0,0 +1,281 @@
+"""
+Persistent metadata store for files managed by the FileService.
+
+File metadata is kept in a SQLite database in WAL mode so that file IDs handed
+out to clients survive server restarts. Every change is its own transaction,
+so a crash leaves either the old or the new row and never a torn record.
+Several server processes may open the same database; SQLite serializes their
+writes and readers see each other's committed rows.
+"""
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+METADATA_DB_NAME = ".file_metadata.db"
+
+# SQLite keeps these next to the database while it is open
+SIDECAR_SUFFIXES = ("", "-wal", "-shm", "-journal")
+
+# Appended to an unreadable database and its sidecars when they are moved aside
+CORRUPT_SUFFIX = ".corrupt"
+
+# Accepted values of PRAGMA synchronous
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# How long a write waits for another process holding the write lock
+BUSY_TIMEOUT_SECONDS = 10.0
+
+COLUMNS = (
+    "id",
+    "original_name",
+    "path",
+    "file_type",
+    "created_at",
+    "expires_at",
+    "size_bytes",
+    "content_sha256",
+    "blob_sha256",
+    "compressed",
+    "last_accessed",
+)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    original_name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    size_bytes INTEGER,
+    content_sha256 TEXT,
+    blob_sha256 TEXT,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    last_accessed TEXT
+)
+"""
+
+# Lookups used by processes sharing the database
+_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS files_expires_at ON files (expires_at)",
+    "CREATE INDEX IF NOT EXISTS files_blob_sha256 ON files (blob_sha256)",
+    "CREATE INDEX IF NOT EXISTS files_created_at ON files (created_at)",
+)
+
+# Columns added after the first schema version, with their SQL types
+_ADDED_COLUMNS = {
+    "blob_sha256": "TEXT",
+    "compressed": "INTEGER NOT NULL DEFAULT 0",
+    "last_accessed": "TEXT",
+}
+
+
+class MetadataStoreError(Exception):
+    """Exception raised by metadata store operations."""
+
+    def __init__(self, message: str, original_error: Exception = None):
+        super().__init__(message)
+        self.original_error = original_error
+        self.name = "MetadataStoreError"
+
+
+class MetadataStore:
+    """SQLite (WAL) backed store of file metadata rows."""
+
+    def __init__(self, db_path: str, synchronous: str = "NORMAL"):
+        """
+        Open (or create) the metadata database.
+
+        A database that cannot be read is moved aside as <name>.corrupt and a
+        new one is created, so a damaged file never prevents startup.
+
+        Args:
+            db_path: Path to the SQLite database file.
+            synchronous: SQLite synchronous level; NORMAL may lose the last
+                commits on power loss, FULL syncs every commit.
+
+        Raises:
+            ValueError: If synchronous is not a known level.
+            MetadataStoreError: If the database cannot be opened or created.
+        """
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unknown synchronous level: {synchronous}")
+        self.db_path = Path(db_path)
+        self.synchronous = synchronous
+        self._lock = threading.Lock()
+        try:
+            self._connection = self._connect()
+        except sqlite3.DatabaseError as error:
+            logger.warning(f"Metadata database {self.db_path} is unreadable, starting a new one: {str(error)}")
+            self._move_aside()
+            try:
+                self._connection = self._connect()
+            except sqlite3.Error as retry_error:
+                raise MetadataStoreError(f"Failed to open metadata database: {str(retry_error)}", retry_error)
+
+    @property
+    def sidecar_paths(self) -> List[str]:
+        """Paths of the database and its WAL/SHM/journal files."""
+        return [str(self.db_path) + suffix for suffix in SIDECAR_SUFFIXES]
+
+    def load(self) -> List[Dict[str, Any]]:
+        """
+        Load all metadata rows.
+
+        Returns:
+            Rows as dictionaries keyed by column name.
+        """
+        query = f"SELECT {', '.join(COLUMNS)} FROM files"
+        with self._lock:
+            try:
+                rows = self._connection.execute(query).fetchall()
+            except sqlite3.DatabaseError as error:
+                logger.warning(f"Metadata database {self.db_path} is unreadable, starting a new one: {str(error)}")
+                self._connection.close()
+                self._move_aside()
+                self._connection = self._connect()
+                rows = []
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load one metadata row.
+
+        Args:
+            file_id: ID of the row.
+
+        Returns:
+            Row keyed by column name, or None if there is none.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM files WHERE id = ?", (file_id,)
+            ).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def expired(self, before: str) -> List[Dict[str, Any]]:
+        """
+        Load the rows that expired before a time.
+
+        Args:
+            before: ISO 8601 timestamp.
+
+        Returns:
+            Rows keyed by column name.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM files WHERE expires_at < ?", (before,)
+            ).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def created_since(self, since: str) -> List[Dict[str, Any]]:
+        """
+        Load the rows created at or after a time.
+
+        Args:
+            since: ISO 8601 timestamp.
+
+        Returns:
+            Rows keyed by column name.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM files WHERE created_at >= ?", (since,)
+            ).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def paths(self) -> Set[str]:
+        """Get the paths of all rows."""
+        with self._lock:
+            return {row[0] for row in self._connection.execute("SELECT path FROM files")}
+
+    def blob_referenced(self, blob_sha256: str) -> bool:
+        """Whether any row references a content-addressed blob."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM files WHERE blob_sha256 = ? LIMIT 1", (blob_sha256,)
+            ).fetchone()
+        return row is not None
+
+    def upsert(self, record: Dict[str, Any]) -> None:
+        """
+        Insert or replace one metadata row.
+
+        Args:
+            record: Row keyed by column name.
+        """
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO files ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                tuple(record.get(column) for column in COLUMNS)
+            )
+
+    def update_paths(self, moves: Iterable[Tuple[str, str]]) -> None:
+        """
+        Change the path of several rows in one transaction.
+
+        Args:
+            moves: (file ID, new path) pairs.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE files SET path = ? WHERE id = ?", ((path, file_id) for file_id, path in moves)
+            )
+
+    def delete(self, file_ids: Iterable[str]) -> None:
+        """
+        Delete metadata rows in one transaction.
+
+        Args:
+            file_ids: IDs of the rows to delete.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany("DELETE FROM files WHERE id = ?", ((file_id,) for file_id in file_ids))
+
+    def close(self) -> None:
+        """Checkpoint the WAL and close the database."""
+        with self._lock:
+            try:
+                self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error as error:
+                logger.debug(f"WAL checkpoint failed: {str(error)}")
+            self._connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database in WAL mode and ensure the schema exists."""
+        connection = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None,
+                                     timeout=BUSY_TIMEOUT_SECONDS)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            # NORMAL is crash-safe in WAL mode; only the last commits may roll back on power loss
+            connection.execute(f"PRAGMA synchronous={self.synchronous}")
+            connection.execute(_SCHEMA)
+            existing = {row[1] for row in connection.execute("PRAGMA table_info(files)")}
+            for column, sql_type in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    connection.execute(f"ALTER TABLE files ADD COLUMN {column} {sql_type}")
+            for statement in _INDEXES:
+                connection.execute(statement)
+        except sqlite3.Error:
+            connection.close()
+            raise
+        # Autocommit off: "with connection" wraps each change in a transaction
+        connection.isolation_level = "DEFERRED"
+        return connection
+
+    def _move_aside(self) -> None:
+        """Rename an unreadable database (and its sidecars) out of the way."""
+        for path in self.sidecar_paths:
+            try:
+                Path(path).replace(path + CORRUPT_SUFFIX)
+            except FileNotFoundError:
+                continue
+            except OSError as error:
+                logger.warning(f"Failed to move aside {path}: {str(error)}")
@@ -0,0 +1,494 @@
+"""
+Prometheus metrics for the MCP Draw.io Server.
+
+Tool calls, LLM calls and renders update counters and histograms in place
+(a dictionary lookup and a locked addition per update). Queue depths, cache
+sizes and FileService figures are read from the services' own statistics
+only when /metrics is scraped, so they cost nothing on the request path.
+
+The exposition (text format 0.0.4) is served on METRICS_PORT by a small
+thread-based HTTP server, which works under every transport. Under the
+multi-worker supervisor each worker writes its exposition next to its
+heartbeat and the supervisor serves all of them with a "worker" label.
+"""
+import bisect
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PATH = "/metrics"
+
+# Seconds; tool calls range from milliseconds (save) to tens of seconds (generation)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value."""
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Format a label set, or an empty string if there are no labels."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    """Base class of metrics with labelled children."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["MetricsRegistry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, Any] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values: str) -> Any:
+        """
+        Get the child for a label set, creating it on first use.
+
+        Args:
+            *values: One value per label name, in order.
+
+        Raises:
+            ValueError: If the number of values does not match the label names.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            key = tuple(str(value) for value in values)
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def clear(self) -> None:
+        """Drop every label set."""
+        with self._lock:
+            self._children.clear()
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _sorted_children(self) -> List[Tuple[LabelValues, Any]]:
+        """Children ordered by label values."""
+        with self._lock:
+            return sorted(self._children.items(), key=lambda item: item[0])
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Render HELP, TYPE and sample lines."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class _CounterChild:
+    """Value of a counter for one label set."""
+
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the counter."""
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase a counter without labels."""
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterable[str]:
+        for values, child in self._sorted_children():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _GaugeChild(_CounterChild):
+    """Value of a gauge for one label set."""
+
+    __slots__ = ()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down."""
+
+    type_name = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        """Set a gauge without labels."""
+        self.labels().set(value)
+
+    def samples(self) -> Iterable[str]:
+        for values, child in self._sorted_children():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _HistogramChild:
+    """Bucket counts, sum and count of a histogram for one label set."""
+
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Cumulative bucket counts (the last is +Inf) and the sum."""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["MetricsRegistry"] = None, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(bucket for bucket in buckets if bucket != math.inf))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Record an observation on a histogram without labels."""
+        self.labels().observe(value)
+
+    def samples(self) -> Iterable[str]:
+        bucket_labels = self.labelnames + ("le",)
+        for values, child in self._sorted_children():
+            cumulative, total = child.snapshot()
+            for bound, count in zip(self.buckets + (math.inf,), cumulative):
+                labels = _format_labels(bucket_labels, values + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {count}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative[-1]}"
+
+
+class CallbackMetric(_Metric):
+    """Gauge or counter whose samples are read from a callback at scrape time."""
+
+    def __init__(self, name: str, documentation: str, type_name: str,
+                 callback: Callable[[], Iterable[Tuple[LabelValues, float]]],
+                 labelnames: Sequence[str] = (), registry: Optional["MetricsRegistry"] = None):
+        """
+        Create the metric.
+
+        Args:
+            name: Metric name.
+            documentation: HELP text.
+            type_name: "gauge" or "counter".
+            callback: Returns (label values, value) pairs; for metrics without
+                labels return [((), value)].
+            labelnames: Label names.
+            registry: Registry to add the metric to.
+        """
+        self.type_name = type_name
+        self.callback = callback
+        super().__init__(name, documentation, labelnames, registry)
+
+    def samples(self) -> Iterable[str]:
+        try:
+            values = list(self.callback())
+        except Exception as error:
+            logger.debug(f"Metric {self.name} callback failed: {str(error)}")
+            return
+        for label_values, value in values:
+            if value is None:
+                continue
+            yield f"{self.name}{_format_labels(self.labelnames, label_values)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        """Add a metric, replacing one of the same name."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+
+    def unregister(self, name: str) -> None:
+        """Remove a metric if present."""
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """Get a metric by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric in the text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def merge_expositions(expositions: Dict[str, str], label: str = "worker") -> str:
+    """
+    Combine the expositions of several processes into one.
+
+    Every sample gets a label naming its source, and the samples of each
+    metric are grouped under one HELP/TYPE header.
+
+    Args:
+        expositions: Exposition text by label value (e.g. worker index).
+        label: Name of the label to add.
+
+    Returns:
+        Combined exposition text.
+    """
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for source, text in expositions.items():
+        family = None
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("#"):
+                parts = line.split(" ", 3)
+                if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+                    family = parts[2]
+                    header = headers.setdefault(family, [])
+                    if line not in header:
+                        header.append(line)
+                    samples.setdefault(family, [])
+                continue
+            if family is None:
+                continue
+            added = f'{label}="{_escape(source)}"'
+            name, brace, rest = line.partition("{")
+            if brace:
+                sample = f"{name}{{{added},{rest}" if not rest.startswith("}") else f"{name}{{{added}{rest}"
+            else:
+                name, _, value = line.partition(" ")
+                sample = f"{name}{{{added}}} {value}"
+            samples[family].append(sample)
+    lines = []
+    for family, header in headers.items():
+        lines.extend(header)
+        lines.extend(samples[family])
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves an exposition on /metrics from a background thread."""
+
+    def __init__(self, render: Callable[[], str], host: str = "127.0.0.1", port: int = 9090):
+        """
+        Create the server.
+
+        Args:
+            render: Returns the exposition text for each scrape.
+            host: Interface to bind.
+            port: TCP port to bind (0 picks a free port).
+        """
+        self.render = render
+        self.host = host
+        self.port = port
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Bind the port and start serving.
+
+        Raises:
+            OSError: If the port cannot be bound.
+        """
+        render = self.render
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != METRICS_PATH:
+                    self.send_error(404)
+                    return
+                try:
+                    body = render().encode("utf-8")
+                except Exception as error:
+                    logger.warning(f"Rendering metrics failed: {str(error)}")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics served on http://{self.host}:{self.port}{METRICS_PATH}")
+
+    def detach(self) -> None:
+        """Close the listening socket inherited by a forked child without stopping the parent's server."""
+        if self._httpd is not None:
+            self._httpd.socket.close()
+            self._httpd = None
+            self._thread = None
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_DURATION = Histogram(
+    "mcp_server_request_duration_seconds", "Tool call latency in seconds.", ["tool"], REGISTRY)
+REQUESTS = Counter(
+    "mcp_server_requests_total", "Tool calls by outcome (success or error).", ["tool", "status"], REGISTRY)
+ERRORS = Counter(
+    "mcp_server_errors_total", "Failed tool calls by error code.", ["tool", "error_code"], REGISTRY)
+LLM_TOKENS = Counter(
+    "mcp_server_llm_tokens_total", "Tokens used by Claude API calls, by type (input or output).", ["type"], REGISTRY)
+LLM_REQUEST_DURATION = Histogram(
+    "mcp_server_llm_request_duration_seconds", "Claude API call latency in seconds.", (), REGISTRY)
+CACHE_REQUESTS = Counter(
+    "mcp_server_cache_requests_total", "Cache lookups by cache (llm or render) and result (hit or miss).",
+    ["cache", "result"], REGISTRY)
+RENDER_DURATION = Histogram(
+    "mcp_server_render_duration_seconds", "Diagram export time in seconds on a render cache miss.",
+    ["renderer", "format"], REGISTRY)
+PHASE_DURATION = Histogram(
+    "mcp_server_tool_phase_duration_seconds", "Time in seconds a tool call spent per phase.",
+    ["tool", "phase"], REGISTRY, buckets=(0.0005, 0.001, 0.0025) + DEFAULT_BUCKETS)
+
+
+def register_service_metrics(llm_service=None, file_service=None, image_service=None,
+                             registry: MetricsRegistry = REGISTRY) -> None:
+    """
+    Expose the services' own statistics as scrape-time gauges and counters.
+
+    Args:
+        llm_service: LLMService whose cache size is reported.
+        file_service: FileService whose storage and expiry figures are reported.
+        image_service: ImageService whose render queue is reported.
+        registry: Registry to add the metrics to.
+    """
+    def single(read: Callable[[], Optional[float]]) -> Callable[[], List[Tuple[LabelValues, Optional[float]]]]:
+        return lambda: [((), read())]
+
+    if image_service is not None:
+        stats = image_service._render_stats
+        CallbackMetric("mcp_server_render_queue_depth", "Renders waiting for a render slot.", "gauge",
+                       single(lambda: stats["renders_waiting"]), registry=registry)
+        CallbackMetric("mcp_server_renders_active", "Renders in progress.", "gauge",
+                       single(lambda: stats["renders_active"]), registry=registry)
+        CallbackMetric("mcp_server_render_cache_entries", "Cached renders.", "gauge",
+                       single(lambda: len(image_service._render_cache)), registry=registry)
+
+    if file_service is not None:
+        CallbackMetric("mcp_server_managed_files", "Files tracked by the FileService.", "gauge",
+                       single(lambda: len(file_service.temp_files)), registry=registry)
+        CallbackMetric("mcp_server_storage_bytes", "Bytes on disk used by managed files.", "gauge",
+                       single(lambda: file_service.temp_files.disk_bytes), registry=registry)
+        CallbackMetric("mcp_server_storage_limit_bytes", "Storage quota in bytes (0 = unlimited).", "gauge",
+                       single(lambda: file_service.max_storage_bytes), registry=registry)
+        CallbackMetric("mcp_server_blobs", "Content-addressed blobs stored.", "gauge",
+                       single(lambda: file_service.temp_files.blob_count), registry=registry)
+        CallbackMetric("mcp_server_expired_files_removed_total", "Files removed after expiring.", "counter",
+                       single(lambda: file_service._expiry_stats["removed"]), registry=registry)
+        CallbackMetric("mcp_server_quota_evicted_files_total", "Files evicted to stay within the quota.", "counter",
+                       single(lambda: file_service._quota_stats["evicted_files"]), registry=registry)
+        CallbackMetric("mcp_server_io_queue_depth", "Disk operations waiting for an I/O thread.", "gauge",
+                       single(lambda: file_service.io_executor.get_stats()["queue_depth"]), registry=registry)
+        CallbackMetric("mcp_server_io_active", "Disk operations in progress.", "gauge",
+                       single(lambda: file_service.io_executor.get_stats()["active"]), registry=registry)
+
+    if llm_service is not None:
+        CallbackMetric("mcp_server_llm_cache_entries", "Generated diagrams in the in-memory LLM cache.", "gauge",
+                       single(lambda: len(llm_service.cache)), registry=registry)
@@ -0,0 +1,339 @@
+"""
+Sampling profiler for the running server.
+
+The event loop thread is sampled from an interval timer (setitimer
+ITIMER_REAL): the SIGALRM handler runs between two bytecodes of that thread
+and records the interrupted stack. A background thread samples the other
+threads (the I/O pool and the render workers) through sys._current_frames().
+The profiled code runs unmodified and the cost is one stack walk per thread
+per sample, well under 1% of a core at the default 100 Hz.
+
+A sampler thread alone cannot observe the event loop accurately: it only
+gets the GIL when the loop releases it, which is mostly inside select()
+while the loop is idle. It is still used for every thread where the timer
+is unavailable (Windows, profiling from another thread, or SIGALRM already
+taken by the application), at the cost of under-reporting the loop.
+
+Stacks are aggregated into collapsed form (one "frame;frame;frame count"
+line per distinct stack, as read by flamegraph.pl and speedscope) or into a
+pstats file readable with python -m pstats or snakeviz.
+
+To profile a single tool, call_tool marks the asyncio task running each
+tool call and only samples taken while a marked task of that tool runs on
+the event loop are kept.
+"""
+import asyncio
+import marshal
+import os
+import signal
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+PROFILE_DIR_NAME = ".profiles"
+
+FORMAT_COLLAPSED = "collapsed"
+FORMAT_PSTATS = "pstats"
+PROFILE_FORMATS = (FORMAT_COLLAPSED, FORMAT_PSTATS)
+
+DEFAULT_INTERVAL_SECONDS = 0.01
+MAX_DURATION_SECONDS = 300
+MAX_STACK_DEPTH = 128
+
+# (filename, first line, function name), the key pstats uses for a function
+FrameKey = Tuple[str, int, str]
+
+# Tool name of the asyncio task running each tool call
+_tool_tasks: "weakref.WeakKeyDictionary[asyncio.Task, str]" = weakref.WeakKeyDictionary()
+
+_active_lock = threading.Lock()
+_active_profiler: Optional["SamplingProfiler"] = None
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+@contextmanager
+def tool_scope(name: str) -> Iterator[None]:
+    """Mark the current task as running a tool call, for per-tool profiling."""
+    task = asyncio.current_task()
+    if task is None:
+        yield
+        return
+    _tool_tasks[task] = name
+    try:
+        yield
+    finally:
+        _tool_tasks.pop(task, None)
+
+
+def running_tool(loop: asyncio.AbstractEventLoop) -> Optional[str]:
+    """Tool of the task the event loop is running right now (callable from any thread)."""
+    task = asyncio.current_task(loop)
+    return _tool_tasks.get(task) if task is not None else None
+
+
+def _frame_key(code) -> FrameKey:
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+@dataclass
+class ProfileResult:
+    """Outcome of a finished profile."""
+    path: str
+    output_format: str
+    duration_seconds: float
+    samples: int
+    interval_seconds: float
+    tool: Optional[str] = None
+    top_functions: List[Dict[str, object]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "profile_path": self.path,
+            "format": self.output_format,
+            "duration_seconds": round(self.duration_seconds, 3),
+            "samples": self.samples,
+            "interval_ms": round(self.interval_seconds * 1000, 3),
+            "tool": self.tool,
+            "top_functions": self.top_functions,
+        }
+
+
+class SamplingProfiler:
+    """Samples thread stacks from an interval timer signal and a background thread."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_SECONDS, thread_id: Optional[int] = None,
+                 sample_filter: Optional[Callable[[], bool]] = None):
+        """
+        Create the profiler.
+
+        Args:
+            interval: Seconds between samples.
+            thread_id: Only sample this thread; all threads when None.
+            sample_filter: Called before each sample; the sample is skipped
+                when it returns False.
+
+        Raises:
+            ValueError: If interval is not positive.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.interval = interval
+        self.thread_id = thread_id
+        self.sample_filter = sample_filter
+        # Stacks are stored root first, prefixed with the thread name
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.uses_signal = False
+
+    def _signal_available(self) -> bool:
+        return (hasattr(signal, "setitimer")
+                and threading.current_thread() is threading.main_thread()
+                and signal.getsignal(signal.SIGALRM) in (signal.SIG_DFL, None))
+
+    def start(self) -> None:
+        """Start sampling; call stop() from the same thread."""
+        self.started_at = time.time()
+        main_id = threading.main_thread().ident
+        self.uses_signal = self.thread_id in (None, main_id) and self._signal_available()
+        if self.uses_signal:
+            signal.signal(signal.SIGALRM, self._handle_signal)
+            signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+        if not (self.uses_signal and self.thread_id == main_id):
+            self._thread = threading.Thread(target=self._run, name="drawio-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        if self.uses_signal:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, signal.SIG_DFL)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.stopped_at = time.time()
+
+    def _handle_signal(self, signum, frame) -> None:
+        """Record the stack the main thread was interrupted in."""
+        if self.sample_filter is None or self.sample_filter():
+            self._record(threading.main_thread().name, frame)
+            self.samples += 1
+
+    def _run(self) -> None:
+        exclude = {threading.get_ident()}
+        if self.uses_signal:
+            exclude.add(threading.main_thread().ident)
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            if self.sample_filter is None or self.sample_filter():
+                self._sample(exclude)
+                if not self.uses_signal:
+                    self.samples += 1
+            next_sample += self.interval
+            delay = next_sample - time.perf_counter()
+            if delay < 0:
+                # Fell behind (e.g. a long GIL hold); skip missed ticks instead of bursting
+                next_sample = time.perf_counter()
+                delay = 0
+            self._stop.wait(delay)
+
+    def _sample(self, exclude: set) -> None:
+        """Record the current stack of every thread except the excluded ones."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id in exclude or (self.thread_id is not None and thread_id != self.thread_id):
+                continue
+            self._record(names.get(thread_id, str(thread_id)), frame)
+
+    def _record(self, thread_name: str, frame) -> None:
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            stack.append(_frame_key(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[(thread_name,) + tuple(stack)] += 1
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed form, one "thread;frame;frame count" line each."""
+        lines = []
+        for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+            frames = [stack[0]] + [f"{name} ({os.path.basename(filename)}:{line})" for filename, line, name in stack[1:]]
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def pstats_data(self) -> Dict:
+        """
+        Samples in the marshalled layout of pstats.Stats.
+
+        Call counts are sample counts; self and cumulative times are sample
+        counts times the interval.
+        """
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        callers: Dict[FrameKey, Counter] = {}
+        for stack, count in self.stacks.items():
+            frames = stack[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            # Recursive functions count once per stack towards cumulative time
+            for key in set(frames):
+                cumulative[key] += count
+            for caller, callee in zip(frames, frames[1:]):
+                callers.setdefault(callee, Counter())[caller] += count
+        stats = {}
+        for key in cumulative:
+            calls = cumulative[key]
+            stats[key] = (
+                calls, calls, own[key] * self.interval, calls * self.interval,
+                {caller: (n, n, 0.0, n * self.interval) for caller, n in callers.get(key, {}).items()},
+            )
+        return stats
+
+    def top_functions(self, limit: int = 10) -> List[Dict[str, object]]:
+        """Functions with the most samples at the top of the stack."""
+        own: Counter = Counter()
+        for stack, count in self.stacks.items():
+            if len(stack) > 1:
+                own[stack[-1]] += count
+        total = sum(own.values()) or 1
+        return [
+            {"function": f"{name} ({os.path.basename(filename)}:{line})", "samples": count,
+             "percent": round(count * 100 / total, 1)}
+            for (filename, line, name), count in own.most_common(limit)
+        ]
+
+    def write(self, path: Path, output_format: str) -> None:
+        """
+        Write the profile.
+
+        Args:
+            path: Output file.
+            output_format: collapsed or pstats.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if output_format == FORMAT_PSTATS:
+            with open(path, "wb") as profile_file:
+                marshal.dump(self.pstats_data(), profile_file)
+        else:
+            path.write_text(self.collapsed(), encoding="utf-8")
+
+
+async def run_profile(output_dir: str, duration: float, output_format: str = FORMAT_COLLAPSED,
+                      tool: Optional[str] = None,
+                      interval: float = DEFAULT_INTERVAL_SECONDS) -> ProfileResult:
+    """
+    Profile the server for a while and write the result under output_dir.
+
+    The server keeps handling requests meanwhile; this coroutine only sleeps.
+    With a tool, only the event loop thread is sampled, and only while that
+    tool's calls run; otherwise every thread is sampled (I/O pool included).
+
+    Args:
+        output_dir: Directory for the profile file.
+        duration: Seconds to profile (up to MAX_DURATION_SECONDS).
+        output_format: collapsed or pstats.
+        tool: Only profile calls of this tool.
+        interval: Seconds between samples.
+
+    Returns:
+        ProfileResult describing the written file.
+
+    Raises:
+        ValueError: If the duration or format is invalid.
+        ProfilerBusyError: If another profile is running.
+    """
+    global _active_profiler
+
+    if not 0 < duration <= MAX_DURATION_SECONDS:
+        raise ValueError(f"duration must be between 0 and {MAX_DURATION_SECONDS} seconds")
+    if output_format not in PROFILE_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(PROFILE_FORMATS)}")
+
+    loop = asyncio.get_running_loop()
+    if tool:
+        profiler = SamplingProfiler(interval, thread_id=threading.get_ident(),
+                                    sample_filter=lambda: running_tool(loop) == tool)
+    else:
+        profiler = SamplingProfiler(interval)
+
+    with _active_lock:
+        if _active_profiler is not None:
+            raise ProfilerBusyError("A profile is already running")
+        _active_profiler = profiler
+    try:
+        profiler.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.stop()
+    finally:
+        with _active_lock:
+            _active_profiler = None
+
+    suffix = "pstats" if output_format == FORMAT_PSTATS else "collapsed.txt"
+    label = f"-{tool}" if tool else ""
+    path = Path(output_dir) / f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}{label}.{suffix}"
+    await asyncio.to_thread(profiler.write, path, output_format)
+    return ProfileResult(
+        path=str(path),
+        output_format=output_format,
+        duration_seconds=profiler.stopped_at - profiler.started_at,
+        samples=profiler.samples,
+        interval_seconds=interval,
+        tool=tool,
+        top_functions=profiler.top_functions(),
+    )
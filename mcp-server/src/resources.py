@@ -0,0 +1,325 @@
+"""
+MCP resources for files managed by the FileService.
+
+Saved .drawio files and rendered images are addressed as drawio://files/<file_id>
+so that clients can fetch them on demand instead of receiving them inline.
+Files larger than the chunk size are served in ranges
+(drawio://files/<file_id>?offset=<n>&length=<n>), and every read carries the
+SHA-256 content hash as an ETag so clients can re-validate cached copies with
+?etag=<hash> without transferring the file again. Draw.io files stored
+compressed are served as stored; ?inflate=true returns the plain XML instead.
+"""
+import base64
+import logging
+import urllib.parse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from mcp.types import Resource, ResourceTemplate
+
+from .file_service import FileService, FileServiceError, read_file_range
+from .image_service import EXPORT_FORMATS
+from .io_executor import get_io_executor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+RESOURCE_URI_PREFIX = "drawio://files/"
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# MIME types by TempFile.file_type
+FILE_MIME_TYPES = {
+    "drawio": "application/vnd.jgraph.mxfile",
+    **EXPORT_FORMATS,
+}
+
+# Template advertised to clients for ranged and conditional reads
+FILE_RESOURCE_TEMPLATE = ResourceTemplate(
+    uriTemplate=RESOURCE_URI_PREFIX + "{file_id}{?offset,length,etag,inflate}",
+    name="managed-file",
+    description=(
+        "Saved Draw.io file or rendered image. offset/length select a byte range "
+        "(at most one chunk per read); etag returns notModified when the content is unchanged; "
+        "inflate=true returns compressed Draw.io pages as plain XML."
+    ),
+)
+
+
+@dataclass
+class ResourceRequest:
+    """Parsed resource URI."""
+    file_id: str
+    offset: Optional[int] = None
+    length: Optional[int] = None
+    etag: Optional[str] = None
+    inflate: bool = False
+
+    @property
+    def ranged(self) -> bool:
+        """Whether the client asked for a byte range."""
+        return self.offset is not None or self.length is not None
+
+
+@dataclass
+class ResourceChunk:
+    """Content returned for one resource read."""
+    content: Union[str, bytes]
+    mime_type: str
+    etag: str
+    offset: int
+    length: int
+    total_size: int
+    next_uri: Optional[str] = None
+    not_modified: bool = False
+    inflated: bool = False
+
+    def meta(self) -> Dict[str, Any]:
+        """Metadata sent alongside the content."""
+        meta = {
+            "etag": self.etag,
+            "offset": self.offset,
+            "length": self.length,
+            "totalSize": self.total_size,
+        }
+        if self.next_uri:
+            meta["nextUri"] = self.next_uri
+        if self.not_modified:
+            meta["notModified"] = True
+        if self.inflated:
+            meta["inflated"] = True
+        return meta
+
+
+def get_mime_type(file_type: str) -> str:
+    """
+    Get the MIME type for a managed file type.
+
+    Args:
+        file_type: TempFile.file_type value.
+
+    Returns:
+        MIME type, or application/octet-stream for unknown types.
+    """
+    return FILE_MIME_TYPES.get(file_type, "application/octet-stream")
+
+
+def build_resource_uri(file_id: str, offset: Optional[int] = None, length: Optional[int] = None) -> str:
+    """
+    Build the resource URI for a managed file.
+
+    Args:
+        file_id: FileService file ID.
+        offset: Optional byte offset of a ranged read.
+        length: Optional byte length of a ranged read.
+
+    Returns:
+        Resource URI (drawio://files/<file_id>[?offset=<n>&length=<n>]).
+    """
+    uri = RESOURCE_URI_PREFIX + urllib.parse.quote(file_id, safe="")
+    query = {key: value for key, value in (("offset", offset), ("length", length)) if value is not None}
+    if query:
+        uri += "?" + urllib.parse.urlencode(query)
+    return uri
+
+
+def parse_resource_uri(uri: str) -> str:
+    """
+    Extract the file ID from a resource URI.
+
+    Args:
+        uri: Resource URI (drawio://files/<file_id>).
+
+    Returns:
+        FileService file ID.
+
+    Raises:
+        ValueError: If the URI does not address a managed file.
+    """
+    return parse_resource_request(uri).file_id
+
+
+def parse_resource_request(uri: str) -> ResourceRequest:
+    """
+    Parse a resource URI including its range, ETag and inflate query parameters.
+
+    Args:
+        uri: Resource URI (drawio://files/<file_id>[?offset=&length=&etag=&inflate=]).
+
+    Returns:
+        Parsed ResourceRequest.
+
+    Raises:
+        ValueError: If the URI does not address a managed file or the query is invalid.
+    """
+    uri = str(uri)
+    if not uri.startswith(RESOURCE_URI_PREFIX):
+        raise ValueError(f"Unknown resource URI: {uri}")
+
+    path, _, query = uri[len(RESOURCE_URI_PREFIX):].partition("?")
+    file_id = urllib.parse.unquote(path)
+    if not file_id or "/" in file_id:
+        raise ValueError(f"Invalid resource URI: {uri}")
+
+    params = urllib.parse.parse_qs(query)
+    request = ResourceRequest(
+        file_id=file_id,
+        etag=params.get("etag", [None])[0],
+        inflate=params.get("inflate", ["false"])[0].lower() in ("true", "1", "yes"),
+    )
+    for name in ("offset", "length"):
+        if name not in params:
+            continue
+        try:
+            value = int(params[name][0])
+        except ValueError:
+            raise ValueError(f"Invalid {name} in resource URI: {uri}")
+        if value < 0 or (name == "length" and value == 0):
+            raise ValueError(f"Invalid {name} in resource URI: {uri}")
+        setattr(request, name, value)
+    return request
+
+
+async def list_file_resources(file_service: FileService,
+                              chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Resource]:
+    """
+    List managed files as MCP resources.
+
+    Files registered without a content hash are hashed once here; files that
+    disappeared from disk are skipped.
+
+    Args:
+        file_service: FileService holding the file metadata.
+        chunk_size: Largest number of bytes served per read.
+
+    Returns:
+        Resources with MIME type, size and ETag metadata.
+    """
+    resources = []
+    for temp_file in await file_service.list_files():
+        try:
+            # file_exists drops files that disappeared from disk without
+            # counting the listing as an access, so LRU order is kept
+            if not await file_service.file_exists(temp_file.id):
+                continue
+            temp_file = await file_service.get_file_digest(temp_file.id)
+        except FileServiceError as error:
+            logger.debug(f"Skipping resource {temp_file.id}: {str(error)}")
+            continue
+
+        resources.append(Resource(
+            uri=build_resource_uri(temp_file.id),
+            name=Path(temp_file.path).name,
+            description=f"{temp_file.file_type} file (expires {temp_file.expires_at.isoformat()})",
+            mimeType=get_mime_type(temp_file.file_type),
+            size=temp_file.size_bytes,
+            _meta={
+                "etag": temp_file.content_sha256,
+                "createdAt": temp_file.created_at.isoformat(),
+                "expiresAt": temp_file.expires_at.isoformat(),
+                "chunkSize": chunk_size,
+                "chunked": temp_file.size_bytes > chunk_size,
+            },
+        ))
+    return resources
+
+
+async def read_file_resource(file_service: FileService, file_id: str,
+                             offset: Optional[int] = None, length: Optional[int] = None,
+                             etag: Optional[str] = None,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE,
+                             inflate: bool = False) -> ResourceChunk:
+    """
+    Read a managed file, or one chunk of it, for a resource request.
+
+    The file is read from disk only when the client asks for it. Complete
+    Draw.io files are returned as text; images and partial reads as bytes.
+    Files larger than chunk_size are never read whole: without an explicit
+    range the first chunk is returned together with the URI of the next one.
+    Ranges are copied out of a memory map of the file.
+
+    Args:
+        file_service: FileService holding the file metadata.
+        file_id: FileService file ID.
+        offset: Byte offset to start reading at.
+        length: Number of bytes to read (capped at chunk_size).
+        etag: Content hash the client already holds.
+        chunk_size: Largest number of bytes served per read.
+        inflate: Return a complete Draw.io file stored compressed as plain XML.
+            The ETag and sizes keep describing the stored file.
+
+    Returns:
+        ResourceChunk with the content and its range metadata.
+
+    Raises:
+        FileServiceError: If the file is unknown, expired or unreadable.
+        ValueError: If offset lies beyond the end of the file.
+    """
+    file_path = await file_service.get_file_path(file_id)
+    temp_file = await file_service.get_file_digest(file_id)
+    mime_type = get_mime_type(temp_file.file_type)
+    total_size = temp_file.size_bytes
+
+    if etag is not None and etag == temp_file.content_sha256:
+        logger.debug(f"Resource {file_id} not modified")
+        return ResourceChunk(content=b"", mime_type=mime_type, etag=etag, offset=0, length=0,
+                             total_size=total_size, not_modified=True)
+
+    start = offset or 0
+    if start > total_size:
+        raise ValueError(f"Offset {start} is beyond the end of file '{file_id}' ({total_size} bytes)")
+
+    whole_file = start == 0 and length is None and total_size <= chunk_size
+    if whole_file and inflate and temp_file.compressed:
+        content = await file_service.read_drawio_xml(file_id)
+        return ResourceChunk(content=content, mime_type=mime_type, etag=temp_file.content_sha256,
+                             offset=0, length=total_size, total_size=total_size, inflated=True)
+
+    count = total_size if whole_file else min(length or chunk_size, chunk_size, total_size - start)
+    try:
+        content = await file_service.io_executor.run(read_file_range, file_path, start, count)
+    except OSError as error:
+        raise FileServiceError(f"Failed to read file with ID '{file_id}': {str(error)}", error)
+
+    end = start + len(content)
+    next_uri = build_resource_uri(file_id, offset=end, length=chunk_size) if end < total_size else None
+    logger.debug(f"Serving resource {file_id} ({mime_type}, bytes {start}-{end} of {total_size})")
+
+    if whole_file and temp_file.file_type == "drawio":
+        content = content.decode("utf-8")
+    return ResourceChunk(content=content, mime_type=mime_type, etag=temp_file.content_sha256,
+                         offset=start, length=end - start, total_size=total_size, next_uri=next_uri)
+
+
+def to_read_resource_contents(chunk: ResourceChunk) -> ReadResourceContents:
+    """
+    Convert a ResourceChunk into the MCP SDK read_resource return type.
+
+    Args:
+        chunk: Chunk returned by read_file_resource.
+
+    Returns:
+        ReadResourceContents carrying the chunk metadata when the SDK supports it.
+    """
+    try:
+        return ReadResourceContents(content=chunk.content, mime_type=chunk.mime_type, meta=chunk.meta())
+    except TypeError:
+        # MCP SDK releases without ReadResourceContents.meta
+        return ReadResourceContents(content=chunk.content, mime_type=chunk.mime_type)
+
+
+async def encode_file_base64(file_path: str) -> str:
+    """
+    Read a file once and Base64-encode it for inline image content.
+
+    Args:
+        file_path: Path to the file.
+
+    Returns:
+        Base64 encoded content.
+    """
+    def read_and_encode():
+        return base64.b64encode(Path(file_path).read_bytes()).decode("ascii")
+
+    return await get_io_executor().run(read_and_encode)
@@ -6,23 +6,33 @@ MCPサーバーを実装します。Claude Codeや他のMCPクライアントと
 
 標準的なMCPサーバー初期化パターンとライフサイクル管理を実装しています。
 """
+import argparse
 import asyncio
+import dataclasses
 import logging
 import os
 import signal
+import socket
 import sys
 import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
 from contextlib import asynccontextmanager
 
 # 公式MCP SDKのインポート - 標準パターン
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.server.models import InitializationOptions
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 from mcp.types import (
     Tool,
     TextContent,
+    ImageContent,
+    Resource,
+    ResourceLink,
+    ResourcesCapability,
+    ResourceTemplate,
     CallToolRequest,
     CallToolResult,
     ListToolsRequest,
@@ -32,8 +42,8 @@ from mcp.types import (
 )
 
 from .config import MCPServerConfig, setup_logging
-from .health import HealthChecker
-from .dependency_checker import DependencyChecker
+from .health import HEALTH_STATE_FILE_NAME, HealthChecker
+from .dependency_checker import DEPENDENCY_CACHE_FILE_NAME, DependencyChecker
 from .exceptions import (
     MCPServerError, 
     MCPServerErrorCode, 
@@ -41,11 +51,62 @@ from .exceptions import (
     InitializationError,
     handle_exception
 )
-from .api_key_validator import APIKeyValidator, APIKeyType
+from .api_key_validator import (
+    API_KEY_CACHE_FILE_NAME,
+    APIKeyType,
+    APIKeyValidationCache,
+    APIKeyValidationResult,
+    APIKeyValidator,
+)
+from .llm_cache import LLM_CACHE_DB_NAME, LLM_CACHE_DIR_NAME, LLMCacheStore
 from .llm_service import LLMService
 from .file_service import FileService
 from .image_service import ImageService
-from .tools import generate_drawio_xml, save_drawio_file, convert_to_png
+from .io_executor import configure_io_executor, shutdown_io_executor
+from .metrics import (
+    ERRORS,
+    PHASE_DURATION,
+    REGISTRY,
+    REQUEST_DURATION,
+    REQUESTS,
+    MetricsServer,
+    merge_expositions,
+    register_service_metrics,
+)
+from .tracing import (
+    create_exporters,
+    current_request_id,
+    default_trace_file,
+    phase_timings,
+    timing_breakdown,
+    tracer,
+)
+from .supervisor import (
+    WORKER_READY,
+    WORKER_STARTING,
+    WORKER_STATE_DIR_NAME,
+    WORKER_STOPPING,
+    Supervisor,
+    WorkerHeartbeat,
+    WorkerProcess,
+    bind_socket,
+    read_worker_metrics,
+    read_worker_statuses,
+    write_worker_metrics,
+)
+from .profiler import MAX_DURATION_SECONDS as MAX_PROFILE_SECONDS, PROFILE_FORMATS, tool_scope
+from .tools import generate_drawio_xml, save_drawio_file, convert_to_png, profile_server
+from .resources import (
+    DEFAULT_CHUNK_SIZE,
+    FILE_RESOURCE_TEMPLATE,
+    build_resource_uri,
+    encode_file_base64,
+    list_file_resources,
+    parse_resource_request,
+    read_file_resource,
+    to_read_resource_contents,
+)
+from pydantic import AnyUrl
 
 
 # MCPサーバー設定とメタデータ - 標準パターン
@@ -55,7 +116,8 @@ SERVER_DESCRIPTION = "Draw.io diagram generation MCP server with official MCP SD
 
 # サーバー機能定義 - 標準MCPサーバーパターン
 SERVER_CAPABILITIES = ServerCapabilities(
-    tools={}  # ツール機能を有効化
+    tools={},  # ツール機能を有効化
+    resources=ResourcesCapability(subscribe=False, listChanged=False)  # ファイルをリソースとして公開
 )
 
 # サーバー実装情報 - MCP標準
@@ -64,16 +126,27 @@ SERVER_IMPLEMENTATION = Implementation(
     version=SERVER_VERSION
 )
 
+# convert-to-png の応答形式
+RESPONSE_MODES = ("text", "auto", "resource")
+DEFAULT_INLINE_IMAGE_MAX_BYTES = 1024 * 1024  # 1MB
+# 初期ヘルスチェック等を開始するまでの待ち時間（秒）。先にクライアントのハンドシェイクを処理する
+DEFERRED_STARTUP_DELAY_SECONDS = 1.0
+# 再起動後も残す状態ファイルを置く temp_dir 配下のディレクトリ（FileService の孤立ファイル掃除の対象外）
+SERVER_STATE_DIR_NAME = ".state"
+
 # グローバル設定とサービスインスタンス
 config: Optional[MCPServerConfig] = None
 logger: Optional[logging.Logger] = None
 dependency_checker: Optional[DependencyChecker] = None
 api_key_validator: Optional[APIKeyValidator] = None
+api_key_validation: Optional[APIKeyValidationResult] = None  # 実際の検証が未完了なら live_check_pending
 llm_service: Optional[LLMService] = None
 file_service: Optional[FileService] = None
 image_service: Optional[ImageService] = None
 health_checker: Optional[HealthChecker] = None
-cleanup_task: Optional[asyncio.Task] = None
+current_worker: Optional[WorkerProcess] = None  # スーパーバイザー配下のワーカーとして実行中の場合
+metrics_server: Optional[MetricsServer] = None
+deferred_startup_task: Optional[asyncio.Task] = None  # 受付開始後に実行する初期化チェック
 start_time: float = 0
 shutdown_requested: bool = False
 
@@ -91,8 +164,7 @@ async def server_lifecycle():
     global config, logger, llm_service, file_service, image_service, health_checker, start_time
     
     try:
-        # 初期化フェーズ
-        logger.info(f"🚀 {SERVER_NAME} v{SERVER_VERSION} 初期化開始")
+        # 初期化フェーズ（ロガーは initialize_services 内で設定される）
         await initialize_services()
         
         # サーバー準備完了
@@ -100,13 +172,15 @@ async def server_lifecycle():
         yield
         
     except Exception as e:
-        logger.error(f"❌ サーバーライフサイクルエラー: {str(e)}", exc_info=True)
+        if logger:
+            logger.error(f"❌ サーバーライフサイクルエラー: {str(e)}", exc_info=True)
         raise
     finally:
-        # クリーンアップフェーズ
-        logger.info("🔄 サーバーシャットダウン開始")
-        await shutdown_services()
-        logger.info("✅ サーバーシャットダウン完了")
+        # クリーンアップフェーズ（設定読み込み前に失敗した場合はロガーがない）
+        if logger:
+            logger.info("🔄 サーバーシャットダウン開始")
+            await shutdown_services()
+            logger.info("✅ サーバーシャットダウン完了")
 
 
 async def initialize_services():
@@ -115,7 +189,7 @@ async def initialize_services():
     
     すべてのサーバーサービスとコンポーネントを標準的な順序で初期化します。
     """
-    global config, logger, dependency_checker, api_key_validator, llm_service, file_service, image_service, health_checker, start_time
+    global config, logger, dependency_checker, api_key_validator, api_key_validation, llm_service, file_service, image_service, health_checker, start_time, metrics_server
     
     try:
         # 1. 設定とログの初期化
@@ -126,12 +200,25 @@ async def initialize_services():
         logger.info(f"📋 {SERVER_NAME} v{SERVER_VERSION} 設定読み込み完了")
         logger.info(f"⚙️ 設定: temp_dir={config.temp_dir}, cache_ttl={config.cache_ttl}s")
         
-        # 2. 依存関係チェックの実行
-        logger.info("🔍 起動時依存関係チェック開始...")
-        dependency_checker = DependencyChecker(logger)
+        # 2-3. 重要な依存関係のチェックとAPIキー検証（互いに独立しているため並行実行）
+        logger.info("🔍 起動時依存関係チェック・APIキー検証開始...")
+        # コマンドのバージョン確認結果はバイナリが変わるまで temp_dir にキャッシュ
+        dependency_checker = DependencyChecker(
+            logger, probe_cache_path=str(Path(config.temp_dir) / SERVER_STATE_DIR_NAME / DEPENDENCY_CACHE_FILE_NAME))
+        # 実際のAPI呼び出しによる検証結果はキー本体ではなくハッシュで temp_dir にキャッシュ
+        api_key_validator = APIKeyValidator(logger, cache=APIKeyValidationCache(
+            str(Path(config.temp_dir) / SERVER_STATE_DIR_NAME / API_KEY_CACHE_FILE_NAME), config.api_key_validation_ttl))
         
-        # 重要な依存関係のチェック
-        dependencies_ok, dependency_errors = await dependency_checker.check_startup_dependencies()
+        (dependencies_ok, dependency_errors), validation_result = await asyncio.gather(
+            dependency_checker.check_startup_dependencies(),
+            api_key_validator.validate_with_policy(
+                api_key=config.anthropic_api_key,
+                development_mode=config.development_mode,
+                force_validation=False,  # 開発モードではテストキーを許可
+                defer_live_check=True  # キャッシュがなければ実際の検証は受付開始後に実行
+            )
+        )
+        api_key_validation = validation_result
         
         if not dependencies_ok:
             error_msg = "重要な依存関係が不足しています:\n" + "\n".join(dependency_errors)
@@ -145,16 +232,6 @@ async def initialize_services():
         
         logger.info("✅ 起動時依存関係チェック完了")
         
-        # 3. APIキー検証の実行
-        logger.info("🔑 APIキー検証中...")
-        api_key_validator = APIKeyValidator(logger)
-        
-        validation_result = await api_key_validator.validate_with_policy(
-            api_key=config.anthropic_api_key,
-            development_mode=config.development_mode,
-            force_validation=False  # 開発モードではテストキーを許可
-        )
-        
         if not validation_result.is_valid:
             error_msg = f"APIキー検証に失敗: {validation_result.error_message}"
             logger.error(f"❌ {error_msg}")
@@ -163,14 +240,20 @@ async def initialize_services():
         # APIキー検証結果をログに記録
         if validation_result.key_type == APIKeyType.TEST:
             logger.warning(f"⚠️ テスト用APIキーを使用中 - 開発/テスト環境でのみ使用してください")
+        elif validation_result.live_check_pending:
+            logger.info("🔑 本番用APIキーの実際の検証は起動後にバックグラウンドで実行します")
         elif validation_result.key_type == APIKeyType.PRODUCTION:
-            logger.info(f"✅ 本番用APIキー検証完了")
+            logger.info(f"✅ 本番用APIキー検証完了{'（キャッシュ）' if validation_result.cached else ''}")
             if validation_result.account_info:
                 logger.debug(f"📊 アカウント情報: {validation_result.account_info}")
         
         # 4. コアサービスの初期化
         logger.info("🧠 LLMサービス初期化中...")
-        llm_service = LLMService(api_key=config.anthropic_api_key)
+        llm_cache_store = None
+        if config.persist_llm_cache:
+            # temp_dir 配下のサブディレクトリに置き、ワーカー間・再起動後も共有
+            llm_cache_store = LLMCacheStore(str(Path(config.temp_dir) / LLM_CACHE_DIR_NAME / LLM_CACHE_DB_NAME))
+        llm_service = LLMService(api_key=config.anthropic_api_key, cache_store=llm_cache_store)
         
         # キャッシュ設定の適用
         if hasattr(llm_service, 'CACHE_TTL') and config.cache_ttl != 3600:
@@ -178,33 +261,118 @@ async def initialize_services():
         if hasattr(llm_service, 'MAX_CACHE_SIZE') and config.max_cache_size != 100:
             llm_service.MAX_CACHE_SIZE = config.max_cache_size
         
+        # ディスクI/O専用スレッドプール（FileService・ImageService・リソース読み込みで共有）
+        configure_io_executor(config.io_max_workers)
+        
         logger.info("📁 ファイルサービス初期化中...")
         file_service = FileService(
             temp_dir=config.temp_dir,
-            file_expiry_hours=config.file_expiry_hours
+            file_expiry_hours=config.file_expiry_hours,
+            cleanup_interval_minutes=config.cleanup_interval_minutes,
+            persist_metadata=config.persist_file_metadata,
+            compress_drawio=config.compress_drawio_files,
+            durability=config.write_durability.value,
+            max_storage_bytes=config.max_storage_bytes,
+            max_files=config.max_files,
+            eviction_policy=config.eviction_policy.value,
+            storage_layout=config.storage_layout.value,
+            shared_storage=config.shared_storage
         )
         
         logger.info("🖼️ 画像サービス初期化中...")
         image_service = ImageService(
-            drawio_cli_path=config.drawio_cli_path
+            drawio_cli_path=config.drawio_cli_path,
+            native_renderer_enabled=config.native_renderer_enabled,
+            max_concurrent_renders=config.max_concurrent_renders,
+            render_cache_size=config.render_cache_size
         )
         
         # 5. ヘルスチェッカーとモニタリング
         logger.info("🏥 ヘルスチェッカー初期化中...")
-        health_checker = HealthChecker(config)
+        # 最新のヘルスチェック結果はコンテナの healthcheck.py 用に temp_dir にも書き出す
+        health_checker = HealthChecker(
+            config, state_path=str(Path(config.temp_dir) / SERVER_STATE_DIR_NAME / HEALTH_STATE_FILE_NAME))
         health_checker.set_services(llm_service, file_service, image_service)
         health_checker.set_dependency_checker(dependency_checker)
+        health_checker.set_api_key_validation(validation_result)
+        
+        # Prometheus メトリクス（ワーカーではスーパーバイザーがまとめて公開）
+        register_service_metrics(llm_service, file_service, image_service)
+        if config.metrics_port and current_worker is None:
+            logger.info("📈 メトリクスエンドポイント開始中...")
+            metrics_server = MetricsServer(REGISTRY.render, host=config.metrics_host, port=config.metrics_port)
+            metrics_server.start()
+        
+        # トレース（エクスポーター未設定の場合はスパンを作成しない）
+        if config.trace_exporter_names:
+            trace_file = config.trace_file or default_trace_file(config.temp_dir)
+            tracer.configure(create_exporters(config.trace_exporter_names, trace_file), config.trace_sample_rate)
+            logger.info(f"🔭 トレース有効: {', '.join(config.trace_exporter_names)} (サンプリング率 {config.trace_sample_rate})")
         
-        # 6. バックグラウンドタスクの開始
+        # 6. バックグラウンドタスクの開始（初期ヘルスチェックと完全な依存関係チェックは受付開始後に実行）
         logger.info("🔄 バックグラウンドタスク開始中...")
         await start_background_tasks()
         
-        # 7. 初期ヘルスチェック
+        # 7. 初期化完了
+        initialization_time = (time.time() - start_time) * 1000
+        logger.info(f"🎉 サーバー初期化完了 ({initialization_time:.2f}ms)")
+        
+    except Exception as e:
+        error_msg = f"サーバー初期化に失敗: {str(e)}"
+        if logger:
+            logger.error(error_msg, exc_info=True)
+        raise InitializationError(error_msg, original_error=e)
+
+
+async def start_background_tasks():
+    """バックグラウンドメンテナンスタスクを開始"""
+    global file_service, logger, deferred_startup_task
+    
+    # ファイルの期限切れ削除は FileService の期限スケジューラーが expires_at に合わせて実行
+    if file_service:
+        logger.info("ファイル期限スケジューラーはFileServiceで稼働中です")
+    
+    deferred_startup_task = asyncio.create_task(run_deferred_startup_checks())
+    
+    # ヘルスチェックを定期的に実行し、liveness・readiness・/health はキャッシュを返す
+    if health_checker:
+        health_checker.start_refresher()
+
+
+async def run_deferred_startup_checks():
+    """
+    起動を遅らせる必要のない初期化をサーバーの受付開始後に実行
+    
+    クライアントの初期化ハンドシェイク（initialize・list_tools）を先に処理させてから、
+    anthropic のインポートとクライアント生成をスレッドで済ませ、キャッシュのない
+    本番用APIキーの実際の検証、初期ヘルスチェック、オプション依存関係を含む
+    完全な依存関係チェックを行います。
+    """
+    global api_key_validation
+    
+    try:
+        await asyncio.sleep(DEFERRED_STARTUP_DELAY_SECONDS)
+        
+        # 最初の generate-drawio-xml 呼び出しでイベントループを止めないよう事前に生成
+        if llm_service:
+            await asyncio.to_thread(lambda: llm_service.client)
+        
+        # APIキーの実際の検証（結果はキャッシュされ、次回以降の起動では省略）
+        if api_key_validation and api_key_validation.live_check_pending:
+            logger.info("🔍 本番用APIキーの実際の検証実行中...")
+            api_key_validation = await api_key_validator.validate_api_key(config.anthropic_api_key)
+            health_checker.set_api_key_validation(api_key_validation)
+            if api_key_validation.is_valid:
+                logger.info("✅ 本番用APIキー検証完了")
+            else:
+                logger.error(f"❌ APIキー検証に失敗: {api_key_validation.error_message}")
+        
+        # 初期ヘルスチェック
         logger.info("🔍 初期ヘルスチェック実行中...")
         health_status = await health_checker.check_all(force_refresh=True)
         logger.info(f"✅ 初期ヘルスチェック完了: {health_status['status']}")
         
-        # 8. 完全な依存関係チェック（オプション依存関係含む）
+        # 完全な依存関係チェック（オプション依存関係含む）
         logger.info("🔍 完全依存関係チェック実行中...")
         full_dependency_status = await dependency_checker.check_all_dependencies(force_refresh=True)
         
@@ -220,60 +388,15 @@ async def initialize_services():
                 for warning in missing_optional:
                     logger.warning(f"  {warning}")
                 logger.warning("  完全なセットアップガイダンスは --setup-guide オプションで確認できます")
-        
-        # 9. 初期化完了
-        initialization_time = (time.time() - start_time) * 1000
-        logger.info(f"🎉 サーバー初期化完了 ({initialization_time:.2f}ms)")
-        
-    except Exception as e:
-        error_msg = f"サーバー初期化に失敗: {str(e)}"
-        if logger:
-            logger.error(error_msg, exc_info=True)
-        raise InitializationError(error_msg, original_error=e)
-
-
-async def start_background_tasks():
-    """バックグラウンドメンテナンスタスクを開始"""
-    global cleanup_task, file_service, logger
-    
-    try:
-        if file_service:
-            cleanup_task = asyncio.create_task(
-                run_cleanup_loop(),
-                name="file_cleanup"
-            )
-            logger.info("ファイルクリーンアップタスクを開始しました")
-    except Exception as e:
-        logger.error(f"バックグラウンドタスクの開始に失敗: {str(e)}", exc_info=True)
+    except asyncio.CancelledError:
         raise
-
-
-async def run_cleanup_loop():
-    """期限切れファイルをクリーンアップするバックグラウンドタスク"""
-    global config, file_service, logger, shutdown_requested
-    
-    cleanup_interval = config.cleanup_interval_minutes * 60  # 秒に変換
-    
-    while not shutdown_requested:
-        try:
-            await asyncio.sleep(cleanup_interval)
-            
-            if file_service and not shutdown_requested:
-                logger.debug("スケジュールされたファイルクリーンアップを実行中...")
-                await file_service.cleanup_expired_files()
-                
-        except asyncio.CancelledError:
-            logger.info("クリーンアップタスクがキャンセルされました")
-            break
-        except Exception as e:
-            logger.error(f"クリーンアップループでエラー: {str(e)}", exc_info=True)
-            # エラーが発生しても実行を継続
-            await asyncio.sleep(60)  # 1分待ってからリトライ
+    except Exception as e:
+        logger.warning(f"⚠️ 起動後チェックに失敗: {str(e)}", exc_info=True)
 
 
 async def shutdown_services():
     """サーバーを正常にシャットダウン"""
-    global cleanup_task, file_service, logger, shutdown_requested
+    global file_service, llm_service, logger, shutdown_requested, metrics_server, deferred_startup_task
     
     if shutdown_requested:
         logger.warning("シャットダウンは既に進行中です")
@@ -283,19 +406,35 @@ async def shutdown_services():
     shutdown_requested = True
     
     try:
-        # バックグラウンドタスクのキャンセル
-        if cleanup_task and not cleanup_task.done():
-            logger.info("クリーンアップタスクをキャンセル中...")
-            cleanup_task.cancel()
+        # 受付開始後のチェックが残っていれば中止
+        if deferred_startup_task and not deferred_startup_task.done():
+            deferred_startup_task.cancel()
             try:
-                await cleanup_task
+                await deferred_startup_task
             except asyncio.CancelledError:
                 pass
+        deferred_startup_task = None
+        
+        if health_checker:
+            await health_checker.stop_refresher()
         
         # 最終クリーンアップの実行
         if file_service:
             logger.info("最終ファイルクリーンアップを実行中...")
             await file_service.cleanup_expired_files()
+            file_service.close()
+        
+        if llm_service:
+            llm_service.close()
+        
+        if metrics_server:
+            metrics_server.stop()
+            metrics_server = None
+        
+        tracer.shutdown()
+        
+        # 実行中のディスクI/Oを完了させてからスレッドプールを停止
+        shutdown_io_executor()
         
         logger.info("サーバーシャットダウンが完了しました")
         
@@ -303,6 +442,13 @@ async def shutdown_services():
         logger.error(f"シャットダウン中にエラー: {str(e)}", exc_info=True)
 
 
+# 処理時間の内訳を結果に含めるための共通引数
+INCLUDE_TIMINGS_SCHEMA = {
+    "type": "boolean",
+    "default": False,
+    "description": "結果に処理時間の内訳（キュー待ち・キャッシュ参照・LLM・検証・書き込み・レンダリング・エンコード）を含める"
+}
+
 # 標準MCPツール定義 - ツールレジストリパターン
 TOOL_DEFINITIONS = [
     Tool(
@@ -316,7 +462,8 @@ TOOL_DEFINITIONS = [
                     "description": "生成する図表の自然言語記述",
                     "minLength": 5,
                     "maxLength": 10000
-                }
+                },
+                "include_timings": INCLUDE_TIMINGS_SCHEMA
             },
             "required": ["prompt"],
             "additionalProperties": False
@@ -337,7 +484,8 @@ TOOL_DEFINITIONS = [
                     "type": "string",
                     "description": "オプションのカスタムファイル名（拡張子なし）",
                     "maxLength": 100
-                }
+                },
+                "include_timings": INCLUDE_TIMINGS_SCHEMA
             },
             "required": ["xml_content"],
             "additionalProperties": False
@@ -345,7 +493,7 @@ TOOL_DEFINITIONS = [
     ),
     Tool(
         name="convert-to-png",
-        description="Draw.io CLIを使用してDraw.ioファイルをPNG画像に変換",
+        description="Draw.io CLIを使用してDraw.ioファイルをPNG画像に変換（SVG・PDF・JPEG・WebPにも対応）",
         inputSchema={
             "type": "object",
             "properties": {
@@ -356,7 +504,62 @@ TOOL_DEFINITIONS = [
                 "file_path": {
                     "type": "string",
                     "description": ".drawioファイルへの直接パス（file_idの代替）"
-                }
+                },
+                "format": {
+                    "type": "string",
+                    "enum": ["png", "svg", "pdf", "jpg", "webp"],
+                    "default": "png",
+                    "description": "出力形式（SVGはWeb埋め込み向けに最も軽量）"
+                },
+                "scale": {
+                    "type": "number",
+                    "exclusiveMinimum": 0,
+                    "maximum": 10,
+                    "default": 1.0,
+                    "description": "拡大率"
+                },
+                "border": {
+                    "type": "integer",
+                    "minimum": 0,
+                    "maximum": 1000,
+                    "default": 0,
+                    "description": "図の周囲の余白（ピクセル）"
+                },
+                "transparent": {
+                    "type": "boolean",
+                    "default": False,
+                    "description": "背景を透過にする（PNG・SVG・WebP）"
+                },
+                "page_index": {
+                    "type": "integer",
+                    "minimum": 0,
+                    "default": 0,
+                    "description": "出力するページのインデックス（0始まり）"
+                },
+                "crop": {
+                    "type": "boolean",
+                    "default": False,
+                    "description": "PDFを図の範囲に切り抜く"
+                },
+                "quality": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": 100,
+                    "default": 90,
+                    "description": "JPEG・WebPの画質"
+                },
+                "response_mode": {
+                    "type": "string",
+                    "enum": ["text", "auto", "resource"],
+                    "default": "text",
+                    "description": "応答形式（text: テキスト要約、auto: 小さい画像はImageContent・大きい画像はリソースリンク、resource: 常にリソースリンク）"
+                },
+                "include_base64": {
+                    "type": "boolean",
+                    "default": False,
+                    "description": "結果にBase64エンコードされたコンテンツを含める"
+                },
+                "include_timings": INCLUDE_TIMINGS_SCHEMA
             },
             "oneOf": [
                 {"required": ["file_id"]},
@@ -367,6 +570,42 @@ TOOL_DEFINITIONS = [
     )
 ]
 
+# 管理ツール - PROFILING_ENABLED=true の場合のみ公開
+PROFILE_TOOL = Tool(
+    name="profile-server",
+    description="稼働中のサーバーをサンプリングプロファイラーで計測し、結果をtemp_dirに保存（管理用）",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "duration_seconds": {
+                "type": "number",
+                "exclusiveMinimum": 0,
+                "maximum": MAX_PROFILE_SECONDS,
+                "default": 10,
+                "description": "計測時間（秒）"
+            },
+            "format": {
+                "type": "string",
+                "enum": list(PROFILE_FORMATS),
+                "default": "collapsed",
+                "description": "出力形式（collapsed: フレームグラフ用のスタック集計、pstats: python -m pstats で読めるファイル）"
+            },
+            "tool": {
+                "type": "string",
+                "description": "このツールの呼び出しだけを計測（例: convert-to-png）"
+            }
+        },
+        "additionalProperties": False
+    }
+)
+
+
+def available_tools() -> List[Tool]:
+    """設定に応じて公開するツールの一覧"""
+    if config and config.profiling_enabled:
+        return TOOL_DEFINITIONS + [PROFILE_TOOL]
+    return TOOL_DEFINITIONS
+
 
 # 標準MCPツールハンドラー登録
 @server.list_tools()
@@ -376,8 +615,9 @@ async def list_tools() -> List[Tool]:
     
     利用可能なMCPツールのリストを標準形式で返します。
     """
-    logger.debug(f"📋 ツールリスト要求 - {len(TOOL_DEFINITIONS)}個のツールを返却")
-    return TOOL_DEFINITIONS
+    tools = available_tools()
+    logger.debug(f"📋 ツールリスト要求 - {len(tools)}個のツールを返却")
+    return tools
 
 
 # 標準MCPサーバーユーティリティ
@@ -409,6 +649,16 @@ def validate_tool_arguments(tool_name: str, arguments: Dict[str, Any]) -> None:
         file_path = arguments.get("file_path")
         if not file_id and not file_path:
             raise ValueError("'file_id' または 'file_path' のいずれかが必要です")
+        export_format = arguments.get("format", "png")
+        if not isinstance(export_format, str):
+            raise ValueError("パラメータ 'format' は文字列である必要があります")
+        if arguments.get("response_mode", "text") not in RESPONSE_MODES:
+            raise ValueError(f"パラメータ 'response_mode' は {', '.join(RESPONSE_MODES)} のいずれかである必要があります")
+    
+    elif tool_name == "profile-server":
+        tool = arguments.get("tool")
+        if tool is not None and tool not in {definition.name for definition in TOOL_DEFINITIONS}:
+            raise ValueError(f"パラメータ 'tool' は既存のツール名である必要があります: {tool}")
 
 
 async def execute_tool_safely(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
@@ -436,46 +686,133 @@ async def execute_tool_safely(tool_name: str, arguments: Dict[str, Any]) -> Dict
     elif tool_name == "convert-to-png":
         file_id = arguments.get("file_id")
         file_path = arguments.get("file_path")
-        return await convert_to_png(file_id=file_id, file_path=file_path)
+        return await convert_to_png(
+            file_id=file_id,
+            file_path=file_path,
+            format=arguments.get("format", "png"),
+            scale=arguments.get("scale", 1.0),
+            border=arguments.get("border", 0),
+            transparent=arguments.get("transparent", False),
+            page_index=arguments.get("page_index", 0),
+            crop=arguments.get("crop", False),
+            quality=arguments.get("quality", 90),
+            include_base64=arguments.get("include_base64", False)
+        )
+        
+    elif tool_name == "profile-server" and PROFILE_TOOL in available_tools():
+        return await profile_server(
+            duration_seconds=arguments.get("duration_seconds", 10),
+            format=arguments.get("format", "collapsed"),
+            tool=arguments.get("tool")
+        )
         
     else:
         raise ValueError(f"不明なツール: {tool_name}")
 
 
+def record_tool_metrics(name: str, duration: float, result: Optional[Dict[str, Any]] = None,
+                        error: Optional[Exception] = None,
+                        phases: Optional[Dict[str, float]] = None) -> None:
+    """
+    ツール実行のメトリクスを記録
+    
+    Args:
+        name: ツール名（未定義のツールは "unknown" として集計）
+        duration: 実行時間（秒）
+        result: ツール実行結果
+        error: ツール実行中に発生した例外
+        phases: フェーズごとの所要時間（秒）
+    """
+    tool = name if any(tool.name == name for tool in available_tools()) else "unknown"
+    REQUEST_DURATION.labels(tool).observe(duration)
+    for phase, seconds in (phases or {}).items():
+        PHASE_DURATION.labels(tool, phase).observe(seconds)
+    if error is None and result is not None and result.get("success"):
+        REQUESTS.labels(tool, "success").inc()
+        return
+    REQUESTS.labels(tool, "error").inc()
+    if error is not None:
+        code = getattr(error, "code", None)
+        error_code = getattr(code, "value", code) or type(error).__name__
+    else:
+        error_code = result.get("error_code") or "UNKNOWN_ERROR"
+    ERRORS.labels(tool, str(error_code)).inc()
+
+
 @server.call_tool()
-async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Union[TextContent, ImageContent, ResourceLink]]:
     """
     標準MCPツール呼び出しハンドラー
     
     公式MCP SDKの標準パターンに従ってツールを実行します。
+    各呼び出しはトレースのルートスパンとなり、そのトレースIDがリクエストIDになります。
     """
     global logger
     
-    start_time = time.time()
-    
+    # MCPリクエストIDはセッション内でのみ一意のため、トレースIDには新しいリクエストIDを使用
     try:
-        logger.info(f"🔧 MCPツール実行開始: {name}")
-        logger.debug(f"📝 引数: {list(arguments.keys())}")
-        
-        # 標準ツール実行パターン
-        result = await execute_tool_safely(name, arguments)
-        
-        # 実行時間の計測とログ
-        execution_time = (time.time() - start_time) * 1000
-        logger.info(f"✅ MCPツール {name} 実行完了 ({execution_time:.2f}ms)")
-        
-        # 標準レスポンス形式でフォーマット
-        return format_tool_response(name, result)
+        mcp_request_id = server.request_context.request_id
+    except LookupError:
+        mcp_request_id = None
+    
+    with tracer.start_trace("tool.call", tool=name, mcp_request_id=mcp_request_id) as span:
+        start_time = time.time()
         
-    except Exception as e:
-        execution_time = (time.time() - start_time) * 1000
-        logger.error(f"❌ MCPツール {name} 実行エラー: {str(e)} ({execution_time:.2f}ms)", exc_info=True)
+        try:
+            logger.info(f"🔧 MCPツール実行開始: {name}")
+            logger.debug(f"📝 引数: {list(arguments.keys())}")
+            
+            # 標準ツール実行パターン（ツール単位のプロファイル用に実行中のツールを記録）
+            with tool_scope(name):
+                result = await execute_tool_safely(name, arguments)
+            
+            # 実行時間の計測とログ（フェーズ別の内訳は常にログとメトリクスへ、クライアントへは要求時のみ）
+            execution_time = (time.time() - start_time) * 1000
+            timings = timing_breakdown(phase_timings(), execution_time / 1000)
+            record_tool_metrics(name, execution_time / 1000, result=result, phases=phase_timings())
+            span.set_attribute("success", bool(result.get("success")))
+            span.set_attribute("error_code", result.get("error_code"))
+            logger.info(f"✅ MCPツール {name} 実行完了 ({format_timings(timings)})",
+                        extra={"extra_fields": {"tool": name, "timings": timings}})
+            if arguments.get("include_timings"):
+                result = {**result, "timings": timings}
+            
+            # 画像はImageContentまたはリソースリンクとして返却
+            response_mode = arguments.get("response_mode", "text")
+            if name == "convert-to-png" and result.get("success") and response_mode != "text":
+                with tracer.span("tool.format_response", response_mode=response_mode):
+                    return await format_image_response(result, response_mode)
+            
+            # 標準レスポンス形式でフォーマット
+            return format_tool_response(name, result)
+            
+        except Exception as e:
+            execution_time = (time.time() - start_time) * 1000
+            timings = timing_breakdown(phase_timings(), execution_time / 1000)
+            record_tool_metrics(name, execution_time / 1000, error=e, phases=phase_timings())
+            span.record_error(e)
+            logger.error(f"❌ MCPツール {name} 実行エラー: {str(e)} ({format_timings(timings)})", exc_info=True,
+                         extra={"extra_fields": {"tool": name, "timings": timings}})
+            
+            # 標準エラーレスポンス
+            return [TextContent(
+                type="text",
+                text=f"❌ ツール {name} の実行に失敗しました。\n\n🚨 エラー詳細:\n• エラー: {str(e)}\n• 実行時間: {execution_time:.2f}ms\n• リクエストID: {current_request_id()}\n• タイムスタンプ: {datetime.now().isoformat()}"
+            )]
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """
+    処理時間の内訳を1行の文字列に整形
+    
+    Args:
+        timings: timing_breakdown() の結果（ミリ秒）
         
-        # 標準エラーレスポンス
-        return [TextContent(
-            type="text",
-            text=f"❌ ツール {name} の実行に失敗しました。\n\n🚨 エラー詳細:\n• エラー: {str(e)}\n• 実行時間: {execution_time:.2f}ms\n• タイムスタンプ: {datetime.now().isoformat()}"
-        )]
+    Returns:
+        str: "12.30ms: render 8.10ms, encode 0.52ms" 形式の文字列
+    """
+    phases = ", ".join(f"{key[:-3]} {value:.2f}ms" for key, value in timings.items() if key != "total_ms")
+    return f"{timings['total_ms']:.2f}ms" + (f": {phases}" if phases else "")
 
 
 def format_tool_response(tool_name: str, result: Dict[str, Any]) -> List[TextContent]:
@@ -513,15 +850,30 @@ def format_tool_response(tool_name: str, result: Dict[str, Any]) -> List[TextCon
 
 ⏱️ 保存時刻: {timestamp}""",
             
-            "convert-to-png": lambda r: f"""✅ Draw.ioファイルのPNG変換に成功しました。
+            "convert-to-png": lambda r: f"""✅ Draw.ioファイルの{r.get('format', 'png').upper()}変換に成功しました。
 
-🖼️ PNG詳細:
-• PNGファイルID: {r['png_file_id']}
-• PNGファイルパス: {r['png_file_path']}
+🖼️ 画像詳細:
+• 形式: {r.get('format', 'png')} ({r.get('mime_type', 'image/png')})
+• ファイルID: {r['png_file_id']}
+• ファイルパス: {r['png_file_path']}
 • CLI利用可能: {r.get('cli_available', '不明')}
 • Base64コンテンツ: {'✅ 利用可能' if r.get('base64_content') else '❌ 含まれていません'}
 
-⏱️ 変換時刻: {timestamp}"""
+⏱️ 変換時刻: {timestamp}""",
+            
+            "profile-server": lambda r: f"""✅ プロファイルを保存しました。
+
+📊 プロファイル詳細:
+• ファイルパス: {r['profile_path']}
+• 形式: {r['format']}
+• 対象ツール: {r.get('tool') or 'すべて'}
+• 計測時間: {r['duration_seconds']}秒
+• サンプル数: {r['samples']}（間隔 {r['interval_ms']}ms）
+
+🔥 自己時間の上位関数:
+""" + "\n".join(f"• {f['percent']}% {f['function']}" for f in r['top_functions']) + f"""
+
+⏱️ 計測完了時刻: {timestamp}"""
         }
         
         formatter = success_responses.get(tool_name)
@@ -529,6 +881,9 @@ def format_tool_response(tool_name: str, result: Dict[str, Any]) -> List[TextCon
             text = formatter(result)
         else:
             text = f"✅ ツール {tool_name} の実行に成功しました。\n\n⏱️ 実行時刻: {timestamp}"
+        
+        if result.get("timings"):
+            text += f"\n⏱️ 処理時間の内訳: {format_timings(result['timings'])}"
             
         return [TextContent(type="text", text=text)]
         
@@ -557,9 +912,111 @@ def format_tool_response(tool_name: str, result: Dict[str, Any]) -> List[TextCon
             if result.get('troubleshooting'):
                 error_text += f"\n\n🔧 トラブルシューティング:\n{result['troubleshooting']}"
         
+        if result.get("timings"):
+            error_text += f"\n\n⏱️ 処理時間の内訳: {format_timings(result['timings'])}"
+        
         return [TextContent(type="text", text=error_text)]
 
 
+async def format_image_response(result: Dict[str, Any],
+                                response_mode: str) -> List[Union[TextContent, ImageContent, ResourceLink]]:
+    """
+    画像レスポンスフォーマッター
+    
+    auto モードでは小さい画像をImageContentとしてインラインで返却し、
+    大きい画像や resource モードではリソースリンクを返却します。
+    リンク先のバイト列はクライアントが read_resource で要求した時点で読み込まれます。
+    
+    Args:
+        result: convert-to-png の実行結果
+        response_mode: "auto" または "resource"
+        
+    Returns:
+        List[Union[TextContent, ImageContent, ResourceLink]]: フォーマットされたMCPレスポンス
+    """
+    file_id = result.get("png_file_id")
+    file_path = result.get("png_file_path")
+    export_format = result.get("format", "png")
+    mime_type = result.get("mime_type") or "image/png"
+    size_bytes = (result.get("metadata") or {}).get("file_size_bytes")
+    inline_limit = config.inline_image_max_bytes if config else DEFAULT_INLINE_IMAGE_MAX_BYTES
+    
+    summary_text = f"✅ Draw.ioファイルの{export_format.upper()}変換に成功しました。(ファイルID: {file_id})"
+    if result.get("timings"):
+        summary_text += f"\n⏱️ 処理時間の内訳: {format_timings(result['timings'])}"
+    summary = TextContent(type="text", text=summary_text)
+    
+    if (response_mode == "auto" and mime_type.startswith("image/")
+            and size_bytes is not None and size_bytes <= inline_limit):
+        data = result.get("base64_content") or await encode_file_base64(file_path)
+        return [summary, ImageContent(type="image", data=data, mimeType=mime_type)]
+    
+    if file_service and file_id and await file_service.file_exists(file_id):
+        return [summary, ResourceLink(
+            type="resource_link",
+            uri=build_resource_uri(file_id),
+            name=Path(file_path).name,
+            mimeType=mime_type,
+            size=size_bytes
+        )]
+    
+    # 管理対象外のファイルはリンクできないためテキスト要約にフォールバック
+    logger.warning(f"⚠️ ファイル {file_id} はリソースとして公開できません - テキスト応答を返却")
+    return format_tool_response("convert-to-png", result)
+
+
+# 標準MCPリソースハンドラー登録
+@server.list_resources()
+async def list_resources() -> List[Resource]:
+    """
+    標準MCPリソース一覧ハンドラー
+    
+    有効期限内の管理ファイルをMIMEタイプ・サイズ・ETag（SHA-256）付きで返却します。
+    """
+    if not file_service:
+        return []
+    
+    chunk_size = config.resource_chunk_size if config else DEFAULT_CHUNK_SIZE
+    return await list_file_resources(file_service, chunk_size)
+
+
+@server.list_resource_templates()
+async def list_resource_templates() -> List[ResourceTemplate]:
+    """
+    標準MCPリソーステンプレート一覧ハンドラー
+    
+    範囲指定（offset/length）と再検証（etag）付きの読み込みURIを公開します。
+    """
+    return [FILE_RESOURCE_TEMPLATE]
+
+
+@server.read_resource()
+async def read_resource(uri: AnyUrl) -> List[ReadResourceContents]:
+    """
+    標準MCPリソース読み込みハンドラー
+    
+    drawio://files/<file_id> で指定されたファイルを要求時にディスクから読み込みます。
+    チャンクサイズを超えるファイルは範囲ごとに返却し、続きのURIをメタデータの nextUri で通知します。
+    etag がクライアント保持分と一致する場合は本文を返さず notModified を返却します。
+    inflate=true の場合、圧縮保存された Draw.io ファイルを展開済みXMLで返却します。
+    """
+    if not file_service:
+        raise RuntimeError("サービスが初期化されていません")
+    
+    request = parse_resource_request(str(uri))
+    chunk = await read_file_resource(
+        file_service,
+        request.file_id,
+        offset=request.offset,
+        length=request.length,
+        etag=request.etag,
+        chunk_size=config.resource_chunk_size if config else DEFAULT_CHUNK_SIZE,
+        inflate=request.inflate
+    )
+    logger.debug(f"📦 リソース読み込み: {uri} ({chunk.mime_type}, {chunk.length}/{chunk.total_size} bytes)")
+    return [to_read_resource_contents(chunk)]
+
+
 def create_initialization_options() -> InitializationOptions:
     """
     標準MCPサーバー初期化オプションを作成
@@ -593,14 +1050,24 @@ def setup_signal_handlers():
     logger.info("📡 シグナルハンドラー設定完了")
 
 
-async def run_mcp_server():
+async def run_mcp_server(transport: Optional[str] = None, host: Optional[str] = None,
+                         port: Optional[int] = None):
     """
     標準MCPサーバー実行パターン
     
     公式MCP SDKを使用してサーバーを実行し、標準的なライフサイクル管理を行います。
+    http トランスポートでは1プロセスで複数クライアントのセッションを受け付け、
+    全セッションが同じサービス（LLMキャッシュ・ファイル・画像サービス）を共有します。
+    
+    Args:
+        transport: "stdio" または "http"（省略時は設定値 MCP_TRANSPORT）
+        host: HTTPの待ち受けアドレス（省略時は MCP_HTTP_HOST）
+        port: HTTPの待ち受けポート（省略時は MCP_HTTP_PORT）
     """
     global logger, shutdown_requested
     
+    transport = transport or (config.transport.value if config else "stdio")
+    
     try:
         # 標準MCPサーバー情報の表示
         logger.info(f"🚀 {SERVER_NAME} v{SERVER_VERSION} 開始")
@@ -611,6 +1078,10 @@ async def run_mcp_server():
         # シグナルハンドラーの設定
         setup_signal_handlers()
         
+        if transport == "http":
+            await run_http_transport(host, port)
+            return
+        
         # 標準MCP stdio サーバーパターン
         async with stdio_server() as (read_stream, write_stream):
             logger.info("🔗 MCP stdio接続確立")
@@ -630,15 +1101,88 @@ async def run_mcp_server():
         raise
 
 
-async def handle_dependency_commands():
+async def run_http_transport(host: Optional[str] = None, port: Optional[int] = None,
+                             sockets: Optional[List[socket.socket]] = None):
     """
-    依存関係チェック関連のコマンドライン操作を処理
+    Streamable HTTP（/mcp）と HTTP+SSE（/sse）でサーバーを実行
+    
+    Args:
+        host: 待ち受けアドレス（省略時は設定値）
+        port: 待ち受けポート（省略時は設定値）
+        sockets: スーパーバイザーが待ち受け済みのソケット（ワーカーとして実行する場合）
+    """
+    # stdio 専用の構成では読み込まない
+    from .http_transport import SSE_PATH, STREAMABLE_HTTP_PATH, create_http_app, create_http_server
+    
+    host = host or (config.http_host if config else "127.0.0.1")
+    port = port if port is not None else (config.http_port if config else 8000)
+    log_level = config.log_level.value if config else "INFO"
+    
+    # ワーカー間で接続が振り分けられるため、ワーカーではセッション状態を持たない
+    app = create_http_app(server, create_initialization_options(), stateless=current_worker is not None,
+                          health_provider=get_health_report)
+    http_server = create_http_server(app, host=host, port=port, log_level=log_level)
+    
+    if current_worker is None:
+        logger.info(f"🌐 MCP HTTPトランスポート開始: http://{host}:{port}{STREAMABLE_HTTP_PATH} (SSE: {SSE_PATH})")
+        await http_server.serve(sockets=sockets)
+        return
+    
+    async def worker_status() -> Dict[str, Any]:
+        if http_server.should_exit:
+            state = WORKER_STOPPING
+        else:
+            state = WORKER_READY if http_server.started else WORKER_STARTING
+        health = await health_checker.get_cached_health() if health_checker else {}
+        if config.metrics_port:
+            write_worker_metrics(get_worker_state_dir(), os.getpid(), REGISTRY.render())
+        return {"status": state, "health": health.get("status", "unknown")}
+    
+    # スーパーバイザーへの生存通知と /health 用のワーカー状態（とメトリクス）を定期的に書き出す
+    heartbeat = WorkerHeartbeat(get_worker_state_dir(), current_worker, worker_status)
+    heartbeat_task = asyncio.create_task(heartbeat.run())
+    logger.info(f"👷 ワーカー {current_worker.index} (pid {os.getpid()}, 世代 {current_worker.generation}) 開始")
+    try:
+        await http_server.serve(sockets=sockets)
+    finally:
+        heartbeat.stop()
+        await heartbeat_task
+
+
+def get_worker_state_dir() -> str:
+    """ワーカーのハートビートファイルを置くディレクトリ"""
+    return str(Path(config.temp_dir) / WORKER_STATE_DIR_NAME)
+
+
+async def get_health_report() -> Dict[str, Any]:
+    """
+    /health エンドポイントの応答を作成
+    
+    バックグラウンドで更新されるキャッシュ済みの結果を返すため、チェック自体は
+    実行しません（checked_at・age_seconds・stale で鮮度を示します）。
+    ワーカーとして実行中の場合は、このワーカーの識別情報と
+    全ワーカーの最新ハートビートを含めます。
     
     Returns:
-        bool: True if command was handled, False if normal server startup should continue
+        Dict[str, Any]: ヘルスチェック結果
+    """
+    report = await health_checker.get_cached_health() if health_checker else {"status": "unknown"}
+    if current_worker is not None:
+        report["worker"] = current_worker.to_dict()
+        report["workers"] = read_worker_statuses(get_worker_state_dir())
+    return report
+
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
     """
-    import argparse
+    コマンドライン引数を解析
     
+    Args:
+        argv: 引数リスト（省略時は sys.argv）
+        
+    Returns:
+        argparse.Namespace: 解析結果
+    """
     parser = argparse.ArgumentParser(description="MCP Draw.io Server")
     parser.add_argument("--check-dependencies", action="store_true", 
                        help="依存関係をチェックして結果を表示")
@@ -646,8 +1190,27 @@ async def handle_dependency_commands():
                        help="セットアップガイダンスを表示")
     parser.add_argument("--check-all", action="store_true",
                        help="すべての依存関係（オプション含む）をチェック")
+    parser.add_argument("--transport", choices=["stdio", "http"],
+                       help="MCPトランスポート（http: Streamable HTTP /mcp と SSE /sse で複数クライアントに対応）")
+    parser.add_argument("--host", help="HTTPトランスポートの待ち受けアドレス")
+    parser.add_argument("--port", type=int, help="HTTPトランスポートの待ち受けポート")
+    parser.add_argument("--workers", type=int,
+                       help="HTTPワーカープロセス数（2以上でスーパーバイザーが事前forkして管理）")
+    return parser.parse_args(argv)
+
+
+async def handle_dependency_commands(args: Optional[argparse.Namespace] = None):
+    """
+    依存関係チェック関連のコマンドライン操作を処理
+    
+    Args:
+        args: 解析済みのコマンドライン引数（省略時は sys.argv を解析）
     
-    args = parser.parse_args()
+    Returns:
+        bool: True if command was handled, False if normal server startup should continue
+    """
+    if args is None:
+        args = parse_arguments()
     
     # 依存関係チェックコマンドの処理
     if args.check_dependencies or args.setup_guide or args.check_all:
@@ -714,22 +1277,125 @@ async def handle_dependency_commands():
     return False
 
 
-async def main():
+def run_supervisor(args: argparse.Namespace, supervisor_config: MCPServerConfig) -> int:
+    """
+    マルチワーカーモードでサーバーを実行
+    
+    待ち受けソケットを作成してから N 個のワーカープロセスを fork し、
+    スーパーバイザーとして監視します。各ワーカーは fork 後に自分のサービスを
+    初期化し、SHARED_STORAGE のファイルメタデータと PERSIST_LLM_CACHE の
+    LLMキャッシュを temp_dir 経由で共有します。
+    SIGHUP で新しい世代のワーカーに順次入れ替えます（設定は環境変数から再読み込み）。
+    
+    Args:
+        args: 解析済みのコマンドライン引数
+        supervisor_config: load_config で検証済みの設定（ワーカー数と SHARED_STORAGE を含む）
+        
+    Returns:
+        int: 終了コード
+    """
+    global config, logger, metrics_server
+    
+    config = supervisor_config
+    logger = setup_logging(config)
+    
+    workers = config.workers
+    transport = args.transport or config.transport.value
+    if transport != "http":
+        raise InitializationError("マルチワーカーモードには HTTP トランスポートが必要です（--transport http）")
+    if not config.persist_llm_cache:
+        logger.warning("⚠️ PERSIST_LLM_CACHE=false のため、LLMキャッシュはワーカーごとに保持されます")
+    
+    host = args.host or config.http_host
+    port = args.port if args.port is not None else config.http_port
+    listen_socket = bind_socket(host, port)
+    logger.info(f"🌐 スーパーバイザー開始: http://{host}:{port} で {workers} ワーカーを起動")
+    
+    supervisor = Supervisor(run_worker, workers, listen_socket, get_worker_state_dir())
+    if not config.metrics_port:
+        return supervisor.run()
+    
+    # 各ワーカーがハートビートごとに書き出すメトリクスを worker ラベル付きで公開
+    state_dir = get_worker_state_dir()
+    metrics_server = MetricsServer(lambda: merge_expositions(read_worker_metrics(state_dir)),
+                                   host=config.metrics_host, port=config.metrics_port)
+    metrics_server.start()
+    try:
+        return supervisor.run()
+    finally:
+        metrics_server.stop()
+
+
+def run_worker(listen_socket: socket.socket, worker: WorkerProcess) -> int:
+    """
+    fork されたワーカープロセスの本体
+    
+    Args:
+        listen_socket: スーパーバイザーと共有する待ち受けソケット
+        worker: このプロセスのワーカー情報
+        
+    Returns:
+        int: 終了コード
+    """
+    global current_worker, metrics_server
+    
+    current_worker = worker
+    if metrics_server is not None:
+        # スーパーバイザーのメトリクス用ソケットは fork で引き継がれるため閉じる
+        metrics_server.detach()
+        metrics_server = None
+    
+    async def serve():
+        async with server_lifecycle():
+            # uvicorn は終了後に受信したシグナルを再送するため、先に自前のハンドラーを設定する
+            setup_signal_handlers()
+            await run_http_transport(sockets=[listen_socket])
+    
+    asyncio.run(serve())
+    return 0
+
+
+def load_config(args: argparse.Namespace) -> MCPServerConfig:
+    """
+    環境変数から設定を読み込み、--workers 指定時は MCP_WORKERS を上書き
+    
+    上書き後の設定も検証し直すため、不正なワーカー数や SHARED_STORAGE なしの
+    マルチワーカー指定は fork する前に ValueError になります。
+    
+    Args:
+        args: 解析済みのコマンドライン引数
+        
+    Returns:
+        MCPServerConfig: 検証済みの設定
+    """
+    loaded = MCPServerConfig.from_env()
+    if args.workers is not None:
+        # replace は __post_init__ を通るため検証が再実行される
+        loaded = dataclasses.replace(loaded, workers=args.workers)
+    return loaded
+
+
+async def main(args: Optional[argparse.Namespace] = None):
     """
     標準MCPサーバーメイン関数
     
     公式MCP SDKの標準パターンに従ってサーバーを初期化・実行します。
+    
+    Args:
+        args: 解析済みのコマンドライン引数（省略時は sys.argv を解析）
     """
     global logger, shutdown_requested
     
     try:
         # コマンドライン引数の処理
-        if await handle_dependency_commands():
+        if args is None:
+            args = parse_arguments()
+        if await handle_dependency_commands(args):
             return  # 依存関係チェックコマンドが実行された場合は終了
         
         # 標準ライフサイクル管理でサーバー実行
         async with server_lifecycle():
-            await run_mcp_server()
+            await run_mcp_server(transport=args.transport, host=args.host, port=args.port)
             
     except KeyboardInterrupt:
         logger.info("⌨️ キーボード割り込み受信")
@@ -741,11 +1407,30 @@ async def main():
         raise
 
 
-if __name__ == "__main__":
+def cli_main():
+    """
+    コマンドラインエントリーポイント（mcp-drawio-server / python -m src.server）
+    
+    ワーカー数が2以上の場合はイベントループを開始する前にスーパーバイザーとして
+    ワーカーを fork し、それ以外は単一プロセスでサーバーを実行します。
+    """
     try:
-        asyncio.run(main())
+        args = parse_arguments()
+        dependency_command = args.check_dependencies or args.setup_guide or args.check_all
+        if not dependency_command:
+            run_config = load_config(args)
+            if run_config.workers > 1:
+                sys.exit(run_supervisor(args, run_config))
+        asyncio.run(main(args))
     except KeyboardInterrupt:
         print("\nサーバーが中断されました", file=sys.stderr)
     except Exception as e:
         print(f"致命的エラー: {str(e)}", file=sys.stderr)
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    # python -m src.server では本ファイルが __main__ として読み込まれる。
+    # ツールは src.server のサービスを参照するため、正規モジュール経由で起動する
+    from . import server as server_module
+    server_module.cli_main()
\ No newline at end of file
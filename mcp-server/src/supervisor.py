@@ -0,0 +1,472 @@
+"""
+Pre-fork supervisor running several HTTP server worker processes.
+
+Once validation, repair, layout and rendering run in-process, one Python
+process is bound to a single core by the GIL. The supervisor binds the HTTP
+port once and forks N workers that all accept on that socket, then keeps them
+running: a worker that crashes or stops sending heartbeats is replaced,
+SIGHUP starts a fresh generation of workers and retires the old one once the
+new one is ready (the socket stays open throughout), and SIGTERM/SIGINT let
+every worker finish its requests before the supervisor exits.
+
+Workers share state through temp_dir: file metadata with SHARED_STORAGE and
+generated diagrams with PERSIST_LLM_CACHE. Each worker publishes a heartbeat
+file in the worker state directory, which the supervisor uses to detect hung
+workers and the /health endpoint uses to report on every worker. With metrics
+enabled each heartbeat also writes the worker's Prometheus exposition there,
+and the supervisor serves all of them on the metrics port.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+WORKER_STATE_DIR_NAME = ".workers"
+
+WORKER_STARTING = "starting"
+WORKER_READY = "ready"
+WORKER_STOPPING = "stopping"
+
+HEARTBEAT_INTERVAL_SECONDS = 5.0
+HEARTBEAT_TIMEOUT_SECONDS = 60.0
+STARTUP_TIMEOUT_SECONDS = 120.0
+SHUTDOWN_TIMEOUT_SECONDS = 30.0
+MONITOR_INTERVAL_SECONDS = 0.5
+
+# Heartbeat interval while a worker is starting, so reloads see it ready promptly
+STARTING_HEARTBEAT_INTERVAL_SECONDS = 0.2
+
+# A worker exiting sooner than this after starting is restarted with backoff
+MIN_WORKER_LIFETIME_SECONDS = 5.0
+MAX_RESPAWN_DELAY_SECONDS = 30.0
+
+
+@dataclass
+class WorkerProcess:
+    """A forked worker process."""
+    index: int
+    generation: int
+    pid: int = 0
+    started_at: float = field(default_factory=time.time)
+    retired_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Identify the worker in status reports."""
+        return {"index": self.index, "generation": self.generation, "pid": self.pid, "started_at": self.started_at}
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """
+    Bind the listening socket the workers share.
+
+    Args:
+        host: Interface to bind.
+        port: TCP port to bind (0 picks a free port).
+        backlog: Listen backlog.
+
+    Returns:
+        Listening socket, inherited by forked workers.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def worker_status_path(state_dir: str, pid: int) -> Path:
+    """Path of the heartbeat file of a worker."""
+    return Path(state_dir) / f"worker-{pid}.json"
+
+
+def write_worker_status(state_dir: str, status: Dict[str, Any]) -> None:
+    """
+    Publish a worker's status, replacing its previous heartbeat atomically.
+
+    Args:
+        state_dir: Worker state directory.
+        status: Status including the worker's pid.
+    """
+    path = worker_status_path(state_dir, status["pid"])
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(status), encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+def worker_metrics_path(state_dir: str, pid: int) -> Path:
+    """Path of the metrics exposition file of a worker."""
+    return Path(state_dir) / f"worker-{pid}.prom"
+
+
+def write_worker_metrics(state_dir: str, pid: int, exposition: str) -> None:
+    """
+    Publish a worker's metrics exposition, replacing the previous one atomically.
+
+    Args:
+        state_dir: Worker state directory.
+        pid: The worker's pid.
+        exposition: Prometheus text exposition.
+    """
+    path = worker_metrics_path(state_dir, pid)
+    temp_path = path.with_suffix(".prom.tmp")
+    temp_path.write_text(exposition, encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+def read_worker_metrics(state_dir: str) -> Dict[str, str]:
+    """
+    Read the latest metrics exposition of every worker.
+
+    While a reload overlaps two generations, only the newest worker of each
+    index is included so that every series stays unique.
+
+    Args:
+        state_dir: Worker state directory.
+
+    Returns:
+        Exposition text by worker index.
+    """
+    expositions = {}
+    for status in read_worker_statuses(state_dir):
+        try:
+            exposition = worker_metrics_path(state_dir, status["pid"]).read_text(encoding="utf-8")
+        except (KeyError, OSError):
+            continue
+        expositions[str(status.get("index", 0))] = exposition
+    return expositions
+
+
+def read_worker_statuses(state_dir: str) -> List[Dict[str, Any]]:
+    """
+    Read the latest heartbeat of every worker.
+
+    Args:
+        state_dir: Worker state directory.
+
+    Returns:
+        Statuses ordered by generation and worker index.
+    """
+    statuses = []
+    for path in Path(state_dir).glob("worker-*.json"):
+        try:
+            statuses.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            # Removed or half-written by an exiting worker
+            continue
+    return sorted(statuses, key=lambda status: (status.get("generation", 0), status.get("index", 0)))
+
+
+class WorkerHeartbeat:
+    """Publishes a worker's status at a fixed interval."""
+
+    def __init__(self, state_dir: str, worker: WorkerProcess,
+                 status_provider: Callable[[], Awaitable[Dict[str, Any]]],
+                 interval: float = HEARTBEAT_INTERVAL_SECONDS):
+        """
+        Create the heartbeat.
+
+        Args:
+            state_dir: Worker state directory.
+            worker: The worker this process runs as.
+            status_provider: Returns the worker's current status, including
+                "status" (starting, ready or stopping).
+            interval: Seconds between heartbeats.
+        """
+        self.state_dir = state_dir
+        self.worker = worker
+        self.status_provider = status_provider
+        self.interval = interval
+        self._stopped = asyncio.Event()
+
+    async def run(self) -> None:
+        """Publish heartbeats until stopped."""
+        while not self._stopped.is_set():
+            state = await self.publish()
+            interval = min(self.interval, STARTING_HEARTBEAT_INTERVAL_SECONDS) if state == WORKER_STARTING else self.interval
+            try:
+                await asyncio.wait_for(self._stopped.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def publish(self) -> Optional[str]:
+        """
+        Publish the current status once.
+
+        Returns:
+            The published "status", or None if publishing failed.
+        """
+        try:
+            details = await self.status_provider()
+            write_worker_status(self.state_dir, {**self.worker.to_dict(), "heartbeat_at": time.time(), **details})
+        except Exception as error:
+            logger.warning(f"Worker heartbeat failed: {str(error)}")
+            return None
+        return details.get("status")
+
+    def stop(self) -> None:
+        """Stop publishing after the current heartbeat."""
+        self._stopped.set()
+
+
+class Supervisor:
+    """Forks and supervises the HTTP worker processes."""
+
+    def __init__(self, worker_main: Callable[[socket.socket, WorkerProcess], int], worker_count: int,
+                 listen_socket: socket.socket, state_dir: str,
+                 heartbeat_timeout: float = HEARTBEAT_TIMEOUT_SECONDS,
+                 startup_timeout: float = STARTUP_TIMEOUT_SECONDS,
+                 shutdown_timeout: float = SHUTDOWN_TIMEOUT_SECONDS):
+        """
+        Create the supervisor.
+
+        Args:
+            worker_main: Runs one worker in the forked process and returns its
+                exit code; it serves on the socket and publishes heartbeats.
+            worker_count: Number of workers to keep running.
+            listen_socket: Socket from bind_socket.
+            state_dir: Directory for worker heartbeat files.
+            heartbeat_timeout: Seconds without a heartbeat after which a ready
+                worker is killed and replaced.
+            startup_timeout: Seconds a new worker has to become ready.
+            shutdown_timeout: Seconds a retired worker has to finish its
+                requests before it is killed.
+
+        Raises:
+            ValueError: If worker_count is not positive.
+        """
+        if worker_count < 1:
+            raise ValueError("worker_count must be at least 1")
+        self.worker_main = worker_main
+        self.worker_count = worker_count
+        self.listen_socket = listen_socket
+        self.state_dir = state_dir
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.generation = 0
+        self.workers: Dict[int, WorkerProcess] = {}
+        self._pending: List[Tuple[float, int]] = []
+        self._respawn_delay = 0.0
+        self._stopping = False
+        self._reload_requested = False
+
+    def run(self) -> int:
+        """
+        Start the workers and supervise them until SIGTERM or SIGINT.
+
+        Returns:
+            Exit code for the supervisor process.
+        """
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        self._prepare_state_dir()
+
+        for index in range(self.worker_count):
+            self._spawn(index)
+        logger.info(f"Supervisor {os.getpid()} started {self.worker_count} workers")
+
+        while not self._stopping:
+            if self._reload_requested:
+                self._reload_requested = False
+                self.reload()
+            self._reap()
+            self._respawn_due()
+            self._check_workers()
+            time.sleep(MONITOR_INTERVAL_SECONDS)
+
+        logger.info("Supervisor stopping workers")
+        self._stop_all()
+        self.listen_socket.close()
+        logger.info("Supervisor stopped")
+        return 0
+
+    def reload(self) -> bool:
+        """
+        Replace every worker with a newly started one.
+
+        The new generation is started next to the running one; only when all
+        of its workers report ready are the old workers told to finish their
+        requests and exit. If the new generation fails to start, it is stopped
+        and the old one keeps serving.
+
+        Returns:
+            True if the new generation took over.
+        """
+        previous = [worker for worker in self.workers.values() if worker.retired_at is None]
+        self.generation += 1
+        logger.info(f"Reloading: starting worker generation {self.generation}")
+        started = [self._spawn(index) for index in range(self.worker_count)]
+
+        deadline = time.time() + self.startup_timeout
+        ready = False
+        while time.time() < deadline and not self._stopping:
+            self._reap()
+            if any(worker.pid not in self.workers for worker in started):
+                break
+            ready_pids = {status["pid"] for status in read_worker_statuses(self.state_dir)
+                          if status.get("status") == WORKER_READY}
+            if all(worker.pid in ready_pids for worker in started):
+                ready = True
+                break
+            time.sleep(MONITOR_INTERVAL_SECONDS)
+
+        if not ready:
+            logger.error(f"Reload failed: worker generation {self.generation} did not become ready, keeping the running workers")
+            self._retire([worker for worker in started if worker.pid in self.workers])
+            serving = {worker.index for worker in self.workers.values() if worker.retired_at is None}
+            self._pending = [(due, index) for due, index in self._pending if index not in serving]
+            self.generation -= 1
+            return False
+
+        self._retire(previous)
+        self._pending = []
+        logger.info(f"Reload complete: worker generation {self.generation} serving")
+        return True
+
+    def _handle_stop(self, signum, frame) -> None:
+        """Begin a graceful shutdown."""
+        self._stopping = True
+
+    def _handle_reload(self, signum, frame) -> None:
+        """Request a reload from the monitor loop."""
+        self._reload_requested = True
+
+    def _prepare_state_dir(self) -> None:
+        """Create the state directory and drop heartbeats of earlier runs."""
+        state_dir = Path(self.state_dir)
+        state_dir.mkdir(parents=True, exist_ok=True)
+        for path in state_dir.glob("worker-*"):
+            path.unlink(missing_ok=True)
+
+    def _spawn(self, index: int) -> WorkerProcess:
+        """Fork one worker of the current generation."""
+        worker = WorkerProcess(index=index, generation=self.generation)
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker(worker)
+        worker.pid = pid
+        self.workers[pid] = worker
+        logger.info(f"Started worker {index} (pid {pid}, generation {self.generation})")
+        return worker
+
+    def _run_worker(self, worker: WorkerProcess) -> None:
+        """Body of a forked worker; never returns."""
+        exit_code = 1
+        try:
+            worker.pid = os.getpid()
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            # Reloads are the supervisor's job; a terminal hangup must not kill workers
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            exit_code = self.worker_main(self.listen_socket, worker)
+        except KeyboardInterrupt:
+            exit_code = 0
+        except BaseException:
+            logger.exception(f"Worker {worker.index} failed")
+        finally:
+            os._exit(exit_code)
+
+    def _reap(self) -> None:
+        """Collect exited workers and schedule replacements for unexpected exits."""
+        while True:
+            try:
+                pid, wait_status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self._remove_worker_files(pid)
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            exit_code = os.waitstatus_to_exitcode(wait_status)
+            if worker.retired_at is not None or self._stopping:
+                logger.info(f"Worker {worker.index} (pid {pid}) exited with {exit_code}")
+                continue
+
+            lifetime = time.time() - worker.started_at
+            if lifetime < MIN_WORKER_LIFETIME_SECONDS:
+                self._respawn_delay = min(max(1.0, self._respawn_delay * 2), MAX_RESPAWN_DELAY_SECONDS)
+            else:
+                self._respawn_delay = 0.0
+            logger.warning(f"Worker {worker.index} (pid {pid}) exited unexpectedly with {exit_code}, "
+                           f"restarting in {self._respawn_delay:.0f}s")
+            self._pending.append((time.time() + self._respawn_delay, worker.index))
+
+    def _respawn_due(self) -> None:
+        """Start the replacements whose backoff has elapsed."""
+        now = time.time()
+        due = [index for when, index in self._pending if when <= now]
+        self._pending = [(when, index) for when, index in self._pending if when > now]
+        for index in due:
+            self._spawn(index)
+
+    def _check_workers(self) -> None:
+        """Kill workers that stopped sending heartbeats or overstayed their retirement."""
+        now = time.time()
+        statuses = {status["pid"]: status for status in read_worker_statuses(self.state_dir)}
+        for worker in list(self.workers.values()):
+            if worker.retired_at is not None:
+                if now - worker.retired_at > self.shutdown_timeout:
+                    logger.warning(f"Worker {worker.index} (pid {worker.pid}) did not stop in time, killing it")
+                    self._signal(worker, signal.SIGKILL)
+                continue
+
+            status = statuses.get(worker.pid)
+            if status and status.get("status") == WORKER_READY:
+                silent_for, limit = now - status.get("heartbeat_at", 0), self.heartbeat_timeout
+            else:
+                silent_for, limit = now - worker.started_at, self.startup_timeout
+            if silent_for > limit:
+                logger.error(f"Worker {worker.index} (pid {worker.pid}) unresponsive for {silent_for:.0f}s, killing it")
+                self._signal(worker, signal.SIGKILL)
+
+    def _retire(self, workers: List[WorkerProcess]) -> None:
+        """Ask workers to finish their requests and exit."""
+        now = time.time()
+        for worker in workers:
+            worker.retired_at = now
+            self._signal(worker, signal.SIGTERM)
+
+    def _stop_all(self) -> None:
+        """Retire every worker and wait for them, killing any that overstay."""
+        self._pending = []
+        self._retire([worker for worker in self.workers.values() if worker.retired_at is None])
+        deadline = time.time() + self.shutdown_timeout
+        while self.workers and time.time() < deadline:
+            self._reap()
+            time.sleep(MONITOR_INTERVAL_SECONDS / 5)
+        for worker in list(self.workers.values()):
+            logger.warning(f"Worker {worker.index} (pid {worker.pid}) did not stop in time, killing it")
+            self._signal(worker, signal.SIGKILL)
+            try:
+                os.waitpid(worker.pid, 0)
+            except ChildProcessError:
+                pass
+            self._remove_worker_files(worker.pid)
+            self.workers.pop(worker.pid, None)
+
+    def _remove_worker_files(self, pid: int) -> None:
+        """Remove the heartbeat and metrics files of an exited worker."""
+        worker_status_path(self.state_dir, pid).unlink(missing_ok=True)
+        worker_metrics_path(self.state_dir, pid).unlink(missing_ok=True)
+
+    @staticmethod
+    def _signal(worker: WorkerProcess, signum: int) -> None:
+        """Send a signal to a worker that may already have exited."""
+        try:
+            os.kill(worker.pid, signum)
+        except ProcessLookupError:
+            pass
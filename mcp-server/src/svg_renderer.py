@@ -0,0 +1,808 @@
+"""
+Native renderer for Draw.io diagrams.
+
+Parses the mxGraph model stored in a .drawio file and renders its cells to SVG
+in-process, without the Draw.io CLI. An optional rasterizer (CairoSVG) turns
+the SVG into PNG bytes; it is imported lazily on first use so that only the
+first rasterization pays the import cost.
+"""
+import base64
+import html
+import logging
+import re
+import threading
+import urllib.parse
+import xml.etree.ElementTree as ET
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Defaults applied by draw.io when a style key is not present
+DEFAULT_FILL_COLOR = "#ffffff"
+DEFAULT_STROKE_COLOR = "#000000"
+DEFAULT_FONT_COLOR = "#000000"
+DEFAULT_FONT_SIZE = 12.0
+DEFAULT_FONT_FAMILY = "Helvetica"
+
+# Optional rasterizer backends, in order of preference
+_RASTERIZER_BACKENDS = ("cairosvg",)
+
+_rasterizer_lock = threading.Lock()
+_rasterizer: Optional[Callable[[bytes, float], bytes]] = None
+_rasterizer_name: Optional[str] = None
+_rasterizer_loaded = False
+
+
+class DiagramRenderError(Exception):
+    """Exception raised when a diagram cannot be parsed or rendered natively."""
+
+    def __init__(self, message: str, original_error: Optional[Exception] = None):
+        super().__init__(message)
+        self.original_error = original_error
+        self.name = "DiagramRenderError"
+
+
+@dataclass
+class Geometry:
+    """Cell geometry relative to its parent."""
+    x: float = 0.0
+    y: float = 0.0
+    width: float = 0.0
+    height: float = 0.0
+    relative: bool = False
+    points: List[Tuple[float, float]] = field(default_factory=list)
+    source_point: Optional[Tuple[float, float]] = None
+    target_point: Optional[Tuple[float, float]] = None
+
+
+@dataclass
+class Cell:
+    """A single mxCell from the diagram model."""
+    id: str
+    value: str = ""
+    style: Dict[str, str] = field(default_factory=dict)
+    vertex: bool = False
+    edge: bool = False
+    parent: Optional[str] = None
+    source: Optional[str] = None
+    target: Optional[str] = None
+    geometry: Optional[Geometry] = None
+
+
+@dataclass
+class DiagramModel:
+    """Parsed mxGraph model for one diagram page."""
+    name: str
+    cells: List[Cell]
+    background: Optional[str] = None
+
+    def cell_map(self) -> Dict[str, Cell]:
+        """Return cells indexed by id."""
+        return {cell.id: cell for cell in self.cells}
+
+
+def parse_style(style: Optional[str]) -> Dict[str, str]:
+    """
+    Parse an mxGraph style string into a dictionary.
+
+    Bare tokens (e.g. ``ellipse`` in ``ellipse;whiteSpace=wrap;``) are stored
+    under the ``_base`` key, mirroring how draw.io treats them as named styles.
+    """
+    result: Dict[str, str] = {}
+    if not style:
+        return result
+    for token in style.split(";"):
+        token = token.strip()
+        if not token:
+            continue
+        if "=" in token:
+            key, value = token.split("=", 1)
+            result[key.strip()] = value.strip()
+        elif "_base" not in result:
+            result["_base"] = token
+    return result
+
+
+def decode_diagram_content(text: str) -> str:
+    """
+    Decode a compressed ``<diagram>`` payload (base64 + raw deflate + URL encoding).
+
+    Args:
+        text: Text content of a ``<diagram>`` element.
+
+    Returns:
+        The inflated mxGraphModel XML.
+    """
+    try:
+        inflated = zlib.decompress(base64.b64decode(text.strip()), -zlib.MAX_WBITS)
+        return urllib.parse.unquote(inflated.decode("utf-8"))
+    except Exception as error:
+        raise DiagramRenderError(f"Failed to decode compressed diagram: {str(error)}", error)
+
+
+def encode_diagram_content(model_xml: str) -> str:
+    """
+    Encode an mxGraphModel the way draw.io stores compressed pages.
+
+    Inverse of decode_diagram_content: URL encoding (as encodeURIComponent),
+    raw deflate, then base64.
+
+    Args:
+        model_xml: Serialized ``<mxGraphModel>`` element.
+
+    Returns:
+        Text content for a compressed ``<diagram>`` element.
+    """
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    quoted = urllib.parse.quote(model_xml, safe="~()*!.'").encode("utf-8")
+    return base64.b64encode(compressor.compress(quoted) + compressor.flush()).decode("ascii")
+
+
+def compress_document(xml_content: str) -> str:
+    """
+    Store every page of a .drawio document in compressed form.
+
+    The result is still a regular .drawio file that draw.io, the Draw.io CLI
+    and this renderer open directly. A bare ``<mxGraphModel>`` is wrapped in
+    an ``<mxfile>`` with a single page.
+
+    Args:
+        xml_content: Draw.io XML (``<mxfile>`` or bare ``<mxGraphModel>``).
+
+    Returns:
+        Draw.io XML with compressed ``<diagram>`` pages.
+
+    Raises:
+        DiagramRenderError: If the document cannot be parsed.
+    """
+    root = _parse_xml(xml_content)
+    if root.tag == "mxGraphModel":
+        document = ET.Element("mxfile")
+        ET.SubElement(document, "diagram", {"name": "Page-1"}).append(root)
+        root = document
+    elif root.tag != "mxfile":
+        raise DiagramRenderError(f"Unsupported Draw.io root element <{root.tag}>")
+
+    for diagram in root.findall("diagram"):
+        model = diagram.find("mxGraphModel")
+        if model is None:
+            continue
+        diagram.remove(model)
+        model.tail = None
+        diagram.text = encode_diagram_content(ET.tostring(model, encoding="unicode"))
+    return ET.tostring(root, encoding="unicode")
+
+
+def inflate_document(xml_content: str) -> str:
+    """
+    Expand compressed pages of a .drawio document into plain mxGraphModel XML.
+
+    Args:
+        xml_content: Draw.io XML, possibly with compressed ``<diagram>`` pages.
+
+    Returns:
+        Draw.io XML with every page as an ``<mxGraphModel>`` element.
+
+    Raises:
+        DiagramRenderError: If the document or a page cannot be decoded.
+    """
+    root = _parse_xml(xml_content)
+    for diagram in root.findall("diagram"):
+        if diagram.find("mxGraphModel") is not None or not (diagram.text or "").strip():
+            continue
+        model = _parse_xml(decode_diagram_content(diagram.text))
+        diagram.text = None
+        diagram.append(model)
+    return ET.tostring(root, encoding="unicode")
+
+
+def list_pages(xml_content: str) -> List[str]:
+    """Return the page names of a .drawio document."""
+    root = _parse_xml(xml_content)
+    if root.tag == "mxGraphModel":
+        return ["Page-1"]
+    return [
+        diagram.get("name") or f"Page-{index + 1}"
+        for index, diagram in enumerate(root.findall("diagram"))
+    ]
+
+
+def parse_diagram(xml_content: str, page_index: int = 0) -> DiagramModel:
+    """
+    Parse a .drawio document into a DiagramModel.
+
+    Args:
+        xml_content: Draw.io XML (``<mxfile>`` or bare ``<mxGraphModel>``).
+        page_index: Zero-based index of the page to parse.
+
+    Returns:
+        DiagramModel for the requested page.
+
+    Raises:
+        DiagramRenderError: If the document cannot be parsed.
+    """
+    root = _parse_xml(xml_content)
+
+    if root.tag == "mxGraphModel":
+        page_name = "Page-1"
+        model = root
+    else:
+        diagrams = root.findall("diagram")
+        if not diagrams:
+            raise DiagramRenderError("Draw.io document contains no <diagram> pages")
+        if page_index < 0 or page_index >= len(diagrams):
+            raise DiagramRenderError(
+                f"Page index {page_index} out of range (document has {len(diagrams)} pages)"
+            )
+        diagram = diagrams[page_index]
+        page_name = diagram.get("name") or f"Page-{page_index + 1}"
+        model = diagram.find("mxGraphModel")
+        if model is None:
+            if not (diagram.text or "").strip():
+                raise DiagramRenderError(f"Page '{page_name}' has no mxGraphModel")
+            model = _parse_xml(decode_diagram_content(diagram.text))
+
+    root_element = model.find("root")
+    if root_element is None:
+        raise DiagramRenderError(f"Page '{page_name}' has no <root> element")
+
+    cells = []
+    for element in root_element:
+        cell = _parse_cell(element)
+        if cell is not None:
+            cells.append(cell)
+
+    background = model.get("background")
+    if background in (None, "", "none"):
+        background = None
+
+    return DiagramModel(name=page_name, cells=cells, background=background)
+
+
+def render_svg(
+    model: DiagramModel,
+    scale: float = 1.0,
+    border: float = 0.0,
+    transparent: bool = True,
+) -> str:
+    """
+    Render a DiagramModel to an SVG document.
+
+    Args:
+        model: Parsed diagram model.
+        scale: Output scale factor.
+        border: Border around the diagram bounds, in diagram units.
+        transparent: If False, fill the canvas with the page background (white by default).
+
+    Returns:
+        SVG document as a string.
+    """
+    cells = model.cell_map()
+    origins: Dict[str, Tuple[float, float]] = {}
+    shapes: List[str] = []
+    labels: List[str] = []
+    bounds = _Bounds()
+
+    for cell in model.cells:
+        if cell.geometry is None:
+            continue
+        if cell.vertex:
+            x, y = _absolute_origin(cell, cells, origins)
+            geometry = cell.geometry
+            bounds.add(x, y)
+            bounds.add(x + geometry.width, y + geometry.height)
+            shapes.append(_render_vertex(cell, x, y))
+            label = _render_label(cell, x, y, geometry.width, geometry.height)
+            if label:
+                labels.append(label)
+        elif cell.edge:
+            points = _edge_points(cell, cells, origins)
+            if len(points) < 2:
+                continue
+            for point in points:
+                bounds.add(*point)
+            shapes.append(_render_edge(cell, points))
+            if cell.value:
+                mid_x, mid_y = _polyline_midpoint(points)
+                label = _render_label(cell, mid_x - 40, mid_y - 10, 80, 20, edge_label=True)
+                if label:
+                    labels.append(label)
+
+    min_x, min_y, max_x, max_y = bounds.box()
+    min_x -= border
+    min_y -= border
+    width = max(max_x - min_x + border, 1.0)
+    height = max(max_y - min_y + border, 1.0)
+
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+        f'width="{_fmt(width * scale)}" height="{_fmt(height * scale)}" '
+        f'viewBox="{_fmt(min_x)} {_fmt(min_y)} {_fmt(width)} {_fmt(height)}">',
+        '<defs><marker id="arrow-classic" viewBox="0 0 10 10" refX="9" refY="5" '
+        'markerWidth="8" markerHeight="8" orient="auto-start-reverse">'
+        '<path d="M 0 0 L 10 5 L 0 10 z" fill="context-stroke"/></marker></defs>',
+    ]
+    if not transparent or model.background:
+        fill = model.background or DEFAULT_FILL_COLOR
+        parts.append(
+            f'<rect x="{_fmt(min_x)}" y="{_fmt(min_y)}" width="{_fmt(width)}" '
+            f'height="{_fmt(height)}" fill="{_attr(fill)}"/>'
+        )
+    parts.extend(shapes)
+    parts.extend(labels)
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def render_drawio_to_svg(
+    xml_content: str,
+    page_index: int = 0,
+    scale: float = 1.0,
+    border: float = 0.0,
+    transparent: bool = True,
+) -> str:
+    """Parse a .drawio document and render the requested page to SVG."""
+    return render_svg(
+        parse_diagram(xml_content, page_index=page_index),
+        scale=scale,
+        border=border,
+        transparent=transparent,
+    )
+
+
+def rasterizer_available() -> bool:
+    """Return True if an in-process SVG rasterizer can be loaded."""
+    return _load_rasterizer() is not None
+
+
+def get_rasterizer_name() -> Optional[str]:
+    """Return the name of the loaded rasterizer backend, if any."""
+    _load_rasterizer()
+    return _rasterizer_name
+
+
+def rasterize_svg(svg_content: str, scale: float = 1.0) -> bytes:
+    """
+    Rasterize an SVG document to PNG bytes using the optional rasterizer.
+
+    Args:
+        svg_content: SVG document.
+        scale: Additional scale applied while rasterizing.
+
+    Returns:
+        PNG image bytes.
+
+    Raises:
+        DiagramRenderError: If no rasterizer is installed or rasterization fails.
+    """
+    rasterizer = _load_rasterizer()
+    if rasterizer is None:
+        raise DiagramRenderError(
+            "No SVG rasterizer available. Install one with: pip install cairosvg"
+        )
+    try:
+        return rasterizer(svg_content.encode("utf-8"), scale)
+    except Exception as error:
+        raise DiagramRenderError(f"SVG rasterization failed: {str(error)}", error)
+
+
+def render_drawio_to_png(
+    xml_content: str,
+    page_index: int = 0,
+    scale: float = 1.0,
+    border: float = 0.0,
+    transparent: bool = False,
+) -> bytes:
+    """Render a .drawio page straight to PNG bytes without the Draw.io CLI."""
+    svg_content = render_drawio_to_svg(
+        xml_content, page_index=page_index, border=border, transparent=transparent
+    )
+    return rasterize_svg(svg_content, scale=scale)
+
+
+def _load_rasterizer() -> Optional[Callable[[bytes, float], bytes]]:
+    """Import the rasterizer backend once and cache the result (including failure)."""
+    global _rasterizer, _rasterizer_name, _rasterizer_loaded
+
+    if _rasterizer_loaded:
+        return _rasterizer
+
+    with _rasterizer_lock:
+        if _rasterizer_loaded:
+            return _rasterizer
+
+        for backend in _RASTERIZER_BACKENDS:
+            try:
+                if backend == "cairosvg":
+                    import cairosvg
+
+                    def render(svg_bytes: bytes, scale: float) -> bytes:
+                        return cairosvg.svg2png(bytestring=svg_bytes, scale=scale)
+
+                    _rasterizer = render
+                    _rasterizer_name = backend
+                    break
+            except (ImportError, OSError) as error:
+                # CairoSVG raises OSError when the native cairo library is missing
+                logger.debug(f"SVG rasterizer backend '{backend}' unavailable: {str(error)}")
+
+        _rasterizer_loaded = True
+        if _rasterizer is None:
+            logger.debug("No in-process SVG rasterizer available")
+        return _rasterizer
+
+
+def _reset_rasterizer_cache() -> None:
+    """Forget the cached rasterizer so the next call re-imports it."""
+    global _rasterizer, _rasterizer_name, _rasterizer_loaded
+    with _rasterizer_lock:
+        _rasterizer = None
+        _rasterizer_name = None
+        _rasterizer_loaded = False
+
+
+def _parse_xml(xml_content: str) -> ET.Element:
+    try:
+        return ET.fromstring(xml_content.strip())
+    except ET.ParseError as error:
+        raise DiagramRenderError(f"Invalid diagram XML: {str(error)}", error)
+
+
+def _parse_cell(element: ET.Element) -> Optional[Cell]:
+    """Parse an mxCell, unwrapping UserObject/object wrappers."""
+    value = None
+    if element.tag in ("UserObject", "object"):
+        value = element.get("label", "")
+        inner = element.find("mxCell")
+        if inner is None:
+            return None
+        cell_id = element.get("id", "")
+        element = inner
+    elif element.tag == "mxCell":
+        cell_id = element.get("id", "")
+    else:
+        return None
+
+    geometry = None
+    geometry_element = element.find("mxGeometry")
+    if geometry_element is not None:
+        geometry = _parse_geometry(geometry_element)
+
+    return Cell(
+        id=cell_id,
+        value=value if value is not None else element.get("value", ""),
+        style=parse_style(element.get("style")),
+        vertex=element.get("vertex") == "1",
+        edge=element.get("edge") == "1",
+        parent=element.get("parent"),
+        source=element.get("source"),
+        target=element.get("target"),
+        geometry=geometry,
+    )
+
+
+def _parse_geometry(element: ET.Element) -> Geometry:
+    geometry = Geometry(
+        x=_float(element.get("x")),
+        y=_float(element.get("y")),
+        width=_float(element.get("width")),
+        height=_float(element.get("height")),
+        relative=element.get("relative") == "1",
+    )
+    for child in element:
+        role = child.get("as")
+        if child.tag == "mxPoint" and role == "sourcePoint":
+            geometry.source_point = (_float(child.get("x")), _float(child.get("y")))
+        elif child.tag == "mxPoint" and role == "targetPoint":
+            geometry.target_point = (_float(child.get("x")), _float(child.get("y")))
+        elif child.tag == "Array" and role == "points":
+            geometry.points = [
+                (_float(point.get("x")), _float(point.get("y")))
+                for point in child.findall("mxPoint")
+            ]
+    return geometry
+
+
+def _float(value: Optional[str]) -> float:
+    try:
+        return float(value) if value is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _absolute_origin(
+    cell: Cell, cells: Dict[str, Cell], origins: Dict[str, Tuple[float, float]]
+) -> Tuple[float, float]:
+    """Absolute top-left corner of a vertex, accumulating parent offsets."""
+    if cell.id in origins:
+        return origins[cell.id]
+    offset_x, offset_y = _parent_offset(cell, cells, origins)
+    geometry = cell.geometry or Geometry()
+    origin = (offset_x + geometry.x, offset_y + geometry.y)
+    origins[cell.id] = origin
+    return origin
+
+
+def _parent_offset(
+    cell: Cell, cells: Dict[str, Cell], origins: Dict[str, Tuple[float, float]]
+) -> Tuple[float, float]:
+    parent = cells.get(cell.parent) if cell.parent else None
+    if parent is None or not parent.vertex or parent.geometry is None:
+        return (0.0, 0.0)
+    return _absolute_origin(parent, cells, origins)
+
+
+def _vertex_box(
+    cell_id: Optional[str], cells: Dict[str, Cell], origins: Dict[str, Tuple[float, float]]
+) -> Optional[Tuple[float, float, float, float]]:
+    cell = cells.get(cell_id) if cell_id else None
+    if cell is None or not cell.vertex or cell.geometry is None:
+        return None
+    x, y = _absolute_origin(cell, cells, origins)
+    return (x, y, cell.geometry.width, cell.geometry.height)
+
+
+def _edge_points(
+    cell: Cell, cells: Dict[str, Cell], origins: Dict[str, Tuple[float, float]]
+) -> List[Tuple[float, float]]:
+    geometry = cell.geometry or Geometry()
+    offset_x, offset_y = _parent_offset(cell, cells, origins)
+    waypoints = [(x + offset_x, y + offset_y) for x, y in geometry.points]
+
+    source_box = _vertex_box(cell.source, cells, origins)
+    target_box = _vertex_box(cell.target, cells, origins)
+
+    def terminal(box, prefix, fallback, towards):
+        if box is not None:
+            x, y, width, height = box
+            if prefix + "X" in cell.style and prefix + "Y" in cell.style:
+                return (
+                    x + width * _float(cell.style[prefix + "X"]),
+                    y + height * _float(cell.style[prefix + "Y"]),
+                )
+            return _perimeter_point(box, towards)
+        if fallback is not None:
+            return (fallback[0] + offset_x, fallback[1] + offset_y)
+        return None
+
+    def center(box, fallback):
+        if box is not None:
+            return (box[0] + box[2] / 2, box[1] + box[3] / 2)
+        if fallback is not None:
+            return (fallback[0] + offset_x, fallback[1] + offset_y)
+        return None
+
+    source_center = center(source_box, geometry.source_point)
+    target_center = center(target_box, geometry.target_point)
+    source_towards = waypoints[0] if waypoints else target_center
+    target_towards = waypoints[-1] if waypoints else source_center
+
+    start = terminal(source_box, "exit", geometry.source_point, source_towards)
+    end = terminal(target_box, "entry", geometry.target_point, target_towards)
+
+    points = []
+    if start is not None:
+        points.append(start)
+    points.extend(waypoints)
+    if end is not None:
+        points.append(end)
+    return points
+
+
+def _perimeter_point(
+    box: Tuple[float, float, float, float], towards: Optional[Tuple[float, float]]
+) -> Tuple[float, float]:
+    """Intersection of the line from the box center towards a point with the box border."""
+    x, y, width, height = box
+    cx, cy = x + width / 2, y + height / 2
+    if towards is None:
+        return (cx, cy)
+    dx, dy = towards[0] - cx, towards[1] - cy
+    if dx == 0 and dy == 0:
+        return (cx, cy)
+    scale_x = (width / 2) / abs(dx) if dx else float("inf")
+    scale_y = (height / 2) / abs(dy) if dy else float("inf")
+    factor = min(scale_x, scale_y)
+    return (cx + dx * factor, cy + dy * factor)
+
+
+def _polyline_midpoint(points: List[Tuple[float, float]]) -> Tuple[float, float]:
+    lengths = [
+        ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
+        for (x1, y1), (x2, y2) in zip(points, points[1:])
+    ]
+    half = sum(lengths) / 2
+    for (x1, y1), (x2, y2), length in zip(points, points[1:], lengths):
+        if half <= length and length > 0:
+            ratio = half / length
+            return (x1 + (x2 - x1) * ratio, y1 + (y2 - y1) * ratio)
+        half -= length
+    return points[len(points) // 2]
+
+
+def _shape_name(style: Dict[str, str]) -> str:
+    shape = style.get("shape") or style.get("_base") or "rect"
+    if shape in ("ellipse", "doubleEllipse") or style.get("ellipse") == "1":
+        return "ellipse"
+    if shape == "rhombus":
+        return "rhombus"
+    if shape in ("text", "label") and "shape" not in style:
+        return "text"
+    return "rect"
+
+
+def _stroke_attributes(style: Dict[str, str]) -> str:
+    stroke = style.get("strokeColor", DEFAULT_STROKE_COLOR)
+    if stroke == "default":
+        stroke = DEFAULT_STROKE_COLOR
+    attributes = [
+        f'stroke="{_attr(stroke)}"',
+        f'stroke-width="{_fmt(_float(style.get("strokeWidth", "1")) or 1.0)}"',
+    ]
+    if style.get("dashed") == "1":
+        attributes.append('stroke-dasharray="3 3"')
+    opacity = style.get("opacity")
+    if opacity is not None:
+        attributes.append(f'opacity="{_fmt(_float(opacity) / 100)}"')
+    return " ".join(attributes)
+
+
+def _render_vertex(cell: Cell, x: float, y: float) -> str:
+    style = cell.style
+    geometry = cell.geometry or Geometry()
+    width, height = geometry.width, geometry.height
+    shape = _shape_name(style)
+
+    if shape == "text":
+        return ""
+
+    fill = style.get("fillColor", DEFAULT_FILL_COLOR)
+    if fill == "default":
+        fill = DEFAULT_FILL_COLOR
+    common = f'fill="{_attr(fill)}" {_stroke_attributes(style)}'
+
+    if shape == "ellipse":
+        return (
+            f'<ellipse cx="{_fmt(x + width / 2)}" cy="{_fmt(y + height / 2)}" '
+            f'rx="{_fmt(width / 2)}" ry="{_fmt(height / 2)}" {common}/>'
+        )
+    if shape == "rhombus":
+        points = [
+            (x + width / 2, y),
+            (x + width, y + height / 2),
+            (x + width / 2, y + height),
+            (x, y + height / 2),
+        ]
+        return f'<polygon points="{_points(points)}" {common}/>'
+
+    radius = ""
+    if style.get("rounded") == "1":
+        arc = min(width, height) * 0.15
+        radius = f' rx="{_fmt(arc)}" ry="{_fmt(arc)}"'
+    return (
+        f'<rect x="{_fmt(x)}" y="{_fmt(y)}" width="{_fmt(width)}" '
+        f'height="{_fmt(height)}"{radius} {common}/>'
+    )
+
+
+def _render_edge(cell: Cell, points: List[Tuple[float, float]]) -> str:
+    style = cell.style
+    markers = ""
+    if style.get("endArrow", "classic") != "none":
+        markers += ' marker-end="url(#arrow-classic)"'
+    if style.get("startArrow", "none") != "none":
+        markers += ' marker-start="url(#arrow-classic)"'
+    return (
+        f'<polyline points="{_points(points)}" fill="none" '
+        f'{_stroke_attributes(style)}{markers}/>'
+    )
+
+
+def _render_label(
+    cell: Cell, x: float, y: float, width: float, height: float, edge_label: bool = False
+) -> str:
+    text = _label_text(cell.value, html_label=cell.style.get("html") == "1")
+    if not text:
+        return ""
+
+    style = cell.style
+    lines = text.split("\n")
+    font_size = _float(style.get("fontSize")) or DEFAULT_FONT_SIZE
+    font_color = style.get("fontColor", DEFAULT_FONT_COLOR)
+    font_family = style.get("fontFamily", DEFAULT_FONT_FAMILY)
+    font_style = int(_float(style.get("fontStyle", "0")))
+    line_height = font_size * 1.2
+
+    align = style.get("align", "center")
+    if align == "left":
+        anchor, text_x = "start", x + _float(style.get("spacingLeft", "2"))
+    elif align == "right":
+        anchor, text_x = "end", x + width - 2
+    else:
+        anchor, text_x = "middle", x + width / 2
+
+    vertical_align = style.get("verticalAlign", "middle")
+    block_height = line_height * len(lines)
+    if vertical_align == "top":
+        first_y = y + font_size + 2
+    elif vertical_align == "bottom":
+        first_y = y + height - block_height + font_size - 2
+    else:
+        first_y = y + (height - block_height) / 2 + font_size
+
+    attributes = [
+        f'x="{_fmt(text_x)}"',
+        f'font-family="{_attr(font_family)}"',
+        f'font-size="{_fmt(font_size)}"',
+        f'fill="{_attr(font_color)}"',
+        f'text-anchor="{anchor}"',
+    ]
+    if font_style & 1:
+        attributes.append('font-weight="bold"')
+    if font_style & 2:
+        attributes.append('font-style="italic"')
+
+    tspans = "".join(
+        f'<tspan x="{_fmt(text_x)}" y="{_fmt(first_y + index * line_height)}">'
+        f"{html.escape(line)}</tspan>"
+        for index, line in enumerate(lines)
+    )
+    background = ""
+    if edge_label:
+        label_width = max(len(line) for line in lines) * font_size * 0.6
+        background = (
+            f'<rect x="{_fmt(x + width / 2 - label_width / 2)}" '
+            f'y="{_fmt(first_y - font_size)}" width="{_fmt(label_width)}" '
+            f'height="{_fmt(block_height)}" fill="{DEFAULT_FILL_COLOR}"/>'
+        )
+    return f'{background}<text {" ".join(attributes)}>{tspans}</text>'
+
+
+_BREAK_TAGS = re.compile(r"<\s*(br|/div|/p|/li)\s*/?\s*>", re.IGNORECASE)
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def _label_text(value: Optional[str], html_label: bool) -> str:
+    if not value:
+        return ""
+    if html_label:
+        value = _BREAK_TAGS.sub("\n", value)
+        value = _TAGS.sub("", value)
+        value = html.unescape(value)
+    lines = [line.strip() for line in value.replace("\r", "").split("\n")]
+    return "\n".join(line for line in lines if line)
+
+
+def _points(points: List[Tuple[float, float]]) -> str:
+    return " ".join(f"{_fmt(x)},{_fmt(y)}" for x, y in points)
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".") or "0"
+
+
+def _attr(value: str) -> str:
+    return html.escape(value, quote=True)
+
+
+class _Bounds:
+    """Running bounding box of rendered geometry."""
+
+    def __init__(self):
+        self.min_x = self.min_y = float("inf")
+        self.max_x = self.max_y = float("-inf")
+
+    def add(self, x: float, y: float) -> None:
+        self.min_x = min(self.min_x, x)
+        self.min_y = min(self.min_y, y)
+        self.max_x = max(self.max_x, x)
+        self.max_y = max(self.max_y, y)
+
+    def box(self) -> Tuple[float, float, float, float]:
+        if self.min_x == float("inf"):
+            return (0.0, 0.0, 0.0, 0.0)
+        return (self.min_x, self.min_y, self.max_x, self.max_y)
@@ -7,13 +7,17 @@ These tools are called by the official MCP server implementation.
 import asyncio
 import logging
 import re
+from dataclasses import asdict
 from datetime import datetime
+from pathlib import Path
 from typing import Any, Dict, Optional
 
 from .exceptions import LLMError, LLMErrorCode
 from .llm_service import LLMService
 from .file_service import FileService, FileServiceError
-from .image_service import ImageService, ImageServiceError
+from .image_service import ExportOptions, ImageService, ImageServiceError
+from .profiler import PROFILE_DIR_NAME, ProfilerBusyError, run_profile
+from .tracing import PHASE_VALIDATION, tracer
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -223,7 +227,8 @@ async def save_drawio_file(xml_content: str, filename: Optional[str] = None) ->
     try:
         # Input validation
         try:
-            validate_drawio_xml(xml_content)
+            with tracer.span("tool.validate_xml", phase=PHASE_VALIDATION):
+                validate_drawio_xml(xml_content)
         except ValueError as e:
             return {
                 "success": False,
@@ -342,24 +347,39 @@ async def save_drawio_file(xml_content: str, filename: Optional[str] = None) ->
         }
 
 
-async def convert_to_png(file_id: Optional[str] = None, file_path: Optional[str] = None) -> Dict[str, Any]:
+async def convert_to_png(file_id: Optional[str] = None, file_path: Optional[str] = None,
+                         format: str = "png", scale: float = 1.0, border: int = 0,
+                         transparent: bool = False, page_index: int = 0, crop: bool = False,
+                         quality: int = 90, include_base64: bool = False) -> Dict[str, Any]:
     """
     Convert Draw.io file to PNG image using Draw.io CLI.
     
     This tool converts a Draw.io (.drawio) file to PNG format using the Draw.io CLI.
+    SVG, PDF, JPEG and WebP output can be requested with the format parameter.
     You can specify either a file_id (from save-drawio-file) or a direct file_path.
     If Draw.io CLI is not available, the tool provides comprehensive fallback information.
     
     Args:
         file_id: File ID returned from save-drawio-file tool (recommended).
         file_path: Direct path to .drawio file (alternative to file_id).
+        format: Output format: png, svg, pdf, jpg or webp.
+        scale: Zoom factor applied to the diagram.
+        border: Border width around the diagram in pixels.
+        transparent: Transparent background (PNG, SVG and WebP).
+        page_index: Zero-based index of the page to export.
+        crop: Crop PDF output to the diagram bounds.
+        quality: JPEG/WebP quality (1-100).
+        include_base64: Include Base64 encoded content in the result. Off by default
+            so large images are not encoded unless the caller needs them inline.
     
     Returns:
         Dictionary containing:
         - success (bool): Whether the conversion was successful
-        - png_file_id (str): Unique identifier for the PNG file (if successful)
-        - png_file_path (str): Absolute path to the PNG file (if successful)
-        - base64_content (str): Base64 encoded PNG content (if successful, optional)
+        - png_file_id (str): Unique identifier for the exported file (if successful)
+        - png_file_path (str): Absolute path to the exported file (if successful)
+        - base64_content (str): Base64 encoded file content (if successful, optional)
+        - format (str): Output format of the exported file (if successful)
+        - mime_type (str): MIME type of the exported file (if successful)
         - error (str): Error message (if failed)
         - error_code (str): Specific error code for programmatic handling (if failed)
         - cli_available (bool): Whether Draw.io CLI is available
@@ -412,6 +432,31 @@ async def convert_to_png(file_id: Optional[str] = None, file_path: Optional[str]
                 "timestamp": timestamp
             }
         
+        # Validate export options
+        try:
+            options = ExportOptions(
+                format=format,
+                scale=scale,
+                border=border,
+                transparent=transparent,
+                page_index=page_index,
+                crop=crop,
+                quality=quality
+            ).validated()
+        except (ImageServiceError, TypeError) as e:
+            return {
+                "success": False,
+                "png_file_id": None,
+                "png_file_path": None,
+                "base64_content": None,
+                "error": f"Invalid export options: {str(e)}",
+                "error_code": "INVALID_EXPORT_OPTIONS",
+                "cli_available": False,
+                "fallback_message": None,
+                "alternatives": None,
+                "timestamp": timestamp
+            }
+        
         # グローバルサービスを使用
         from .server import file_service, image_service
         if not file_service or not image_service:
@@ -506,7 +551,7 @@ async def convert_to_png(file_id: Optional[str] = None, file_path: Optional[str]
         from pathlib import Path
         drawio_path = Path(drawio_file_path)
         
-        if not drawio_path.exists():
+        if not await file_service.io_executor.run(drawio_path.exists):
             return {
                 "success": False,
                 "png_file_id": None,
@@ -536,14 +581,15 @@ async def convert_to_png(file_id: Optional[str] = None, file_path: Optional[str]
         
         # Attempt PNG conversion using ImageService
         try:
-            logger.info(f"Starting PNG conversion for: {drawio_file_path}")
+            logger.info(f"Starting {options.format.upper()} conversion for: {drawio_file_path}")
             
             # Use the comprehensive PNG generation workflow
             conversion_result = await image_service.generate_png_with_fallback(
                 drawio_file_path=drawio_file_path,
-                output_dir=None,  # Use same directory as input
-                include_base64=True,  # Include Base64 for convenience
-                file_service=file_service  # For managed file saving
+                output_dir=str(file_service.storage_dir(drawio_path.stem)),  # Render straight into managed storage
+                include_base64=include_base64,
+                file_service=file_service,  # For managed file saving
+                options=options
             )
             
             if conversion_result["success"]:
@@ -551,13 +597,15 @@ async def convert_to_png(file_id: Optional[str] = None, file_path: Optional[str]
                 conv_data = conversion_result["conversion_result"]
                 save_data = conversion_result.get("save_result", {})
                 
-                logger.info(f"Successfully converted {drawio_file_path} to PNG")
+                logger.info(f"Successfully converted {drawio_file_path} to {options.format.upper()}")
                 
                 return {
                     "success": True,
                     "png_file_id": save_data.get("file_id") or conv_data.get("image_file_id"),
                     "png_file_path": save_data.get("file_path") or conv_data.get("png_file_path"),
                     "base64_content": conv_data.get("base64_content"),
+                    "format": options.format,
+                    "mime_type": options.mime_type,
                     "error": None,
                     "error_code": None,
                     "cli_available": conv_data.get("cli_available", True),
@@ -568,7 +616,11 @@ async def convert_to_png(file_id: Optional[str] = None, file_path: Optional[str]
                         "original_file_id": original_file_id,
                         "original_file_path": drawio_file_path,
                         "conversion_message": conversion_result.get("message"),
-                        "file_size_bytes": save_data.get("size_bytes"),
+                        "renderer": conv_data.get("renderer"),
+                        "export_options": asdict(options),
+                        "from_cache": conv_data.get("from_cache", False),
+                        "file_size_bytes": save_data.get("size_bytes") or conv_data.get("size_bytes"),
+                        "content_sha256": conv_data.get("content_sha256"),
                         "expires_at": save_data.get("expires_at")
                     }
                 }
@@ -645,4 +697,60 @@ async def convert_to_png(file_id: Optional[str] = None, file_path: Optional[str]
         }
 
 
+async def profile_server(duration_seconds: float = 10, format: str = "collapsed",
+                         tool: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Profile the running server with the sampling profiler.
+    
+    The call returns once the profile is written; other requests keep being
+    served meanwhile. Only available when PROFILING_ENABLED is set.
+    
+    Args:
+        duration_seconds: How long to sample (up to 300 seconds).
+        format: "collapsed" (flame graph input) or "pstats".
+        tool: Only sample calls of this tool, e.g. "convert-to-png".
+    
+    Returns:
+        Dictionary containing:
+        - success (bool): Whether the profile was written
+        - profile_path (str): Path of the profile under temp_dir (if successful)
+        - samples (int): Number of samples taken (if successful)
+        - top_functions (list): Functions with the most self samples (if successful)
+        - error (str): Error message (if failed)
+        - error_code (str): Specific error code for programmatic handling (if failed)
+        - timestamp (str): ISO timestamp of the operation
+    """
+    timestamp = datetime.utcnow().isoformat() + "Z"
+    
+    from .server import config
+    if not config or not config.profiling_enabled:
+        return {
+            "success": False,
+            "error": "Profiling is disabled. Set PROFILING_ENABLED=true to enable it",
+            "error_code": "PROFILING_DISABLED",
+            "timestamp": timestamp
+        }
+    
+    try:
+        result = await run_profile(
+            str(Path(config.temp_dir) / PROFILE_DIR_NAME),
+            float(duration_seconds),
+            output_format=format,
+            tool=tool,
+            interval=config.profile_interval_ms / 1000
+        )
+    except ProfilerBusyError as e:
+        return {"success": False, "error": str(e), "error_code": "PROFILE_IN_PROGRESS", "timestamp": timestamp}
+    except (TypeError, ValueError) as e:
+        return {
+            "success": False,
+            "error": f"Invalid profile options: {str(e)}",
+            "error_code": "INVALID_PROFILE_OPTIONS",
+            "timestamp": timestamp
+        }
+    
+    logger.info(f"Profile written to {result.path} ({result.samples} samples)")
+    return {"success": True, **result.to_dict(), "timestamp": timestamp}
+
+
 # Tool schema definitions are now handled in server.py using the official MCP SDK
\ No newline at end of file
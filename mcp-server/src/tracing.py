@@ -0,0 +1,588 @@
+"""
+Span-based tracing of tool calls through the LLM, file and render services.
+
+Each tool call opens a root span whose trace ID doubles as the request ID;
+service methods decorated with @traced open child spans, so a slow
+convert-to-png call breaks down into file lookup, CLI probe, export, encoding
+and registration. The current span and request ID live in context variables
+and follow the call across awaits and tasks.
+
+Finished traces go to pluggable exporters: a JSON lines file for offline
+analysis, the log, or an OpenTelemetry tracer when opentelemetry-api is
+installed. With no exporter configured, spans are not created at all.
+
+Independently of exporters and sampling, every tool call also accumulates a
+per-phase timing breakdown (queue wait, cache lookup, LLM, validation, disk
+write, render, encode): spans and @traced functions given a phase add their
+duration to it, so the breakdown costs two clock reads per phase.
+"""
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TRACE_DIR_NAME = ".traces"
+
+# Finished traces the JSON exporter holds while its writer thread catches up;
+# traces beyond this are dropped rather than slowing down requests
+MAX_PENDING_TRACES = 10000
+
+EXPORTER_JSON = "json"
+EXPORTER_LOG = "log"
+EXPORTER_OTEL = "otel"
+EXPORTER_NAMES = (EXPORTER_JSON, EXPORTER_LOG, EXPORTER_OTEL)
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+# Phases of the per-call timing breakdown, in reporting order
+PHASE_QUEUE_WAIT = "queue_wait"
+PHASE_CACHE_LOOKUP = "cache_lookup"
+PHASE_LLM_FIRST_TOKEN = "llm_first_token"
+PHASE_LLM_TOTAL = "llm_total"
+PHASE_VALIDATION = "validation"
+PHASE_DISK_WRITE = "disk_write"
+PHASE_RENDER = "render"
+PHASE_ENCODE = "encode"
+PHASES = (
+    PHASE_QUEUE_WAIT, PHASE_CACHE_LOOKUP, PHASE_LLM_FIRST_TOKEN, PHASE_LLM_TOTAL,
+    PHASE_VALIDATION, PHASE_DISK_WRITE, PHASE_RENDER, PHASE_ENCODE,
+)
+
+
+@dataclass
+class Span:
+    """A timed operation within a trace."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_time: float = field(default_factory=time.time)
+    end_time: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = STATUS_OK
+    error: Optional[str] = None
+    # Spans of the trace finished so far, shared by every span of the trace
+    _finished: List["Span"] = field(default_factory=list, repr=False)
+    _start_perf: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        """Duration in milliseconds once the span has ended."""
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) * 1000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach an attribute to the span."""
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        """Mark the span as failed."""
+        self.status = STATUS_ERROR
+        self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the span for exporters."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": round(self.duration_ms, 3) if self.end_time is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned when no trace is being recorded."""
+
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("drawio_current_span", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("drawio_request_id", default=None)
+# Seconds per phase of the running tool call; shared by the tasks it spawns
+_phase_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("drawio_phase_timings", default=None)
+
+
+def current_span():
+    """The span of the running operation, or a no-op span outside traces."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def current_request_id() -> Optional[str]:
+    """The request ID of the running tool call, if any."""
+    return _request_id.get()
+
+
+def new_request_id() -> str:
+    """Create a request ID usable as a 128-bit trace ID."""
+    return uuid.uuid4().hex
+
+
+def phase_timings() -> Optional[Dict[str, float]]:
+    """Seconds spent per phase by the running tool call so far, or None outside one."""
+    return _phase_timings.get()
+
+
+def add_phase_time(timings: Optional[Dict[str, float]], phase: str, seconds: float) -> None:
+    """
+    Add time to a phase of a tool call's breakdown.
+
+    Args:
+        timings: Breakdown from phase_timings(); nothing happens when None.
+        phase: One of PHASES.
+        seconds: Time to add.
+    """
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+def timing_breakdown(timings: Optional[Dict[str, float]], total_seconds: float) -> Dict[str, float]:
+    """
+    Breakdown in milliseconds as reported to clients and logs.
+
+    Phases may nest (a render includes its own disk writes), so they need
+    not add up to the total.
+
+    Args:
+        timings: Breakdown from phase_timings().
+        total_seconds: Duration of the whole tool call.
+
+    Returns:
+        "<phase>_ms" for each phase that occurred, in PHASES order, and "total_ms".
+    """
+    breakdown = {f"{phase}_ms": round(timings[phase] * 1000, 3) for phase in PHASES if timings and phase in timings}
+    breakdown["total_ms"] = round(total_seconds * 1000, 3)
+    return breakdown
+
+
+class SpanExporter:
+    """Receives the spans of each finished trace."""
+
+    def export(self, spans: Sequence[Span]) -> None:
+        """
+        Export one trace.
+
+        Args:
+            spans: Spans of the trace ordered by start time; the first is the root.
+        """
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """Flush and release resources."""
+
+
+class JSONFileExporter(SpanExporter):
+    """
+    Appends spans to a JSON lines file, one span per line.
+
+    export only queues the trace; a writer thread serializes and appends
+    whatever has queued up in one write, so ending a request never waits on
+    the disk. shutdown writes the remaining traces.
+    """
+
+    def __init__(self, path: str, max_pending: int = MAX_PENDING_TRACES):
+        """
+        Create the exporter and start its writer thread.
+
+        Args:
+            path: File to append to; its directory is created if missing.
+            max_pending: Traces queued before further ones are dropped.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._queue: "queue.Queue[Optional[Sequence[Span]]]" = queue.Queue(maxsize=max_pending)
+        self._dropped = 0
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._writer.start()
+
+    def export(self, spans: Sequence[Span]) -> None:
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self._dropped += 1
+            if self._dropped == 1:
+                logger.warning(f"Trace writer for {self.path} is falling behind; dropping traces")
+
+    def flush(self) -> None:
+        """Wait until every queued trace has been written."""
+        self._queue.join()
+
+    def shutdown(self) -> None:
+        """Write the queued traces and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        if self._dropped:
+            logger.warning(f"Dropped {self._dropped} traces while the writer for {self.path} was behind")
+
+    def _write_loop(self) -> None:
+        """Append queued traces until shutdown."""
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            traces = [spans for spans in batch if spans is not None]
+            try:
+                if traces:
+                    self._write(traces)
+            except Exception as error:
+                logger.warning(f"Trace exporter {type(self).__name__} failed: {str(error)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _write(self, traces: List[Sequence[Span]]) -> None:
+        """Append the spans of several traces in one write."""
+        lines = "".join(
+            json.dumps(span.to_dict(), default=str, ensure_ascii=False) + "\n"
+            for spans in traces for span in spans
+        )
+        with open(self.path, "a", encoding="utf-8") as trace_file:
+            trace_file.write(lines)
+
+
+class LoggingExporter(SpanExporter):
+    """Logs each trace as an indented span tree at DEBUG level."""
+
+    def __init__(self, log: Optional[logging.Logger] = None):
+        self.log = log or logger
+
+    def export(self, spans: Sequence[Span]) -> None:
+        if not self.log.isEnabledFor(logging.DEBUG):
+            return
+        depth = {}
+        lines = []
+        for span in spans:
+            depth[span.span_id] = depth.get(span.parent_id, -1) + 1
+            status = "" if span.status == STATUS_OK else f" [{span.error}]"
+            lines.append(f"{'  ' * depth[span.span_id]}{span.name} {span.duration_ms:.2f}ms{status}")
+        self.log.debug(f"Trace {spans[0].trace_id}:\n" + "\n".join(lines))
+
+
+class OpenTelemetryExporter(SpanExporter):
+    """
+    Replays finished traces into an OpenTelemetry tracer.
+
+    Spans keep their timing and parent links; the configured OpenTelemetry
+    SDK decides where they go (OTLP, Jaeger, console...).
+    """
+
+    def __init__(self, tracer_name: str = "mcp-drawio-server"):
+        """
+        Create the exporter.
+
+        Raises:
+            ImportError: If opentelemetry-api is not installed.
+        """
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = trace.get_tracer(tracer_name)
+
+    def export(self, spans: Sequence[Span]) -> None:
+        trace = self._trace
+        started = {}
+        for span in spans:
+            parent = started.get(span.parent_id)
+            context = trace.set_span_in_context(parent) if parent is not None else None
+            otel_span = self._tracer.start_span(
+                span.name, context=context, start_time=int(span.start_time * 1e9),
+                attributes={"request_id": span.trace_id, **_otel_attributes(span.attributes)},
+            )
+            if span.status == STATUS_ERROR:
+                otel_span.set_status(trace.Status(trace.StatusCode.ERROR, span.error))
+            started[span.span_id] = otel_span
+        for span in reversed(spans):
+            started[span.span_id].end(end_time=int(span.end_time * 1e9))
+
+
+def _otel_attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep attribute values OpenTelemetry accepts, stringifying the rest."""
+    return {key: value if isinstance(value, (str, bool, int, float)) else str(value)
+            for key, value in attributes.items() if value is not None}
+
+
+class _SpanScope:
+    """Context manager making a span current for its duration."""
+
+    __slots__ = ("tracer", "span", "set_request_id", "_token", "_request_token", "_timings_token")
+
+    def __init__(self, tracer: "Tracer", span: Span, set_request_id: bool = False):
+        self.tracer = tracer
+        self.span = span
+        self.set_request_id = set_request_id
+        self._token = None
+        self._request_token = None
+        self._timings_token = None
+
+    def __enter__(self) -> Span:
+        if self.set_request_id:
+            self._request_token = _request_id.set(self.span.trace_id)
+            self._timings_token = _phase_timings.set({})
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_span.reset(self._token)
+        if self._request_token is not None:
+            _request_id.reset(self._request_token)
+            _phase_timings.reset(self._timings_token)
+        if exc is not None:
+            self.span.record_error(exc)
+        self.tracer._finish(self.span)
+
+
+class _RequestScope:
+    """Context manager setting the request ID and breakdown of an unsampled trace."""
+
+    __slots__ = ("request_id", "_token", "_timings_token")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self._token = None
+        self._timings_token = None
+
+    def __enter__(self) -> _NoopSpan:
+        self._token = _request_id.set(self.request_id)
+        self._timings_token = _phase_timings.set({})
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _request_id.reset(self._token)
+        _phase_timings.reset(self._timings_token)
+
+
+class _PhaseScope:
+    """Context manager adding its duration to a phase of the breakdown."""
+
+    __slots__ = ("phase", "scope", "timings", "_start")
+
+    def __init__(self, phase: str, scope, timings: Dict[str, float]):
+        self.phase = phase
+        self.scope = scope
+        self.timings = timings
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self.scope.__enter__()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        add_phase_time(self.timings, self.phase, time.perf_counter() - self._start)
+        self.scope.__exit__(exc_type, exc, tb)
+
+
+class _NoopScope:
+    """Context manager used when a span is not recorded."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+class Tracer:
+    """Creates spans and hands finished traces to the exporters."""
+
+    def __init__(self, exporters: Optional[List[SpanExporter]] = None, sample_rate: float = 1.0):
+        """
+        Create the tracer.
+
+        Args:
+            exporters: Exporters receiving finished traces; none disables tracing.
+            sample_rate: Fraction of tool calls to trace (0.0-1.0).
+        """
+        self.exporters: List[SpanExporter] = []
+        self.sample_rate = 1.0
+        self.configure(exporters or [], sample_rate)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any exporter receives traces."""
+        return bool(self.exporters)
+
+    def configure(self, exporters: List[SpanExporter], sample_rate: float = 1.0) -> None:
+        """
+        Replace the exporters and sample rate.
+
+        Raises:
+            ValueError: If sample_rate is outside 0.0-1.0.
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0.0 and 1.0")
+        self.shutdown()
+        self.exporters = list(exporters)
+        self.sample_rate = sample_rate
+
+    def start_trace(self, name: str, request_id: Optional[str] = None, **attributes: Any):
+        """
+        Open the root span of a request.
+
+        The request ID is set for the duration even when the trace is not
+        sampled, so logs can still be correlated.
+
+        Args:
+            name: Span name.
+            request_id: Request ID to use as trace ID; generated if omitted.
+            **attributes: Span attributes.
+
+        Returns:
+            Context manager yielding the root span (or a no-op span).
+        """
+        request_id = request_id or new_request_id()
+        if not self.exporters or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return _RequestScope(request_id)
+        span = Span(name=name, trace_id=request_id, span_id=uuid.uuid4().hex[:16], attributes=attributes)
+        return _SpanScope(self, span, set_request_id=True)
+
+    def span(self, name: str, phase: Optional[str] = None, **attributes: Any):
+        """
+        Open a child span of the current span.
+
+        Outside a recorded trace no span is created, but the duration still
+        counts towards the phase of the running tool call.
+
+        Args:
+            name: Span name.
+            phase: Phase of the timing breakdown the span's duration belongs to.
+            **attributes: Span attributes.
+
+        Returns:
+            Context manager yielding the span (or a no-op span).
+        """
+        parent = _current_span.get()
+        if parent is None:
+            scope = _NOOP_SCOPE
+        else:
+            span = Span(name=name, trace_id=parent.trace_id, span_id=uuid.uuid4().hex[:16],
+                        parent_id=parent.span_id, attributes=attributes, _finished=parent._finished)
+            scope = _SpanScope(self, span)
+        if phase is not None:
+            timings = _phase_timings.get()
+            if timings is not None:
+                return _PhaseScope(phase, scope, timings)
+        return scope
+
+    def _finish(self, span: Span) -> None:
+        """End a span and export its trace when the root ends."""
+        span.end_time = span.start_time + (time.perf_counter() - span._start_perf)
+        span._finished.append(span)
+        if span.parent_id is not None:
+            return
+        spans = sorted(span._finished, key=lambda finished: finished.start_time)
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as error:
+                logger.warning(f"Trace exporter {type(exporter).__name__} failed: {str(error)}")
+
+    def shutdown(self) -> None:
+        """Shut down the exporters."""
+        for exporter in self.exporters:
+            try:
+                exporter.shutdown()
+            except Exception as error:
+                logger.warning(f"Trace exporter {type(exporter).__name__} failed to shut down: {str(error)}")
+        self.exporters = []
+
+
+tracer = Tracer()
+
+
+def traced(name: str, phase: Optional[str] = None, **attributes: Any) -> Callable:
+    """
+    Decorate an async function to run inside a child span.
+
+    Args:
+        name: Span name.
+        phase: Phase of the timing breakdown the call's duration belongs to.
+        **attributes: Static span attributes.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _current_span.get() is None and (phase is None or _phase_timings.get() is None):
+                return await func(*args, **kwargs)
+            with tracer.span(name, phase=phase, **attributes):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def create_exporters(names: Sequence[str], trace_file: str) -> List[SpanExporter]:
+    """
+    Create exporters by name.
+
+    Args:
+        names: Exporter names (json, log, otel).
+        trace_file: File of the json exporter.
+
+    Returns:
+        The exporters; otel is skipped with a warning if opentelemetry-api is missing.
+
+    Raises:
+        ValueError: If a name is unknown.
+    """
+    exporters = []
+    for name in names:
+        if name == EXPORTER_JSON:
+            exporters.append(JSONFileExporter(trace_file))
+        elif name == EXPORTER_LOG:
+            exporters.append(LoggingExporter())
+        elif name == EXPORTER_OTEL:
+            try:
+                exporters.append(OpenTelemetryExporter())
+            except ImportError:
+                logger.warning("TRACE_EXPORTERS includes otel but opentelemetry-api is not installed")
+        else:
+            raise ValueError(f"Unknown trace exporter: {name}")
+    return exporters
+
+
+def default_trace_file(temp_dir: str) -> str:
+    """Per-process trace file under temp_dir, so workers never interleave writes."""
+    return os.path.join(temp_dir, TRACE_DIR_NAME, f"traces-{os.getpid()}.jsonl")
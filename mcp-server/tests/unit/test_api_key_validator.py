@@ -0,0 +1,105 @@
+"""
+Unit tests for APIKeyValidator.
+Tests the validation cache, its persistence and deferring the live check.
+"""
+import json
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from src.api_key_validator import (
+    APIKeyType,
+    APIKeyValidationCache,
+    APIKeyValidationResult,
+    APIKeyValidator,
+)
+
+PRODUCTION_KEY = "sk-ant-REDACTED"
+
+
+def live_result(is_valid=True, error_code=None):
+    """Result as returned by a live check."""
+    return APIKeyValidationResult(is_valid=is_valid, key_type=APIKeyType.PRODUCTION, error_code=error_code)
+
+
+class TestAPIKeyValidationCache:
+    """Test caching live validation results."""
+
+    @pytest.fixture
+    def cache_path(self, tmp_path):
+        """Path of the cache file."""
+        return tmp_path / ".state" / "api_key_validation.json"
+
+    def test_persisted_by_hash(self, cache_path):
+        """Test that results survive a restart and the key never reaches the disk."""
+        assert APIKeyValidationCache(str(cache_path), 3600).put(PRODUCTION_KEY, live_result())
+
+        cached = APIKeyValidationCache(str(cache_path), 3600).get(PRODUCTION_KEY)
+
+        assert cached.is_valid is True and cached.cached is True
+        assert PRODUCTION_KEY not in cache_path.read_text(encoding="utf-8")
+        assert APIKeyValidationCache(str(cache_path), 3600).get(PRODUCTION_KEY + "x") is None
+
+    def test_ttl(self, cache_path):
+        """Test that expired entries are ignored and a zero TTL disables the cache."""
+        cache = APIKeyValidationCache(str(cache_path), 60)
+        cache.put(PRODUCTION_KEY, live_result(is_valid=False, error_code="UNAUTHORIZED"))
+
+        assert cache.get(PRODUCTION_KEY).error_code == "UNAUTHORIZED"
+        with patch("src.api_key_validator.time.time", return_value=time.time() + 61):
+            assert cache.get(PRODUCTION_KEY) is None
+        assert not APIKeyValidationCache(str(cache_path), 0).put(PRODUCTION_KEY, live_result())
+
+    def test_inconclusive_results_not_cached(self, cache_path):
+        """Test that network errors are retried instead of cached."""
+        cache = APIKeyValidationCache(str(cache_path), 3600)
+
+        assert not cache.put(PRODUCTION_KEY, live_result(is_valid=False, error_code="CONNECTION_ERROR"))
+        assert cache.get(PRODUCTION_KEY) is None
+
+    def test_corrupt_file(self, cache_path):
+        """Test that an unreadable cache file is treated as empty and rewritten."""
+        cache_path.parent.mkdir(parents=True)
+        cache_path.write_text("{not json", encoding="utf-8")
+        cache = APIKeyValidationCache(str(cache_path), 3600)
+
+        assert cache.get(PRODUCTION_KEY) is None
+        cache.put(PRODUCTION_KEY, live_result())
+        assert len(json.loads(cache_path.read_text(encoding="utf-8"))["entries"]) == 1
+
+
+class TestAPIKeyValidatorCaching:
+    """Test live validation through the cache."""
+
+    @pytest.fixture
+    def validator(self, tmp_path):
+        """Validator with a cache under tmp_path."""
+        return APIKeyValidator(Mock(), cache=APIKeyValidationCache(str(tmp_path / "cache.json"), 3600))
+
+    @pytest.mark.asyncio
+    async def test_live_check_once(self, validator):
+        """Test that the API is called once and later validations use the cache."""
+        with patch.object(validator, '_validate_production_key', new_callable=AsyncMock,
+                          return_value=live_result()) as live:
+            first = await validator.validate_with_policy(PRODUCTION_KEY)
+            second = await validator.validate_with_policy(PRODUCTION_KEY)
+
+        live.assert_awaited_once_with(PRODUCTION_KEY)
+        assert first.is_valid and not first.cached
+        assert second.is_valid and second.cached
+
+    @pytest.mark.asyncio
+    async def test_deferred_live_check(self, validator):
+        """Test that startup validation does not call the API without a cached result."""
+        with patch.object(validator, '_validate_production_key', new_callable=AsyncMock,
+                          return_value=live_result(is_valid=False, error_code="UNAUTHORIZED")) as live:
+            deferred = await validator.validate_with_policy(PRODUCTION_KEY, defer_live_check=True)
+            live.assert_not_awaited()
+
+            await validator.validate_api_key(PRODUCTION_KEY)
+            cached = await validator.validate_with_policy(PRODUCTION_KEY, defer_live_check=True)
+
+        assert deferred.is_valid and deferred.live_check_pending
+        assert not cached.is_valid and not cached.live_check_pending
+        assert cached.error_code == "UNAUTHORIZED"
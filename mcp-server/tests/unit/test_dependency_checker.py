@@ -0,0 +1,137 @@
+"""
+Unit tests for DependencyChecker.
+Tests concurrent checks, version lookups from package metadata and the
+persisted probe cache of system commands.
+"""
+import importlib.metadata
+import os
+import stat
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.dependency_checker import (
+    DependencyChecker,
+    DependencyRequirement,
+    DependencyStatus,
+    DependencyType,
+)
+
+
+def make_command(directory, name, version, delay=0.0, exit_code=0):
+    """Create an executable that counts its runs and prints a version."""
+    counter = directory / f"{name}.runs"
+    script = directory / name
+    script.write_text(
+        "#!/bin/sh\n"
+        f"echo run >> '{counter}'\n"
+        f"sleep {delay}\n"
+        f"echo {version}\n"
+        f"exit {exit_code}\n",
+        encoding="utf-8",
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return script, counter
+
+
+def command_requirement(name):
+    """Optional system command probed with --version."""
+    return DependencyRequirement(
+        name=name,
+        type=DependencyType.SYSTEM_COMMAND,
+        required=False,
+        description=f"{name} command",
+        check_command=f"{name} --version",
+    )
+
+
+def run_count(counter):
+    """Number of times a command created by make_command ran."""
+    return len(counter.read_text().splitlines()) if counter.exists() else 0
+
+
+@pytest.mark.skipif(os.name == "nt", reason="Uses shell scripts as fake commands")
+class TestSystemCommandProbes:
+    """Test probing system commands."""
+
+    @pytest.fixture
+    def bin_dir(self, tmp_path, monkeypatch):
+        """Directory of fake commands, first on PATH."""
+        directory = tmp_path / "bin"
+        directory.mkdir()
+        monkeypatch.setenv("PATH", f"{directory}{os.pathsep}{os.environ['PATH']}")
+        return directory
+
+    def make_checker(self, cache_path, names):
+        """Checker of the given commands, persisting probes to cache_path."""
+        checker = DependencyChecker(Mock(), probe_cache_path=str(cache_path) if cache_path else None)
+        checker.requirements = [command_requirement(name) for name in names]
+        return checker
+
+    @pytest.mark.asyncio
+    async def test_probes_run_concurrently(self, bin_dir):
+        """Test that slow version commands are probed at the same time."""
+        for name in ("fake-a", "fake-b", "fake-c"):
+            make_command(bin_dir, name, f"{name} 1.0", delay=0.3)
+        checker = self.make_checker(None, ["fake-a", "fake-b", "fake-c"])
+
+        start = time.perf_counter()
+        results = await checker.check_all_dependencies(force_refresh=True)
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.8
+        assert list(results["dependencies"]) == ["fake-a", "fake-b", "fake-c"]
+        assert results["dependencies"]["fake-b"]["version"] == "fake-b 1.0"
+
+    @pytest.mark.asyncio
+    async def test_probe_cache_survives_restart(self, bin_dir, tmp_path):
+        """Test that an unchanged binary is not probed again and a changed one is."""
+        cache_path = tmp_path / ".state" / "dependency_probes.json"
+        script, counter = make_command(bin_dir, "fake-tool", "fake-tool 1.0")
+
+        await self.make_checker(cache_path, ["fake-tool"]).check_all_dependencies(force_refresh=True)
+        restarted = await self.make_checker(cache_path, ["fake-tool"]).check_all_dependencies(force_refresh=True)
+
+        assert run_count(counter) == 1
+        assert restarted["dependencies"]["fake-tool"]["version"] == "fake-tool 1.0"
+
+        make_command(bin_dir, "fake-tool", "fake-tool 2.0")
+        os.utime(script, ns=(time.time_ns(), script.stat().st_mtime_ns + 1_000_000_000))
+        upgraded = await self.make_checker(cache_path, ["fake-tool"]).check_all_dependencies(force_refresh=True)
+
+        assert run_count(counter) == 2
+        assert upgraded["dependencies"]["fake-tool"]["version"] == "fake-tool 2.0"
+
+    @pytest.mark.asyncio
+    async def test_failed_probe_cached(self, bin_dir, tmp_path):
+        """Test that a failing version command is reported invalid and cached with the binary."""
+        cache_path = tmp_path / "dependency_probes.json"
+        _, counter = make_command(bin_dir, "fake-broken", "oops", exit_code=3)
+
+        first = await self.make_checker(cache_path, ["fake-broken"]).check_all_dependencies(force_refresh=True)
+        second = await self.make_checker(cache_path, ["fake-broken"]).check_all_dependencies(force_refresh=True)
+
+        assert first["dependencies"]["fake-broken"]["status"] == DependencyStatus.INVALID.value
+        assert second["dependencies"]["fake-broken"]["troubleshooting"] == \
+            first["dependencies"]["fake-broken"]["troubleshooting"]
+        assert run_count(counter) == 1
+
+
+class TestPythonLibraries:
+    """Test checking Python libraries."""
+
+    @pytest.mark.asyncio
+    async def test_version_from_metadata(self):
+        """Test that versions come from package metadata without importing the module."""
+        checker = DependencyChecker(Mock())
+        requirement = DependencyRequirement(
+            name="pytest", type=DependencyType.PYTHON_LIBRARY, required=True, description="pytest")
+
+        with patch("importlib.import_module") as import_module:
+            result = await checker._check_python_library(requirement)
+            startup = await checker._check_python_library(requirement, detect_version=False)
+
+        import_module.assert_not_called()
+        assert result.version == importlib.metadata.version("pytest")
+        assert startup.status == DependencyStatus.AVAILABLE and startup.version is None
@@ -4,6 +4,7 @@ Tests file saving, retrieval, and cleanup functionality.
 """
 import asyncio
 import os
+import sys
 import tempfile
 import time
 from datetime import datetime, timedelta
@@ -13,7 +14,14 @@ import threading
 
 import pytest
 
-from src.file_service import FileService, TempFile, FileServiceError
+from src import server
+from src.file_service import (
+    FileService, FileIndex, TempFile, FileServiceError, map_file, read_file_range, shard_prefix
+)
+from src.image_service import CLIAvailabilityResult, ImageService
+from src.metadata_store import METADATA_DB_NAME
+from src.tools import convert_to_png
+from tests.fixtures.sample_xml import MINIMAL_VALID_XML
 
 
 class TestFileServiceInitialization:
@@ -361,6 +369,23 @@ class TestFileServicePNGOperations:
             # Clean up
             Path(png_file_path).unlink(missing_ok=True)
     
+    @pytest.mark.asyncio
+    async def test_register_file_with_known_digest(self, file_service):
+        """Test registering a rendered file in place with caller-provided size and hash."""
+        svg_path = Path(file_service.temp_dir) / "diagram.svg"
+        svg_path.write_text("<svg/>")
+        
+        file_id = await file_service.register_file(
+            "diagram", str(svg_path), file_type="svg", size_bytes=6, content_sha256="abc123"
+        )
+        
+        assert file_id == "diagram_svg"
+        temp_file = file_service.temp_files[file_id]
+        assert temp_file.file_type == "svg"
+        assert temp_file.path == str(svg_path)
+        assert temp_file.size_bytes == 6
+        assert temp_file.content_sha256 == "abc123"
+    
     @pytest.mark.asyncio
     async def test_save_png_file_not_exists(self, file_service):
         """Test error when PNG file doesn't exist."""
@@ -573,6 +598,7 @@ class TestFileServiceStatistics:
         assert stats["expired_files"] == 0
         assert stats["drawio_files"] == 0
         assert stats["png_files"] == 0
+        assert stats["files_by_type"] == {}
         assert "cleanup_running" in stats
     
     @pytest.mark.asyncio
@@ -589,6 +615,7 @@ class TestFileServiceStatistics:
         
         try:
             await file_service.save_png_file("test_id", png_file_path)
+            await file_service.register_file("test_id", png_file_path, file_type="svg")
             
             # Create expired file
             expired_file_id = await file_service.save_drawio_file(xml_content)
@@ -597,11 +624,12 @@ class TestFileServiceStatistics:
             
             stats = file_service.get_stats()
             
-            assert stats["total_files"] == 3
-            assert stats["active_files"] == 2  # drawio + png
+            assert stats["total_files"] == 4
+            assert stats["active_files"] == 3  # drawio + png + svg
             assert stats["expired_files"] == 1
             assert stats["drawio_files"] == 2
             assert stats["png_files"] == 1
+            assert stats["files_by_type"] == {"drawio": 2, "png": 1, "svg": 1}
             
         finally:
             Path(png_file_path).unlink(missing_ok=True)
@@ -641,6 +669,35 @@ class TestFileServiceCleanupScheduler:
         # Should stop within reasonable time
         time.sleep(0.1)
         assert not file_service._cleanup_thread.is_alive()
+    
+    @pytest.mark.asyncio
+    async def test_file_removed_at_expiry(self, file_service):
+        """Test that the scheduler removes a file shortly after it expires, well before the sweep interval."""
+        file_id = await file_service.save_drawio_file("<mxfile>short lived</mxfile>")
+        file_path = Path(file_service.temp_files[file_id].path)
+        
+        # Becomes the earliest expiry and wakes the scheduler
+        file_service.temp_files[file_id].expires_at = datetime.now() + timedelta(seconds=0.2)
+        
+        deadline = time.monotonic() + 3
+        while file_id in file_service.temp_files and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        
+        assert file_id not in file_service.temp_files
+        assert not file_path.exists()
+        
+        stats = file_service.get_stats()
+        assert stats["expired_files_removed"] == 1
+        assert 0 <= stats["expiry_lag_seconds_max"] < 1
+    
+    @pytest.mark.asyncio
+    async def test_next_expiry_reported(self, file_service):
+        """Test that the time until the next expiry is reported."""
+        assert file_service.get_stats()["next_expiry_in_seconds"] is None
+        
+        await file_service.save_drawio_file("<mxfile>long lived</mxfile>")
+        
+        assert file_service.get_stats()["next_expiry_in_seconds"] > 3600
 
 
 class TestFileServiceErrorHandling:
@@ -749,4 +806,882 @@ class TestFileServiceAsyncOperations:
         for file_id in file_ids:
             assert file_id in file_service.temp_files
             file_path = await file_service.get_file_path(file_id)
-            assert Path(file_path).exists()
\ No newline at end of file
+            assert Path(file_path).exists()
+
+
+class TestFileIndex:
+    """Test path and expiry indexes of file metadata."""
+    
+    def make_temp_file(self, file_id, path, expires_in_hours):
+        """Create TempFile metadata expiring relative to now."""
+        now = datetime.now()
+        return TempFile(
+            id=file_id,
+            original_name=file_id,
+            path=path,
+            file_type="drawio",
+            created_at=now,
+            expires_at=now + timedelta(hours=expires_in_hours)
+        )
+    
+    def test_indexes_follow_insert_and_delete(self):
+        """Test that path and expiry indexes are maintained on every change."""
+        index = FileIndex()
+        index["a"] = self.make_temp_file("a", "/tmp/a.drawio", -1)
+        index["b"] = self.make_temp_file("b", "/tmp/b.drawio", 1)
+        
+        assert index.indexed_paths() == {"/tmp/a.drawio", "/tmp/b.drawio"}
+        assert index.get_ids_by_path("/tmp/a.drawio") == {"a"}
+        
+        del index["a"]
+        
+        assert index.indexed_paths() == {"/tmp/b.drawio"}
+        assert index.expired_ids(datetime.now()) == []
+        assert dict(index) == {"b": index["b"]}
+    
+    def test_snapshots_while_another_thread_writes(self):
+        """Test that reading the index is safe while another thread inserts and deletes."""
+        index = FileIndex()
+        for number in range(200):
+            index[f"base{number}"] = self.make_temp_file(f"base{number}", f"/tmp/base{number}.drawio", 1)
+        done = threading.Event()
+        
+        def write():
+            for number in range(2000):
+                index[f"new{number}"] = self.make_temp_file(f"new{number}", f"/tmp/new{number}.drawio", 1)
+                del index[f"new{number}"]
+            done.set()
+        
+        writer = threading.Thread(target=write)
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            writer.start()
+            while not done.is_set():
+                assert sum(1 for f in index.snapshot_values() if f.file_type == "drawio") >= 200
+                assert len([file_id for file_id, _ in index.snapshot_items()]) >= 200
+                assert len(list(index)) >= 200
+                assert len(index.indexed_paths()) >= 200
+        finally:
+            sys.setswitchinterval(interval)
+            writer.join()
+        
+        assert len(index.snapshot_values()) == 200
+    
+    def test_expired_ids_ordered_and_rescheduled(self):
+        """Test that expired IDs come out earliest first and follow expires_at changes."""
+        index = FileIndex()
+        for file_id, hours in (("late", -1), ("early", -3), ("active", 2)):
+            index[file_id] = self.make_temp_file(file_id, f"/tmp/{file_id}.drawio", hours)
+        
+        # Extending an expired file removes it from the expired set
+        index["late"].expires_at = datetime.now() + timedelta(hours=1)
+        # Shortening an active file adds it
+        index["active"].expires_at = datetime.now() - timedelta(hours=2)
+        
+        assert index.expired_ids(datetime.now()) == ["early", "active"]
+        # Expired IDs are handed out once
+        assert index.expired_ids(datetime.now()) == []
+    
+    def test_shared_path_kept_until_last_owner_removed(self):
+        """Test that a path registered under two IDs stays indexed until both are removed."""
+        index = FileIndex()
+        index["x_png"] = self.make_temp_file("x_png", "/tmp/shared.png", 1)
+        index["y_png"] = self.make_temp_file("y_png", "/tmp/shared.png", 1)
+        
+        del index["x_png"]
+        assert index.indexed_paths() == {"/tmp/shared.png"}
+        
+        del index["y_png"]
+        assert index.indexed_paths() == set()
+    
+    @pytest.mark.asyncio
+    async def test_cleanup_keeps_registered_renders(self):
+        """Test that files registered from inside temp_dir are not treated as orphans."""
+        FileService._instance = None
+        FileService._initialized = False
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch('src.file_service.FileService._start_cleanup_scheduler'):
+                service = FileService(temp_dir=temp_dir, file_expiry_hours=24)
+            
+            png_path = service.temp_dir / "render.png"
+            png_path.write_bytes(b"png")
+            await service.register_file("render", str(png_path), file_type="png")
+            
+            assert await service.cleanup_expired_files() == 0
+            assert png_path.exists()
+        
+        FileService._instance = None
+        FileService._initialized = False
+
+
+class TestFileServicePersistence:
+    """Test that file metadata survives restarts."""
+    
+    def start_service(self, temp_dir):
+        """Start a fresh FileService singleton on temp_dir."""
+        FileService._instance = None
+        FileService._initialized = False
+        with patch('src.file_service.FileService._start_cleanup_scheduler'):
+            return FileService(temp_dir=temp_dir, file_expiry_hours=24)
+    
+    @pytest.fixture
+    def temp_dir(self):
+        """Provide a temp directory and reset the singleton afterwards."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield temp_dir
+        FileService._instance = None
+        FileService._initialized = False
+    
+    @pytest.mark.asyncio
+    async def test_file_ids_survive_restart(self, temp_dir):
+        """Test that saved and registered files are found again after a restart."""
+        service = self.start_service(temp_dir)
+        drawio_id = await service.save_drawio_file("<mxfile>persisted</mxfile>", "persisted")
+        png_path = service.temp_dir / "persisted.png"
+        png_path.write_bytes(b"png")
+        png_id = await service.register_file(drawio_id, str(png_path), file_type="png", size_bytes=3)
+        service.temp_files[drawio_id].content_sha256 = "abc"
+        service.close()
+        
+        restarted = self.start_service(temp_dir)
+        
+        assert set(restarted.temp_files) == {drawio_id, png_id}
+        assert restarted.temp_files[drawio_id].content_sha256 == "abc"
+        assert restarted.temp_files[png_id].size_bytes == 3
+        assert Path(await restarted.get_file_path(drawio_id)).read_text() == "<mxfile>persisted</mxfile>"
+        # Nothing is mistaken for an orphan, including the database itself
+        assert await restarted.cleanup_expired_files() == 0
+        assert (restarted.temp_dir / METADATA_DB_NAME).exists()
+        restarted.close()
+    
+    @pytest.mark.asyncio
+    async def test_reconcile_drops_missing_and_keeps_expired(self, temp_dir):
+        """Test that boot reconciliation drops rows without files and leaves expiry to cleanup."""
+        service = self.start_service(temp_dir)
+        missing_id = await service.save_drawio_file("<mxfile>missing</mxfile>")
+        expired_id = await service.save_drawio_file("<mxfile>expired</mxfile>")
+        service.temp_files[expired_id].expires_at = datetime.now() - timedelta(hours=1)
+        Path(service.temp_files[missing_id].path).unlink()
+        expired_path = Path(service.temp_files[expired_id].path)
+        service.close()
+        
+        restarted = self.start_service(temp_dir)
+        
+        assert set(restarted.temp_files) == {expired_id}
+        # The expired file plus the now unreferenced blob of the dropped record
+        assert await restarted.cleanup_expired_files() == 2
+        assert not expired_path.exists()
+        restarted.close()
+        
+        # Removals are persisted as well
+        assert len(self.start_service(temp_dir).temp_files) == 0
+    
+    @pytest.mark.asyncio
+    async def test_corrupt_database_recovered(self, temp_dir):
+        """Test that an unreadable database is moved aside, kept by the orphan sweep, instead of failing startup."""
+        (Path(temp_dir) / METADATA_DB_NAME).write_bytes(b"not a sqlite database" * 100)
+        
+        service = self.start_service(temp_dir)
+        
+        assert len(service.temp_files) == 0
+        assert service.temp_files.store is not None
+        corrupt_path = Path(temp_dir) / (METADATA_DB_NAME + ".corrupt")
+        assert corrupt_path.exists()
+        
+        old = time.time() - 24 * 3600
+        os.utime(corrupt_path, (old, old))
+        await service.cleanup_expired_files()
+        assert corrupt_path.exists()
+        service.close()
+    
+    @pytest.mark.asyncio
+    async def test_persistence_disabled(self, temp_dir):
+        """Test that persist_metadata=False keeps metadata in memory only."""
+        FileService._instance = None
+        FileService._initialized = False
+        with patch('src.file_service.FileService._start_cleanup_scheduler'):
+            service = FileService(temp_dir=temp_dir, persist_metadata=False)
+        
+        await service.save_drawio_file("<mxfile>memory</mxfile>")
+        
+        assert service.temp_files.store is None
+        assert not (Path(temp_dir) / METADATA_DB_NAME).exists()
+
+
+class TestFileServiceDedup:
+    """Test content-addressed storage of saved Draw.io files."""
+    
+    @pytest.fixture
+    def file_service(self):
+        """Create FileService instance for testing."""
+        FileService._instance = None
+        FileService._initialized = False
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch('src.file_service.FileService._start_cleanup_scheduler'):
+                service = FileService(temp_dir=temp_dir, file_expiry_hours=24)
+                yield service
+                service.close()
+        
+        FileService._instance = None
+        FileService._initialized = False
+    
+    @pytest.mark.asyncio
+    async def test_identical_content_stored_once(self, file_service):
+        """Test that identical payloads share one blob and keep their own filenames."""
+        xml_content = "<mxfile>same diagram</mxfile>"
+        first_id = await file_service.save_drawio_file(xml_content, "first")
+        second_id = await file_service.save_drawio_file(xml_content, "second")
+        
+        first = file_service.temp_files[first_id]
+        second = file_service.temp_files[second_id]
+        blob_path = file_service._blob_path(first.blob_sha256)
+        
+        assert first.blob_sha256 == second.blob_sha256
+        assert first.path.endswith("first.drawio")
+        assert second.path.endswith("second.drawio")
+        assert Path(second.path).read_text(encoding="utf-8") == xml_content
+        assert Path(first.path).stat().st_ino == blob_path.stat().st_ino
+        assert blob_path.parent.parent.name == first.blob_sha256[:2]
+        
+        stats = file_service.get_stats()
+        size = len(xml_content.encode("utf-8"))
+        assert stats["blob_count"] == 1
+        assert stats["dedup_logical_bytes"] == 2 * size
+        assert stats["dedup_stored_bytes"] == size
+        assert stats["dedup_bytes_saved"] == size
+        assert stats["dedup_ratio"] == 2.0
+    
+    @pytest.mark.asyncio
+    async def test_blob_removed_with_last_reference(self, file_service):
+        """Test that a blob outlives all but its last referencing file."""
+        xml_content = "<mxfile>shared</mxfile>"
+        first_id = await file_service.save_drawio_file(xml_content)
+        second_id = await file_service.save_drawio_file(xml_content)
+        blob_path = file_service._blob_path(file_service.temp_files[first_id].blob_sha256)
+        
+        await file_service._remove_file(first_id)
+        assert blob_path.exists()
+        assert Path(await file_service.get_file_path(second_id)).read_text(encoding="utf-8") == xml_content
+        
+        await file_service._remove_file(second_id)
+        assert not blob_path.exists()
+        assert file_service.get_stats()["dedup_stored_bytes"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_unreferenced_blob_swept(self, file_service):
+        """Test that blobs without references are removed by the orphan sweep."""
+        orphan_blob = file_service._blob_path("ab" * 32)
+        orphan_blob.parent.mkdir(parents=True)
+        orphan_blob.write_bytes(b"<mxfile>left over</mxfile>")
+        kept_id = await file_service.save_drawio_file("<mxfile>kept</mxfile>")
+        
+        assert await file_service.cleanup_expired_files() == 1
+        assert not orphan_blob.exists()
+        assert file_service._blob_path(file_service.temp_files[kept_id].blob_sha256).exists()
+
+
+class TestFileServiceCompression:
+    """Test compressed storage of saved Draw.io files."""
+    
+    @pytest.fixture
+    def file_service(self):
+        """Create FileService instance storing Draw.io files compressed."""
+        FileService._instance = None
+        FileService._initialized = False
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch('src.file_service.FileService._start_cleanup_scheduler'):
+                service = FileService(temp_dir=temp_dir, file_expiry_hours=24, compress_drawio=True)
+                yield service
+                service.close()
+        
+        FileService._instance = None
+        FileService._initialized = False
+    
+    def build_diagram(self, cell_count: int) -> str:
+        """Build a diagram large enough to benefit from compression."""
+        cells = "".join(
+            f'<mxCell id="v{index}" value="Node {index}" style="rounded=1;whiteSpace=wrap;html=1;" '
+            f'vertex="1" parent="1"><mxGeometry x="{index * 10}" y="40" width="120" height="60" as="geometry"/></mxCell>'
+            for index in range(cell_count)
+        )
+        return (
+            '<mxfile><diagram name="Page-1"><mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/>'
+            + cells + '</root></mxGraphModel></diagram></mxfile>'
+        )
+    
+    @pytest.mark.asyncio
+    async def test_compressed_save_and_read(self, file_service):
+        """Test that diagrams are stored compressed and inflated on read."""
+        xml_content = self.build_diagram(50)
+        file_id = await file_service.save_drawio_file(xml_content)
+        temp_file = file_service.temp_files[file_id]
+        stored = Path(temp_file.path).read_text(encoding="utf-8")
+        
+        assert temp_file.compressed
+        assert temp_file.size_bytes == len(stored.encode("utf-8")) < len(xml_content) / 4
+        assert "<mxGraphModel" not in stored
+        
+        inflated = await file_service.read_drawio_xml(file_id)
+        assert "<mxGraphModel>" in inflated and 'value="Node 49"' in inflated
+    
+    @pytest.mark.asyncio
+    async def test_small_or_foreign_content_stored_plain(self, file_service):
+        """Test that content that does not shrink or parse is stored as given."""
+        for xml_content in ("<mxfile>short</mxfile>", "<mxfile><diagram>"):
+            file_id = await file_service.save_drawio_file(xml_content)
+            
+            assert not file_service.temp_files[file_id].compressed
+            assert await file_service.read_drawio_xml(file_id) == xml_content
+    
+    @pytest.mark.asyncio
+    async def test_compressed_flag_persisted(self, file_service):
+        """Test that the storage mode survives a restart."""
+        file_id = await file_service.save_drawio_file(self.build_diagram(20))
+        temp_dir = str(file_service.temp_dir)
+        file_service.close()
+        FileService._instance = None
+        FileService._initialized = False
+        
+        with patch('src.file_service.FileService._start_cleanup_scheduler'):
+            restarted = FileService(temp_dir=temp_dir, file_expiry_hours=24)
+        try:
+            assert restarted.temp_files[file_id].compressed
+            assert 'value="Node 19"' in await restarted.read_drawio_xml(file_id)
+        finally:
+            restarted.close()
+
+
+class TestMappedReads:
+    """Test memory-mapped file reads."""
+    
+    def test_map_file_and_range(self, tmp_path):
+        """Test mapped views, ranges and empty files."""
+        path = tmp_path / "data.bin"
+        path.write_bytes(b"0123456789")
+        empty = tmp_path / "empty.bin"
+        empty.write_bytes(b"")
+        
+        with map_file(path) as view:
+            assert bytes(view) == b"0123456789"
+        assert read_file_range(path, 3, 4) == b"3456"
+        assert read_file_range(path, 8, 10) == b"89"
+        with map_file(empty) as view:
+            assert len(view) == 0
+
+
+class TestFileServiceDurableWrites:
+    """Test atomic writes, durability policies and unique name allocation."""
+    
+    @pytest.fixture
+    def make_service(self):
+        """Create FileService instances with a given durability policy."""
+        services = []
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def make(durability="file"):
+                FileService._instance = None
+                FileService._initialized = False
+                with patch('src.file_service.FileService._start_cleanup_scheduler'):
+                    service = FileService(temp_dir=temp_dir, persist_metadata=False, durability=durability)
+                services.append(service)
+                return service
+            
+            yield make
+            for service in services:
+                service.close()
+        
+        FileService._instance = None
+        FileService._initialized = False
+    
+    def test_unknown_policy_rejected(self, make_service):
+        """Test that unknown durability policies are rejected."""
+        with pytest.raises(ValueError):
+            make_service("always")
+    
+    @pytest.mark.asyncio
+    async def test_colliding_names_use_stem_counter(self, make_service):
+        """Test that repeated names get suffixes without probing every taken name."""
+        file_service = make_service()
+        paths = [
+            file_service.temp_files[await file_service.save_drawio_file(f"<mxfile>{index}</mxfile>", "dup")].path
+            for index in range(3)
+        ]
+        
+        assert [Path(path).name for path in paths] == ["dup.drawio", "dup_1.drawio", "dup_2.drawio"]
+        
+        with patch('src.file_service.os.link', wraps=os.link) as mock_link:
+            file_id = await file_service.save_drawio_file("<mxfile>3</mxfile>", "dup")
+        
+        assert file_service.temp_files[file_id].path.endswith("dup_3.drawio")
+        assert mock_link.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_copy_when_hard_links_unsupported(self, make_service):
+        """Test that a save without hard link support gets a .drawio copy that converts."""
+        file_service = make_service()
+        image_service = ImageService()
+        
+        with patch('src.file_service.os.link', side_effect=PermissionError("links not permitted")):
+            file_id = await file_service.save_drawio_file(MINIMAL_VALID_XML, "nolink")
+        
+        temp_file = file_service.temp_files[file_id]
+        assert Path(temp_file.path).name == "nolink.drawio"
+        assert temp_file.blob_sha256 is None
+        assert not [path for path in (file_service.temp_dir / "blobs").rglob("*") if path.is_file()]
+        assert file_service.temp_files.blob_count == 0
+        
+        with patch.object(server, 'file_service', file_service), \
+             patch.object(server, 'image_service', image_service), \
+             patch.object(image_service, 'is_drawio_cli_available',
+                          return_value=CLIAvailabilityResult(available=False, error="CLI not found")):
+            result = await convert_to_png(file_id=file_id, format="svg")
+        
+        assert result["success"] is True, result["error"]
+        assert "<svg" in Path(result["png_file_path"]).read_text(encoding="utf-8")
+        
+        await file_service._remove_file(file_id)
+        assert not Path(temp_file.path).exists()
+    
+    @pytest.mark.asyncio
+    async def test_existing_file_never_overwritten(self, make_service):
+        """Test that a name taken outside the service is skipped, not replaced."""
+        file_service = make_service()
+        foreign = file_service.temp_dir / "report.drawio"
+        foreign.write_text("<mxfile>foreign</mxfile>", encoding="utf-8")
+        
+        file_id = await file_service.save_drawio_file("<mxfile>ours</mxfile>", "report")
+        
+        assert foreign.read_text(encoding="utf-8") == "<mxfile>foreign</mxfile>"
+        assert file_service.temp_files[file_id].path.endswith("report_1.drawio")
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_saves_get_distinct_names(self, make_service):
+        """Test that concurrent saves of one name never share a file."""
+        file_service = make_service()
+        file_ids = await asyncio.gather(*(
+            file_service.save_drawio_file(f"<mxfile>{index}</mxfile>", "same") for index in range(20)
+        ))
+        
+        paths = {file_service.temp_files[file_id].path for file_id in file_ids}
+        assert len(paths) == 20
+        for file_id in file_ids:
+            content = Path(file_service.temp_files[file_id].path).read_text(encoding="utf-8")
+            assert content == Path(file_service._blob_path(file_service.temp_files[file_id].blob_sha256)).read_text(encoding="utf-8")
+    
+    @pytest.mark.asyncio
+    async def test_durability_policies(self, make_service):
+        """Test which writes are synced under each policy."""
+        fsync_counts = {}
+        for durability in ("none", "file", "full"):
+            file_service = make_service(durability)
+            with patch('src.file_service.os.fsync') as mock_fsync:
+                await file_service.save_drawio_file(f"<mxfile>{durability}</mxfile>")
+            fsync_counts[durability] = mock_fsync.call_count
+        
+        # "full" also syncs the blob directory and the directory holding the link
+        assert fsync_counts == {"none": 0, "file": 1, "full": 3}
+    
+    @pytest.mark.asyncio
+    async def test_failed_write_leaves_no_partial_file(self, make_service):
+        """Test that an interrupted write never appears under a final name."""
+        file_service = make_service()
+        
+        with patch.object(file_service, '_write_file', side_effect=OSError("disk full")):
+            with pytest.raises(FileServiceError):
+                await file_service.save_drawio_file("<mxfile>lost</mxfile>", "partial")
+        
+        assert not (file_service.temp_dir / "partial.drawio").exists()
+        assert list((file_service.temp_dir / "blobs").rglob("*.tmp")) == []
+    
+    @pytest.mark.asyncio
+    async def test_sweep_keeps_in_flight_temp_files(self, make_service):
+        """Test that the orphan sweep only removes stale temporary blob files."""
+        file_service = make_service()
+        blob_dir = file_service._blob_path("cd" * 32).parent
+        blob_dir.mkdir(parents=True)
+        fresh = blob_dir / ("cd" * 32 + ".fresh.tmp")
+        stale = blob_dir / ("cd" * 32 + ".stale.tmp")
+        fresh.write_bytes(b"in flight")
+        stale.write_bytes(b"interrupted")
+        old = time.time() - 3600
+        os.utime(stale, (old, old))
+        
+        assert await file_service.cleanup_expired_files() == 1
+        assert fresh.exists()
+        assert not stale.exists()
+
+
+class TestFileServiceQuota:
+    """Test storage quota enforcement and eviction."""
+    
+    @pytest.fixture
+    def make_service(self):
+        """Create FileService instances with the given quota settings."""
+        services = []
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def make(**quota):
+                FileService._instance = None
+                FileService._initialized = False
+                with patch('src.file_service.FileService._start_cleanup_scheduler'):
+                    service = FileService(temp_dir=temp_dir, **quota)
+                services.append(service)
+                return service
+            
+            yield make
+            for service in services:
+                service.close()
+        
+        FileService._instance = None
+        FileService._initialized = False
+    
+    def test_invalid_quota_settings(self, make_service):
+        """Test that negative limits and unknown policies are rejected."""
+        with pytest.raises(ValueError):
+            make_service(max_files=-1)
+        with pytest.raises(ValueError):
+            make_service(eviction_policy="random")
+    
+    @pytest.mark.asyncio
+    async def test_lru_eviction_follows_access(self, make_service):
+        """Test that the least recently accessed file is evicted when max_files is reached."""
+        file_service = make_service(max_files=3)
+        first, second, third = [
+            await file_service.save_drawio_file(f"<mxfile>{index}</mxfile>", f"lru{index}") for index in range(3)
+        ]
+        await file_service.get_file_path(first)
+        
+        fourth = await file_service.save_drawio_file("<mxfile>3</mxfile>", "lru3")
+        
+        assert set(file_service.temp_files) == {first, third, fourth}
+        assert file_service.temp_files[first].last_accessed is not None
+        stats = file_service.get_stats()
+        assert stats["quota_evicted_files"] == 1
+        assert stats["max_files"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_expired_files_evicted_first(self, make_service):
+        """Test that expired files make room before live files are evicted."""
+        file_service = make_service(max_files=2)
+        expired = await file_service.save_drawio_file("<mxfile>old</mxfile>", "old")
+        live = await file_service.save_drawio_file("<mxfile>live</mxfile>", "live")
+        file_service.temp_files[expired].expires_at = datetime.now() - timedelta(hours=1)
+        
+        await file_service.save_drawio_file("<mxfile>new</mxfile>", "new")
+        
+        assert expired not in file_service.temp_files
+        assert live in file_service.temp_files
+        assert file_service.get_stats()["quota_evicted_files"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_largest_oldest_evicts_big_file(self, make_service):
+        """Test that the size-aware policy frees space by evicting the largest file."""
+        file_service = make_service(max_storage_bytes=1000, eviction_policy="largest_oldest")
+        small = await file_service.save_drawio_file("<mxfile>" + "s" * 40 + "</mxfile>", "small")
+        big = await file_service.save_drawio_file("<mxfile>" + "b" * 600 + "</mxfile>", "big")
+        
+        newest = await file_service.save_drawio_file("<mxfile>" + "n" * 400 + "</mxfile>", "newest")
+        
+        assert set(file_service.temp_files) == {small, newest}
+        assert not Path(file_service.temp_dir / "big.drawio").exists()
+        assert file_service.get_stats()["storage_bytes"] <= 1000
+    
+    @pytest.mark.asyncio
+    async def test_file_larger_than_quota_rejected(self, make_service):
+        """Test that a file that can never fit is rejected without evicting anything."""
+        file_service = make_service(max_storage_bytes=100)
+        kept = await file_service.save_drawio_file("<mxfile>kept</mxfile>", "kept")
+        
+        with pytest.raises(FileServiceError):
+            await file_service.save_drawio_file("<mxfile>" + "x" * 200 + "</mxfile>", "huge")
+        
+        assert list(file_service.temp_files) == [kept]
+        assert file_service._quota_reserved == {"bytes": 0, "files": 0}
+    
+    @pytest.mark.asyncio
+    async def test_usage_by_type(self, make_service):
+        """Test that usage is reported per file type and shared blobs count once on disk."""
+        file_service = make_service()
+        drawio_id = await file_service.save_drawio_file("<mxfile>usage</mxfile>", "usage")
+        await file_service.save_drawio_file("<mxfile>usage</mxfile>", "usage_copy")
+        png_path = file_service.temp_dir / "usage.png"
+        png_path.write_bytes(b"png-bytes")
+        await file_service.register_file(drawio_id, str(png_path), file_type="png")
+        
+        stats = file_service.get_stats()
+        
+        assert stats["usage_by_type"] == {
+            "drawio": {"files": 2, "bytes": 2 * len("<mxfile>usage</mxfile>")},
+            "png": {"files": 1, "bytes": 9},
+        }
+        assert stats["storage_bytes"] == len("<mxfile>usage</mxfile>") + 9
+    
+    @pytest.mark.asyncio
+    async def test_access_time_persisted(self, make_service):
+        """Test that access timestamps, and so the LRU order, survive a restart."""
+        file_service = make_service(max_files=2)
+        first = await file_service.save_drawio_file("<mxfile>a</mxfile>", "a")
+        second = await file_service.save_drawio_file("<mxfile>b</mxfile>", "b")
+        await file_service.get_file_path(first)
+        accessed = file_service.temp_files[first].last_accessed
+        file_service.close()
+        
+        restarted = make_service(max_files=2)
+        assert restarted.temp_files[first].last_accessed == accessed
+        
+        await restarted.save_drawio_file("<mxfile>c</mxfile>", "c")
+        assert first in restarted.temp_files
+        assert second not in restarted.temp_files
+
+
+class TestFileServiceShardedLayout:
+    """Test the hash-prefix sharded storage layout and migration to it."""
+    
+    @pytest.fixture
+    def make_service(self):
+        """Create FileService instances on one temp directory with a given layout."""
+        services = []
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def make(storage_layout="sharded", **options):
+                FileService._instance = None
+                FileService._initialized = False
+                with patch('src.file_service.FileService._start_cleanup_scheduler'):
+                    service = FileService(temp_dir=temp_dir, storage_layout=storage_layout, **options)
+                services.append(service)
+                return service
+            
+            yield make
+            for service in services:
+                service.close()
+        
+        FileService._instance = None
+        FileService._initialized = False
+    
+    def test_unknown_layout_rejected(self, make_service):
+        """Test that unknown layouts are rejected."""
+        with pytest.raises(ValueError):
+            make_service("nested")
+    
+    @pytest.mark.asyncio
+    async def test_files_saved_in_shards(self, make_service):
+        """Test that saves land in the shard directory of their stem, suffixes included."""
+        file_service = make_service()
+        first = await file_service.save_drawio_file("<mxfile>1</mxfile>", "sharded")
+        second = await file_service.save_drawio_file("<mxfile>2</mxfile>", "sharded")
+        
+        shard = file_service.temp_dir / "files" / shard_prefix("sharded")
+        assert file_service.storage_dir("sharded") == shard
+        assert Path(file_service.temp_files[first].path) == shard / "sharded.drawio"
+        assert Path(file_service.temp_files[second].path) == shard / "sharded_1.drawio"
+        assert not (file_service.temp_dir / "sharded.drawio").exists()
+        assert file_service.get_stats()["storage_layout"] == "sharded"
+    
+    @pytest.mark.asyncio
+    async def test_flat_layout_unchanged(self, make_service):
+        """Test that the flat layout keeps files directly in temp_dir."""
+        file_service = make_service("flat")
+        file_id = await file_service.save_drawio_file("<mxfile>flat</mxfile>", "flat")
+        
+        assert Path(file_service.temp_files[file_id].path) == file_service.temp_dir / "flat.drawio"
+        assert file_service.storage_dir("flat") == file_service.temp_dir
+    
+    @pytest.mark.asyncio
+    async def test_migration_from_flat(self, make_service):
+        """Test that switching to the sharded layout moves managed files and persists their paths."""
+        flat = make_service("flat")
+        drawio_id = await flat.save_drawio_file("<mxfile>migrate</mxfile>", "migrate")
+        png_path = flat.temp_dir / "migrate.png"
+        png_path.write_bytes(b"png")
+        png_id = await flat.register_file(drawio_id, str(png_path), file_type="png")
+        orphan = flat.temp_dir / "orphan.txt"
+        orphan.write_text("no metadata")
+        flat.close()
+        
+        sharded = make_service()
+        drawio_path = Path(await sharded.get_file_path(drawio_id))
+        png_path_after = Path(await sharded.get_file_path(png_id))
+        
+        assert drawio_path == sharded.storage_dir("migrate") / "migrate.drawio"
+        assert drawio_path.read_text(encoding="utf-8") == "<mxfile>migrate</mxfile>"
+        assert png_path_after.read_bytes() == b"png"
+        assert not (sharded.temp_dir / "migrate.drawio").exists()
+        assert not png_path.exists()
+        # Unmanaged files are left for the orphan sweep
+        assert orphan.exists()
+        assert sharded.temp_files.get_ids_by_path(str(drawio_path)) == {drawio_id}
+        sharded.close()
+        
+        restarted = make_service()
+        assert Path(restarted.temp_files[drawio_id].path) == drawio_path
+        assert await restarted.cleanup_expired_files() == 1
+        assert not orphan.exists()
+    
+    @pytest.mark.asyncio
+    async def test_interrupted_migration_resumes(self, make_service):
+        """Test that a file already linked into its shard by an interrupted migration is moved."""
+        flat = make_service("flat")
+        file_id = await flat.save_drawio_file("<mxfile>resume</mxfile>", "resume")
+        flat_path = Path(flat.temp_files[file_id].path)
+        flat.close()
+        shard_path = flat.temp_dir / "files" / shard_prefix("resume") / "resume.drawio"
+        shard_path.parent.mkdir(parents=True)
+        os.link(flat_path, shard_path)
+        
+        sharded = make_service()
+        
+        assert Path(sharded.temp_files[file_id].path) == shard_path
+        assert not flat_path.exists()
+    
+    @pytest.mark.asyncio
+    async def test_orphan_sweep_covers_shards(self, make_service):
+        """Test that files without metadata inside shard directories are swept."""
+        file_service = make_service()
+        file_id = await file_service.save_drawio_file("<mxfile>kept</mxfile>", "kept")
+        orphan = file_service.storage_dir("kept") / "stray.drawio"
+        orphan.write_text("<mxfile/>")
+        
+        assert await file_service.cleanup_expired_files() == 1
+        assert not orphan.exists()
+        assert Path(file_service.temp_files[file_id].path).exists()
+
+
+class TestFileServiceSharedStorage:
+    """Test several FileService workers sharing one temp_dir and metadata database."""
+    
+    @pytest.fixture
+    def make_worker(self):
+        """Create FileService workers on one temp directory, as separate processes would."""
+        workers = []
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def make(**options):
+                FileService._instance = None
+                FileService._initialized = False
+                with patch('src.file_service.FileService._start_cleanup_scheduler'):
+                    worker = FileService(temp_dir=temp_dir, shared_storage=True, **options)
+                workers.append(worker)
+                return worker
+            
+            yield make
+            for worker in workers:
+                worker.close()
+        
+        FileService._instance = None
+        FileService._initialized = False
+    
+    def test_requires_persisted_metadata(self, make_worker):
+        """Test that shared storage cannot run on in-memory metadata."""
+        with pytest.raises(ValueError):
+            make_worker(persist_metadata=False)
+    
+    @pytest.mark.asyncio
+    async def test_any_worker_serves_any_file_id(self, make_worker):
+        """Test that a file saved by one worker is resolved by another started earlier."""
+        first = make_worker()
+        second = make_worker()
+        file_id = await first.save_drawio_file("<mxfile>shared</mxfile>", "shared")
+        
+        assert await second.file_exists(file_id)
+        assert await second.get_file_path(file_id) == await first.get_file_path(file_id)
+        assert await second.read_drawio_xml(file_id) == "<mxfile>shared</mxfile>"
+        assert [f.id for f in await second.list_files()] == [file_id]
+    
+    @pytest.mark.asyncio
+    async def test_listing_reads_new_rows_only(self, make_worker):
+        """Test that later listings pick up other workers' files without reloading the store."""
+        first = make_worker()
+        second = make_worker()
+        older = await first.save_drawio_file("<mxfile>older</mxfile>", "older")
+        assert [f.id for f in await second.list_files()] == [older]
+        
+        newer = await first.save_drawio_file("<mxfile>newer</mxfile>", "newer")
+        with patch.object(second._metadata_store, 'load', side_effect=AssertionError("full reload")):
+            assert [f.id for f in await second.list_files()] == [older, newer]
+    
+    @pytest.mark.asyncio
+    async def test_single_cleanup_leader(self, make_worker):
+        """Test that one worker sweeps and another takes over when it exits."""
+        first = make_worker()
+        second = make_worker()
+        
+        await first.cleanup_expired_files()
+        await second.cleanup_expired_files()
+        
+        assert first.get_stats()["cleanup_leader"] is True
+        assert second.get_stats()["cleanup_leader"] is False
+        
+        first.close()
+        await second.cleanup_expired_files()
+        assert second.get_stats()["cleanup_leader"] is True
+    
+    @pytest.mark.asyncio
+    async def test_sweep_keeps_other_workers_files(self, make_worker):
+        """Test that the leader does not treat files of other workers as orphans."""
+        leader = make_worker()
+        other = make_worker()
+        file_id = await other.save_drawio_file("<mxfile>other</mxfile>", "other")
+        path = Path(other.temp_files[file_id].path)
+        in_flight = leader.temp_dir / "linked_not_stored.drawio"
+        in_flight.write_text("<mxfile/>")
+        
+        assert await leader.cleanup_expired_files() == 0
+        assert path.exists()
+        assert in_flight.exists()
+        
+        # Past the grace period an unreferenced file is an orphan
+        with patch('src.file_service.TEMP_WRITE_GRACE_SECONDS', 0):
+            assert await leader.cleanup_expired_files() == 1
+        assert path.exists()
+        assert not in_flight.exists()
+    
+    @pytest.mark.asyncio
+    async def test_leader_expires_files_of_exited_worker(self, make_worker):
+        """Test that files of a worker that exited are still removed when they expire."""
+        leader = make_worker()
+        exited = make_worker()
+        file_id = await exited.save_drawio_file("<mxfile>abandoned</mxfile>", "abandoned")
+        path = Path(exited.temp_files[file_id].path)
+        exited.temp_files[file_id].expires_at = datetime.now() - timedelta(minutes=1)
+        exited.close()
+        
+        assert await leader.cleanup_expired_files() == 1
+        assert not path.exists()
+        assert not await leader.file_exists(file_id)
+    
+    @pytest.mark.asyncio
+    async def test_shared_blob_kept_for_other_worker(self, make_worker):
+        """Test that a worker does not delete a blob another worker's file still references."""
+        first = make_worker()
+        second = make_worker()
+        first_id = await first.save_drawio_file("<mxfile>same</mxfile>", "a")
+        second_id = await second.save_drawio_file("<mxfile>same</mxfile>", "b")
+        blob_path = first._blob_path(first.temp_files[first_id].blob_sha256)
+        
+        await first._remove_file(first_id)
+        
+        assert blob_path.exists()
+        assert await second.read_drawio_xml(second_id) == "<mxfile>same</mxfile>"
+    
+    @pytest.mark.asyncio
+    async def test_quota_counts_own_files_only(self, make_worker):
+        """Test that files adopted from other workers neither count toward nor get evicted by the quota."""
+        first = make_worker(max_files=2)
+        second = make_worker(max_files=2)
+        shared_ids = [await first.save_drawio_file(f"<mxfile>{n}</mxfile>", f"first{n}") for n in range(2)]
+        assert len(await second.list_files()) == 2
+        
+        own_ids = [await second.save_drawio_file(f"<mxfile>own{n}</mxfile>", f"second{n}") for n in range(3)]
+        
+        for file_id in shared_ids:
+            assert await second.file_exists(file_id)
+            assert Path(first.temp_files[file_id].path).exists()
+        assert not await second.file_exists(own_ids[0])
+        assert await second.file_exists(own_ids[2])
+        assert second.get_stats()["storage_bytes"] == sum(
+            second.temp_files[file_id].size_bytes for file_id in own_ids[1:]
+        )
@@ -0,0 +1,107 @@
+"""
+Unit tests for HealthChecker.
+Tests the background refresher, cached liveness/readiness probes, the
+published health state and the container healthcheck reading it.
+"""
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.config import MCPServerConfig
+from src.health import HEALTH_STATE_FILE_NAME, HealthChecker
+from src.healthcheck import STATE_DIR_NAME, ContainerHealthCheck
+
+
+@pytest.fixture
+def config(tmp_path):
+    """Configuration with temp_dir under tmp_path."""
+    return MCPServerConfig(anthropic_api_key="sk-ant-test-key", temp_dir=str(tmp_path))
+
+
+@pytest.fixture
+def health_checker(config, tmp_path):
+    """HealthChecker publishing its state where the container healthcheck reads it."""
+    return HealthChecker(config, state_path=str(tmp_path / STATE_DIR_NAME / HEALTH_STATE_FILE_NAME))
+
+
+class TestCachedProbes:
+    """Test that probes read the cached report."""
+
+    @pytest.mark.asyncio
+    async def test_probes_do_not_run_checks(self, health_checker, tmp_path):
+        """Test that liveness, readiness and the health report only read cached state."""
+        liveness = await health_checker.get_liveness()
+        assert liveness["alive"] is True and liveness["stale"] is True and liveness["checked_at"] is None
+
+        report = await health_checker.check_all(force_refresh=True)
+        with patch.object(health_checker, 'check_all', new_callable=AsyncMock) as check_all:
+            liveness = await health_checker.get_liveness()
+            readiness = await health_checker.get_readiness()
+            cached = await health_checker.get_cached_health()
+        check_all.assert_not_called()
+
+        assert liveness["stale"] is False and liveness["age_seconds"] >= 0
+        assert readiness["health_status"] == report["status"]
+        assert cached["checks"] == report["checks"] and cached["checked_at"] == liveness["checked_at"]
+
+        state = json.loads((tmp_path / STATE_DIR_NAME / HEALTH_STATE_FILE_NAME).read_text(encoding="utf-8"))
+        assert state["status"] == report["status"]
+        assert state["stale_after"] == pytest.approx(state["checked_at"] + 2 * health_checker.refresh_interval)
+        assert set(state["checks"]) == set(report["checks"])
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_report_is_not_ready(self, health_checker):
+        """Test that readiness follows the status of the cached report."""
+        health_checker._services_initialized = True
+        assert (await health_checker.get_readiness())["ready"] is True
+
+        health_checker._report = {"status": "unhealthy", "checks": {}}
+        health_checker._report_time = time.time() - 3 * health_checker.refresh_interval
+
+        readiness = await health_checker.get_readiness()
+        assert readiness["ready"] is False and readiness["stale"] is True
+
+
+class TestRefresher:
+    """Test refreshing the report in the background."""
+
+    @pytest.mark.asyncio
+    async def test_refreshes_on_interval(self, health_checker):
+        """Test that the refresher recomputes the report until stopped."""
+        health_checker.config.health_check_interval = 0.05
+        with patch.object(health_checker, 'check_all', wraps=health_checker.check_all) as check_all:
+            health_checker.start_refresher()
+            await asyncio.sleep(0.3)
+            await health_checker.stop_refresher()
+            runs = check_all.call_count
+            await asyncio.sleep(0.1)
+
+        assert runs >= 2
+        assert check_all.call_count == runs
+        assert (await health_checker.get_liveness())["age_seconds"] < 0.3
+
+
+class TestContainerHealthCheck:
+    """Test the container healthcheck script reading the published state."""
+
+    @pytest.mark.asyncio
+    async def test_uses_fresh_server_state(self, health_checker, tmp_path, monkeypatch):
+        """Test that a fresh report is used and a stale one is ignored."""
+        monkeypatch.setenv("TEMP_DIR", str(tmp_path))
+        await health_checker.check_all(force_refresh=True)
+        container = ContainerHealthCheck()
+
+        with patch.object(container, '_check_drawio_cli', new_callable=AsyncMock) as probe:
+            results = await container.check_container_health()
+        probe.assert_not_called()
+        assert results["source"] == "server"
+        assert set(results["checks"]) == set(health_checker._report["checks"])
+
+        state_path = tmp_path / STATE_DIR_NAME / HEALTH_STATE_FILE_NAME
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        state["stale_after"] = time.time() - 1
+        state_path.write_text(json.dumps(state), encoding="utf-8")
+        assert container._read_server_state() is None
@@ -0,0 +1,143 @@
+"""
+Unit tests for the HTTP transports.
+Tests Streamable HTTP and SSE sessions against one server process sharing its services.
+"""
+import asyncio
+import socket
+import tempfile
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import httpx
+import pytest
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from src import server
+from src.file_service import FileService
+from src.http_transport import HEALTH_PATH, SSE_PATH, STREAMABLE_HTTP_PATH, create_http_app, create_http_server
+from tests.fixtures.sample_xml import MINIMAL_VALID_XML
+
+
+def free_port() -> int:
+    """Find a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def file_service():
+    """Create FileService instance for testing."""
+    FileService._instance = None
+    FileService._initialized = False
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with patch('src.file_service.FileService._start_cleanup_scheduler'):
+            service = FileService(temp_dir=temp_dir, persist_metadata=False)
+        yield service
+        service.close()
+
+    FileService._instance = None
+    FileService._initialized = False
+
+
+@pytest.fixture
+async def base_url(file_service):
+    """Serve the MCP server over HTTP on a free port."""
+    port = free_port()
+    app = create_http_app(server.server, server.create_initialization_options())
+    http_server = create_http_server(app, port=port, log_level="warning")
+
+    with patch.object(server, 'file_service', file_service), patch.object(server, 'logger', Mock()):
+        task = asyncio.create_task(http_server.serve())
+        while not http_server.started:
+            await asyncio.sleep(0.01)
+        yield f"http://127.0.0.1:{port}"
+        http_server.should_exit = True
+        await task
+
+
+async def save_over(session: ClientSession, filename: str) -> str:
+    """Save a diagram through the save-drawio-file tool and return the response text."""
+    result = await session.call_tool("save-drawio-file", {"xml_content": MINIMAL_VALID_XML, "filename": filename})
+    return result.content[0].text
+
+
+class TestStreamableHTTP:
+    """Test the Streamable HTTP transport."""
+
+    @pytest.mark.asyncio
+    async def test_list_and_call_tools(self, base_url, file_service):
+        """Test that a Streamable HTTP session lists tools and saves through the shared FileService."""
+        async with streamablehttp_client(base_url + STREAMABLE_HTTP_PATH) as (read_stream, write_stream, _):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                tools = await session.list_tools()
+                text = await save_over(session, "http")
+
+        assert {tool.name for tool in tools.tools} == {"generate-drawio-xml", "save-drawio-file", "convert-to-png"}
+        assert "http" in text
+        assert len(await file_service.list_files()) == 1
+
+    @pytest.mark.asyncio
+    async def test_sessions_share_services(self, base_url, file_service):
+        """Test that concurrent sessions see each other's files."""
+        async def open_session(filename):
+            async with streamablehttp_client(base_url + STREAMABLE_HTTP_PATH) as (read_stream, write_stream, _):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    await save_over(session, filename)
+
+        await asyncio.gather(*(open_session(f"session{index}") for index in range(5)))
+
+        async with streamablehttp_client(base_url + STREAMABLE_HTTP_PATH) as (read_stream, write_stream, _):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                resources = await session.list_resources()
+
+        assert len(resources.resources) == 5
+
+
+class TestSSE:
+    """Test the HTTP+SSE transport."""
+
+    @pytest.mark.asyncio
+    async def test_sse_session(self, base_url, file_service):
+        """Test that an SSE session reaches the same tools and services."""
+        async with sse_client(base_url + SSE_PATH) as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                tools = await session.list_tools()
+                await save_over(session, "sse")
+
+        assert len(tools.tools) == 3
+        assert [f.original_name for f in await file_service.list_files()] == ["sse"]
+
+
+class TestHealthEndpoint:
+    """Test the /health route."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status,code", [("healthy", 200), ("degraded", 200), ("unhealthy", 503)])
+    async def test_health_status_code(self, status, code):
+        """Test that the report is served as JSON with 503 when unhealthy."""
+        async def provider():
+            return {"status": status, "checked_at": datetime(2025, 1, 1)}
+
+        app = create_http_app(server.server, server.create_initialization_options(), health_provider=provider)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(HEALTH_PATH)
+
+        assert response.status_code == code
+        assert response.json() == {"status": status, "checked_at": "2025-01-01 00:00:00"}
+
+    @pytest.mark.asyncio
+    async def test_no_health_route_without_provider(self):
+        """Test that /health is only served when a provider is given."""
+        app = create_http_app(server.server, server.create_initialization_options())
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(HEALTH_PATH)
+
+        assert response.status_code == 404
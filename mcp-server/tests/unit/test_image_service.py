@@ -4,11 +4,13 @@ Tests PNG conversion, CLI availability checks, and fallback handling.
 """
 import asyncio
 import base64
+import hashlib
 import os
 import shutil
 import subprocess
 import tempfile
 import time
+from datetime import datetime, timedelta
 from pathlib import Path
 from unittest.mock import AsyncMock, Mock, patch, MagicMock, call
 
@@ -18,11 +20,26 @@ from src.image_service import (
     ImageService, 
     ImageGenerationResult, 
     CLIAvailabilityResult, 
+    ExportOptions,
     ImageServiceError
 )
+from src.file_service import TempFile
 from tests.fixtures.sample_xml import MINIMAL_VALID_XML
 
 
+def make_registered_file(file_id="file_123", path="/temp/saved_file.png"):
+    """Build the TempFile metadata returned by FileService.get_file_info."""
+    created_at = datetime(2024, 1, 1)
+    return TempFile(
+        id=file_id,
+        original_name=Path(path).name,
+        path=path,
+        file_type="png",
+        created_at=created_at,
+        expires_at=created_at + timedelta(hours=24)
+    )
+
+
 class TestImageServiceInitialization:
     """Test ImageService initialization and configuration."""
     
@@ -286,7 +303,43 @@ class TestImageServicePNGGeneration:
             assert "CLI not available" in result.error
             assert result.fallback_message == "Fallback instructions"
             assert result.cli_available is False
-    
+
+    @pytest.mark.asyncio
+    async def test_generate_png_native_renderer_when_cli_missing(self, image_service, temp_drawio_file):
+        """Test in-process rendering when CLI is unavailable but a rasterizer is installed."""
+        with patch.object(image_service, 'is_drawio_cli_available') as mock_cli_check, \
+             patch('src.image_service.svg_renderer.rasterizer_available', return_value=True), \
+             patch('src.image_service.svg_renderer.rasterize_svg', return_value=b'\x89PNGnative') as mock_rasterize, \
+             patch.object(image_service, '_execute_drawio_cli') as mock_execute:
+
+            mock_cli_check.return_value = CLIAvailabilityResult(available=False, error="CLI not found")
+
+            result = await image_service.generate_png(temp_drawio_file, include_base64=True)
+
+            assert result.success is True
+            assert result.renderer == "native"
+            assert result.cli_available is False
+            assert Path(result.png_file_path).read_bytes() == b'\x89PNGnative'
+            assert base64.b64decode(result.base64_content) == b'\x89PNGnative'
+            mock_rasterize.assert_called_once()
+            mock_execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_generate_png_native_renderer_disabled(self, temp_drawio_file):
+        """Test that a disabled native renderer falls back to the CLI error path."""
+        image_service = ImageService(native_renderer_enabled=False)
+
+        with patch.object(image_service, 'is_drawio_cli_available') as mock_cli_check, \
+             patch('src.image_service.svg_renderer.rasterizer_available', return_value=True), \
+             patch.object(image_service, 'get_fallback_message', return_value="Fallback instructions"):
+
+            mock_cli_check.return_value = CLIAvailabilityResult(available=False, error="CLI not found")
+
+            result = await image_service.generate_png(temp_drawio_file)
+
+            assert result.success is False
+            assert result.fallback_message == "Fallback instructions"
+
     @pytest.mark.asyncio
     async def test_generate_png_cli_execution_fails(self, image_service, temp_drawio_file):
         """Test PNG generation when CLI execution fails."""
@@ -427,6 +480,193 @@ class TestImageServiceCLIExecution:
             assert result is False
 
 
+class TestImageServiceExportFormats:
+    """Test multi-format export, export options and the render cache."""
+    
+    @pytest.fixture
+    def image_service(self):
+        """Create ImageService instance for testing."""
+        return ImageService()
+    
+    @pytest.fixture
+    def temp_drawio_file(self, temp_directory):
+        """Create a temporary .drawio file for testing."""
+        drawio_path = Path(temp_directory) / "test.drawio"
+        drawio_path.write_text(MINIMAL_VALID_XML, encoding='utf-8')
+        return str(drawio_path)
+    
+    @staticmethod
+    def write_png(path):
+        """Write a small real PNG, the way the CLI would."""
+        from PIL import Image
+        Image.new("RGBA", (4, 4), (255, 0, 0, 128)).save(path, format="PNG")
+    
+    def test_export_options_validation(self):
+        """Test normalization and validation of export options."""
+        options = ExportOptions(format="JPEG", scale=2, border=5).validated()
+        
+        assert options.format == "jpg"
+        assert options.mime_type == "image/jpeg"
+        assert options.scale == 2.0
+        
+        with pytest.raises(ImageServiceError) as exc_info:
+            ExportOptions(format="gif").validated()
+        assert "Unsupported export format" in str(exc_info.value)
+        
+        with pytest.raises(ImageServiceError):
+            ExportOptions(scale=0).validated()
+        with pytest.raises(ImageServiceError):
+            ExportOptions(page_index=-1).validated()
+    
+    @pytest.mark.asyncio
+    async def test_execute_drawio_cli_export_options(self, image_service):
+        """Test that export options are passed to the CLI."""
+        with patch('asyncio.create_subprocess_exec') as mock_subprocess:
+            mock_process = AsyncMock()
+            mock_process.returncode = 0
+            mock_process.communicate.return_value = (b"", b"")
+            mock_subprocess.return_value = mock_process
+            
+            options = ExportOptions(format="pdf", scale=2.0, border=10, transparent=True,
+                                    page_index=1, crop=True).validated()
+            result = await image_service._execute_drawio_cli(
+                "/input/test.drawio",
+                "/output/test.pdf",
+                options
+            )
+            
+            assert result is True
+            call_args = list(mock_subprocess.call_args[0])
+            assert call_args[:6] == ["drawio", "-x", "-f", "pdf", "-o", "/output/test.pdf"]
+            assert call_args[call_args.index("-s") + 1] == "2"
+            assert call_args[call_args.index("-b") + 1] == "10"
+            assert call_args[call_args.index("-p") + 1] == "2"
+            assert "--crop" in call_args
+            assert "-t" not in call_args  # transparency is PNG only
+            assert call_args[-1] == "/input/test.drawio"
+    
+    @pytest.mark.asyncio
+    async def test_export_svg_natively_without_rasterizer(self, image_service, temp_drawio_file):
+        """Test that SVG export works without the CLI or a rasterizer."""
+        with patch.object(image_service, 'is_drawio_cli_available') as mock_cli_check, \
+             patch('src.image_service.svg_renderer.rasterizer_available', return_value=False):
+            
+            mock_cli_check.return_value = CLIAvailabilityResult(available=False, error="CLI not found")
+            
+            result = await image_service.export_diagram(
+                temp_drawio_file, ExportOptions(format="svg", border=5)
+            )
+            
+            assert result.success is True
+            assert result.renderer == "native"
+            assert result.export_format == "svg"
+            assert result.mime_type == "image/svg+xml"
+            assert result.png_file_path.endswith("test.svg")
+            assert "<svg" in Path(result.png_file_path).read_text(encoding='utf-8')
+    
+    @pytest.mark.asyncio
+    async def test_export_pdf_requires_cli(self, image_service, temp_drawio_file):
+        """Test that PDF export falls back when the CLI is missing."""
+        with patch.object(image_service, 'is_drawio_cli_available') as mock_cli_check, \
+             patch.object(image_service, 'get_fallback_message', return_value="Fallback instructions"):
+            
+            mock_cli_check.return_value = CLIAvailabilityResult(available=False, error="CLI not found")
+            
+            result = await image_service.export_diagram(temp_drawio_file, ExportOptions(format="pdf"))
+            
+            assert result.success is False
+            assert result.fallback_message == "Fallback instructions"
+    
+    @pytest.mark.asyncio
+    async def test_export_invalid_options(self, image_service, temp_drawio_file):
+        """Test that invalid options are reported without rendering."""
+        with patch.object(image_service, '_execute_drawio_cli') as mock_execute:
+            result = await image_service.export_diagram(temp_drawio_file, ExportOptions(format="gif"))
+            
+            assert result.success is False
+            assert "Unsupported export format" in result.error
+            mock_execute.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_export_render_cache_hit(self, image_service, temp_directory):
+        """Test that identical content and options reuse the cached render."""
+        first = Path(temp_directory) / "first.drawio"
+        second = Path(temp_directory) / "second.drawio"
+        first.write_text(MINIMAL_VALID_XML, encoding='utf-8')
+        second.write_text(MINIMAL_VALID_XML, encoding='utf-8')
+        
+        async def fake_cli(input_path, output_path, options=None):
+            self.write_png(output_path)
+            return True
+        
+        with patch.object(image_service, 'is_drawio_cli_available') as mock_cli_check, \
+             patch.object(image_service, '_execute_drawio_cli', side_effect=fake_cli) as mock_execute:
+            
+            mock_cli_check.return_value = CLIAvailabilityResult(available=True)
+            
+            first_result = await image_service.generate_png(str(first))
+            second_result = await image_service.generate_png(str(second))
+            scaled_result = await image_service.export_diagram(str(second), ExportOptions(scale=2.0))
+            
+            assert first_result.from_cache is False
+            assert second_result.success is True
+            assert second_result.from_cache is True
+            assert Path(second_result.png_file_path).read_bytes() == Path(first_result.png_file_path).read_bytes()
+            assert scaled_result.from_cache is False
+            assert mock_execute.call_count == 2
+            
+            stats = image_service.get_stats()
+            assert stats["render_cache_hits"] == 1
+            assert stats["render_cache_misses"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_export_reads_rendered_file_once(self, image_service, temp_drawio_file):
+        """Test that hashing and Base64 encoding share a single read of the render."""
+        rendered = b'\x89PNG' + os.urandom(4096)
+        
+        async def fake_cli(input_path, output_path, options=None):
+            Path(output_path).write_bytes(rendered)
+            return True
+        
+        with patch.object(image_service, 'is_drawio_cli_available') as mock_cli_check, \
+             patch.object(image_service, '_execute_drawio_cli', side_effect=fake_cli), \
+             patch.object(image_service, 'convert_to_base64') as mock_base64, \
+             patch.object(Path, 'read_bytes', autospec=True, side_effect=Path.read_bytes) as mock_read:
+            
+            mock_cli_check.return_value = CLIAvailabilityResult(available=True)
+            
+            result = await image_service.generate_png(temp_drawio_file, include_base64=True)
+            
+            assert result.success is True
+            assert result.size_bytes == len(rendered)
+            assert result.content_sha256 == hashlib.sha256(rendered).hexdigest()
+            assert base64.b64decode(result.base64_content) == rendered
+            mock_base64.assert_not_called()
+            output_reads = [c for c in mock_read.call_args_list if str(c.args[0]).endswith(".png")]
+            assert len(output_reads) == 1
+    
+    @pytest.mark.asyncio
+    async def test_export_webp_transcodes_cli_png(self, image_service, temp_drawio_file):
+        """Test that WebP is rendered as PNG by the CLI and transcoded."""
+        async def fake_cli(input_path, output_path, options=None):
+            assert options.format == "png"
+            self.write_png(output_path)
+            return True
+        
+        with patch.object(image_service, 'is_drawio_cli_available') as mock_cli_check, \
+             patch.object(image_service, '_execute_drawio_cli', side_effect=fake_cli):
+            
+            mock_cli_check.return_value = CLIAvailabilityResult(available=True)
+            
+            result = await image_service.export_diagram(temp_drawio_file, ExportOptions(format="webp"))
+            
+            assert result.success is True
+            assert result.mime_type == "image/webp"
+            data = Path(result.png_file_path).read_bytes()
+            assert data[:4] == b"RIFF" and data[8:12] == b"WEBP"
+            assert not list(Path(temp_drawio_file).parent.glob("*.render.png"))
+
+
 class TestImageServiceBase64Conversion:
     """Test Base64 conversion functionality."""
     
@@ -545,12 +785,8 @@ class TestImageServiceComprehensiveWorkflow:
     def mock_file_service(self):
         """Create mock FileService for testing."""
         mock_service = Mock()
-        mock_service.save_file = AsyncMock(return_value="file_123")
-        mock_service.get_file_info = AsyncMock(return_value={
-            "path": "/temp/saved_file.png",
-            "created_at": "2024-01-01T00:00:00Z",
-            "expires_at": "2024-01-02T00:00:00Z"
-        })
+        mock_service.register_file = AsyncMock(return_value="file_123")
+        mock_service.get_file_info = AsyncMock(return_value=make_registered_file())
         return mock_service
     
     @pytest.fixture
@@ -702,12 +938,8 @@ class TestImageServiceFileMetadata:
     def mock_file_service(self):
         """Create mock FileService for testing."""
         mock_service = Mock()
-        mock_service.save_file = AsyncMock(return_value="file_123")
-        mock_service.get_file_info = AsyncMock(return_value={
-            "path": "/temp/saved_file.png",
-            "created_at": "2024-01-01T00:00:00Z",
-            "expires_at": "2024-01-02T00:00:00Z"
-        })
+        mock_service.register_file = AsyncMock(return_value="file_123")
+        mock_service.get_file_info = AsyncMock(return_value=make_registered_file())
         return mock_service
     
     @pytest.fixture
@@ -721,23 +953,27 @@ class TestImageServiceFileMetadata:
     @pytest.mark.asyncio
     async def test_save_png_with_metadata_success(self, image_service, temp_png_file, mock_file_service):
         """Test successful PNG saving with metadata."""
-        result = await image_service.save_png_with_metadata(
-            png_file_path=temp_png_file,
-            file_service=mock_file_service,
-            original_drawio_id="drawio_123"
-        )
+        with patch('builtins.open') as mock_open:
+            result = await image_service.save_png_with_metadata(
+                png_file_path=temp_png_file,
+                file_service=mock_file_service,
+                original_drawio_id="drawio_123"
+            )
         
         assert result["success"] is True
         assert result["file_id"] == "file_123"
         assert result["original_drawio_id"] == "drawio_123"
         assert "size_bytes" in result
         assert result["size_bytes"] > 0
+        assert result["expires_at"] == "2024-01-02T00:00:00"
         
-        # Verify file service was called correctly
-        mock_file_service.save_file.assert_called_once()
-        call_args = mock_file_service.save_file.call_args
+        # The rendered file is registered in place, never re-read or copied
+        mock_open.assert_not_called()
+        mock_file_service.register_file.assert_called_once()
+        call_args = mock_file_service.register_file.call_args
         assert call_args[1]["file_type"] == "png"
-        assert "drawio_123" in call_args[1]["filename"]
+        assert call_args[1]["file_id"] == "drawio_123"
+        assert call_args[1]["file_path"] == temp_png_file
     
     @pytest.mark.asyncio
     async def test_save_png_with_metadata_file_not_found(self, image_service, mock_file_service):
@@ -753,7 +989,7 @@ class TestImageServiceFileMetadata:
     @pytest.mark.asyncio
     async def test_save_png_with_metadata_service_error(self, image_service, temp_png_file, mock_file_service):
         """Test PNG saving with file service error."""
-        mock_file_service.save_file.side_effect = Exception("Save failed")
+        mock_file_service.register_file.side_effect = Exception("Save failed")
         
         result = await image_service.save_png_with_metadata(
             png_file_path=temp_png_file,
@@ -899,13 +1135,8 @@ class TestImageServiceIntegrationScenarios:
     def mock_file_service(self):
         """Create comprehensive mock FileService."""
         mock_service = Mock()
-        mock_service.save_file = AsyncMock(return_value="file_123")
-        mock_service.get_file_info = AsyncMock(return_value={
-            "path": "/temp/saved_file.png",
-            "created_at": "2024-01-01T00:00:00Z",
-            "expires_at": "2024-01-02T00:00:00Z",
-            "size_bytes": 1024
-        })
+        mock_service.register_file = AsyncMock(return_value="file_123")
+        mock_service.get_file_info = AsyncMock(return_value=make_registered_file())
         return mock_service
     
     @pytest.mark.asyncio
@@ -0,0 +1,122 @@
+"""
+Unit tests for the dedicated I/O executor.
+Tests call execution, queue-depth metrics and the shared executor lifecycle.
+"""
+import asyncio
+import tempfile
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src import io_executor
+from src.file_service import FileService
+from src.io_executor import IOExecutor, configure_io_executor, get_io_executor, shutdown_io_executor
+
+
+@pytest.fixture
+def executor():
+    """Create a small IOExecutor for testing."""
+    pool = IOExecutor(max_workers=2)
+    yield pool
+    pool.shutdown()
+
+
+class TestIOExecutor:
+    """Test running calls on the I/O pool."""
+
+    def test_invalid_size(self):
+        """Test that the pool needs at least one worker."""
+        with pytest.raises(ValueError):
+            IOExecutor(max_workers=0)
+
+    @pytest.mark.asyncio
+    async def test_run_on_io_thread(self, executor):
+        """Test that calls run on named I/O threads and return their result."""
+        name = await executor.run(lambda: threading.current_thread().name)
+
+        assert name.startswith("drawio-io")
+        assert await executor.run(pow, 2, exp=10) == 1024
+
+    @pytest.mark.asyncio
+    async def test_exception_propagates(self, executor):
+        """Test that exceptions are re-raised and counted."""
+        def fail():
+            raise OSError("disk gone")
+
+        with pytest.raises(OSError):
+            await executor.run(fail)
+
+        stats = executor.get_stats()
+        assert stats["failed"] == 1
+        assert stats["completed"] == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_depth_metrics(self, executor):
+        """Test that calls beyond the pool size are reported as queued."""
+        release = threading.Event()
+        calls = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+
+        stats = executor.get_stats()
+        assert stats["active"] == 2
+        assert stats["queue_depth"] == 3
+        assert stats["max_queue_depth"] >= 3
+
+        release.set()
+        await asyncio.gather(*calls)
+
+        stats = executor.get_stats()
+        assert (stats["active"], stats["queue_depth"], stats["completed"]) == (0, 0, 5)
+        assert stats["wait_ms_max"] > 0
+
+    def test_submit_after_shutdown(self, executor):
+        """Test that a closed pool rejects work without skewing its counters."""
+        executor.shutdown()
+
+        with pytest.raises(RuntimeError):
+            executor.submit(print)
+        assert executor.get_stats()["submitted"] == 0
+
+
+class TestSharedExecutor:
+    """Test the process-wide executor used by the services."""
+
+    def test_configure_replaces_shared_pool(self):
+        """Test that configure swaps the shared pool and closes the old one."""
+        previous = get_io_executor()
+        configured = configure_io_executor(3)
+        try:
+            assert get_io_executor() is configured
+            assert configured.max_workers == 3
+            assert previous.closed
+        finally:
+            shutdown_io_executor()
+
+        assert io_executor._default_executor is None
+        assert not get_io_executor().closed
+
+    @pytest.mark.asyncio
+    async def test_file_service_uses_io_pool(self):
+        """Test that FileService disk operations go through its executor."""
+        FileService._instance = None
+        FileService._initialized = False
+        pool = IOExecutor(max_workers=1)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch('src.file_service.FileService._start_cleanup_scheduler'):
+                service = FileService(temp_dir=temp_dir, persist_metadata=False, io_executor=pool)
+            try:
+                file_id = await service.save_drawio_file("<mxfile>pooled</mxfile>")
+                assert await service.file_exists(file_id)
+                await service._remove_file(file_id)
+
+                stats = service.get_stats()["io_executor"]
+                assert stats["max_workers"] == 1
+                assert stats["completed"] >= 5
+            finally:
+                service.close()
+                pool.shutdown()
+
+        FileService._instance = None
+        FileService._initialized = False
@@ -5,6 +5,7 @@ Tests XML generation, error handling, and cache functionality.
 import asyncio
 import hashlib
 import os
+import threading
 import time
 from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from datetime import datetime, timedelta
@@ -12,6 +13,7 @@ from datetime import datetime, timedelta
 import pytest
 from anthropic import APIError, APIConnectionError, APITimeoutError, RateLimitError
 
+from src.llm_cache import LLMCacheStore
 from src.llm_service import LLMService, CacheEntry
 from src.exceptions import LLMError, LLMErrorCode
 
@@ -47,6 +49,17 @@ class TestLLMServiceInitialization:
         assert exc_info.value.code == LLMErrorCode.API_KEY_MISSING
         assert "ANTHROPIC_API_KEY environment variable is required" in str(exc_info.value)
     
+    def test_client_created_on_first_use(self):
+        """Test that the Anthropic client is only created when first used."""
+        with patch('anthropic.Anthropic') as mock_anthropic:
+            service = LLMService(api_key="sk-ant-test-key")
+            assert mock_anthropic.call_count == 0
+            
+            client = service.client
+            assert service.client is client
+        
+        mock_anthropic.assert_called_once_with(api_key="sk-ant-test-key", timeout=25.0)
+    
     @patch.dict(os.environ, {}, clear=True)
     def test_init_empty_api_key(self):
         """Test initialization fails when API key is empty."""
@@ -419,12 +432,13 @@ class TestLLMServiceCaching:
         cache_key3 = llm_service._generate_cache_key("Different prompt")
         assert cache_key != cache_key3
     
-    def test_save_to_cache(self, llm_service):
+    @pytest.mark.asyncio
+    async def test_save_to_cache(self, llm_service):
         """Test saving results to cache."""
         key = "test_key"
         xml = "<mxfile>test</mxfile>"
         
-        llm_service._save_to_cache(key, xml)
+        await llm_service._save_to_cache(key, xml)
         
         assert key in llm_service.cache
         entry = llm_service.cache[key]
@@ -432,19 +446,21 @@ class TestLLMServiceCaching:
         assert entry.timestamp <= time.time()
         assert entry.expires_at > time.time()
     
-    def test_get_from_cache_valid(self, llm_service):
+    @pytest.mark.asyncio
+    async def test_get_from_cache_valid(self, llm_service):
         """Test retrieving valid cache entries."""
         key = "test_key"
         xml = "<mxfile>test</mxfile>"
         
         # Save to cache
-        llm_service._save_to_cache(key, xml)
+        await llm_service._save_to_cache(key, xml)
         
         # Retrieve from cache
-        result = llm_service._get_from_cache(key)
+        result = await llm_service._get_from_cache(key)
         assert result == xml
     
-    def test_get_from_cache_expired(self, llm_service):
+    @pytest.mark.asyncio
+    async def test_get_from_cache_expired(self, llm_service):
         """Test retrieving expired cache entries."""
         key = "test_key"
         xml = "<mxfile>test</mxfile>"
@@ -458,28 +474,30 @@ class TestLLMServiceCaching:
         )
         
         # Should return None and remove from cache
-        result = llm_service._get_from_cache(key)
+        result = await llm_service._get_from_cache(key)
         assert result is None
         assert key not in llm_service.cache
     
-    def test_get_from_cache_missing(self, llm_service):
+    @pytest.mark.asyncio
+    async def test_get_from_cache_missing(self, llm_service):
         """Test retrieving non-existent cache entries."""
-        result = llm_service._get_from_cache("non_existent_key")
+        result = await llm_service._get_from_cache("non_existent_key")
         assert result is None
     
-    def test_cache_size_limit(self, llm_service):
+    @pytest.mark.asyncio
+    async def test_cache_size_limit(self, llm_service):
         """Test cache size limit enforcement."""
         # Set small cache size for testing
         llm_service.MAX_CACHE_SIZE = 3
         
         # Add entries up to limit
         for i in range(3):
-            llm_service._save_to_cache(f"key_{i}", f"<mxfile>test_{i}</mxfile>")
+            await llm_service._save_to_cache(f"key_{i}", f"<mxfile>test_{i}</mxfile>")
         
         assert len(llm_service.cache) == 3
         
         # Add one more entry - should remove oldest
-        llm_service._save_to_cache("key_3", "<mxfile>test_3</mxfile>")
+        await llm_service._save_to_cache("key_3", "<mxfile>test_3</mxfile>")
         
         assert len(llm_service.cache) == 3
         assert "key_3" in llm_service.cache
@@ -511,11 +529,12 @@ class TestLLMServiceCaching:
         assert "valid" in llm_service.cache
         assert "expired" not in llm_service.cache
     
-    def test_get_cache_stats(self, llm_service):
+    @pytest.mark.asyncio
+    async def test_get_cache_stats(self, llm_service):
         """Test cache statistics."""
         # Add some entries
-        llm_service._save_to_cache("key1", "<mxfile>test1</mxfile>")
-        llm_service._save_to_cache("key2", "<mxfile>test2</mxfile>")
+        await llm_service._save_to_cache("key1", "<mxfile>test1</mxfile>")
+        await llm_service._save_to_cache("key2", "<mxfile>test2</mxfile>")
         
         stats = llm_service.get_cache_stats()
         
@@ -523,6 +542,79 @@ class TestLLMServiceCaching:
         assert stats["max_size"] == llm_service.MAX_CACHE_SIZE
 
 
+class TestLLMServicePersistentCache:
+    """Test the persistent cache shared between processes."""
+    
+    @pytest.fixture
+    def make_service(self, tmp_path):
+        """Create LLMService instances sharing one cache database."""
+        stores = []
+        
+        def make(max_entries=1000):
+            store = LLMCacheStore(str(tmp_path / "cache" / "llm_cache.db"), max_entries=max_entries)
+            stores.append(store)
+            with patch.object(LLMService, '_start_cache_cleanup'):
+                return LLMService(api_key="sk-ant-test-key", skip_client_init=True, cache_store=store)
+        
+        yield make
+        for store in stores:
+            store.close()
+    
+    @pytest.mark.asyncio
+    async def test_shared_between_services(self, make_service):
+        """Test that a result cached by one service is served by another."""
+        writer, reader = make_service(), make_service()
+        await writer._save_to_cache("key", "<mxfile>shared</mxfile>")
+        
+        assert await reader._get_from_cache("key") == "<mxfile>shared</mxfile>"
+        # Promoted into the reader's in-memory cache with the original expiry
+        assert reader.cache["key"].expires_at == writer.cache["key"].expires_at
+        assert reader.get_cache_stats()["persistent_size"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_expired_entries_ignored_and_purged(self, make_service):
+        """Test that expired persistent entries are not served and are purged."""
+        service = make_service()
+        now = time.time()
+        service.cache_store.put("old", "<mxfile>old</mxfile>", now - 7200, now - 3600)
+        
+        assert await service._get_from_cache("old") is None
+        service._clean_cache()
+        assert service.cache_store.count() == 0
+    
+    @pytest.mark.asyncio
+    async def test_store_accessed_off_event_loop(self, make_service):
+        """Test that persistent cache reads and writes run in worker threads."""
+        service = make_service()
+        store = service.cache_store
+        threads = []
+        
+        def record(method):
+            def call(*args):
+                threads.append(threading.get_ident())
+                return method(*args)
+            return call
+        
+        with patch.object(store, 'get', record(store.get)), patch.object(store, 'put', record(store.put)):
+            await service._save_to_cache("key", "<mxfile>stored</mxfile>")
+            service.cache.clear()
+            assert await service._get_from_cache("key") == "<mxfile>stored</mxfile>"
+        
+        assert len(threads) == 2
+        assert threading.get_ident() not in threads
+    
+    def test_store_size_limit(self, make_service):
+        """Test that the store keeps only the newest entries."""
+        service = make_service(max_entries=2)
+        now = time.time()
+        for i in range(3):
+            service.cache_store.put(f"key_{i}", f"<mxfile>{i}</mxfile>", now + i, now + 3600)
+        
+        assert service.cache_store.count() == 2
+        assert service.cache_store.get("key_0", now) is None
+        assert service.cache_store.get("key_2", now)[0] == "<mxfile>2</mxfile>"
+
+
 class TestLLMServicePromptBuilding:
     """Test prompt building functionality."""
     
@@ -0,0 +1,229 @@
+"""
+Unit tests for the Prometheus metrics.
+Tests the exposition format, scrape-time service metrics, worker merging,
+the /metrics server and tool call instrumentation.
+"""
+import tempfile
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src import server
+from src.exceptions import LLMError, LLMErrorCode
+from src.file_service import FileService
+from src.llm_service import LLMService
+from src.metrics import (
+    CallbackMetric,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    MetricsServer,
+    merge_expositions,
+    register_service_metrics,
+)
+from src.supervisor import read_worker_metrics, write_worker_metrics, write_worker_status
+
+
+def sample_value(exposition: str, sample: str) -> float:
+    """Value of one sample line in an exposition."""
+    for line in exposition.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{sample} not in exposition:\n{exposition}")
+
+
+@pytest.fixture
+def registry():
+    """Create an empty registry."""
+    return MetricsRegistry()
+
+
+class TestExposition:
+    """Test rendering metrics in the text exposition format."""
+
+    def test_counter_and_gauge(self, registry):
+        """Test HELP/TYPE headers, labels and values."""
+        requests = Counter("requests_total", "Requests.", ["tool", "status"], registry)
+        queue = Gauge("queue_depth", "Queued.", (), registry)
+        requests.labels("save", "success").inc()
+        requests.labels("save", "success").inc(2)
+        queue.set(4)
+
+        text = registry.render()
+
+        assert "# HELP requests_total Requests.\n# TYPE requests_total counter\n" in text
+        assert sample_value(text, 'requests_total{tool="save",status="success"}') == 3
+        assert sample_value(text, "queue_depth") == 4
+
+    def test_label_count_and_counter_decrease(self, registry):
+        """Test that label mismatches and negative increments are rejected."""
+        counter = Counter("errors_total", "Errors.", ["code"], registry)
+
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+        with pytest.raises(ValueError):
+            counter.labels("a").inc(-1)
+
+    def test_label_values_are_escaped(self, registry):
+        """Test that quotes, backslashes and newlines in label values are escaped."""
+        Counter("errors_total", "Errors.", ["code"], registry).labels('bad "x"\\\n').inc()
+
+        assert 'errors_total{code="bad \\"x\\"\\\\\\n"} 1' in registry.render()
+
+    def test_histogram_buckets(self, registry):
+        """Test cumulative buckets, +Inf, sum and count."""
+        histogram = Histogram("latency_seconds", "Latency.", ["tool"], registry, buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.labels("save").observe(value)
+
+        text = registry.render()
+
+        assert sample_value(text, 'latency_seconds_bucket{tool="save",le="0.1"}') == 2
+        assert sample_value(text, 'latency_seconds_bucket{tool="save",le="1"}') == 3
+        assert sample_value(text, 'latency_seconds_bucket{tool="save",le="+Inf"}') == 4
+        assert sample_value(text, 'latency_seconds_sum{tool="save"}') == pytest.approx(3.65)
+        assert sample_value(text, 'latency_seconds_count{tool="save"}') == 4
+
+    def test_callback_metric(self, registry):
+        """Test that callbacks are read at scrape time and failures are skipped."""
+        depth = {"value": 1}
+        CallbackMetric("depth", "Depth.", "gauge", lambda: [((), depth["value"])], registry=registry)
+        CallbackMetric("broken", "Broken.", "gauge", lambda: 1 / 0, registry=registry)
+
+        depth["value"] = 7
+        text = registry.render()
+
+        assert sample_value(text, "depth") == 7
+        assert "# TYPE broken gauge" in text
+        assert "\nbroken " not in text
+
+
+class TestServiceMetrics:
+    """Test the scrape-time metrics of the services."""
+
+    def test_file_and_render_metrics(self, registry):
+        """Test that FileService and ImageService figures are exported."""
+        FileService._instance = None
+        FileService._initialized = False
+        image_service = SimpleNamespace(_render_stats={"renders_waiting": 2, "renders_active": 1},
+                                        _render_cache={"a": 1})
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch('src.file_service.FileService._start_cleanup_scheduler'):
+                file_service = FileService(temp_dir=temp_dir, persist_metadata=False)
+            try:
+                register_service_metrics(file_service=file_service, image_service=image_service,
+                                         registry=registry)
+                text = registry.render()
+            finally:
+                file_service.close()
+        FileService._instance = None
+        FileService._initialized = False
+
+        assert sample_value(text, "mcp_server_render_queue_depth") == 2
+        assert sample_value(text, "mcp_server_renders_active") == 1
+        assert sample_value(text, "mcp_server_managed_files") == 0
+        assert sample_value(text, "mcp_server_io_queue_depth") == 0
+
+
+class TestWorkerMetrics:
+    """Test combining the metrics of several workers."""
+
+    def test_merge_expositions(self):
+        """Test that samples get a worker label and share one header per metric."""
+        exposition = ('# HELP requests_total Requests.\n# TYPE requests_total counter\n'
+                      'requests_total{tool="save"} 2\n# HELP up Up.\n# TYPE up gauge\nup 1\n')
+
+        text = merge_expositions({"0": exposition, "1": exposition.replace("2", "5")})
+
+        assert text.count("# TYPE requests_total counter") == 1
+        assert sample_value(text, 'requests_total{worker="0",tool="save"}') == 2
+        assert sample_value(text, 'requests_total{worker="1",tool="save"}') == 5
+        assert sample_value(text, 'up{worker="1"}') == 1
+        assert text.index("up{") > text.index("requests_total{worker=\"1\"")
+
+    def test_newest_generation_per_index(self, tmp_path):
+        """Test that an overlapping reload does not duplicate a worker index."""
+        state_dir = str(tmp_path)
+        for pid, generation in ((10, 0), (20, 1)):
+            write_worker_status(state_dir, {"pid": pid, "index": 0, "generation": generation})
+            write_worker_metrics(state_dir, pid, f"up {pid}\n")
+
+        assert read_worker_metrics(state_dir) == {"0": "up 20\n"}
+
+
+class TestMetricsServer:
+    """Test serving /metrics."""
+
+    def test_serves_exposition(self):
+        """Test that /metrics returns the rendered text and other paths 404."""
+        metrics_server = MetricsServer(lambda: "up 1\n", port=0)
+        metrics_server.start()
+        try:
+            base_url = f"http://127.0.0.1:{metrics_server.port}"
+            with urllib.request.urlopen(base_url + "/metrics", timeout=5) as response:
+                body = response.read().decode("utf-8")
+                content_type = response.headers["Content-Type"]
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(base_url + "/other", timeout=5)
+        finally:
+            metrics_server.stop()
+
+        assert body == "up 1\n"
+        assert content_type.startswith("text/plain; version=0.0.4")
+        assert error.value.code == 404
+
+
+class TestLLMMetrics:
+    """Test Claude API instrumentation."""
+
+    def test_token_usage(self):
+        """Test that input and output tokens are counted and missing usage is ignored."""
+        llm_service = LLMService(api_key="sk-ant-test-key")
+        before = server.REGISTRY.render()
+
+        llm_service._record_token_usage(SimpleNamespace(usage=SimpleNamespace(input_tokens=120, output_tokens=30)))
+        llm_service._record_token_usage(SimpleNamespace(usage=None))
+        text = server.REGISTRY.render()
+
+        for token_type, count in (("input", 120), ("output", 30)):
+            sample = f'mcp_server_llm_tokens_total{{type="{token_type}"}}'
+            previous = sample_value(before, sample) if sample in before else 0
+            assert sample_value(text, sample) - previous == count
+
+
+class TestToolMetrics:
+    """Test tool call instrumentation."""
+
+    @pytest.mark.asyncio
+    async def test_success_and_error_codes(self):
+        """Test that outcomes are counted and error codes come from results and exceptions."""
+        before = server.REGISTRY.render()
+        results = [
+            {"success": True},
+            {"success": False, "error_code": "INVALID_XML"},
+        ]
+
+        with patch.object(server, 'logger', Mock()), \
+             patch.object(server, 'execute_tool_safely', side_effect=results + [
+                 LLMError("quota", LLMErrorCode.QUOTA_EXCEEDED)]), \
+             patch.object(server, 'format_tool_response', return_value=[]):
+            for _ in range(3):
+                await server.call_tool("save-drawio-file", {})
+        text = server.REGISTRY.render()
+
+        def delta(sample):
+            try:
+                previous = sample_value(before, sample)
+            except AssertionError:
+                previous = 0
+            return sample_value(text, sample) - previous
+
+        assert delta('mcp_server_requests_total{tool="save-drawio-file",status="success"}') == 1
+        assert delta('mcp_server_requests_total{tool="save-drawio-file",status="error"}') == 2
+        assert delta('mcp_server_errors_total{tool="save-drawio-file",error_code="INVALID_XML"}') == 1
+        assert delta('mcp_server_errors_total{tool="save-drawio-file",error_code="QUOTA_EXCEEDED"}') == 1
+        assert delta('mcp_server_request_duration_seconds_count{tool="save-drawio-file"}') == 3
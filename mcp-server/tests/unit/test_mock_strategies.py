@@ -227,7 +227,8 @@ class TestMockStrategies:
             # Environment has our test value
             assert os.getenv("ANTHROPIC_API_KEY") == "test-key"
     
-    def test_cache_testing_strategy(self):
+    @pytest.mark.asyncio
+    async def test_cache_testing_strategy(self):
         """
         Demonstrates how to test caching functionality.
         
@@ -248,12 +249,12 @@ class TestMockStrategies:
         assert key1 != key3  # Different prompt = different key
         
         # Test cache operations
-        service._save_to_cache("test_key", "<mxfile>test</mxfile>")
-        result = service._get_from_cache("test_key")
+        await service._save_to_cache("test_key", "<mxfile>test</mxfile>")
+        result = await service._get_from_cache("test_key")
         assert result == "<mxfile>test</mxfile>"
         
         # Test cache miss
-        result = service._get_from_cache("non_existent_key")
+        result = await service._get_from_cache("non_existent_key")
         assert result is None
     
     def test_error_propagation_strategy(self):
@@ -0,0 +1,145 @@
+"""
+Unit tests for the sampling profiler.
+Tests stack sampling, the collapsed and pstats outputs, per-tool sampling
+and the profile-server admin tool.
+"""
+import asyncio
+import pstats
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src import server
+from src.profiler import (
+    FORMAT_PSTATS,
+    ProfilerBusyError,
+    SamplingProfiler,
+    run_profile,
+    tool_scope,
+)
+from src.tools import profile_server
+
+
+def spin(seconds):
+    """Keep the CPU busy."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def render_work(seconds):
+    """Busy function standing in for rendering."""
+    spin(seconds)
+
+
+def save_work(seconds):
+    """Busy function standing in for saving."""
+    spin(seconds)
+
+
+async def busy_tool(name, work, until):
+    """Run CPU work in small chunks as a tool call until the deadline."""
+    with tool_scope(name):
+        while time.perf_counter() < until:
+            work(0.002)
+            await asyncio.sleep(0)
+
+
+class TestSamplingProfiler:
+    """Test sampling thread stacks."""
+
+    def test_invalid_interval(self):
+        """Test that the interval must be positive."""
+        with pytest.raises(ValueError):
+            SamplingProfiler(interval=0)
+
+    def test_collapsed_and_pstats(self, tmp_path):
+        """Test that a busy thread shows up in both output formats."""
+        worker = threading.Thread(target=render_work, args=(0.3,), name="busy")
+        profiler = SamplingProfiler(interval=0.002)
+        worker.start()
+        profiler.start()
+        worker.join()
+        profiler.stop()
+
+        collapsed = profiler.collapsed()
+        busy_lines = [line for line in collapsed.splitlines() if line.startswith("busy;")]
+        assert profiler.samples > 10
+        assert any("render_work (test_profiler.py" in line for line in busy_lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in busy_lines)
+
+        path = tmp_path / "profile.pstats"
+        profiler.write(path, FORMAT_PSTATS)
+        stats = pstats.Stats(str(path))
+        functions = {name for _, _, name in stats.stats}
+        assert {"render_work", "spin"} <= functions
+        assert profiler.top_functions()[0]["samples"] > 0
+
+
+class TestRunProfile:
+    """Test profiling the running event loop."""
+
+    @pytest.mark.asyncio
+    async def test_per_tool_sampling(self, tmp_path):
+        """Test that a tool filter keeps only that tool's stacks."""
+        until = time.perf_counter() + 0.5
+        tasks = [asyncio.create_task(busy_tool("convert-to-png", render_work, until)),
+                 asyncio.create_task(busy_tool("save-drawio-file", save_work, until))]
+
+        result = await run_profile(str(tmp_path), 0.4, tool="convert-to-png", interval=0.002)
+        await asyncio.gather(*tasks)
+
+        content = open(result.path, encoding="utf-8").read()
+        assert result.samples > 0
+        assert result.path.endswith("-convert-to-png.collapsed.txt")
+        assert "render_work" in content
+        assert "save_work" not in content
+
+    @pytest.mark.asyncio
+    async def test_one_profile_at_a_time(self, tmp_path):
+        """Test that overlapping profiles are refused and options are checked."""
+        first = asyncio.create_task(run_profile(str(tmp_path), 0.2))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(ProfilerBusyError):
+            await run_profile(str(tmp_path), 0.1)
+        await first
+        with pytest.raises(ValueError):
+            await run_profile(str(tmp_path), 0)
+        with pytest.raises(ValueError):
+            await run_profile(str(tmp_path), 1, output_format="svg")
+
+
+class TestProfileTool:
+    """Test the profile-server admin tool."""
+
+    @pytest.mark.asyncio
+    async def test_hidden_unless_enabled(self, tmp_path):
+        """Test that the tool is only listed and callable with PROFILING_ENABLED."""
+        disabled = SimpleNamespace(profiling_enabled=False, temp_dir=str(tmp_path), profile_interval_ms=10)
+        with patch.object(server, 'config', disabled), patch.object(server, 'logger', Mock()):
+            tools = await server.list_tools()
+            with pytest.raises(ValueError):
+                await server.execute_tool_safely("profile-server", {"duration_seconds": 0.1})
+
+        assert "profile-server" not in {tool.name for tool in tools}
+        assert (await profile_server(0.1))["error_code"] == "PROFILING_DISABLED"
+
+    @pytest.mark.asyncio
+    async def test_profile_through_call_tool(self, tmp_path):
+        """Test that the tool writes a profile under temp_dir and reports it."""
+        enabled = SimpleNamespace(profiling_enabled=True, temp_dir=str(tmp_path), profile_interval_ms=2)
+        with patch.object(server, 'config', enabled), patch.object(server, 'logger', Mock()):
+            tools = await server.list_tools()
+            with patch.object(server, 'format_tool_response', side_effect=lambda name, result: result):
+                result = await server.call_tool("profile-server", {"duration_seconds": 0.1, "format": "pstats"})
+            with pytest.raises(ValueError):
+                server.validate_tool_arguments("profile-server", {"tool": "no-such-tool"})
+
+        assert "profile-server" in {tool.name for tool in tools}
+        assert result["success"] is True
+        assert result["profile_path"].startswith(str(tmp_path / ".profiles"))
+        assert pstats.Stats(result["profile_path"]).total_calls >= 0
@@ -0,0 +1,290 @@
+"""
+Unit tests for MCP resources backed by the FileService.
+Tests resource URIs, listing, chunked and conditional reads and image response modes.
+"""
+import base64
+import hashlib
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from mcp.types import ImageContent, ResourceLink, TextContent
+
+from src import server
+from src.file_service import FileService, FileServiceError
+from src.resources import (
+    build_resource_uri,
+    get_mime_type,
+    list_file_resources,
+    parse_resource_request,
+    parse_resource_uri,
+    read_file_resource,
+)
+from tests.fixtures.sample_xml import MINIMAL_VALID_XML
+
+
+@pytest.fixture
+def file_service():
+    """Create FileService instance for testing."""
+    # Reset singleton state
+    FileService._instance = None
+    FileService._initialized = False
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with patch('src.file_service.FileService._start_cleanup_scheduler'):
+            service = FileService(temp_dir=temp_dir, file_expiry_hours=24)
+            yield service
+
+    FileService._instance = None
+    FileService._initialized = False
+
+
+async def register_png(file_service, content: bytes) -> str:
+    """Write a PNG into managed storage and register it."""
+    png_path = file_service.temp_dir / "diagram.png"
+    png_path.write_bytes(content)
+    return await file_service.register_file("diagram", str(png_path), file_type="png", size_bytes=len(content))
+
+
+class TestResourceURIs:
+    """Test resource URI helpers."""
+
+    def test_uri_round_trip(self):
+        """Test that file IDs survive URI quoting."""
+        uri = build_resource_uri("my diagram_png")
+
+        assert uri == "drawio://files/my%20diagram_png"
+        assert parse_resource_uri(uri) == "my diagram_png"
+
+    def test_parse_invalid_uri(self):
+        """Test that foreign or empty URIs are rejected."""
+        with pytest.raises(ValueError):
+            parse_resource_uri("file:///etc/passwd")
+        with pytest.raises(ValueError):
+            parse_resource_uri("drawio://files/")
+
+    def test_parse_range_and_etag(self):
+        """Test range and ETag query parameters."""
+        request = parse_resource_request("drawio://files/abc?offset=10&length=5&etag=deadbeef")
+
+        assert request.file_id == "abc"
+        assert (request.offset, request.length, request.etag) == (10, 5, "deadbeef")
+        assert request.ranged
+        assert build_resource_uri("abc", offset=10, length=5) == "drawio://files/abc?offset=10&length=5"
+
+    def test_parse_invalid_range(self):
+        """Test that negative, zero-length or non-numeric ranges are rejected."""
+        for query in ("offset=-1", "length=0", "offset=abc"):
+            with pytest.raises(ValueError):
+                parse_resource_request(f"drawio://files/abc?{query}")
+
+    def test_mime_types(self):
+        """Test MIME types of managed file types."""
+        assert get_mime_type("drawio") == "application/vnd.jgraph.mxfile"
+        assert get_mime_type("svg") == "image/svg+xml"
+        assert get_mime_type("unknown") == "application/octet-stream"
+
+
+class TestReadFileResource:
+    """Test on-demand resource reads."""
+
+    @pytest.mark.asyncio
+    async def test_read_drawio_as_text(self, file_service):
+        """Test that Draw.io files are served as text."""
+        file_id = await file_service.save_drawio_file(MINIMAL_VALID_XML)
+
+        chunk = await read_file_resource(file_service, file_id)
+
+        assert chunk.content == MINIMAL_VALID_XML
+        assert chunk.mime_type == "application/vnd.jgraph.mxfile"
+        assert chunk.etag == hashlib.sha256(MINIMAL_VALID_XML.encode("utf-8")).hexdigest()
+        assert chunk.next_uri is None
+
+    @pytest.mark.asyncio
+    async def test_read_png_as_bytes(self, file_service):
+        """Test that rendered images are served as bytes."""
+        file_id = await register_png(file_service, b'\x89PNGdata')
+
+        chunk = await read_file_resource(file_service, file_id)
+
+        assert chunk.content == b'\x89PNGdata'
+        assert chunk.mime_type == "image/png"
+        assert chunk.total_size == 8
+
+    @pytest.mark.asyncio
+    async def test_large_file_served_in_chunks(self, file_service):
+        """Test that files over the chunk size are returned chunk by chunk."""
+        data = bytes(range(256)) * 4
+        file_id = await register_png(file_service, data)
+
+        chunk = await read_file_resource(file_service, file_id, chunk_size=300)
+        received = chunk.content
+        while chunk.next_uri:
+            request = parse_resource_request(chunk.next_uri)
+            chunk = await read_file_resource(file_service, file_id, offset=request.offset,
+                                             length=request.length, chunk_size=300)
+            assert chunk.length <= 300
+            received += chunk.content
+
+        assert received == data
+        assert chunk.offset + chunk.length == chunk.total_size == len(data)
+
+    @pytest.mark.asyncio
+    async def test_ranged_read(self, file_service):
+        """Test that explicit ranges are honoured and drawio ranges come back as bytes."""
+        file_id = await file_service.save_drawio_file(MINIMAL_VALID_XML)
+
+        chunk = await read_file_resource(file_service, file_id, offset=1, length=6)
+
+        assert chunk.content == MINIMAL_VALID_XML.encode("utf-8")[1:7]
+        assert chunk.meta()["nextUri"] == build_resource_uri(file_id, offset=7, length=1024 * 1024)
+
+        with pytest.raises(ValueError):
+            await read_file_resource(file_service, file_id, offset=10 ** 9)
+
+    @pytest.mark.asyncio
+    async def test_inflate_compressed_drawio(self, file_service):
+        """Test that compressed Draw.io files are served as stored unless inflate is requested."""
+        file_service.compress_drawio = True
+        cells = "".join(f'<mxCell id="v{index}" value="Node {index}" vertex="1" parent="1"/>' for index in range(40))
+        file_id = await file_service.save_drawio_file(
+            f'<mxfile><diagram name="Page-1"><mxGraphModel><root>{cells}</root></mxGraphModel></diagram></mxfile>'
+        )
+
+        stored = await read_file_resource(file_service, file_id)
+        inflated = await read_file_resource(file_service, file_id, inflate=True)
+
+        assert "<mxGraphModel" not in stored.content
+        assert 'value="Node 39"' in inflated.content
+        assert inflated.meta()["inflated"] is True
+        assert inflated.etag == stored.etag
+        assert parse_resource_request(f"drawio://files/{file_id}?inflate=true").inflate
+
+    @pytest.mark.asyncio
+    async def test_matching_etag_not_modified(self, file_service):
+        """Test that a matching ETag skips the file content."""
+        file_id = await register_png(file_service, b'\x89PNGcached')
+        etag = (await read_file_resource(file_service, file_id)).etag
+
+        chunk = await read_file_resource(file_service, file_id, etag=etag)
+
+        assert chunk.not_modified
+        assert chunk.content == b""
+        assert chunk.meta()["notModified"] is True
+
+    @pytest.mark.asyncio
+    async def test_read_expired_file(self, file_service):
+        """Test that expired files are not served."""
+        file_id = await file_service.save_drawio_file(MINIMAL_VALID_XML)
+        file_service.temp_files[file_id].expires_at = datetime.now() - timedelta(hours=1)
+
+        with pytest.raises(FileServiceError):
+            await read_file_resource(file_service, file_id)
+
+
+class TestListFileResources:
+    """Test resource listing."""
+
+    @pytest.mark.asyncio
+    async def test_list_active_files(self, file_service):
+        """Test that active files are listed with size, MIME type and ETag."""
+        drawio_id = await file_service.save_drawio_file(MINIMAL_VALID_XML)
+        png_id = await register_png(file_service, b'\x89PNGdata')
+        expired_id = await file_service.save_drawio_file(MINIMAL_VALID_XML)
+        file_service.temp_files[expired_id].expires_at = datetime.now() - timedelta(hours=1)
+
+        resources = {str(r.uri): r for r in await list_file_resources(file_service, chunk_size=4)}
+
+        assert set(resources) == {build_resource_uri(drawio_id), build_resource_uri(png_id)}
+        png = resources[build_resource_uri(png_id)]
+        assert png.mimeType == "image/png"
+        assert png.size == 8
+        assert png.meta["etag"] == hashlib.sha256(b'\x89PNGdata').hexdigest()
+        assert png.meta["chunked"] is True
+
+    @pytest.mark.asyncio
+    async def test_missing_file_skipped(self, file_service):
+        """Test that files removed from disk are not listed."""
+        file_id = await file_service.save_drawio_file(MINIMAL_VALID_XML)
+        Path(file_service.temp_files[file_id].path).unlink()
+
+        assert await list_file_resources(file_service) == []
+
+    @pytest.mark.asyncio
+    async def test_listing_keeps_lru_order(self, file_service):
+        """Test that listing does not count as an access for LRU eviction."""
+        first, _, _ = [
+            await file_service.save_drawio_file(f"<mxfile>{index}</mxfile>", f"lru{index}") for index in range(3)
+        ]
+        await file_service.get_file_path(first)
+        order = file_service.temp_files.eviction_order("lru", datetime.now())
+        last_accessed = {file_id: f.last_accessed for file_id, f in file_service.temp_files.items()}
+
+        assert len(await list_file_resources(file_service)) == 3
+
+        assert file_service.temp_files.eviction_order("lru", datetime.now()) == order
+        assert {file_id: f.last_accessed for file_id, f in file_service.temp_files.items()} == last_accessed
+
+
+class TestImageResponseModes:
+    """Test ImageContent and resource link responses of convert-to-png."""
+
+    def make_result(self, file_id, file_path, size_bytes):
+        """Build a successful convert-to-png result."""
+        return {
+            "success": True,
+            "png_file_id": file_id,
+            "png_file_path": file_path,
+            "base64_content": None,
+            "format": "png",
+            "mime_type": "image/png",
+            "cli_available": True,
+            "metadata": {"file_size_bytes": size_bytes}
+        }
+
+    @pytest.mark.asyncio
+    async def test_small_image_inlined(self, file_service):
+        """Test that small images are returned as ImageContent."""
+        file_id = await register_png(file_service, b'\x89PNGsmall')
+        result = self.make_result(file_id, str(file_service.temp_dir / "diagram.png"), 10)
+
+        with patch.object(server, 'file_service', file_service):
+            response = await server.format_image_response(result, "auto")
+
+        assert isinstance(response[0], TextContent)
+        assert isinstance(response[1], ImageContent)
+        assert base64.b64decode(response[1].data) == b'\x89PNGsmall'
+        assert response[1].mimeType == "image/png"
+
+    @pytest.mark.asyncio
+    async def test_large_image_linked(self, file_service):
+        """Test that large images are returned as resource links without reading them."""
+        file_id = await register_png(file_service, b'\x89PNGlarge')
+        result = self.make_result(file_id, str(file_service.temp_dir / "diagram.png"), 10)
+
+        with patch.object(server, 'file_service', file_service), \
+             patch.object(server, 'DEFAULT_INLINE_IMAGE_MAX_BYTES', 4), \
+             patch('src.server.encode_file_base64') as mock_encode:
+            response = await server.format_image_response(result, "auto")
+
+        mock_encode.assert_not_called()
+        assert isinstance(response[1], ResourceLink)
+        assert str(response[1].uri) == build_resource_uri(file_id)
+        assert response[1].size == 10
+
+    @pytest.mark.asyncio
+    async def test_resource_mode_read_back(self, file_service):
+        """Test that a resource link can be read back through the resource handler."""
+        file_id = await register_png(file_service, b'\x89PNGlinked')
+        result = self.make_result(file_id, str(file_service.temp_dir / "diagram.png"), 11)
+
+        with patch.object(server, 'file_service', file_service), \
+             patch.object(server, 'logger', Mock()):
+            response = await server.format_image_response(result, "resource")
+            contents = await server.read_resource(response[1].uri)
+
+        assert contents[0].content == b'\x89PNGlinked'
+        assert contents[0].mime_type == "image/png"
+        assert contents[0].meta["totalSize"] == 10
@@ -0,0 +1,208 @@
+"""
+Unit tests for the pre-fork supervisor.
+Tests worker heartbeats, restarts, graceful reload and shutdown.
+"""
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+
+from src import server
+from src.supervisor import (
+    WORKER_READY,
+    Supervisor,
+    WorkerHeartbeat,
+    WorkerProcess,
+    bind_socket,
+    read_worker_statuses,
+    write_worker_status,
+)
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+
+
+def wait_for(condition, timeout=10.0):
+    """Poll until condition() is true or the timeout passes."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def supervise_until(supervisor, condition, timeout=10.0):
+    """Run the supervisor's reap and respawn steps until condition() is true."""
+    def step():
+        supervisor._reap()
+        supervisor._respawn_due()
+        return condition()
+    return wait_for(step, timeout)
+
+
+def make_worker_main(state_dir, ready=True):
+    """Create a worker body that reports its status and idles until signalled."""
+    def worker_main(listen_socket, worker):
+        status = WORKER_READY if ready else "starting"
+        while True:
+            write_worker_status(state_dir, {**worker.to_dict(), "heartbeat_at": time.time(), "status": status})
+            time.sleep(0.1)
+    return worker_main
+
+
+@pytest.fixture
+def make_supervisor(tmp_path):
+    """Create supervisors whose workers are stopped after the test."""
+    supervisors = []
+
+    def make(worker_count=2, ready=True, **kwargs):
+        state_dir = str(tmp_path / "workers")
+        supervisor = Supervisor(make_worker_main(state_dir, ready), worker_count,
+                                bind_socket("127.0.0.1", 0), state_dir, **kwargs)
+        supervisor._prepare_state_dir()
+        supervisors.append(supervisor)
+        return supervisor
+
+    yield make
+    for supervisor in supervisors:
+        supervisor.shutdown_timeout = 5
+        supervisor._stop_all()
+        supervisor.listen_socket.close()
+
+
+def ready_pids(supervisor):
+    """PIDs of the workers whose latest heartbeat says ready."""
+    return {status["pid"] for status in read_worker_statuses(supervisor.state_dir)
+            if status.get("status") == WORKER_READY}
+
+
+class TestWorkerStatus:
+    """Test the heartbeat files."""
+
+    def test_write_and_read(self, tmp_path):
+        """Test that statuses round-trip and are ordered by generation and index."""
+        write_worker_status(str(tmp_path), {"pid": 11, "index": 1, "generation": 0})
+        write_worker_status(str(tmp_path), {"pid": 12, "index": 0, "generation": 1})
+        write_worker_status(str(tmp_path), {"pid": 10, "index": 0, "generation": 0})
+        (tmp_path / "worker-13.json").write_text("{half", encoding="utf-8")
+
+        assert [status["pid"] for status in read_worker_statuses(str(tmp_path))] == [10, 11, 12]
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_publishes_until_stopped(self, tmp_path):
+        """Test that the heartbeat writes the provider's status."""
+        worker = WorkerProcess(index=2, generation=3, pid=os.getpid())
+
+        async def provider():
+            return {"status": WORKER_READY, "health": "healthy"}
+
+        heartbeat = WorkerHeartbeat(str(tmp_path), worker, provider, interval=0.01)
+        task = asyncio.create_task(heartbeat.run())
+        await asyncio.sleep(0.05)
+        heartbeat.stop()
+        await task
+
+        [status] = read_worker_statuses(str(tmp_path))
+        assert (status["index"], status["generation"], status["health"]) == (2, 3, "healthy")
+
+
+class TestSupervisor:
+    """Test supervising forked workers."""
+
+    def test_invalid_worker_count(self, tmp_path):
+        """Test that at least one worker is required."""
+        with pytest.raises(ValueError):
+            Supervisor(make_worker_main(str(tmp_path)), 0, None, str(tmp_path))
+
+    def test_restart_crashed_worker(self, make_supervisor):
+        """Test that an unexpectedly exited worker is replaced under the same index."""
+        supervisor = make_supervisor()
+        workers = [supervisor._spawn(index) for index in range(2)]
+        assert wait_for(lambda: len(ready_pids(supervisor)) == 2)
+
+        os.kill(workers[0].pid, signal.SIGKILL)
+        assert supervise_until(supervisor, lambda: workers[0].pid not in supervisor.workers
+                               and len(supervisor.workers) == 2)
+
+        assert sorted(worker.index for worker in supervisor.workers.values()) == [0, 1]
+        assert workers[1].pid in supervisor.workers
+
+    def test_reload_replaces_generation(self, make_supervisor):
+        """Test that reload starts new workers and then retires the old ones."""
+        supervisor = make_supervisor()
+        old = [supervisor._spawn(index) for index in range(2)]
+
+        assert supervisor.reload()
+
+        assert supervisor.generation == 1
+        assert all(worker.retired_at is not None for worker in old)
+        assert supervise_until(supervisor, lambda: len(supervisor.workers) == 2)
+        assert {worker.generation for worker in supervisor.workers.values()} == {1}
+
+    def test_failed_reload_keeps_running_workers(self, make_supervisor):
+        """Test that workers that never become ready do not replace the old ones."""
+        supervisor = make_supervisor(worker_count=1, startup_timeout=0.5)
+        old = supervisor._spawn(0)
+        supervisor.worker_main = make_worker_main(supervisor.state_dir, ready=False)
+
+        assert not supervisor.reload()
+
+        assert supervisor.generation == 0
+        assert old.retired_at is None
+        assert supervise_until(supervisor, lambda: list(supervisor.workers) == [old.pid])
+
+    def test_hung_worker_is_killed(self, make_supervisor):
+        """Test that a worker without heartbeats past the startup timeout is killed."""
+        supervisor = make_supervisor(worker_count=1, ready=False, startup_timeout=0.2)
+        worker = supervisor._spawn(0)
+
+        time.sleep(0.3)
+        supervisor._check_workers()
+
+        assert supervise_until(supervisor, lambda: worker.pid not in supervisor.workers, timeout=0.5)
+
+    def test_stop_all(self, make_supervisor):
+        """Test that stopping retires every worker and removes their heartbeats."""
+        supervisor = make_supervisor()
+        for index in range(2):
+            supervisor._spawn(index)
+        assert wait_for(lambda: len(ready_pids(supervisor)) == 2)
+
+        supervisor._stop_all()
+
+        assert supervisor.workers == {}
+        assert read_worker_statuses(supervisor.state_dir) == []
+
+
+class TestWorkerCount:
+    """Test choosing the worker count before forking."""
+
+    @pytest.fixture(autouse=True)
+    def environment(self, tmp_path, monkeypatch):
+        """Minimal valid environment with temp_dir under tmp_path."""
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-ant-test-key")
+        monkeypatch.setenv("TEMP_DIR", str(tmp_path))
+        monkeypatch.delenv("MCP_WORKERS", raising=False)
+        monkeypatch.delenv("SHARED_STORAGE", raising=False)
+        return monkeypatch
+
+    def test_cli_overrides_environment(self, environment):
+        """Test that --workers overrides MCP_WORKERS in the validated config."""
+        environment.setenv("SHARED_STORAGE", "true")
+        environment.setenv("MCP_WORKERS", "2")
+
+        assert server.load_config(server.parse_arguments([])).workers == 2
+        assert server.load_config(server.parse_arguments(["--workers", "3"])).workers == 3
+
+    def test_invalid_counts_rejected(self, environment):
+        """Test that invalid counts and multiple workers without shared storage fail before forking."""
+        with pytest.raises(ValueError, match="shared_storage"):
+            server.load_config(server.parse_arguments(["--workers", "2"]))
+        with pytest.raises(ValueError, match="at least 1"):
+            server.load_config(server.parse_arguments(["--workers", "0"]))
+
+        environment.setenv("MCP_WORKERS", "many")
+        with pytest.raises(ValueError):
+            server.load_config(server.parse_arguments([]))
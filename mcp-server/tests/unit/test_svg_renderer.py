@@ -0,0 +1,210 @@
+"""
+Unit tests for the native SVG renderer.
+Tests diagram parsing, SVG rendering and lazy rasterizer loading.
+"""
+import base64
+import urllib.parse
+import zlib
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src import svg_renderer
+from src.svg_renderer import (
+    DiagramRenderError,
+    compress_document,
+    decode_diagram_content,
+    encode_diagram_content,
+    inflate_document,
+    list_pages,
+    parse_diagram,
+    parse_style,
+    rasterize_svg,
+    render_drawio_to_svg,
+)
+from tests.fixtures.sample_xml import VALID_DRAWIO_XML, MINIMAL_VALID_XML, AWS_DIAGRAM_XML
+
+
+def compress_diagram(model_xml: str) -> str:
+    """Encode an mxGraphModel the way draw.io stores compressed pages."""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    data = compressor.compress(urllib.parse.quote(model_xml).encode("utf-8")) + compressor.flush()
+    return base64.b64encode(data).decode("ascii")
+
+
+@pytest.fixture(autouse=True)
+def reset_rasterizer():
+    """Reset the cached rasterizer between tests."""
+    svg_renderer._reset_rasterizer_cache()
+    yield
+    svg_renderer._reset_rasterizer_cache()
+
+
+class TestDiagramParsing:
+    """Test parsing of Draw.io documents into the diagram model."""
+
+    def test_parse_style(self):
+        """Test style string parsing including bare style names."""
+        style = parse_style("ellipse;whiteSpace=wrap;html=1;fillColor=#dae8fc;")
+
+        assert style["_base"] == "ellipse"
+        assert style["whiteSpace"] == "wrap"
+        assert style["fillColor"] == "#dae8fc"
+        assert parse_style(None) == {}
+
+    def test_parse_valid_diagram(self):
+        """Test parsing vertices and edges."""
+        model = parse_diagram(VALID_DRAWIO_XML)
+
+        assert model.name == "Page-1"
+        vertices = [cell for cell in model.cells if cell.vertex]
+        edges = [cell for cell in model.cells if cell.edge]
+        assert [cell.value for cell in vertices] == ["Start", "Process", "End"]
+        assert len(edges) == 2
+        assert edges[0].source == "2" and edges[0].target == "3"
+        assert vertices[1].geometry.width == 120
+
+    def test_parse_compressed_diagram(self):
+        """Test parsing a page stored with draw.io deflate+base64 encoding."""
+        model_xml = (
+            '<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/>'
+            '<mxCell id="2" value="Compressed" vertex="1" parent="1">'
+            '<mxGeometry x="10" y="20" width="100" height="40" as="geometry"/></mxCell>'
+            '</root></mxGraphModel>'
+        )
+        xml_content = f'<mxfile><diagram name="Packed">{compress_diagram(model_xml)}</diagram></mxfile>'
+
+        assert decode_diagram_content(compress_diagram(model_xml)) == model_xml
+        model = parse_diagram(xml_content)
+        assert model.name == "Packed"
+        assert any(cell.value == "Compressed" for cell in model.cells)
+
+    def test_compress_document_round_trip(self):
+        """Test that compressed documents stay parseable and inflate back to the same pages."""
+        compressed = compress_document(VALID_DRAWIO_XML)
+
+        assert "<mxGraphModel" not in compressed
+        assert parse_diagram(compressed).cells == parse_diagram(VALID_DRAWIO_XML).cells
+        inflated = inflate_document(compressed)
+        assert "<mxGraphModel" in inflated
+        assert parse_diagram(inflated).cells == parse_diagram(VALID_DRAWIO_XML).cells
+
+    def test_compress_bare_model(self):
+        """Test that a bare mxGraphModel is wrapped in an mxfile page."""
+        model_xml = '<mxGraphModel><root><mxCell id="0"/></root></mxGraphModel>'
+        compressed = compress_document(model_xml)
+
+        assert compressed.startswith("<mxfile")
+        assert decode_diagram_content(encode_diagram_content(model_xml)) == model_xml
+        assert list_pages(compressed) == ["Page-1"]
+
+    def test_compress_unsupported_root(self):
+        """Test that documents that are not Draw.io files are rejected."""
+        with pytest.raises(DiagramRenderError):
+            compress_document("<html/>")
+
+    def test_parse_page_index_out_of_range(self):
+        """Test that an invalid page index raises a render error."""
+        with pytest.raises(DiagramRenderError) as exc_info:
+            parse_diagram(MINIMAL_VALID_XML, page_index=3)
+
+        assert "out of range" in str(exc_info.value)
+
+    def test_parse_invalid_xml(self):
+        """Test that malformed XML raises a render error."""
+        with pytest.raises(DiagramRenderError):
+            parse_diagram("<mxfile><diagram>")
+
+    def test_list_pages(self):
+        """Test listing page names."""
+        xml_content = '<mxfile><diagram name="A"><mxGraphModel><root/></mxGraphModel></diagram><diagram><mxGraphModel><root/></mxGraphModel></diagram></mxfile>'
+
+        assert list_pages(xml_content) == ["A", "Page-2"]
+
+
+class TestSVGRendering:
+    """Test SVG output of the native renderer."""
+
+    def test_render_basic_shapes(self):
+        """Test that ellipses, rectangles, edges and labels are rendered."""
+        svg = render_drawio_to_svg(VALID_DRAWIO_XML)
+
+        assert svg.startswith("<?xml")
+        assert svg.count("<ellipse") == 2
+        assert svg.count("<rect") == 1
+        assert svg.count("<polyline") == 2
+        assert ">Process</tspan>" in svg
+        assert 'viewBox="100 100 120 240"' in svg
+
+    def test_render_with_border_and_scale(self):
+        """Test that border and scale change the canvas size."""
+        svg = render_drawio_to_svg(VALID_DRAWIO_XML, scale=2.0, border=10)
+
+        assert 'width="280"' in svg
+        assert 'height="520"' in svg
+        assert 'viewBox="90 90 140 260"' in svg
+
+    def test_render_nested_containers(self):
+        """Test that child geometry is offset by its container."""
+        svg = render_drawio_to_svg(AWS_DIAGRAM_XML)
+
+        # VPC is at (30, 40) inside the AWS Cloud group at (50, 50)
+        assert '<rect x="80" y="90" width="640" height="420"' in svg
+
+    def test_render_html_labels_are_escaped(self):
+        """Test HTML label stripping and XML escaping."""
+        xml_content = (
+            '<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/>'
+            '<mxCell id="2" value="A &amp;lt;b&amp;gt;&lt;br&gt;B &amp;amp; C" style="html=1;" vertex="1" parent="1">'
+            '<mxGeometry width="100" height="40" as="geometry"/></mxCell></root></mxGraphModel>'
+        )
+        svg = render_drawio_to_svg(xml_content)
+
+        assert ">A &lt;b&gt;</tspan>" in svg
+        assert ">B &amp; C</tspan>" in svg
+
+    def test_render_opaque_background(self):
+        """Test that a non-transparent render fills the canvas."""
+        svg = render_drawio_to_svg(VALID_DRAWIO_XML, transparent=False)
+
+        assert '<rect x="100" y="100" width="120" height="240" fill="#ffffff"/>' in svg
+
+
+class TestRasterizer:
+    """Test lazy loading of the optional rasterizer."""
+
+    def test_rasterizer_unavailable(self):
+        """Test behaviour when no rasterizer backend can be imported."""
+        with patch.dict("sys.modules", {"cairosvg": None}):
+            assert svg_renderer.rasterizer_available() is False
+
+            with pytest.raises(DiagramRenderError) as exc_info:
+                rasterize_svg("<svg/>")
+
+        assert "No SVG rasterizer available" in str(exc_info.value)
+
+    def test_rasterizer_loaded_once(self):
+        """Test that the rasterizer import is attempted only on first use."""
+        fake_cairosvg = Mock()
+        fake_cairosvg.svg2png.return_value = b"\x89PNG"
+
+        with patch.dict("sys.modules", {"cairosvg": fake_cairosvg}):
+            assert rasterize_svg("<svg/>", scale=2.0) == b"\x89PNG"
+
+        # Removing the module afterwards must not matter: the backend is cached
+        with patch.dict("sys.modules", {"cairosvg": None}):
+            assert svg_renderer.rasterizer_available() is True
+            assert svg_renderer.get_rasterizer_name() == "cairosvg"
+
+        fake_cairosvg.svg2png.assert_called_once_with(bytestring=b"<svg/>", scale=2.0)
+
+    def test_rasterizer_failure_wrapped(self):
+        """Test that rasterizer errors are wrapped in DiagramRenderError."""
+        fake_cairosvg = Mock()
+        fake_cairosvg.svg2png.side_effect = ValueError("bad svg")
+
+        with patch.dict("sys.modules", {"cairosvg": fake_cairosvg}):
+            with pytest.raises(DiagramRenderError) as exc_info:
+                rasterize_svg("<svg/>")
+
+        assert exc_info.value.original_error is not None
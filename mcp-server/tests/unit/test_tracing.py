@@ -0,0 +1,321 @@
+"""
+Unit tests for tracing.
+Tests span nesting, request ID propagation, sampling, exporters, the
+per-phase timing breakdown and the spans recorded for a tool call.
+"""
+import asyncio
+import json
+import threading
+import time
+import tempfile
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src import server
+from src.file_service import FileService
+from src.io_executor import IOExecutor
+from src.tracing import (
+    NOOP_SPAN,
+    PHASE_DISK_WRITE,
+    PHASE_QUEUE_WAIT,
+    PHASE_RENDER,
+    STATUS_ERROR,
+    JSONFileExporter,
+    OpenTelemetryExporter,
+    SpanExporter,
+    Tracer,
+    create_exporters,
+    current_request_id,
+    current_span,
+    phase_timings,
+    timing_breakdown,
+    traced,
+    tracer,
+)
+from tests.fixtures.sample_xml import MINIMAL_VALID_XML
+
+
+class MemoryExporter(SpanExporter):
+    """Keeps exported traces in memory."""
+
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(list(spans))
+
+
+@pytest.fixture
+def exporter():
+    """Route the shared tracer to an in-memory exporter for one test."""
+    memory = MemoryExporter()
+    tracer.configure([memory])
+    yield memory
+    tracer.configure([])
+
+
+class TestTracer:
+    """Test creating spans."""
+
+    def test_disabled_tracer_records_nothing(self):
+        """Test that without exporters only the request ID is set."""
+        disabled = Tracer()
+
+        with disabled.start_trace("root", request_id="req-1") as root:
+            with disabled.span("child") as child:
+                assert current_request_id() == "req-1"
+
+        assert root is NOOP_SPAN and child is NOOP_SPAN
+        assert current_request_id() is None
+
+    def test_nested_spans(self):
+        """Test parent links, ordering and export when the root ends."""
+        memory = MemoryExporter()
+        local = Tracer([memory])
+
+        with local.start_trace("root", request_id="req-2", tool="save"):
+            with local.span("first") as first:
+                first.set_attribute("bytes", 10)
+            with pytest.raises(OSError):
+                with local.span("second"):
+                    raise OSError("disk full")
+            assert memory.traces == []
+
+        [spans] = memory.traces
+        assert [span.name for span in spans] == ["root", "first", "second"]
+        assert {span.trace_id for span in spans} == {"req-2"}
+        assert spans[1].parent_id == spans[0].span_id
+        assert spans[1].attributes == {"bytes": 10}
+        assert spans[2].status == STATUS_ERROR and "disk full" in spans[2].error
+        assert spans[0].attributes == {"tool": "save"}
+        assert all(span.duration_ms >= 0 for span in spans)
+
+    def test_sampling(self):
+        """Test that unsampled calls are not exported but keep a request ID."""
+        memory = MemoryExporter()
+        local = Tracer([memory], sample_rate=0.0)
+
+        with local.start_trace("root") as root:
+            assert root is NOOP_SPAN
+            assert current_request_id()
+
+        assert memory.traces == []
+        with pytest.raises(ValueError):
+            Tracer(sample_rate=1.5)
+
+    @pytest.mark.asyncio
+    async def test_traced_across_tasks(self, exporter):
+        """Test that concurrent tasks keep their spans under the right parent."""
+        @traced("work")
+        async def work(delay):
+            await asyncio.sleep(delay)
+            current_span().set_attribute("delay", delay)
+
+        with tracer.start_trace("root"):
+            await asyncio.gather(work(0.02), work(0.01))
+
+        [spans] = exporter.traces
+        root = spans[0]
+        assert [span.name for span in spans] == ["root", "work", "work"]
+        assert all(span.parent_id == root.span_id for span in spans[1:])
+        assert sorted(span.attributes["delay"] for span in spans[1:]) == [0.01, 0.02]
+
+    @pytest.mark.asyncio
+    async def test_traced_outside_trace(self, exporter):
+        """Test that decorated calls outside a tool call create no spans."""
+        @traced("work")
+        async def work():
+            return current_span()
+
+        assert await work() is NOOP_SPAN
+        assert exporter.traces == []
+
+
+class TestPhaseTimings:
+    """Test the per-call timing breakdown."""
+
+    @pytest.mark.asyncio
+    async def test_recorded_without_exporters(self):
+        """Test that phases accumulate per call even when no spans are created."""
+        disabled = Tracer()
+
+        @traced("render", phase=PHASE_RENDER)
+        async def render():
+            await asyncio.sleep(0.01)
+
+        assert phase_timings() is None
+        await render()
+        with disabled.start_trace("root"):
+            await asyncio.gather(render(), render())
+            with disabled.span("write", phase=PHASE_DISK_WRITE) as span:
+                assert span is NOOP_SPAN
+            timings = phase_timings()
+
+        assert timings[PHASE_RENDER] >= 0.02
+        assert PHASE_DISK_WRITE in timings
+        assert phase_timings() is None
+
+    @pytest.mark.asyncio
+    async def test_io_queue_wait(self):
+        """Test that time queued for an I/O thread counts as queue wait of the submitting call."""
+        executor = IOExecutor(max_workers=1)
+        try:
+            with tracer.start_trace("root"):
+                blocker = executor.run(time.sleep, 0.05)
+                await asyncio.gather(blocker, executor.run(len, "queued"))
+                timings = phase_timings()
+        finally:
+            executor.shutdown()
+
+        assert timings[PHASE_QUEUE_WAIT] >= 0.04
+
+    def test_breakdown(self):
+        """Test milliseconds, phase order and the total."""
+        breakdown = timing_breakdown({PHASE_RENDER: 0.0081, PHASE_QUEUE_WAIT: 0.0004}, 0.0123)
+
+        assert breakdown == {"queue_wait_ms": 0.4, "render_ms": 8.1, "total_ms": 12.3}
+        assert list(breakdown) == ["queue_wait_ms", "render_ms", "total_ms"]
+        assert timing_breakdown(None, 0.001) == {"total_ms": 1.0}
+
+
+class TestExporters:
+    """Test the bundled exporters."""
+
+    def test_json_file_exporter(self, tmp_path):
+        """Test that each span is written as one JSON line."""
+        path = tmp_path / "traces" / "traces.jsonl"
+        local = Tracer(create_exporters(["json"], str(path)))
+
+        for request_id in ("a", "b"):
+            with local.start_trace("root", request_id=request_id):
+                with local.span("child", size=3):
+                    pass
+        local.shutdown()
+
+        records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [(record["trace_id"], record["name"]) for record in records] == [
+            ("a", "root"), ("a", "child"), ("b", "root"), ("b", "child")]
+        assert records[1]["attributes"] == {"size": 3}
+        assert records[1]["parent_id"] == records[0]["span_id"]
+
+    def test_json_file_written_in_background(self, tmp_path):
+        """Test that ending a trace does not wait for the write and shutdown flushes it."""
+        json_exporter = JSONFileExporter(str(tmp_path / "traces.jsonl"))
+        local = Tracer([json_exporter])
+        release = threading.Event()
+        write = json_exporter._write
+
+        def slow_write(traces):
+            release.wait(5)
+            write(traces)
+
+        with patch.object(json_exporter, '_write', side_effect=slow_write):
+            start = time.perf_counter()
+            for request_id in ("a", "b", "c"):
+                with local.start_trace("root", request_id=request_id):
+                    pass
+            assert time.perf_counter() - start < 1
+            assert not json_exporter.path.exists()
+
+            release.set()
+            local.shutdown()
+
+        lines = json_exporter.path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["trace_id"] for line in lines] == ["a", "b", "c"]
+
+    def test_unknown_exporter(self, tmp_path):
+        """Test that unknown exporter names are rejected."""
+        with pytest.raises(ValueError):
+            create_exporters(["zipkin"], str(tmp_path / "traces.jsonl"))
+
+    def test_opentelemetry_exporter(self):
+        """Test that spans are replayed with their timing and parents."""
+        pytest.importorskip("opentelemetry")
+        otel = OpenTelemetryExporter()
+        local = Tracer([otel])
+        with local.start_trace("root"):
+            with local.span("child", path=None):
+                pass
+        otel._tracer = Mock()
+        memory = MemoryExporter()
+        local.configure([memory])
+        with local.start_trace("root"):
+            with local.span("child"):
+                pass
+
+        otel.export(memory.traces[0])
+
+        root_call, child_call = otel._tracer.start_span.call_args_list
+        assert root_call.args == ("root",) and root_call.kwargs["context"] is None
+        assert child_call.kwargs["context"] is not None
+        assert child_call.kwargs["start_time"] == int(memory.traces[0][1].start_time * 1e9)
+
+    def test_failing_exporter_is_isolated(self):
+        """Test that an exporter error does not reach the traced call."""
+        broken = Mock(spec=SpanExporter)
+        broken.export.side_effect = OSError("gone")
+        memory = MemoryExporter()
+        local = Tracer([broken, memory])
+
+        with local.start_trace("root"):
+            pass
+
+        assert len(memory.traces) == 1
+
+
+class TestToolCallTracing:
+    """Test the spans recorded for a tool call."""
+
+    @pytest.fixture
+    def file_service(self):
+        """Create FileService instance for testing."""
+        FileService._instance = None
+        FileService._initialized = False
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch('src.file_service.FileService._start_cleanup_scheduler'):
+                service = FileService(temp_dir=temp_dir, persist_metadata=False)
+            yield service
+            service.close()
+
+        FileService._instance = None
+        FileService._initialized = False
+
+    @pytest.mark.asyncio
+    async def test_save_tool_spans(self, exporter, file_service):
+        """Test that a save call is traced from the tool down to the disk write."""
+        with patch.object(server, 'file_service', file_service), patch.object(server, 'logger', Mock()):
+            await server.call_tool("save-drawio-file", {"xml_content": MINIMAL_VALID_XML, "filename": "traced"})
+
+        [spans] = exporter.traces
+        names = [span.name for span in spans]
+        assert names[0] == "tool.call"
+        assert {"file.save_drawio", "file.write"} <= set(names)
+        assert spans[0].attributes["tool"] == "save-drawio-file"
+        assert spans[0].attributes["success"] is True
+        assert len({span.trace_id for span in spans}) == 1
+
+    @pytest.mark.asyncio
+    async def test_timings_in_result_logs_and_metrics(self, file_service):
+        """Test that the breakdown reaches the client on request and always the log and metrics."""
+        sample = 'mcp_server_tool_phase_duration_seconds_count{tool="save-drawio-file",phase="disk_write"}'
+
+        def phase_count():
+            for line in server.REGISTRY.render().splitlines():
+                if line.startswith(sample + " "):
+                    return float(line.rsplit(" ", 1)[1])
+            return 0
+
+        before = phase_count()
+        logger = Mock()
+        with patch.object(server, 'file_service', file_service), patch.object(server, 'logger', logger):
+            timed = await server.call_tool("save-drawio-file", {"xml_content": MINIMAL_VALID_XML,
+                                                                "include_timings": True})
+            logged = logger.info.call_args.kwargs["extra"]["extra_fields"]["timings"]
+            plain = await server.call_tool("save-drawio-file", {"xml_content": MINIMAL_VALID_XML})
+
+        assert "処理時間の内訳" in timed[0].text and "disk_write" in timed[0].text
+        assert "処理時間の内訳" not in plain[0].text
+        assert {"validation_ms", "disk_write_ms", "total_ms"} <= set(logged)
+        assert phase_count() - before == 1